@@ -0,0 +1,55 @@
+"""
+JobTracker SaaS - Normalisation des dates d'entretien
+Renseigne interviews.date_entretien_at (datetime UTC indexée) pour les
+entretiens planifiés qui ne l'ont pas encore, afin que le planificateur de
+rappels les trouve par plage de dates. Le planificateur le fait aussi par lots
+à chaque passage ; ce script traite tout l'historique d'un coup.
+
+Usage:
+    python backfill_interview_dates.py
+"""
+
+import asyncio
+import argparse
+import os
+import sys
+
+# Ajouter le répertoire parent au path pour les imports
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from utils.reminder_dispatcher import backfill_interview_dates
+
+
+async def backfill(mongo_url: str, db_name: str, batch_size: int):
+    """Traite les entretiens par lots jusqu'à épuisement"""
+    client = AsyncIOMotorClient(mongo_url)
+    db = client[db_name]
+
+    total = 0
+    while True:
+        count = await backfill_interview_dates(db, batch_size)
+        if not count:
+            break
+        total += count
+        print(f"  {total} entretien(s) normalisé(s)...")
+
+    print(f"\nDone. {total} entretien(s) mis à jour.")
+    client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Renseigne interviews.date_entretien_at")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Taille des lots")
+    parser.add_argument("--mongo-url", default=os.environ.get("MONGO_URL", "mongodb://localhost:27017"),
+                        help="URL MongoDB")
+    parser.add_argument("--db-name", default=os.environ.get("DB_NAME", "jobtracker"),
+                        help="Nom de la base de données")
+    args = parser.parse_args()
+
+    asyncio.run(backfill(args.mongo_url, args.db_name, args.batch_size))
+
+
+if __name__ == "__main__":
+    main()
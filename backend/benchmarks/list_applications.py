@@ -0,0 +1,123 @@
+"""
+Benchmark : enrichissement entretiens de GET /applications.
+Compare l'ancienne version (2 requêtes par candidature) à l'agrégation groupée.
+Lance (depuis backend/) : python -m benchmarks.list_applications
+Nécessite un MongoDB local ; la base de bench est supprimée à la fin.
+"""
+import asyncio
+import os
+import random
+import statistics
+import time
+import uuid
+from datetime import datetime, timezone, timedelta
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import monitoring
+
+from routes.applications import enrich_with_interviews
+
+MONGO_URL = os.environ.get("MONGO_URL", "mongodb://localhost:27017")
+DB_NAME = "jobtracker_bench"
+N_APPLICATIONS = 500
+ITERATIONS = 200
+
+
+class CommandCounter(monitoring.CommandListener):
+    """Compte les commandes envoyées au serveur (= allers-retours)"""
+
+    def __init__(self):
+        self.count = 0
+
+    def started(self, event):
+        self.count += 1
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+async def legacy_enrich(db, applications):
+    """Version d'origine : count_documents + find_one par candidature"""
+    for app in applications:
+        app["interviews_count"] = await db.interviews.count_documents({"candidature_id": app["id"]})
+        next_interview = await db.interviews.find_one(
+            {
+                "candidature_id": app["id"],
+                "statut": "planned",
+                "date_entretien": {"$gte": datetime.now(timezone.utc).isoformat()}
+            },
+            {"_id": 0, "date_entretien": 1},
+            sort=[("date_entretien", 1)]
+        )
+        app["next_interview"] = next_interview["date_entretien"] if next_interview else None
+    return applications
+
+
+async def seed(db, user_id):
+    now = datetime.now(timezone.utc)
+    apps, interviews = [], []
+    for i in range(N_APPLICATIONS):
+        app_id = str(uuid.uuid4())
+        apps.append({
+            "id": app_id,
+            "user_id": user_id,
+            "entreprise": f"Entreprise {i}",
+            "poste": "Développeur",
+            "reponse": "pending",
+            "date_candidature": (now - timedelta(days=i % 90)).isoformat(),
+        })
+        for _ in range(random.randint(0, 3)):
+            interviews.append({
+                "id": str(uuid.uuid4()),
+                "user_id": user_id,
+                "candidature_id": app_id,
+                "statut": random.choice(["planned", "completed", "cancelled"]),
+                "date_entretien": (now + timedelta(days=random.randint(-30, 30))).isoformat(),
+            })
+    await db.applications.insert_many(apps)
+    if interviews:
+        await db.interviews.insert_many(interviews)
+    await db.applications.create_index([("user_id", 1), ("date_candidature", -1)])
+    await db.interviews.create_index("candidature_id")
+
+
+async def run(db, counter, user_id, per_page, enrich):
+    latencies, round_trips = [], []
+    for _ in range(ITERATIONS):
+        page = random.randint(1, N_APPLICATIONS // per_page)
+        counter.count = 0
+        start = time.perf_counter()
+        filter_query = {"user_id": user_id}
+        await db.applications.count_documents(filter_query)
+        applications = await db.applications.find(filter_query, {"_id": 0}).sort(
+            "date_candidature", -1
+        ).skip((page - 1) * per_page).limit(per_page).to_list(length=per_page)
+        await enrich(db, applications)
+        latencies.append((time.perf_counter() - start) * 1000)
+        round_trips.append(counter.count)
+    p95 = statistics.quantiles(latencies, n=20)[-1]
+    return statistics.mean(round_trips), statistics.median(latencies), p95
+
+
+async def main():
+    counter = CommandCounter()
+    client = AsyncIOMotorClient(MONGO_URL, event_listeners=[counter])
+    db = client[DB_NAME]
+    user_id = str(uuid.uuid4())
+    try:
+        await seed(db, user_id)
+        print(f"{'per_page':>8} {'version':>8} {'round trips':>12} {'p50 (ms)':>9} {'p95 (ms)':>9}")
+        for per_page in (20, 100):
+            for label, enrich in (("legacy", legacy_enrich), ("batched", enrich_with_interviews)):
+                trips, p50, p95 = await run(db, counter, user_id, per_page, enrich)
+                print(f"{per_page:>8} {label:>8} {trips:>12.0f} {p50:>9.2f} {p95:>9.2f}")
+    finally:
+        await client.drop_database(DB_NAME)
+        client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,100 @@
+"""
+Benchmark : rendu PDF des lettres de motivation.
+Compare le rendu d'origine (synchrone dans la boucle d'événements) au pool de
+processus utils/pdf_renderer à 1 / 4 / 8 processus : lettres/s et retard
+maximal de la boucle (ce que subissent les autres requêtes du worker).
+Moitié HTML (xhtml2pdf), moitié texte (ReportLab).
+Lance (depuis backend/) : python -m benchmarks.pdf_render
+Aucune base de données requise.
+"""
+import asyncio
+import os
+import time
+
+from config import settings
+from utils import pdf_renderer
+from utils.pdf_renderer import render_cover_letter_pdf, render_pdf
+
+LETTERS = int(os.environ.get("BENCH_LETTERS", "48"))
+PROCESSES = [int(p) for p in os.environ.get("BENCH_PROCESSES", "1,4,8").split(",")]
+
+PARAGRAPH = (
+    "Fort de cinq années d'expérience en développement Python et en architecture de données, "
+    "je souhaite mettre mes compétences au service de votre équipe. J'ai notamment conduit la "
+    "migration d'une plateforme de facturation vers une architecture orientée événements."
+)
+TEXT_LETTER = "\n\n".join([PARAGRAPH] * 6)
+HTML_LETTER = """
+<html><head><style>
+  body { font-family: Helvetica; font-size: 11pt; color: #1a1a2e; }
+  h1 { font-size: 16pt; border-bottom: 1px solid #ccc; }
+  .meta { color: #666; font-size: 9pt; }
+  table { width: 100%; } td { padding: 4pt; }
+</style></head><body>
+  <table><tr><td><b>Jeanne Martin</b><br/>jeanne@example.com<br/>06 12 34 56 78</td>
+  <td align="right">Paris, le 18/10/2026</td></tr></table>
+  <h1>Candidature : Développeuse Python - Thalès</h1>
+  <p class="meta">Objet : candidature au poste de Développeuse Python</p>
+""" + "".join(f"<p>{PARAGRAPH}</p>" for _ in range(6)) + "</body></html>"
+
+
+def letter_args(i: int) -> dict:
+    is_html = i % 2 == 0
+    return {
+        "content": HTML_LETTER if is_html else TEXT_LETTER,
+        "entreprise": "Thalès",
+        "poste": "Développeuse Python",
+        "user_name": "Jeanne Martin",
+        "is_html": is_html,
+    }
+
+
+async def measure(render) -> tuple:
+    """(lettres/s, retard max de la boucle en ms) pendant le rendu de LETTERS lettres concurrentes"""
+    lag = 0.0
+    done = asyncio.Event()
+
+    async def ticker():
+        nonlocal lag
+        while not done.is_set():
+            start = time.perf_counter()
+            await asyncio.sleep(0.01)
+            lag = max(lag, time.perf_counter() - start - 0.01)
+
+    tick = asyncio.create_task(ticker())
+    start = time.perf_counter()
+    await asyncio.gather(*(render(i) for i in range(LETTERS)))
+    elapsed = time.perf_counter() - start
+    done.set()
+    await tick
+    return LETTERS / elapsed, lag * 1000
+
+
+async def inline(i: int):
+    """Version d'origine : rendu bloquant dans le handler"""
+    render_cover_letter_pdf(**letter_args(i))
+
+
+async def pooled(i: int):
+    await render_pdf(**letter_args(i))
+
+
+async def main():
+    print(f"{LETTERS} lettres, {os.cpu_count()} CPU")
+    print(f"{'version':>12} {'lettres/s':>10} {'retard boucle max (ms)':>23}")
+    rate, lag = await measure(inline)
+    print(f"{'inline':>12} {rate:>10.1f} {lag:>23.0f}")
+
+    settings.PDF_RENDER_QUEUE_SIZE = LETTERS
+    for processes in PROCESSES:
+        settings.PDF_RENDER_PROCESSES = processes
+        pdf_renderer.shutdown_pdf_renderer()
+        # Démarrage des processus hors mesure
+        await asyncio.gather(*(pooled(i) for i in range(processes)))
+        rate, lag = await measure(pooled)
+        print(f"{f'pool x{processes}':>12} {rate:>10.1f} {lag:>23.0f}")
+    pdf_renderer.shutdown_pdf_renderer()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
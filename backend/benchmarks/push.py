@@ -0,0 +1,137 @@
+"""
+Benchmark : débit d'envoi Web Push.
+Compare l'ancien envoi (pywebpush synchrone, séquentiel, VAPID re-signé et
+connexion ouverte à chaque appel) au service utils/push_service, contre un
+service push local simulé (latence PUSH_STUB_LATENCY_MS, ~2% d'abonnements
+expirés en 410, ~2% de 503 transitoires).
+Lance (depuis backend/) : python -m benchmarks.push
+Le service simulé seul : python -m benchmarks.push --serve
+Aucune base de données requise.
+"""
+import asyncio
+import base64
+import json
+import os
+import sys
+import threading
+import time
+
+import uvicorn
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+from fastapi import FastAPI, Response
+from py_vapid import Vapid, b64urlencode
+from pywebpush import webpush
+
+from utils import push_service
+
+HOST, PORT = "127.0.0.1", int(os.environ.get("PUSH_STUB_PORT", "8765"))
+LATENCY_MS = float(os.environ.get("PUSH_STUB_LATENCY_MS", "20"))
+SIZES = [int(s) for s in os.environ.get("BENCH_SIZES", "100,1000").split(",")]
+LEGACY_MAX = 200  # l'ancien envoi est extrapolé au-delà
+
+# ============================================
+# SERVICE PUSH SIMULÉ
+# ============================================
+
+stub_app = FastAPI()
+_attempts = {}
+
+
+@stub_app.post("/push/{token}")
+async def receive(token: str):
+    await asyncio.sleep(LATENCY_MS / 1000)
+    if token.startswith("gone"):
+        return Response(status_code=410)
+    if token.startswith("flaky") and not _attempts.get(token):
+        _attempts[token] = 1
+        return Response(status_code=503, headers={"Retry-After": "0"})
+    return Response(status_code=201)
+
+
+def start_stub() -> uvicorn.Server:
+    server = uvicorn.Server(uvicorn.Config(stub_app, host=HOST, port=PORT, log_level="warning", timeout_keep_alive=120))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+# ============================================
+# DONNÉES
+# ============================================
+
+def _b64(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).strip(b"=").decode()
+
+
+def make_subscriptions(n: int) -> list:
+    receiver = ec.generate_private_key(ec.SECP256R1())
+    p256dh = _b64(receiver.public_key().public_bytes(
+        serialization.Encoding.X962, serialization.PublicFormat.UncompressedPoint
+    ))
+    auth = _b64(os.urandom(16))
+    subscriptions = []
+    for i in range(n):
+        prefix = "gone" if i % 50 == 7 else "flaky" if i % 50 == 13 else "ok"
+        subscriptions.append({
+            "endpoint": f"http://{HOST}:{PORT}/push/{prefix}-{n}-{i}",
+            "keys": {"p256dh": p256dh, "auth": auth},
+        })
+    return subscriptions
+
+
+def vapid_private_key() -> str:
+    vapid = Vapid()
+    vapid.generate_keys()
+    return b64urlencode(vapid.private_key.private_numbers().private_value.to_bytes(32, "big"))
+
+
+PAYLOAD = {"title": "🗓️ Entretien demain - Thalès", "body": "Préparez-vous !", "url": "/dashboard/interviews"}
+
+
+async def legacy_send(subscriptions, private_key):
+    """Version d'origine : webpush bloquant dans la boucle, un envoi après l'autre"""
+    sent = 0
+    for sub in subscriptions:
+        try:
+            webpush(subscription_info=sub, data=json.dumps(PAYLOAD), vapid_private_key=private_key,
+                    vapid_claims={"sub": "mailto:bench@example.com"})
+            sent += 1
+        except Exception:
+            pass
+    return sent
+
+
+async def main():
+    private_key = vapid_private_key()
+    push_service.VAPID_PRIVATE_KEY = private_key
+    start_stub()
+    try:
+        print(f"latence simulée : {LATENCY_MS:.0f} ms, concurrence : {push_service.settings.PUSH_MAX_CONCURRENCY}")
+        print(f"{'push':>6} {'version':>8} {'durée (s)':>10} {'push/s':>8} {'envoyés':>8} {'expirés':>8}")
+        for n in SIZES:
+            subscriptions = make_subscriptions(n)
+
+            legacy_subs = subscriptions[:LEGACY_MAX]
+            start = time.perf_counter()
+            sent = await legacy_send(legacy_subs, private_key)
+            elapsed = time.perf_counter() - start
+            print(f"{n:>6} {'legacy':>8} {elapsed * n / len(legacy_subs):>10.2f} "
+                  f"{len(legacy_subs) / elapsed:>8.0f} {sent:>8} {'-':>8}")
+
+            _attempts.clear()
+            start = time.perf_counter()
+            report = await push_service.send_pushes([(sub, PAYLOAD) for sub in subscriptions])
+            elapsed = time.perf_counter() - start
+            print(f"{n:>6} {'service':>8} {elapsed:>10.2f} {n / elapsed:>8.0f} "
+                  f"{report.sent:>8} {len(report.expired):>8}")
+    finally:
+        await push_service.close_push_client()
+
+
+if __name__ == "__main__":
+    if "--serve" in sys.argv:
+        uvicorn.run(stub_app, host=HOST, port=PORT)
+    else:
+        asyncio.run(main())
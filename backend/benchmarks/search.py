@@ -0,0 +1,159 @@
+"""
+Benchmark : recherche globale (GET /search/global).
+Compare l'ancienne version (regex non ancrées sur 5 collections) à la recherche
+plein texte classée, pour 1k / 10k / 100k documents par utilisateur.
+Lance (depuis backend/) : python -m benchmarks.search
+Nécessite un MongoDB local ; la base de bench est supprimée à la fin.
+"""
+import asyncio
+import os
+import random
+import re
+import statistics
+import time
+import uuid
+from datetime import datetime, timezone, timedelta
+
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from utils.search_engine import ensure_search_indexes, search
+
+MONGO_URL = os.environ.get("MONGO_URL", "mongodb://localhost:27017")
+DB_NAME = "jobtracker_bench"
+SIZES = [int(s) for s in os.environ.get("BENCH_SIZES", "1000,10000,100000").split(",")]
+ITERATIONS = 50
+INSERT_BATCH = 5000
+
+COMPANIES = ["Société Générale", "Crédit Agricole", "Décathlon", "Thalès", "Orange", "Capgemini",
+             "Sopra Steria", "L'Oréal", "Michelin", "Ubisoft", "Dassault Systèmes", "Criteo"]
+POSTES = ["Développeur Python", "Ingénieur données", "Chef de projet", "Analyste financier",
+          "Développeuse front-end", "Architecte cloud", "Responsable marketing", "Stagiaire RH"]
+VILLES = ["Paris", "Lyon", "Nantes", "Toulouse", "Montréal", "Bordeaux", "Lille"]
+QUERIES = ["developpeur", "Société", "thales paris", "ingenieur donnees", "marketing", "introuvable"]
+
+
+async def legacy_search(db, user_id, q):
+    """Version d'origine : regex insensibles à la casse, non ancrées, séquentielles"""
+    search_regex = {"$regex": re.escape(q), "$options": "i"}
+    results = []
+    results += await db.applications.find({"user_id": user_id, "$or": [
+        {"entreprise": search_regex}, {"poste": search_regex}, {"lieu": search_regex}
+    ]}).limit(10).to_list(10)
+    matching_apps = await db.applications.find({"user_id": user_id, "$or": [
+        {"entreprise": search_regex}, {"poste": search_regex}
+    ]}, {"id": 1}).to_list(100)
+    interviews = await db.interviews.find({"user_id": user_id, "$or": [
+        {"candidature_id": {"$in": [a["id"] for a in matching_apps]}},
+        {"notes": search_regex}, {"type_entretien": search_regex}, {"interviewer": search_regex}
+    ]}).limit(10).to_list(10)
+    for interview in interviews:
+        await db.applications.find_one({"id": interview["candidature_id"]}, {"entreprise": 1, "poste": 1})
+    results += interviews
+    results += await db.documents.find({"user_id": user_id, "$or": [
+        {"name": search_regex}, {"original_filename": search_regex}, {"description": search_regex}
+    ]}).limit(10).to_list(10)
+    results += await db.generated_cover_letters.find({"user_id": user_id, "$or": [
+        {"entreprise": search_regex}, {"poste": search_regex}, {"content": search_regex}
+    ]}).limit(8).to_list(8)
+    results += await db.notifications.find({"user_id": user_id, "$or": [
+        {"title": search_regex}, {"message": search_regex}
+    ]}).limit(3).to_list(3)
+    return results
+
+
+async def insert(collection, docs):
+    for start in range(0, len(docs), INSERT_BATCH):
+        await collection.insert_many(docs[start:start + INSERT_BATCH], ordered=False)
+
+
+async def seed(db, user_id, total):
+    """Répartition : 60% candidatures, 20% entretiens, 5% documents, 10% lettres, 5% notifications"""
+    now = datetime.now(timezone.utc)
+    n_apps = int(total * 0.6)
+    apps = []
+    for i in range(n_apps):
+        apps.append({
+            "id": str(uuid.uuid4()),
+            "user_id": user_id,
+            "entreprise": f"{random.choice(COMPANIES)} {i}",
+            "poste": random.choice(POSTES),
+            "lieu": random.choice(VILLES),
+            "reponse": "pending",
+            "date_candidature": (now - timedelta(days=i % 365)).isoformat(),
+        })
+    interviews = [{
+        "id": str(uuid.uuid4()),
+        "user_id": user_id,
+        "candidature_id": random.choice(apps)["id"],
+        "type_entretien": random.choice(["rh", "technique", "manager", "final"]),
+        "interviewer": random.choice(["Mme Dupont", "M. Lefèvre", "Équipe RH"]),
+        "notes": "Préparer les questions sur " + random.choice(POSTES),
+        "date_entretien": (now + timedelta(days=random.randint(-60, 60))).isoformat(),
+    } for _ in range(int(total * 0.2))]
+    documents = [{
+        "id": str(uuid.uuid4()),
+        "user_id": user_id,
+        "name": f"CV {random.choice(POSTES)} v{i}",
+        "original_filename": f"cv_{i}.pdf",
+        "description": "Version ciblée " + random.choice(COMPANIES),
+        "document_type": "cv",
+    } for i in range(int(total * 0.05))]
+    letters = [{
+        "id": str(uuid.uuid4()),
+        "user_id": user_id,
+        "entreprise": random.choice(COMPANIES),
+        "poste": random.choice(POSTES),
+        "content": "Madame, Monsieur, je souhaite rejoindre votre équipe en tant que " + random.choice(POSTES),
+    } for _ in range(int(total * 0.1))]
+    notifications = [{
+        "id": str(uuid.uuid4()),
+        "user_id": user_id,
+        "title": f"Entretien demain - {random.choice(COMPANIES)}",
+        "message": "Votre entretien approche, préparez-vous !",
+        "created_at": now.isoformat(),
+    } for _ in range(int(total * 0.05))]
+
+    await insert(db.applications, apps)
+    await insert(db.interviews, interviews)
+    await insert(db.documents, documents)
+    await insert(db.generated_cover_letters, letters)
+    await insert(db.notifications, notifications)
+    for name in ("applications", "interviews", "documents", "generated_cover_letters", "notifications"):
+        await db[name].create_index("user_id")
+    await db.applications.create_index("id", unique=True)
+    await db.interviews.create_index("candidature_id")
+    await ensure_search_indexes(db)
+
+
+async def run(db, user_id, fn):
+    latencies = []
+    for i in range(ITERATIONS):
+        q = QUERIES[i % len(QUERIES)]
+        start = time.perf_counter()
+        await fn(db, user_id, q)
+        latencies.append((time.perf_counter() - start) * 1000)
+    p95 = statistics.quantiles(latencies, n=20)[-1]
+    return statistics.median(latencies), p95
+
+
+async def main():
+    client = AsyncIOMotorClient(MONGO_URL)
+    db = client[DB_NAME]
+    try:
+        print(f"{'documents':>10} {'version':>8} {'p50 (ms)':>9} {'p95 (ms)':>9}")
+        for total in SIZES:
+            await client.drop_database(DB_NAME)
+            user_id = str(uuid.uuid4())
+            # Un second utilisateur de même volume : les index doivent isoler l'utilisateur
+            await seed(db, str(uuid.uuid4()), total)
+            await seed(db, user_id, total)
+            for label, fn in (("legacy", legacy_search), ("text", search)):
+                p50, p95 = await run(db, user_id, fn)
+                print(f"{total:>10} {label:>8} {p50:>9.2f} {p95:>9.2f}")
+    finally:
+        await client.drop_database(DB_NAME)
+        client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -56,6 +56,106 @@ class Settings(BaseSettings):
     # Generate: python -c "from cryptography.fernet import Fernet; print(Fernet.generate_key().decode())"
     ENCRYPTION_KEY: Optional[str] = os.environ.get('ENCRYPTION_KEY')
 
+    # Caches en mémoire (invalidation partagée entre workers si REDIS_URL est défini)
+    REDIS_URL: Optional[str] = os.environ.get('REDIS_URL')
+    USER_CACHE_TTL_SECONDS: int = int(os.environ.get('USER_CACHE_TTL_SECONDS', '30'))
+    USER_CACHE_MAX_ENTRIES: int = int(os.environ.get('USER_CACHE_MAX_ENTRIES', '10000'))
+
+    # Fournisseurs IA (clients async partagés)
+    AI_TIMEOUT_SECONDS: float = float(os.environ.get('AI_TIMEOUT_SECONDS', '60'))
+    AI_MAX_CONCURRENCY_PER_PROVIDER: int = int(os.environ.get('AI_MAX_CONCURRENCY_PER_PROVIDER', '8'))
+    AI_CLIENT_POOL_SIZE: int = int(os.environ.get('AI_CLIENT_POOL_SIZE', '256'))
+    # Hedging : après AI_HEDGE_DELAY_SECONDS sans réponse, le fournisseur suivant est lancé
+    AI_HEDGE_ENABLED: bool = os.environ.get('AI_HEDGE_ENABLED', 'true').lower() == 'true'
+    AI_HEDGE_DELAY_SECONDS: float = float(os.environ.get('AI_HEDGE_DELAY_SECONDS', '4'))
+    AI_EWMA_ALPHA: float = float(os.environ.get('AI_EWMA_ALPHA', '0.2'))
+    # Cache des réponses IA (endpoints désactivables : ex. "extract_job,matching")
+    AI_CACHE_ENABLED: bool = os.environ.get('AI_CACHE_ENABLED', 'true').lower() == 'true'
+    AI_CACHE_DISABLED_ENDPOINTS: str = os.environ.get('AI_CACHE_DISABLED_ENDPOINTS', '')
+    AI_CACHE_TTL_SECONDS: int = int(os.environ.get('AI_CACHE_TTL_SECONDS', str(7 * 24 * 3600)))
+    AI_CACHE_MAX_ENTRIES: int = int(os.environ.get('AI_CACHE_MAX_ENTRIES', '50000'))
+    AI_CACHE_TRIM_EVERY: int = int(os.environ.get('AI_CACHE_TRIM_EVERY', '100'))
+    AI_CACHE_MEMORY_ENTRIES: int = int(os.environ.get('AI_CACHE_MEMORY_ENTRIES', '1000'))
+    AI_CACHE_MEMORY_TTL_SECONDS: int = int(os.environ.get('AI_CACHE_MEMORY_TTL_SECONDS', '600'))
+    
+    # Import en masse : taille des lots insert_many / bulk_write
+    IMPORT_BATCH_SIZE: int = int(os.environ.get('IMPORT_BATCH_SIZE', '1000'))
+
+    # Exports asynchrones (stockage des artefacts : "local" ou "gridfs")
+    EXPORT_JOBS_STORAGE: str = os.environ.get('EXPORT_JOBS_STORAGE', 'local')
+    EXPORT_JOBS_DIR: str = os.environ.get('EXPORT_JOBS_DIR', '')
+    EXPORT_JOBS_POLL_SECONDS: int = int(os.environ.get('EXPORT_JOBS_POLL_SECONDS', '30'))
+    EXPORT_JOBS_LEASE_SECONDS: int = int(os.environ.get('EXPORT_JOBS_LEASE_SECONDS', '300'))
+    EXPORT_JOBS_MAX_ATTEMPTS: int = int(os.environ.get('EXPORT_JOBS_MAX_ATTEMPTS', '3'))
+    EXPORT_JOBS_RETENTION_HOURS: int = int(os.environ.get('EXPORT_JOBS_RETENTION_HOURS', '24'))
+
+    # Recherche globale : repli regex (mots partiels) quand l'index texte ne trouve rien
+    # Budget par source (s) : au-delà, la source est ignorée et la réponse partielle
+    SEARCH_SOURCE_BUDGET_SECONDS: float = float(os.environ.get('SEARCH_SOURCE_BUDGET_SECONDS', '0.8'))
+    SEARCH_REGEX_FALLBACK: bool = os.environ.get('SEARCH_REGEX_FALLBACK', 'true').lower() == 'true'
+    # Autocomplétion : index de préfixes en mémoire (LRU par utilisateur)
+    TYPEAHEAD_MAX_USERS: int = int(os.environ.get('TYPEAHEAD_MAX_USERS', '2000'))
+    TYPEAHEAD_TTL_SECONDS: int = int(os.environ.get('TYPEAHEAD_TTL_SECONDS', '3600'))
+
+    # Rappels d'entretiens : passage du planificateur, horizon lu à chaque passage
+    # (doit dépasser l'intervalle) et regroupement des échéances
+    REMINDER_PLAN_INTERVAL_SECONDS: int = int(os.environ.get('REMINDER_PLAN_INTERVAL_SECONDS', '300'))
+    REMINDER_PLAN_HORIZON_SECONDS: int = int(os.environ.get('REMINDER_PLAN_HORIZON_SECONDS', '900'))
+    REMINDER_BUCKET_SECONDS: int = int(os.environ.get('REMINDER_BUCKET_SECONDS', '60'))
+
+    # Tâches planifiées : un seul worker leader (bail Mongo), renouvelé
+    # toutes les SCHEDULER_LEASE_RENEW_SECONDS, repris par un autre worker à expiration
+    SCHEDULER_LEASE_SECONDS: int = int(os.environ.get('SCHEDULER_LEASE_SECONDS', '30'))
+    SCHEDULER_LEASE_RENEW_SECONDS: int = int(os.environ.get('SCHEDULER_LEASE_RENEW_SECONDS', '10'))
+
+    # Rendu PDF des lettres : processus du pool (0 = thread), file d'attente bornée
+    # au-delà de laquelle les demandes sont refusées, délai maximal par rendu
+    PDF_RENDER_PROCESSES: int = int(os.environ.get('PDF_RENDER_PROCESSES', '2'))
+    PDF_RENDER_QUEUE_SIZE: int = int(os.environ.get('PDF_RENDER_QUEUE_SIZE', '16'))
+    PDF_RENDER_TIMEOUT_SECONDS: float = float(os.environ.get('PDF_RENDER_TIMEOUT_SECONDS', '30'))
+
+    # Templates de lettres : documents et templates Jinja compilés en mémoire,
+    # bytecode sur disque (dossier privé 0700 ; vide = dossier temporaire propre à l'utilisateur)
+    TEMPLATE_CACHE_SIZE: int = int(os.environ.get('TEMPLATE_CACHE_SIZE', '1000'))
+    TEMPLATE_CACHE_TTL_SECONDS: int = int(os.environ.get('TEMPLATE_CACHE_TTL_SECONDS', '3600'))
+    TEMPLATE_BYTECODE_DIR: str = os.environ.get('TEMPLATE_BYTECODE_DIR', '')
+
+    # Stockage des documents : "cloudinary", "s3" ou "local" (dossier, vide = dossier
+    # temporaire) ; uploads par morceaux (>= 5 Mo, minimum Cloudinary / S3) et pool
+    # de threads des SDK synchrones
+    STORAGE_BACKEND: str = os.environ.get('STORAGE_BACKEND', 'cloudinary')
+    STORAGE_LOCAL_DIR: str = os.environ.get('STORAGE_LOCAL_DIR', '')
+    STORAGE_CHUNK_SIZE: int = int(os.environ.get('STORAGE_CHUNK_SIZE', str(6 * 1024 * 1024)))
+    STORAGE_MAX_WORKERS: int = int(os.environ.get('STORAGE_MAX_WORKERS', '8'))
+    # Fichiers du stockage local : URL signées, valables au moins cette durée
+    STORAGE_LOCAL_URL_EXPIRES_SECONDS: int = int(os.environ.get('STORAGE_LOCAL_URL_EXPIRES_SECONDS', str(24 * 3600)))
+    S3_BUCKET: str = os.environ.get('S3_BUCKET', '')
+    S3_ENDPOINT_URL: str = os.environ.get('S3_ENDPOINT_URL', '')
+    S3_REGION: str = os.environ.get('S3_REGION', '')
+    S3_ACCESS_KEY_ID: str = os.environ.get('S3_ACCESS_KEY_ID', '')
+    S3_SECRET_ACCESS_KEY: str = os.environ.get('S3_SECRET_ACCESS_KEY', '')
+    # URL publique du bucket (CDN) ; vide = URL signées valables S3_URL_EXPIRES_SECONDS
+    S3_PUBLIC_URL: str = os.environ.get('S3_PUBLIC_URL', '')
+    S3_URL_EXPIRES_SECONDS: int = int(os.environ.get('S3_URL_EXPIRES_SECONDS', str(7 * 24 * 3600)))
+
+    # PDF des lettres générées : artefacts dédupliqués par empreinte du rendu,
+    # stockage dédié possible (vide = STORAGE_BACKEND)
+    PDF_ARTIFACT_STORAGE: str = os.environ.get('PDF_ARTIFACT_STORAGE', '')
+
+    # Texte des CV : extraction à l'upload dans un pool de processus (0 = thread),
+    # file d'attente bornée, mise en cache par empreinte du fichier
+    CV_EXTRACT_PROCESSES: int = int(os.environ.get('CV_EXTRACT_PROCESSES', '1'))
+    CV_EXTRACT_QUEUE_SIZE: int = int(os.environ.get('CV_EXTRACT_QUEUE_SIZE', '8'))
+    CV_EXTRACT_TIMEOUT_SECONDS: float = float(os.environ.get('CV_EXTRACT_TIMEOUT_SECONDS', '30'))
+
+    # Web Push : requêtes simultanées (et connexions) vers les services push,
+    # nouvelles tentatives sur 429/5xx, durée de vie des JWT VAPID et des messages
+    PUSH_MAX_CONCURRENCY: int = int(os.environ.get('PUSH_MAX_CONCURRENCY', '32'))
+    PUSH_TIMEOUT_SECONDS: float = float(os.environ.get('PUSH_TIMEOUT_SECONDS', '10'))
+    PUSH_MAX_RETRIES: int = int(os.environ.get('PUSH_MAX_RETRIES', '3'))
+    PUSH_VAPID_EXPIRY_SECONDS: int = int(os.environ.get('PUSH_VAPID_EXPIRY_SECONDS', str(12 * 3600)))
+    PUSH_TTL_SECONDS: int = int(os.environ.get('PUSH_TTL_SECONDS', str(24 * 3600)))
+
     # App
     APP_NAME: str = "JobTracker SaaS"
     DEBUG: bool = os.environ.get('DEBUG', 'false').lower() == 'true'
@@ -0,0 +1,56 @@
+"""
+JobTracker SaaS - Reconstruction du rollup user_stats
+Recalcule les compteurs db.user_stats depuis applications/interviews
+pour corriger une éventuelle dérive.
+
+Usage:
+    python rebuild_user_stats.py                 # tous les utilisateurs
+    python rebuild_user_stats.py --user-id <id>  # un seul utilisateur
+"""
+
+import asyncio
+import argparse
+import os
+import sys
+
+# Ajouter le répertoire parent au path pour les imports
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from utils.user_stats import rebuild_user_stats
+
+
+async def rebuild(mongo_url: str, db_name: str, user_id: str = None):
+    """Reconstruit le rollup d'un utilisateur ou de tous"""
+    client = AsyncIOMotorClient(mongo_url)
+    db = client[db_name]
+
+    if user_id:
+        user_ids = [user_id]
+    else:
+        user_ids = await db.applications.distinct("user_id")
+        user_ids += [uid for uid in await db.user_stats.distinct("user_id") if uid not in user_ids]
+
+    for uid in user_ids:
+        doc = await rebuild_user_stats(db, uid)
+        print(f"  {uid}: {doc['total']} candidature(s)")
+
+    print(f"\nDone. {len(user_ids)} rollup(s) reconstruit(s).")
+    client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reconstruit le rollup user_stats")
+    parser.add_argument("--user-id", help="Limiter à un utilisateur")
+    parser.add_argument("--mongo-url", default=os.environ.get("MONGO_URL", "mongodb://localhost:27017"),
+                        help="URL MongoDB")
+    parser.add_argument("--db-name", default=os.environ.get("DB_NAME", "jobtracker"),
+                        help="Nom de la base de données")
+    args = parser.parse_args()
+
+    asyncio.run(rebuild(args.mongo_url, args.db_name, args.user_id))
+
+
+if __name__ == "__main__":
+    main()
@@ -18,7 +18,8 @@ import uuid
 
 # Password hashing
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-from utils.auth import get_current_user
+from utils.auth import get_current_user, invalidate_user_cache
+from utils.template_cache import invalidate_template
 from utils.ai_quota import DAILY_QUOTA
 
 router = APIRouter(prefix="/admin", tags=["Administration"])
@@ -478,6 +479,7 @@ async def update_user(
             {"id": user_id},
             {"$set": update_dict}
         )
+        await invalidate_user_cache(user_id)
     
     return {"message": "Utilisateur mis à jour avec succès"}
 
@@ -509,6 +511,7 @@ async def delete_user(
         {"id": user_id},
         {"$set": {"is_active": False}}
     )
+    await invalidate_user_cache(user_id)
     
     return {"message": "Utilisateur désactivé avec succès"}
 
@@ -532,6 +535,7 @@ async def reactivate_user(
         {"id": user_id},
         {"$set": {"is_active": True}}
     )
+    await invalidate_user_cache(user_id)
     
     return {"message": "Utilisateur réactivé avec succès"}
 
@@ -689,6 +693,18 @@ async def get_ai_quota_stats(
     }
 
 
+@router.get("/ai-cache-stats")
+async def get_ai_cache_stats(
+    admin_user: dict = Depends(get_admin_user),
+    db = Depends(get_db)
+):
+    """Retourne les métriques du cache des réponses IA (succès / échecs par endpoint)"""
+    from utils.ai_cache import cache_stats
+    stats = cache_stats()
+    stats["stored_entries"] = await db.ai_response_cache.estimated_document_count()
+    return stats
+
+
 # ============================================
 # PLATFORM SETTINGS (QUOTA IA)
 # ============================================
@@ -722,6 +738,8 @@ async def update_quota_settings(
         {"$set": {"key": "ai_daily_quota", "value": body.daily_quota, "updated_at": datetime.now(timezone.utc).isoformat()}},
         upsert=True
     )
+    from utils.ai_quota import invalidate_quota_limit
+    await invalidate_quota_limit()
     return {"daily_quota": body.daily_quota}
 
 
@@ -918,6 +936,7 @@ async def update_system_template(
         {"id": template_id},
         {"$set": update_dict}
     )
+    await invalidate_template(template_id)
     
     # Récupérer la version mise à jour
     updated_template = await db.system_templates.find_one({"id": template_id})
@@ -934,5 +953,6 @@ async def delete_system_template(
     result = await db.system_templates.delete_one({"id": template_id})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Template non trouvé")
+    await invalidate_template(template_id)
     
     return {"message": "Template supprimé avec succès"}
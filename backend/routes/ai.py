@@ -4,6 +4,7 @@ Supporte trois fournisseurs d'IA avec sélection dynamique du modèle.
 """
 
 from fastapi import APIRouter, HTTPException, status, Depends, Request
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import Optional, List
 from datetime import datetime, timezone
@@ -42,6 +43,8 @@ except ImportError:
 
 from utils.auth import get_current_user
 from utils.ai_quota import check_and_increment_quota, get_usage_today
+from utils.ai_providers import complete, complete_hedged, provider_health, stream
+from utils import ai_cache
 
 router = APIRouter(prefix="/ai", tags=["AI"])
 
@@ -219,7 +222,8 @@ Dernières candidatures:
 
 def select_api_key(user_keys: dict, provider: Optional[str] = None) -> tuple:
     """Select the best available API key and provider.
-    Priority order: groq > openai > google (groq is free and fast)
+    Default priority: groq > openai > google (groq is free and fast),
+    re-ranked by observed provider latency / error rate.
     """
     env_keys = {
         "openai": os.environ.get("OPENAI_API_KEY") or os.environ.get("EMERGENT_LLM_KEY"),
@@ -233,12 +237,13 @@ def select_api_key(user_keys: dict, provider: Optional[str] = None) -> tuple:
             return key, provider
 
     # Priority: groq first (free & fast), then openai, then google
-    for p in ["groq", "openai", "google"]:
+    ranked = provider_health.rank(["groq", "openai", "google"], provider_of=lambda p: p)
+    for p in ranked:
         if user_keys.get(p):
             return user_keys[p], p
 
     # Fallback to environment keys
-    for p in ["groq", "openai", "google"]:
+    for p in ranked:
         if env_keys.get(p):
             return env_keys[p], p
 
@@ -246,7 +251,7 @@ def select_api_key(user_keys: dict, provider: Optional[str] = None) -> tuple:
 
 
 def get_all_api_keys_ordered(user_keys: dict) -> list:
-    """Return all available (key, provider) pairs in priority order for fallback"""
+    """Return all available (key, provider) pairs, best observed provider first"""
     env_keys = {
         "openai": os.environ.get("OPENAI_API_KEY") or os.environ.get("EMERGENT_LLM_KEY"),
         "google": os.environ.get("GOOGLE_API_KEY") or os.environ.get("GEMINI_API_KEY") or os.environ.get("EMERGENT_LLM_KEY"),
@@ -257,7 +262,7 @@ def get_all_api_keys_ordered(user_keys: dict) -> list:
         key = user_keys.get(p) or env_keys.get(p)
         if key and (p, key) not in [(r[1], r[0]) for r in result]:
             result.append((key, p))
-    return result
+    return provider_health.rank(result, provider_of=lambda r: r[1])
 
 
 # ============== AI Call Functions ==============
@@ -273,15 +278,7 @@ async def call_openai(api_key: str, model: str, system_message: str, user_messag
         response = await chat.send_message(UserMessage(text=user_message))
         return response
     else:
-        client = OpenAI(api_key=api_key)
-        response = client.chat.completions.create(
-            model=model,
-            messages=[
-                {"role": "system", "content": system_message},
-                {"role": "user", "content": user_message}
-            ]
-        )
-        return response.choices[0].message.content
+        return await complete("openai", api_key, model, system_message, user_message)
 
 
 async def call_google(api_key: str, model: str, system_message: str, user_message: str) -> str:
@@ -295,10 +292,8 @@ async def call_google(api_key: str, model: str, system_message: str, user_messag
         response = await chat.send_message(UserMessage(text=user_message))
         return response
     else:
-        client = genai.Client(api_key=api_key)
         full_prompt = f"{system_message}\n\n---\n\nQuestion:\n{user_message}"
-        response = client.models.generate_content(model=model, contents=full_prompt)
-        return response.text
+        return await complete("google", api_key, model, None, full_prompt)
 
 
 async def call_groq(api_key: str, model: str, system_message: str, user_message: str) -> str:
@@ -306,15 +301,7 @@ async def call_groq(api_key: str, model: str, system_message: str, user_message:
     if not GROQ_AVAILABLE:
         raise HTTPException(status_code=500, detail="Groq SDK not installed")
     
-    client = Groq(api_key=api_key)
-    response = client.chat.completions.create(
-        model=model,
-        messages=[
-            {"role": "system", "content": system_message},
-            {"role": "user", "content": user_message}
-        ]
-    )
-    return response.choices[0].message.content
+    return await complete("groq", api_key, model, system_message, user_message)
 
 
 async def call_ai(api_key: str, provider: str, model: str, system_message: str, user_message: str) -> str:
@@ -329,6 +316,131 @@ async def call_ai(api_key: str, provider: str, model: str, system_message: str,
         raise HTTPException(status_code=400, detail=f"Unknown provider: {provider}")
 
 
+async def call_ai_stream(api_key: str, provider: str, model: str, system_message: str, user_message: str):
+    """Universal streaming call: yields text chunks as the provider emits them.
+    Closing the generator aborts the upstream request."""
+    if provider not in ("openai", "google", "groq"):
+        raise HTTPException(status_code=400, detail=f"Unknown provider: {provider}")
+    if provider == "groq" and not GROQ_AVAILABLE:
+        raise HTTPException(status_code=500, detail="Groq SDK not installed")
+
+    if USE_EMERGENT and provider != "groq":
+        # LlmChat has no streaming API: single chunk
+        yield await call_ai(api_key, provider, model, system_message, user_message)
+        return
+
+    if provider == "google":
+        upstream = stream("google", api_key, model, None, f"{system_message}\n\n---\n\nQuestion:\n{user_message}")
+    else:
+        upstream = stream(provider, api_key, model, system_message, user_message)
+    try:
+        async for chunk in upstream:
+            yield chunk
+    finally:
+        await upstream.aclose()
+
+
+def sse_event(data: dict, event: Optional[str] = None) -> str:
+    """Format a server-sent event"""
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def stream_ai_response(http_request: Request, api_key: str, provider: str, model: str, system_message: str,
+                       user_message: str, session_id: str, on_complete) -> StreamingResponse:
+    """SSE response forwarding tokens; on_complete(full_text) persists the message once at the end.
+    If the client disconnects, the upstream call is aborted and nothing is saved."""
+    model_used = f"{provider}/{model}"
+
+    async def events():
+        yield sse_event({"session_id": session_id, "model_used": model_used}, event="start")
+        parts = []
+        upstream = call_ai_stream(api_key, provider, model, system_message, user_message)
+        try:
+            async for chunk in upstream:
+                if await http_request.is_disconnected():
+                    return
+                parts.append(chunk)
+                yield sse_event({"delta": chunk})
+        except Exception as e:
+            detail = e.detail if isinstance(e, HTTPException) else f"Erreur du service IA: {str(e)}"
+            yield sse_event({"detail": detail}, event="error")
+            return
+        finally:
+            await upstream.aclose()
+
+        await on_complete("".join(parts))
+        yield sse_event({"session_id": session_id, "model_used": model_used}, event="done")
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+async def call_ai_with_fallback(providers_to_try: list, get_model, system_message: str, user_message: str,
+                                parse=None, db=None, cache_endpoint: Optional[str] = None, before_call=None):
+    """Call the first provider that answers; with several providers the request is
+    hedged (the next provider is fired after a latency budget, the loser cancelled).
+    With db and cache_endpoint, answers go through the response cache and
+    before_call (e.g. quota check) only runs on a cache miss.
+    Returns (result, provider)."""
+    use_cache = db is not None and cache_endpoint is not None
+    if use_cache:
+        cached = await ai_cache.lookup(
+            db, cache_endpoint, [(p, get_model(p)) for _, p in providers_to_try], system_message, user_message
+        )
+        if cached:
+            response, provider = cached
+            return (parse(response) if parse else response), provider
+    if before_call:
+        await before_call()
+
+    def parse_keep_raw(response: str):
+        return response, (parse(response) if parse else response)
+
+    if not USE_EMERGENT:
+        candidates = [(provider, api_key, get_model(provider)) for api_key, provider in providers_to_try]
+        (response, result), provider, model = await complete_hedged(
+            candidates, system_message, user_message, parse=parse_keep_raw
+        )
+        if use_cache:
+            await ai_cache.store(db, cache_endpoint, provider, model, system_message, user_message, response)
+        return result, provider
+
+    # Emergent keys go through LlmChat: sequential fallback
+    last_error = None
+    for api_key, provider in providers_to_try:
+        try:
+            model = get_model(provider)
+            response, result = parse_keep_raw(
+                await call_ai(api_key, provider, model, system_message, user_message)
+            )
+        except Exception as e:
+            print(f"WARNING: Provider {provider} failed: {e}. Trying next...")
+            last_error = e
+            continue
+        if use_cache:
+            await ai_cache.store(db, cache_endpoint, provider, model, system_message, user_message, response)
+        return result, provider
+    raise last_error
+
+
+def parse_json_response(response: str) -> dict:
+    """Parse a JSON answer, stripping markdown code fences if present"""
+    cleaned = response.strip()
+    if cleaned.startswith("```"):
+        cleaned = re.sub(r'^```(?:json)?\n?', '', cleaned)
+        cleaned = re.sub(r'\n?```$', '', cleaned)
+
+    try:
+        return json.loads(cleaned)
+    except json.JSONDecodeError:
+        json_match = re.search(r'\{[\s\S]*\}', cleaned)
+        return json.loads(json_match.group()) if json_match else {}
+
+
 # ============== API Endpoints ==============
 
 @router.get("/available-models", response_model=AvailableModelsResponse)
@@ -402,22 +514,17 @@ async def get_ai_usage_stats(
     }
 
 
-@router.post("/career-advisor", response_model=CareerAdviceResponse)
-async def get_career_advice(
-    request: CareerAdviceRequest,
-    current_user: dict = Depends(get_current_user),
-    db = Depends(get_db)
-):
-    """Get career advice from AI advisor"""
-    user_id = current_user["user_id"]
-    is_admin = current_user.get("role") == "admin"
+async def prepare_chat_call(user_id: str, db, model_provider: Optional[str], model_name: Optional[str],
+                            role: Optional[str] = None) -> tuple:
+    """Quota check and provider/model selection shared by chat endpoints.
+    Returns (api_key, provider, model)."""
     own_keys = await get_user_own_keys(user_id, db)
     has_own_key = _has_any_key(own_keys)
     user_keys = await get_user_api_keys(user_id, db)
-    if not has_own_key and not is_admin:
-        await check_and_increment_quota(user_id, db)
+    if not has_own_key and role != "admin":
+        await check_and_increment_quota(user_id, db, role=role)
 
-    api_key, provider = select_api_key(user_keys, request.model_provider)
+    api_key, provider = select_api_key(user_keys, model_provider)
 
     if not api_key:
         raise HTTPException(
@@ -426,18 +533,14 @@ async def get_career_advice(
         )
     
     # Select model
-    model = request.model_name
+    model = model_name
     if not model:
         model = AI_MODELS[provider][0]["model_id"]
-    
-    session_id = f"career-{user_id}"
-    
-    # Build context
-    context = ""
-    if request.include_applications:
-        context = await get_user_context(user_id, db)
-    
-    system_message = f"""Tu es un conseiller carrière IA expert et bienveillant. Tu aides les candidats dans leur recherche d'emploi.
+    return api_key, provider, model
+
+
+def build_career_system_message(context: str) -> str:
+    return f"""Tu es un conseiller carrière IA expert et bienveillant. Tu aides les candidats dans leur recherche d'emploi.
 
 {context}
 
@@ -451,21 +554,84 @@ Tes responsabilités:
 Réponds toujours en français de manière professionnelle mais accessible.
 Sois concis et actionnable dans tes conseils."""
 
+
+CHATBOT_SYSTEM_MESSAGE = """Tu es un assistant IA spécialisé dans la recherche d'emploi. Tu aides les utilisateurs avec:
+
+1. Rédaction de CV et lettres de motivation
+2. Préparation aux entretiens d'embauche
+3. Conseils sur les négociations salariales
+4. Informations sur les entreprises et secteurs
+5. Gestion du stress lié à la recherche d'emploi
+
+Réponds toujours en français de manière claire et utile.
+Si tu ne sais pas quelque chose, dis-le honnêtement."""
+
+
+async def save_career_advice(db, user_id: str, session_id: str, question: str, advice: str, model_used: str):
+    await db.chat_history.insert_one({
+        "user_id": user_id,
+        "session_id": session_id,
+        "type": "career_advisor",
+        "model_used": model_used,
+        "messages": [
+            {"role": "user", "content": question, "timestamp": datetime.now(timezone.utc).isoformat()},
+            {"role": "assistant", "content": advice, "timestamp": datetime.now(timezone.utc).isoformat()}
+        ],
+        "created_at": datetime.now(timezone.utc).isoformat()
+    })
+
+
+async def save_chat_exchange(db, user_id: str, session_id: str, message: str, response: str, model_used: str):
+    await db.chat_history.update_one(
+        {"session_id": session_id, "user_id": user_id},
+        {
+            "$push": {
+                "messages": {
+                    "$each": [
+                        {"role": "user", "content": message, "timestamp": datetime.now(timezone.utc).isoformat()},
+                        {"role": "assistant", "content": response, "timestamp": datetime.now(timezone.utc).isoformat()}
+                    ]
+                }
+            },
+            "$set": {
+                "updated_at": datetime.now(timezone.utc).isoformat(),
+                "model_used": model_used
+            },
+            "$setOnInsert": {
+                "created_at": datetime.now(timezone.utc).isoformat(),
+                "type": "chatbot"
+            }
+        },
+        upsert=True
+    )
+
+
+@router.post("/career-advisor", response_model=CareerAdviceResponse)
+async def get_career_advice(
+    request: CareerAdviceRequest,
+    current_user: dict = Depends(get_current_user),
+    db = Depends(get_db)
+):
+    """Get career advice from AI advisor"""
+    user_id = current_user["user_id"]
+    api_key, provider, model = await prepare_chat_call(
+        user_id, db, request.model_provider, request.model_name, current_user.get("role")
+    )
+    
+    session_id = f"career-{user_id}"
+    
+    # Build context
+    context = ""
+    if request.include_applications:
+        context = await get_user_context(user_id, db)
+    
+    system_message = build_career_system_message(context)
+
     try:
         response = await call_ai(api_key, provider, model, system_message, request.question)
         
         # Save to chat history
-        await db.chat_history.insert_one({
-            "user_id": user_id,
-            "session_id": session_id,
-            "type": "career_advisor",
-            "model_used": f"{provider}/{model}",
-            "messages": [
-                {"role": "user", "content": request.question, "timestamp": datetime.now(timezone.utc).isoformat()},
-                {"role": "assistant", "content": response, "timestamp": datetime.now(timezone.utc).isoformat()}
-            ],
-            "created_at": datetime.now(timezone.utc).isoformat()
-        })
+        await save_career_advice(db, user_id, session_id, request.question, response, f"{provider}/{model}")
         
         return CareerAdviceResponse(advice=response, session_id=session_id, model_used=f"{provider}/{model}")
         
@@ -476,6 +642,30 @@ Sois concis et actionnable dans tes conseils."""
         )
 
 
+@router.post("/career-advisor/stream")
+async def stream_career_advice(
+    request: CareerAdviceRequest,
+    http_request: Request,
+    current_user: dict = Depends(get_current_user),
+    db = Depends(get_db)
+):
+    """Streaming (SSE) variant of /career-advisor: events start, delta*, done | error"""
+    user_id = current_user["user_id"]
+    api_key, provider, model = await prepare_chat_call(
+        user_id, db, request.model_provider, request.model_name, current_user.get("role")
+    )
+    session_id = f"career-{user_id}"
+    context = await get_user_context(user_id, db) if request.include_applications else ""
+
+    async def on_complete(advice: str):
+        await save_career_advice(db, user_id, session_id, request.question, advice, f"{provider}/{model}")
+
+    return stream_ai_response(
+        http_request, api_key, provider, model, build_career_system_message(context),
+        request.question, session_id, on_complete
+    )
+
+
 @router.post("/chatbot", response_model=ChatResponse)
 async def chat_with_assistant(
     request: ChatRequest,
@@ -484,65 +674,17 @@ async def chat_with_assistant(
 ):
     """Chat with AI assistant with model selection"""
     user_id = current_user["user_id"]
-    is_admin = current_user.get("role") == "admin"
-    own_keys = await get_user_own_keys(user_id, db)
-    has_own_key = _has_any_key(own_keys)
-    user_keys = await get_user_api_keys(user_id, db)
-    if not has_own_key and not is_admin:
-        await check_and_increment_quota(user_id, db)
-
-    api_key, provider = select_api_key(user_keys, request.model_provider)
-
-    if not api_key:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Aucune clé API configurée. Configurez une clé OpenAI, Google ou Groq dans les paramètres."
-        )
-    
-    # Select model
-    model = request.model_name
-    if not model:
-        model = AI_MODELS[provider][0]["model_id"]
+    api_key, provider, model = await prepare_chat_call(
+        user_id, db, request.model_provider, request.model_name, current_user.get("role")
+    )
     
     session_id = request.session_id or f"chat-{user_id}-{uuid.uuid4().hex[:8]}"
-    
-    system_message = """Tu es un assistant IA spécialisé dans la recherche d'emploi. Tu aides les utilisateurs avec:
-
-1. Rédaction de CV et lettres de motivation
-2. Préparation aux entretiens d'embauche
-3. Conseils sur les négociations salariales
-4. Informations sur les entreprises et secteurs
-5. Gestion du stress lié à la recherche d'emploi
-
-Réponds toujours en français de manière claire et utile.
-Si tu ne sais pas quelque chose, dis-le honnêtement."""
 
     try:
-        response = await call_ai(api_key, provider, model, system_message, request.message)
+        response = await call_ai(api_key, provider, model, CHATBOT_SYSTEM_MESSAGE, request.message)
         
         # Save to chat history
-        await db.chat_history.update_one(
-            {"session_id": session_id, "user_id": user_id},
-            {
-                "$push": {
-                    "messages": {
-                        "$each": [
-                            {"role": "user", "content": request.message, "timestamp": datetime.now(timezone.utc).isoformat()},
-                            {"role": "assistant", "content": response, "timestamp": datetime.now(timezone.utc).isoformat()}
-                        ]
-                    }
-                },
-                "$set": {
-                    "updated_at": datetime.now(timezone.utc).isoformat(),
-                    "model_used": f"{provider}/{model}"
-                },
-                "$setOnInsert": {
-                    "created_at": datetime.now(timezone.utc).isoformat(),
-                    "type": "chatbot"
-                }
-            },
-            upsert=True
-        )
+        await save_chat_exchange(db, user_id, session_id, request.message, response, f"{provider}/{model}")
         
         return ChatResponse(response=response, session_id=session_id, model_used=f"{provider}/{model}")
         
@@ -553,6 +695,28 @@ Si tu ne sais pas quelque chose, dis-le honnêtement."""
         )
 
 
+@router.post("/chatbot/stream")
+async def stream_chat_with_assistant(
+    request: ChatRequest,
+    http_request: Request,
+    current_user: dict = Depends(get_current_user),
+    db = Depends(get_db)
+):
+    """Streaming (SSE) variant of /chatbot: events start, delta*, done | error"""
+    user_id = current_user["user_id"]
+    api_key, provider, model = await prepare_chat_call(
+        user_id, db, request.model_provider, request.model_name, current_user.get("role")
+    )
+    session_id = request.session_id or f"chat-{user_id}-{uuid.uuid4().hex[:8]}"
+
+    async def on_complete(response: str):
+        await save_chat_exchange(db, user_id, session_id, request.message, response, f"{provider}/{model}")
+
+    return stream_ai_response(
+        http_request, api_key, provider, model, CHATBOT_SYSTEM_MESSAGE, request.message, session_id, on_complete
+    )
+
+
 @router.post("/extract-job", response_model=JobExtractionResponse)
 async def extract_job_from_page(
     request: JobExtractionRequest,
@@ -568,8 +732,7 @@ async def extract_job_from_page(
     user_keys = await get_user_api_keys(user_id, db)
     origin = http_request.headers.get("origin", "")
     from_extension = origin.startswith("chrome-extension://")
-    if not has_own_key and not is_admin and not from_extension:
-        await check_and_increment_quota(user_id, db)
+    quota_applies = not has_own_key and not is_admin and not from_extension
 
     # Build ordered list of providers for fallback (groq first)
     providers_to_try = []
@@ -653,51 +816,39 @@ Contenu de la page:
 
 Extrais les informations de cette offre d'emploi."""
 
-    last_error = None
-    for api_key, provider in providers_to_try:
-        model = get_model_for_provider(provider)
-        try:
-            print(f"INFO: Trying provider={provider} model={model}")
-            response = await call_ai(api_key, provider, model, system_message, user_message)
-
-            # Parse JSON response (remove markdown code blocks if present)
-            cleaned = response.strip()
-            if cleaned.startswith("```"):
-                cleaned = re.sub(r'^```(?:json)?\n?', '', cleaned)
-                cleaned = re.sub(r'\n?```$', '', cleaned)
-
-            try:
-                data = json.loads(cleaned)
-            except json.JSONDecodeError:
-                json_match = re.search(r'\{[\s\S]*\}', cleaned)
-                data = json.loads(json_match.group()) if json_match else {}
-
-            return JobExtractionResponse(
-                entreprise=data.get("entreprise"),
-                poste=data.get("poste"),
-                type_poste=data.get("type_poste"),
-                lieu=data.get("lieu"),
-                salaire_min=data.get("salaire_min"),
-                salaire_max=data.get("salaire_max"),
-                description_poste=data.get("description_poste"),
-                competences=data.get("competences") or [],
-                experience_requise=data.get("experience_requise"),
-                date_publication=data.get("date_publication"),
-                contact_email=data.get("contact_email"),
-                contact_name=data.get("contact_name"),
-                moyen=moyen,
-                lien=request.page_url,
-                confidence_score=data.get("confidence_score", 0.5)
-            )
-
-        except Exception as e:
-            print(f"WARNING: Provider {provider} failed: {e}. Trying next...")
-            last_error = e
-            continue
-
-    raise HTTPException(
-        status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-        detail=f"Tous les providers IA ont échoué. Dernière erreur: {str(last_error)}"
+    try:
+        # Quota only counted on a cache miss
+        data, provider = await call_ai_with_fallback(
+            providers_to_try, get_model_for_provider, system_message, user_message, parse=parse_json_response,
+            db=db, cache_endpoint="extract_job",
+            before_call=(lambda: check_and_increment_quota(user_id, db, role=current_user.get("role")))
+            if quota_applies else None
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Tous les providers IA ont échoué. Dernière erreur: {str(e)}"
+        )
+    print(f"INFO: Job extracted with provider={provider}")
+
+    return JobExtractionResponse(
+        entreprise=data.get("entreprise"),
+        poste=data.get("poste"),
+        type_poste=data.get("type_poste"),
+        lieu=data.get("lieu"),
+        salaire_min=data.get("salaire_min"),
+        salaire_max=data.get("salaire_max"),
+        description_poste=data.get("description_poste"),
+        competences=data.get("competences") or [],
+        experience_requise=data.get("experience_requise"),
+        date_publication=data.get("date_publication"),
+        contact_email=data.get("contact_email"),
+        contact_name=data.get("contact_name"),
+        moyen=moyen,
+        lien=request.page_url,
+        confidence_score=data.get("confidence_score", 0.5)
     )
 
 
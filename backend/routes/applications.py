@@ -5,6 +5,7 @@ JobTracker SaaS - Routes des candidatures
 from fastapi import APIRouter, HTTPException, status, Depends, Query
 from typing import Optional, List
 from datetime import datetime, timezone, timedelta
+from collections import Counter
 import re
 
 from models import (
@@ -13,6 +14,10 @@ from models import (
     BulkUpdateRequest, PaginatedResponse
 )
 from utils.auth import get_current_user
+from utils.user_stats import (
+    record_application_change, apply_stats_delta, application_delta, invalidate_user_stats
+)
+from utils.typeahead import invalidate_typeahead, record_typeahead_change
 
 router = APIRouter(prefix="/applications", tags=["Applications"])
 
@@ -22,6 +27,47 @@ def get_db():
     pass
 
 
+async def enrich_with_interviews(db, applications: List[dict]) -> List[dict]:
+    """
+    Ajoute interviews_count et next_interview à une liste de candidatures.
+    Une seule agrégation sur db.interviews pour toute la liste (au lieu de
+    deux requêtes par candidature).
+    """
+    if not applications:
+        return applications
+
+    app_ids = [app["id"] for app in applications]
+    now_iso = datetime.now(timezone.utc).isoformat()
+
+    pipeline = [
+        {"$match": {"candidature_id": {"$in": app_ids}}},
+        {"$group": {
+            "_id": "$candidature_id",
+            "count": {"$sum": 1},
+            # $min ignore les null : seuls les entretiens planifiés à venir comptent
+            "next_interview": {"$min": {"$cond": [
+                {"$and": [
+                    {"$eq": ["$statut", "planned"]},
+                    {"$gte": ["$date_entretien", now_iso]}
+                ]},
+                "$date_entretien",
+                None
+            ]}}
+        }}
+    ]
+    stats = {
+        row["_id"]: row
+        for row in await db.interviews.aggregate(pipeline).to_list(length=len(app_ids))
+    }
+
+    for app in applications:
+        row = stats.get(app["id"])
+        app["interviews_count"] = row["count"] if row else 0
+        app["next_interview"] = row["next_interview"] if row else None
+
+    return applications
+
+
 @router.get("", response_model=PaginatedResponse)
 async def list_applications(
     page: int = Query(1, ge=1),
@@ -96,27 +142,8 @@ async def list_applications(
     cursor = db.applications.find(filter_query, {"_id": 0}).sort(sort_by, sort_direction).skip(skip).limit(per_page)
     applications = await cursor.to_list(length=per_page)
     
-    # Enrichir avec les infos d'entretiens
-    enriched_apps = []
-    for app in applications:
-        # Compter les entretiens
-        interviews_count = await db.interviews.count_documents({"candidature_id": app["id"]})
-        
-        # Prochain entretien
-        next_interview = await db.interviews.find_one(
-            {
-                "candidature_id": app["id"],
-                "statut": "planned",
-                "date_entretien": {"$gte": datetime.now(timezone.utc).isoformat()}
-            },
-            {"_id": 0, "date_entretien": 1},
-            sort=[("date_entretien", 1)]
-        )
-        
-        app["interviews_count"] = interviews_count
-        app["next_interview"] = next_interview["date_entretien"] if next_interview else None
-
-        enriched_apps.append(app)
+    # Enrichir avec les infos d'entretiens (une seule agrégation pour toute la page)
+    enriched_apps = await enrich_with_interviews(db, applications)
     
     total_pages = (total + per_page - 1) // per_page
     
@@ -159,6 +186,8 @@ async def create_application(
         app_dict['moyen'] = app_dict['moyen'].value if hasattr(app_dict['moyen'], 'value') else app_dict['moyen']
     
     await db.applications.insert_one(app_dict)
+    await record_application_change(db, current_user["user_id"], after=app_dict)
+    await record_typeahead_change(current_user["user_id"], "applications", after=app_dict)
     
     return JobApplicationResponse(**application.model_dump(), interviews_count=0, next_interview=None)
 
@@ -196,22 +225,8 @@ async def get_application(
             detail="Candidature non trouvée"
         )
     
-    # Compter les entretiens
-    interviews_count = await db.interviews.count_documents({"candidature_id": application_id})
-    
-    # Prochain entretien
-    next_interview = await db.interviews.find_one(
-        {
-            "candidature_id": application_id,
-            "statut": "planned",
-            "date_entretien": {"$gte": datetime.now(timezone.utc).isoformat()}
-        },
-        {"_id": 0, "date_entretien": 1},
-        sort=[("date_entretien", 1)]
-    )
-    
-    application["interviews_count"] = interviews_count
-    application["next_interview"] = next_interview["date_entretien"] if next_interview else None
+    # Nombre d'entretiens et prochain entretien
+    await enrich_with_interviews(db, [application])
     
     # Calculer si une relance est recommandée
     needs_followup = False
@@ -302,6 +317,12 @@ async def update_application(
         {"id": application_id},
         update_query
     )
+    await record_application_change(
+        db, current_user["user_id"], before=existing, after={**existing, **update_data}
+    )
+    await record_typeahead_change(
+        current_user["user_id"], "applications", before=existing, after={**existing, **update_data}
+    )
     
     # Récupérer la candidature mise à jour
     return await get_application(application_id, current_user, db)
@@ -314,18 +335,25 @@ async def delete_application(
     db = Depends(get_db)
 ):
     """Supprime une candidature et ses entretiens associés"""
-    result = await db.applications.delete_one(
+    deleted = await db.applications.find_one_and_delete(
         {"id": application_id, "user_id": current_user["user_id"]}
     )
     
-    if result.deleted_count == 0:
+    if not deleted:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Candidature non trouvée"
         )
     
     # Supprimer les entretiens associés
-    await db.interviews.delete_many({"candidature_id": application_id})
+    interviews_result = await db.interviews.delete_many({"candidature_id": application_id})
+    await record_application_change(
+        db, current_user["user_id"], before=deleted, has_interview=interviews_result.deleted_count > 0
+    )
+    if interviews_result.deleted_count:
+        await invalidate_typeahead(current_user["user_id"])
+    else:
+        await record_typeahead_change(current_user["user_id"], "applications", before=deleted)
 
 
 @router.post("/{application_id}/favorite")
@@ -351,6 +379,9 @@ async def toggle_favorite(
         {"id": application_id},
         {"$set": {"is_favorite": new_favorite, "updated_at": datetime.now(timezone.utc).isoformat()}}
     )
+    await record_application_change(
+        db, current_user["user_id"], before=application, after={**application, "is_favorite": new_favorite}
+    )
     
     return {"is_favorite": new_favorite}
 
@@ -362,22 +393,43 @@ async def bulk_update_applications(
     db = Depends(get_db)
 ):
     """Met à jour le statut de plusieurs candidatures"""
-    result = await db.applications.update_many(
-        {
-            "id": {"$in": bulk_data.application_ids},
-            "user_id": current_user["user_id"]
-        },
-        {
-            "$set": {
-                "reponse": bulk_data.reponse.value,
-                "updated_at": datetime.now(timezone.utc).isoformat()
-            }
-        }
-    )
+    user_id = current_user["user_id"]
+    new_status = bulk_data.reponse.value
+    remaining = set(bulk_data.application_ids)
+    modified_count = 0
+    delta = Counter()
+    
+    # Mise à jour par statut d'origine : le filtre porte sur le statut lu, donc une
+    # candidature modifiée entre la lecture et l'écriture n'est pas comptée deux fois
+    # (elle est relue au passage suivant)
+    for _ in range(3):
+        previous = await db.applications.find(
+            {"id": {"$in": list(remaining)}, "user_id": user_id, "reponse": {"$ne": new_status}},
+            {"_id": 0, "id": 1, "reponse": 1}
+        ).to_list(length=len(remaining))
+        if not previous:
+            break
+        
+        by_status = {}
+        for app in previous:
+            by_status.setdefault(app.get("reponse"), []).append(app["id"])
+        
+        for old_status, ids in by_status.items():
+            result = await db.applications.update_many(
+                {"id": {"$in": ids}, "user_id": user_id, "reponse": old_status},
+                {"$set": {"reponse": new_status, "updated_at": datetime.now(timezone.utc).isoformat()}}
+            )
+            modified_count += result.modified_count
+            # Seul le statut change : même delta pour chaque candidature modifiée
+            for path, value in application_delta({"reponse": old_status}, {"reponse": new_status}).items():
+                delta[path] += value * result.modified_count
+        remaining = {app["id"] for app in previous}
+    
+    await apply_stats_delta(db, user_id, delta)
     
     return {
-        "modified_count": result.modified_count,
-        "message": f"{result.modified_count} candidature(s) mise(s) à jour"
+        "modified_count": modified_count,
+        "message": f"{modified_count} candidature(s) mise(s) à jour"
     }
 
 
@@ -395,12 +447,7 @@ async def list_favorites(
     favorites = await cursor.to_list(length=100)
     
     # Enrichir avec les infos d'entretiens
-    for app in favorites:
-        interviews_count = await db.interviews.count_documents({"candidature_id": app["id"]})
-        app["interviews_count"] = interviews_count
-        app["next_interview"] = None
-    
-    return favorites
+    return await enrich_with_interviews(db, favorites)
 
 
 @router.delete("/reset/all", status_code=status.HTTP_200_OK)
@@ -416,6 +463,8 @@ async def reset_all_applications(
     
     # Supprimer toutes les candidatures
     apps_result = await db.applications.delete_many({"user_id": user_id})
+    await invalidate_user_stats(db, user_id)
+    await invalidate_typeahead(user_id)
     
     return {
         "success": True,
@@ -13,6 +13,7 @@ from urllib.parse import urlencode
 from pydantic import BaseModel
 
 from utils.auth import get_current_user
+from utils.user_stats import record_data_change
 from config import settings
 
 router = APIRouter(prefix="/calendar", tags=["Calendar"])
@@ -357,8 +358,12 @@ async def create_calendar_event(
     if event.interview_id:
         await db.interviews.update_one(
             {"id": event.interview_id},
-            {"$set": {"google_calendar_event_id": created["id"]}}
+            {"$set": {
+                "google_calendar_event_id": created["id"],
+                "updated_at": datetime.now(timezone.utc).isoformat()
+            }}
         )
+        await record_data_change(db, current_user["user_id"])
     
     return CalendarEventResponse(
         id=created["id"],
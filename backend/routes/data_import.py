@@ -15,6 +15,7 @@ import json
 import csv
 import io
 import uuid
+from collections import Counter
 
 load_dotenv()
 
@@ -29,22 +30,21 @@ except ImportError:
     except ImportError:
         pass
 
-# Import PDF and DOCX extractors
-try:
-    from PyPDF2 import PdfReader
-    PDF_SUPPORT = True
-except ImportError:
-    PDF_SUPPORT = False
-
-try:
-    from docx import Document as DocxDocument
-    DOCX_SUPPORT = True
-except ImportError:
-    DOCX_SUPPORT = False
-
 from utils.auth import get_current_user
 from utils.ai_quota import check_and_increment_quota
+from utils.ai_cache import cached_completion
 from utils.crypto import decrypt
+from utils.ai_providers import complete
+from utils.cv_text import (
+    CvTextError, MIN_TEXT_LENGTH, cached_cv_text, content_hash, file_extension, get_cv_text
+)
+from utils.user_stats import (
+    application_contribution, apply_stats_delta, record_applications_inserted, invalidate_user_stats
+)
+from utils.typeahead import invalidate_typeahead
+from utils.storage import stored_url
+from utils.reminder_dispatcher import parse_interview_date
+from utils.import_engine import ImportBatch
 
 router = APIRouter(prefix="/import", tags=["Import"])
 
@@ -184,6 +184,7 @@ async def import_interviews_data(
                 "user_id": current_user["user_id"],
                 "candidature_id": candidature_id,
                 "date_entretien": date_str,
+                "date_entretien_at": parse_interview_date(date_str),
                 "type_entretien": interview_data.get('type_entretien') or interview_data.get('Type') or 'technical',
                 "format_entretien": interview_data.get('format_entretien') or interview_data.get('Format') or 'video',
                 "lieu_lien": interview_data.get('lieu_lien') or interview_data.get('lieu_entretien') or interview_data.get('Lieu/Lien') or interview_data.get('Lieu'),
@@ -201,6 +202,11 @@ async def import_interviews_data(
             errors.append(f"Ligne {idx+1}: {str(e)}")
             skipped += 1
     
+    if imported > 0:
+        # with_interview dépend des entretiens existants : reconstruction à la prochaine lecture
+        await invalidate_user_stats(db, current_user["user_id"])
+        await invalidate_typeahead(current_user["user_id"])
+    
     if duplicates > 0:
         errors.insert(0, f"{duplicates} entretien(s) déjà existant(s) ignoré(s)")
     
@@ -212,6 +218,23 @@ async def import_interviews_data(
     )
 
 
+# Normalisation des entretiens imbriqués vers les valeurs des enums
+INTERVIEW_TYPE_MAPPING = {
+    'rh': 'rh', 'hr': 'rh', 'ressources humaines': 'rh',
+    'technique': 'technical', 'technical': 'technical', 'tech': 'technical',
+    'manager': 'manager', 'managerial': 'manager',
+    'final': 'final', 'finale': 'final',
+}
+
+INTERVIEW_FORMAT_MAPPING = {
+    'visio': 'video', 'video': 'video', 'visioconference': 'video',
+    'visioconférence': 'video', 'teams': 'video', 'zoom': 'video', 'meet': 'video',
+    'téléphone': 'phone', 'telephone': 'phone', 'phone': 'phone', 'tel': 'phone',
+    'présentiel': 'in_person', 'presentiel': 'in_person', 'in_person': 'in_person',
+    'sur site': 'in_person', 'on site': 'in_person', 'onsite': 'in_person',
+}
+
+
 # Import from pre-parsed data (from frontend preview)
 @router.post("/data", response_model=ImportResult)
 async def import_data(
@@ -220,10 +243,18 @@ async def import_data(
     db = Depends(get_db)
 ):
     """Import applications from pre-parsed data with duplicate detection"""
+    user_id = current_user["user_id"]
     imported = 0
     errors = []
     skipped = 0
     duplicates = 0
+    existing_touched = False
+    
+    # Doublons détectés en mémoire : une seule lecture des clés existantes
+    batch = ImportBatch(db, user_id)
+    await batch.load_existing_applications()
+    if any(isinstance(app_data.get('interviews'), list) for app_data in request.applications):
+        await batch.load_existing_interview_days()
     
     for idx, app_data in enumerate(request.applications):
         try:
@@ -252,30 +283,26 @@ async def import_data(
             elif date_reponse_val:
                 date_reponse_str = str(date_reponse_val)
 
-            # Check for duplicate (same company + position for same user)
-            existing = await db.applications.find_one({
-                "user_id": current_user["user_id"],
-                "entreprise": {"$regex": f"^{entreprise}$", "$options": "i"},
-                "poste": {"$regex": f"^{poste}$", "$options": "i"}
-            })
-
-            app_id = None
+            # Check for duplicate (same company + position for same user, case-insensitive)
+            existing = batch.find_application(entreprise, poste)
 
             if existing:
                 app_id = existing.get("id")
-                is_duplicate = True
                 duplicates += 1
                 # Upsert date_reponse if existing record has none but import has one
                 if date_reponse_str and not existing.get("date_reponse"):
-                    await db.applications.update_one(
-                        {"id": app_id},
-                        {"$set": {"date_reponse": date_reponse_str, "updated_at": datetime.now(timezone.utc).isoformat()}}
-                    )
+                    existing["date_reponse"] = date_reponse_str
+                    if existing.get("_existing"):
+                        existing_touched = True
+                        batch.add_update(app_id, {
+                            "date_reponse": date_reponse_str,
+                            "updated_at": datetime.now(timezone.utc).isoformat()
+                        })
             else:
                 # Create new application
                 app_doc = {
                     "id": str(uuid.uuid4()),
-                    "user_id": current_user["user_id"],
+                    "user_id": user_id,
                     "entreprise": entreprise,
                     "poste": poste,
                     "type_poste": (app_data.get('type_poste') or app_data.get('Type') or 'cdi') if (app_data.get('type_poste') or app_data.get('Type', '')) in {"cdi","cdd","stage","alternance","freelance","interim"} else 'cdi',
@@ -291,13 +318,11 @@ async def import_data(
                     "updated_at": datetime.now(timezone.utc).isoformat()
                 }
                 
-                await db.applications.insert_one(app_doc)
+                batch.add_application(app_doc, idx + 1)
                 app_id = app_doc["id"]
-                imported += 1
 
             # Handle nested interviews if present (even for duplicate applications)
             if 'interviews' in app_data and isinstance(app_data['interviews'], list) and app_id:
-                interviews_imported = 0
                 for interview_data in app_data['interviews']:
                     try:
                         # Normalize date
@@ -310,40 +335,21 @@ async def import_data(
                             int_date_str = str(int_date_val).replace(' ', 'T')
                         
                         # Check if interview already exists (same date + same application)
-                        existing_interview = await db.interviews.find_one({
-                            "user_id": current_user["user_id"],
-                            "candidature_id": app_id,
-                            "date_entretien": {"$regex": f"^{int_date_str[:10]}"}
-                        })
-                        
-                        if existing_interview:
+                        if batch.has_interview_on(app_id, int_date_str):
                             continue  # Skip duplicate interview
                         
                         # Normalize type_entretien to enum values
                         raw_type = str(interview_data.get('type_entretien', 'technical')).lower()
-                        type_mapping = {
-                            'rh': 'rh', 'hr': 'rh', 'ressources humaines': 'rh',
-                            'technique': 'technical', 'technical': 'technical', 'tech': 'technical',
-                            'manager': 'manager', 'managerial': 'manager',
-                            'final': 'final', 'finale': 'final',
-                        }
-                        normalized_type = type_mapping.get(raw_type, 'other')
+                        normalized_type = INTERVIEW_TYPE_MAPPING.get(raw_type, 'other')
                         
                         # Normalize format_entretien to enum values
                         raw_format = str(interview_data.get('format_entretien', 'video')).lower()
-                        format_mapping = {
-                            'visio': 'video', 'video': 'video', 'visioconference': 'video', 
-                            'visioconférence': 'video', 'teams': 'video', 'zoom': 'video', 'meet': 'video',
-                            'téléphone': 'phone', 'telephone': 'phone', 'phone': 'phone', 'tel': 'phone',
-                            'présentiel': 'in_person', 'presentiel': 'in_person', 'in_person': 'in_person',
-                            'sur site': 'in_person', 'on site': 'in_person', 'onsite': 'in_person',
-                        }
-                        normalized_format = format_mapping.get(raw_format, 'video')
+                        normalized_format = INTERVIEW_FORMAT_MAPPING.get(raw_format, 'video')
                         
                         # Create interview linked to this application
-                        interview_doc = {
+                        batch.add_interview({
                             "id": str(uuid.uuid4()),
-                            "user_id": current_user["user_id"],
+                            "user_id": user_id,
                             "candidature_id": app_id,
                             "date_entretien": int_date_str,
                             "type_entretien": normalized_type,
@@ -354,10 +360,7 @@ async def import_data(
                             "commentaire": interview_data.get('commentaire'),
                             "created_at": datetime.now(timezone.utc).isoformat(),
                             "updated_at": datetime.now(timezone.utc).isoformat()
-                        }
-                        
-                        await db.interviews.insert_one(interview_doc)
-                        interviews_imported += 1
+                        }, idx + 1)
                     except Exception as ie:
                         print(f"Erreur import entretien: {ie}")
                         # Don't fail the whole row for a bad interview
@@ -366,6 +369,29 @@ async def import_data(
             errors.append(f"Ligne {idx+1}: {str(e)}")
             skipped += 1
     
+    # Écriture par lots (insert_many / bulk_write non ordonnés)
+    await batch.flush()
+    imported = len(batch.inserted_applications)
+    inserted_ids = {app["id"] for app in batch.inserted_applications}
+    for line, message in batch.errors:
+        errors.append(f"Ligne {line}: {message}")
+        skipped += 1
+    for line, message in batch.interview_errors:
+        errors.append(f"Ligne {line}: {message}")
+    
+    # Rollup des statistiques : un seul $inc pour les nouvelles candidatures,
+    # reconstruction si des candidatures existantes ont été modifiées
+    with_interview_ids = {iv["candidature_id"] for iv in batch.inserted_interviews}
+    if existing_touched or with_interview_ids - inserted_ids:
+        await invalidate_user_stats(db, user_id)
+    else:
+        stats_delta = Counter()
+        for app in batch.inserted_applications:
+            stats_delta.update(application_contribution(app, has_interview=app["id"] in with_interview_ids))
+        await apply_stats_delta(db, user_id, stats_delta)
+    if batch.inserted_applications or batch.inserted_interviews:
+        await invalidate_typeahead(user_id)
+    
     # Add duplicate info to errors if any
     if duplicates > 0:
         errors.insert(0, f"{duplicates} candidature(s) déjà existante(s) ignorée(s)")
@@ -400,6 +426,13 @@ Tu dois retourner ta réponse UNIQUEMENT au format JSON valide suivant (sans tex
 Sois précis et constructif. Le score doit refléter la qualité globale du CV."""
 
 
+CV_DEFAULT_MODELS = {
+    "openai": "gpt-4o",
+    "google": "gemini-1.5-flash",
+    "groq": "llama-3.3-70b-versatile",
+}
+
+
 def build_cv_analysis_prompt(cv_text: str, apps_context: str) -> str:
     """Build the user prompt for CV analysis"""
     return f"""Analyse ce CV en détail:
@@ -428,52 +461,24 @@ async def analyze_cv_with_emergent(api_key: str, user_id: str, cv_text: str, app
 
 
 async def analyze_cv_with_openai(api_key: str, cv_text: str, apps_context: str) -> str:
-    """Analyze CV using standard OpenAI SDK"""
-    from openai import OpenAI
-    
+    """Analyze CV using OpenAI (async pooled client)"""
     user_prompt = build_cv_analysis_prompt(cv_text, apps_context)
-    
-    client = OpenAI(api_key=api_key)
-    response = client.chat.completions.create(
-        model="gpt-4o",
-        messages=[
-            {"role": "system", "content": CV_ANALYSIS_SYSTEM_MESSAGE},
-            {"role": "user", "content": user_prompt}
-        ]
-    )
-    return response.choices[0].message.content
+    return await complete("openai", api_key, "gpt-4o", CV_ANALYSIS_SYSTEM_MESSAGE, user_prompt)
 
 
 async def analyze_cv_with_google(api_key: str, cv_text: str, apps_context: str) -> str:
-    """Analyze CV using Google Gemini"""
-    from google import genai
-    
+    """Analyze CV using Google Gemini (async pooled client)"""
     user_prompt = build_cv_analysis_prompt(cv_text, apps_context)
     full_prompt = f"{CV_ANALYSIS_SYSTEM_MESSAGE}\n\n{user_prompt}"
-    
-    client = genai.Client(api_key=api_key)
-    response = client.models.generate_content(model="gemini-1.5-flash", contents=full_prompt)
-    return response.text
+    return await complete("google", api_key, "gemini-1.5-flash", None, full_prompt)
 
 
 async def analyze_cv_with_groq(api_key: str, cv_text: str, apps_context: str, model: str = None) -> str:
-    """Analyze CV using Groq"""
-    from groq import Groq
-    
+    """Analyze CV using Groq (async pooled client)"""
     user_prompt = build_cv_analysis_prompt(cv_text, apps_context)
-    
     # Use specified model or default
     groq_model = model or "llama-3.3-70b-versatile"
-    
-    client = Groq(api_key=api_key)
-    response = client.chat.completions.create(
-        model=groq_model,
-        messages=[
-            {"role": "system", "content": CV_ANALYSIS_SYSTEM_MESSAGE},
-            {"role": "user", "content": user_prompt}
-        ]
-    )
-    return response.choices[0].message.content
+    return await complete("groq", api_key, groq_model, CV_ANALYSIS_SYSTEM_MESSAGE, user_prompt)
 
 
 # Import JSON
@@ -500,9 +505,9 @@ async def import_json(
         if not isinstance(applications, list):
             raise HTTPException(status_code=400, detail="Format JSON invalide")
         
-        imported = 0
         errors = []
         skipped = 0
+        batch = ImportBatch(db, current_user["user_id"])
         
         for idx, app_data in enumerate(applications):
             try:
@@ -530,13 +535,23 @@ async def import_json(
                     "updated_at": datetime.now(timezone.utc).isoformat()
                 }
                 
-                await db.applications.insert_one(app_doc)
-                imported += 1
+                batch.add_application(app_doc, idx + 1)
                 
             except Exception as e:
                 errors.append(f"Ligne {idx+1}: {str(e)}")
                 skipped += 1
         
+        # Écriture par lots
+        await batch.flush()
+        imported = len(batch.inserted_applications)
+        for line, message in batch.errors:
+            errors.append(f"Ligne {line}: {message}")
+            skipped += 1
+        
+        await record_applications_inserted(db, current_user["user_id"], batch.inserted_applications)
+        if batch.inserted_applications:
+            await invalidate_typeahead(current_user["user_id"])
+        
         return ImportResult(
             success=True,
             imported_count=imported,
@@ -568,9 +583,9 @@ async def import_csv(
         # Parse CSV
         reader = csv.DictReader(io.StringIO(text))
         
-        imported = 0
         errors = []
         skipped = 0
+        batch = ImportBatch(db, current_user["user_id"])
         
         # Map possible column names
         field_mapping = {
@@ -618,13 +633,23 @@ async def import_csv(
                     "updated_at": datetime.now(timezone.utc).isoformat()
                 }
                 
-                await db.applications.insert_one(app_doc)
-                imported += 1
+                batch.add_application(app_doc, idx + 2)
                 
             except Exception as e:
                 errors.append(f"Ligne {idx+2}: {str(e)}")
                 skipped += 1
         
+        # Écriture par lots
+        await batch.flush()
+        imported = len(batch.inserted_applications)
+        for line, message in batch.errors:
+            errors.append(f"Ligne {line}: {message}")
+            skipped += 1
+        
+        await record_applications_inserted(db, current_user["user_id"], batch.inserted_applications)
+        if batch.inserted_applications:
+            await invalidate_typeahead(current_user["user_id"])
+        
         return ImportResult(
             success=True,
             imported_count=imported,
@@ -715,10 +740,8 @@ async def analyze_cv(
             detail="Service IA non configuré. Ajoutez une clé API dans Paramètres ou contactez l'administrateur."
         )
 
-    # Quota check — exempte si clé personnelle ou admin
+    # Quota — exempte si clé personnelle ou admin ; décompté seulement si l'analyse n'est pas en cache
     has_own_key = user and any([user.get("openai_key"), user.get("google_ai_key"), user.get("groq_key")])
-    if not has_own_key:
-        await check_and_increment_quota(user_id, db)
 
     # Check file type
     allowed_types = ['.pdf', '.docx', '.doc', '.txt']
@@ -728,47 +751,11 @@ async def analyze_cv(
     
     try:
         content = await file.read()
-        cv_text = ""
-        
-        # Extract text based on file type
-        if file_ext == '.txt':
-            cv_text = content.decode('utf-8')
-            
-        elif file_ext == '.pdf':
-            if not PDF_SUPPORT:
-                raise HTTPException(status_code=500, detail="Support PDF non disponible. Installez PyPDF2.")
-            try:
-                pdf_reader = PdfReader(io.BytesIO(content))
-                text_parts = []
-                for page in pdf_reader.pages:
-                    page_text = page.extract_text()
-                    if page_text:
-                        text_parts.append(page_text)
-                cv_text = "\n".join(text_parts)
-            except Exception as e:
-                raise HTTPException(status_code=400, detail=f"Erreur lecture PDF: {str(e)}")
-                
-        elif file_ext in ['.docx', '.doc']:
-            if not DOCX_SUPPORT:
-                raise HTTPException(status_code=500, detail="Support DOCX non disponible. Installez python-docx.")
-            try:
-                doc = DocxDocument(io.BytesIO(content))
-                text_parts = []
-                for para in doc.paragraphs:
-                    if para.text.strip():
-                        text_parts.append(para.text)
-                # Also extract from tables
-                for table in doc.tables:
-                    for row in table.rows:
-                        for cell in row.cells:
-                            if cell.text.strip():
-                                text_parts.append(cell.text)
-                cv_text = "\n".join(text_parts)
-            except Exception as e:
-                raise HTTPException(status_code=400, detail=f"Erreur lecture DOCX: {str(e)}")
-        
-        if not cv_text or len(cv_text.strip()) < 50:
-            raise HTTPException(status_code=400, detail="Impossible d'extraire le texte du CV. Le fichier est peut-être vide ou protégé.")
+        # Texte déjà extrait pour ce fichier (empreinte) : pas de nouveau parsing
+        try:
+            cv_text = await get_cv_text(db, content, file_ext)
+        except CvTextError as e:
+            raise HTTPException(status_code=e.status_code, detail=e.detail)
         
         # Get user's applications for matching
         applications = await db.applications.find(
@@ -779,38 +766,45 @@ async def analyze_cv(
         apps_context = "\n".join([f"- {a['poste']} chez {a['entreprise']}" for a in applications]) if applications else "Aucune candidature"
         
         # Call AI based on provider and model
-        response = ""
-        model_used = model or "unknown"
+        model_used = model or CV_DEFAULT_MODELS.get(provider, "unknown")
         
         # Use Emergent integrations if available for supported providers
         use_emergent = USE_EMERGENT and api_key == os.environ.get("EMERGENT_LLM_KEY")
         
-        if provider == "openai":
-            emergent_model = model or "gpt-4o"
-            if use_emergent or (user and user.get("openai_key") == api_key):
-                # Can use Emergent for user keys too if available
-                try:
-                    response = await analyze_cv_with_emergent(api_key, user_id, cv_text, apps_context, "openai", emergent_model)
-                    model_used = emergent_model
-                except Exception:
-                    response = await analyze_cv_with_openai(api_key, cv_text, apps_context)
-                    model_used = "gpt-4o"
-            else:
-                response = await analyze_cv_with_openai(api_key, cv_text, apps_context)
+        async def call_provider() -> str:
+            nonlocal model_used
+            if provider == "openai":
+                emergent_model = model or "gpt-4o"
+                if use_emergent or (user and user.get("openai_key") == api_key):
+                    # Can use Emergent for user keys too if available
+                    try:
+                        response = await analyze_cv_with_emergent(api_key, user_id, cv_text, apps_context, "openai", emergent_model)
+                        model_used = emergent_model
+                        return response
+                    except Exception:
+                        pass
                 model_used = "gpt-4o"
-                
-        elif provider == "google" or provider == "gemini":
-            emergent_model = model or "gemini-1.5-flash"
-            if use_emergent:
-                response = await analyze_cv_with_emergent(api_key, user_id, cv_text, apps_context, "gemini", emergent_model)
-                model_used = emergent_model
-            else:
-                response = await analyze_cv_with_google(api_key, cv_text, apps_context)
+                return await analyze_cv_with_openai(api_key, cv_text, apps_context)
+                    
+            elif provider == "google" or provider == "gemini":
+                emergent_model = model or "gemini-1.5-flash"
+                if use_emergent:
+                    model_used = emergent_model
+                    return await analyze_cv_with_emergent(api_key, user_id, cv_text, apps_context, "gemini", emergent_model)
                 model_used = "gemini-1.5-flash"
-                
-        elif provider == "groq":
-            response = await analyze_cv_with_groq(api_key, cv_text, apps_context, model)
-            model_used = model or "llama-3.3-70b-versatile"
+                return await analyze_cv_with_google(api_key, cv_text, apps_context)
+                    
+            elif provider == "groq":
+                return await analyze_cv_with_groq(api_key, cv_text, apps_context, model)
+            return ""
+        
+        response = await cached_completion(
+            db, "cv_analysis", provider, model_used, CV_ANALYSIS_SYSTEM_MESSAGE,
+            build_cv_analysis_prompt(cv_text, apps_context), call=call_provider,
+            before_call=None if has_own_key else (
+                lambda: check_and_increment_quota(user_id, db, role=current_user.get("role"))
+            )
+        )
         
         # Parse JSON response
         try:
@@ -859,6 +853,8 @@ async def analyze_cv(
                 recommendations=response[:500] if response else "Analyse non disponible"
             )
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erreur d'analyse: {str(e)}")
 
@@ -967,56 +963,34 @@ async def analyze_existing_cv(
     if not api_key:
         raise HTTPException(status_code=500, detail="Service IA non configuré")
     
-    # Download file from Cloudinary
-    file_url = document.get("cloudinary_url") or document.get("url")
-    if not file_url:
-        raise HTTPException(status_code=400, detail="URL du document non disponible")
-    
-    try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(file_url)
-            content = response.content
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Impossible de télécharger le CV: {str(e)}")
-    
-    # Extract text based on file type
-    file_ext = '.' + document.get("name", "").split('.')[-1].lower() if '.' in document.get("name", "") else '.pdf'
-    cv_text = ""
-    
-    if file_ext == '.txt':
-        cv_text = content.decode('utf-8')
-    elif file_ext == '.pdf':
-        if not PDF_SUPPORT:
-            raise HTTPException(status_code=500, detail="Support PDF non disponible")
+    # Texte extrait à l'upload : le fichier n'est ni re-téléchargé ni re-parsé
+    cv_text = await cached_cv_text(db, document.get("content_hash"))
+    if cv_text is None:
+        # Documents antérieurs à l'extraction à l'upload : téléchargement puis extraction (mise en cache)
+        # URL résolue à la demande (URL signée S3), sinon URL enregistrée des anciens documents
+        file_url = await stored_url(document) or document.get("cloudinary_url")
+        if not file_url:
+            raise HTTPException(status_code=400, detail="URL du document non disponible")
+        
         try:
-            pdf_reader = PdfReader(io.BytesIO(content))
-            text_parts = []
-            for page in pdf_reader.pages:
-                page_text = page.extract_text()
-                if page_text:
-                    text_parts.append(page_text)
-            cv_text = "\n".join(text_parts)
+            async with httpx.AsyncClient() as client:
+                response = await client.get(file_url)
+                content = response.content
         except Exception as e:
-            raise HTTPException(status_code=400, detail=f"Erreur lecture PDF: {str(e)}")
-    elif file_ext in ['.docx', '.doc']:
-        if not DOCX_SUPPORT:
-            raise HTTPException(status_code=500, detail="Support DOCX non disponible")
+            raise HTTPException(status_code=500, detail=f"Impossible de télécharger le CV: {str(e)}")
+        
+        file_ext = file_extension(document.get("original_filename") or document.get("name"), default=".pdf")
+        file_hash = content_hash(content)
         try:
-            doc = DocxDocument(io.BytesIO(content))
-            text_parts = []
-            for para in doc.paragraphs:
-                if para.text.strip():
-                    text_parts.append(para.text)
-            for table in doc.tables:
-                for row in table.rows:
-                    for cell in row.cells:
-                        if cell.text.strip():
-                            text_parts.append(cell.text)
-            cv_text = "\n".join(text_parts)
-        except Exception as e:
-            raise HTTPException(status_code=400, detail=f"Erreur lecture DOCX: {str(e)}")
+            cv_text = await get_cv_text(db, content, file_ext, file_hash)
+        except CvTextError as e:
+            raise HTTPException(status_code=e.status_code, detail=e.detail)
+        await db.documents.update_one(
+            {"id": document_id, "user_id": user_id},
+            {"$set": {"content_hash": file_hash, "text_extracted": True}}
+        )
     
-    if not cv_text or len(cv_text.strip()) < 50:
+    if len(cv_text.strip()) < MIN_TEXT_LENGTH:
         raise HTTPException(status_code=400, detail="Impossible d'extraire le texte du CV")
     
     # Get applications context
@@ -1028,25 +1002,26 @@ async def analyze_existing_cv(
     apps_context = "\n".join([f"- {a['poste']} chez {a['entreprise']}" for a in applications]) if applications else "Aucune candidature"
     
     # Call AI
-    response_text = ""
-    model_used = model or "unknown"
+    model_used = model or CV_DEFAULT_MODELS.get(provider, "unknown")
     
-    try:
+    async def call_provider() -> str:
         if provider == "openai":
             if USE_EMERGENT:
-                response_text = await analyze_cv_with_emergent(api_key, user_id, cv_text, apps_context, "openai", model or "gpt-4o")
-            else:
-                response_text = await analyze_cv_with_openai(api_key, cv_text, apps_context)
-            model_used = model or "gpt-4o"
+                return await analyze_cv_with_emergent(api_key, user_id, cv_text, apps_context, "openai", model_used)
+            return await analyze_cv_with_openai(api_key, cv_text, apps_context)
         elif provider == "google":
             if USE_EMERGENT:
-                response_text = await analyze_cv_with_emergent(api_key, user_id, cv_text, apps_context, "gemini", model or "gemini-1.5-flash")
-            else:
-                response_text = await analyze_cv_with_google(api_key, cv_text, apps_context)
-            model_used = model or "gemini-1.5-flash"
+                return await analyze_cv_with_emergent(api_key, user_id, cv_text, apps_context, "gemini", model_used)
+            return await analyze_cv_with_google(api_key, cv_text, apps_context)
         elif provider == "groq":
-            response_text = await analyze_cv_with_groq(api_key, cv_text, apps_context, model)
-            model_used = model or "llama-3.3-70b-versatile"
+            return await analyze_cv_with_groq(api_key, cv_text, apps_context, model)
+        return ""
+    
+    try:
+        response_text = await cached_completion(
+            db, "cv_analysis", provider, model_used, CV_ANALYSIS_SYSTEM_MESSAGE,
+            build_cv_analysis_prompt(cv_text, apps_context), call=call_provider
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erreur d'analyse IA: {str(e)}")
     
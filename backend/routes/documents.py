@@ -1,24 +1,16 @@
 """
 JobTracker SaaS - Routes Gestion des Documents
 Gestion des CV, lettres de motivation, portfolios et liens.
-Stockage via Cloudinary pour persistance sur Vercel/Production.
+Stockage objet via utils/storage (Cloudinary, S3 ou disque local).
 """
 
 from fastapi import APIRouter, HTTPException, status, Depends, UploadFile, File, Form
 from fastapi.responses import RedirectResponse, FileResponse
-import re
-import io
+import asyncio
 import os
 import uuid
 from pathlib import Path
 from datetime import datetime, timezone
-from xhtml2pdf import pisa
-from jinja2 import Environment, ChainableUndefined
-
-def _render_jinja(template_str: str, context: dict) -> str:
-    """Rend un template Jinja2 en ignorant silencieusement les variables inconnues."""
-    env = Environment(undefined=ChainableUndefined)
-    return env.from_string(template_str).render(**context)
 from typing import Optional, List
 
 from models import (
@@ -26,29 +18,17 @@ from models import (
     CoverLetterTemplateCreate, CoverLetterTemplate,
     GeneratedCoverLetter, ApplicationDocumentLink
 )
+from config import settings
 from utils.auth import get_current_user
 from utils.crypto import decrypt
 from utils.ai_quota import check_and_increment_quota
-from xml.sax.saxutils import escape
-
-# Cloudinary configuration
-import cloudinary
-import cloudinary.uploader
-import cloudinary.api
-
-# PDF generation
-from reportlab.lib.pagesizes import A4
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import cm
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
-from reportlab.lib.enums import TA_JUSTIFY, TA_LEFT
-
-cloudinary.config(
-    cloud_name=os.environ.get("CLOUDINARY_CLOUD_NAME"),
-    api_key=os.environ.get("CLOUDINARY_API_KEY"),
-    api_secret=os.environ.get("CLOUDINARY_API_SECRET"),
-    secure=True
-)
+from utils.ai_providers import complete
+from utils.typeahead import record_typeahead_change
+from utils.pdf_renderer import PdfRenderBusy
+from utils.pdf_artifacts import get_or_create_pdf, release_pdf
+from utils.storage import LocalStore, get_object_store, stored_url
+from utils.cv_text import content_hash, prepare_cv_text, document_cv_text
+from utils.template_cache import get_template_doc, render_template_doc, invalidate_template
 
 router = APIRouter(prefix="/documents", tags=["Documents"])
 
@@ -58,105 +38,6 @@ def get_db():
     pass
 
 
-def generate_cover_letter_pdf(content: str, entreprise: str, poste: str, user_name: str, is_html: bool = False) -> io.BytesIO:
-    """Generate a PDF from cover letter content (Text or HTML)"""
-    buffer = io.BytesIO()
-    
-    if is_html:
-        # HTML Rendering using xhtml2pdf
-        print(f"[PDF] Generating HTML PDF, content length: {len(content)}")
-        print(f"[PDF] Content preview: {content[:300]}")
-        pisa_status = pisa.CreatePDF(content, dest=buffer)
-        print(f"[PDF] pisa error: {pisa_status.err}, buffer size: {buffer.tell()}")
-        if pisa_status.err:
-            print(f"[PDF] HTML to PDF FAILED, falling back to text")
-            return generate_cover_letter_pdf(content, entreprise, poste, user_name, is_html=False)
-    else:
-        # Legacy Text Rendering using ReportLab
-        doc = SimpleDocTemplate(
-            buffer,
-            pagesize=A4,
-            rightMargin=2*cm,
-            leftMargin=2*cm,
-            topMargin=2*cm,
-            bottomMargin=2*cm
-        )
-        
-        styles = getSampleStyleSheet()
-        
-        # Custom styles
-        title_style = ParagraphStyle(
-            'CustomTitle',
-            parent=styles['Heading1'],
-            fontSize=14,
-            spaceAfter=20,
-            textColor='#1a1a2e'
-        )
-        
-        body_style = ParagraphStyle(
-            'CustomBody',
-            parent=styles['Normal'],
-            fontSize=11,
-            leading=16,
-            alignment=TA_LEFT,
-            spaceAfter=12
-        )
-        
-        meta_style = ParagraphStyle(
-            'Meta',
-            parent=styles['Normal'],
-            fontSize=9,
-            textColor='#666666',
-            spaceAfter=20
-        )
-        
-        story = []
-        
-        # Title
-        story.append(Paragraph(f"Lettre de Motivation - {poste}", title_style))
-        story.append(Paragraph(f"Candidature chez {entreprise} • {user_name}", meta_style))
-        story.append(Spacer(1, 0.5*cm))
-        
-        # Content - split by paragraphs
-        paragraphs = content.split('\n\n')
-        for para in paragraphs:
-            if para.strip():
-                # Escape XML special characters for ReportLab Paragraph
-                clean_para = escape(para.strip())
-                # Replace single newlines with <br/> for line breaks within paragraphs
-                clean_para = clean_para.replace('\n', '<br/>')
-                story.append(Paragraph(clean_para, body_style))
-        
-        doc.build(story)
-        
-    buffer.seek(0)
-    return buffer
-
-
-async def upload_cover_letter_to_cloudinary(pdf_buffer: io.BytesIO, user_id: str, letter_id: str, filename: str) -> dict:
-    """Upload generated cover letter PDF to Cloudinary"""
-    try:
-        # Use raw to avoid Cloudinary trying to process it as an image
-        # Adding .pdf to public_id ensures the URL has the correct extension for raw files
-        upload_result = cloudinary.uploader.upload(
-            pdf_buffer.getvalue(),
-            public_id=f"jobtracker/{user_id}/cover_letters/{letter_id}.pdf",
-            resource_type="raw",
-            overwrite=True,
-            tags=[user_id, "cover_letter"]
-        )
-        # Force attachment/download flag in the URL for raw files
-        url = upload_result.get("secure_url")
-
-        return {
-            "url": url,
-            "public_id": upload_result.get("public_id")
-        }
-    except Exception as e:
-        print(f"Error uploading to Cloudinary: {e}")
-        return None
-
-
 # Configuration
 MAX_FILE_SIZE = 10 * 1024 * 1024  # 10 MB
 ALLOWED_MIME_TYPES = [
@@ -183,7 +64,7 @@ async def upload_document(
     current_user: dict = Depends(get_current_user),
     db = Depends(get_db)
 ):
-    """Upload a document (CV, cover letter, etc.) to Cloudinary"""
+    """Upload a document (CV, cover letter, etc.) to object storage"""
     user_id = current_user["user_id"]
     
     # Validate file size
@@ -204,31 +85,31 @@ async def upload_document(
             detail=f"Type de fichier non autorisé. Types acceptés: PDF, DOC, DOCX, PNG, JPG"
         )
     
-    # Generate unique public_id for Cloudinary
     doc_id = str(uuid.uuid4())
     
+    # CV : texte extrait pendant l'upload (pool de processus), mis en cache par empreinte
+    file_hash = None
+    extraction = None
+    if document_type == DocumentType.CV.value:
+        data = await asyncio.to_thread(file.file.read)
+        file.file.seek(0)
+        file_hash = await asyncio.to_thread(content_hash, data)
+        extraction = asyncio.create_task(prepare_cv_text(db, data, file.filename, file_hash))
+    
     try:
-        # Upload to Cloudinary
-        # Auto will detect images as "image", PDFs as "image" (better for viewing) and docs as "raw"
-        resource_type = "auto"
-        
-        upload_result = cloudinary.uploader.upload(
-            file.file,
-            public_id=f"jobtracker/{user_id}/{doc_id}",
-            resource_type=resource_type,
-            use_filename=True,
-            unique_filename=False,
-            overwrite=True,
+        # Upload par morceaux depuis le fichier temporaire de l'UploadFile
+        stored = await get_object_store().save(
+            f"jobtracker/{user_id}/{doc_id}",
+            file,
+            content_type=file.content_type,
             tags=[user_id, document_type]
         )
-        
-        cloudinary_url = upload_result.get("secure_url")
-        cloudinary_public_id = upload_result.get("public_id")
-        
     except Exception as e:
+        if extraction:
+            extraction.cancel()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Erreur upload Cloudinary: {str(e)}"
+            detail=f"Erreur upload du fichier: {str(e)}"
         )
     
     # If setting as default, unset other defaults of same type
@@ -248,18 +129,25 @@ async def upload_document(
         "label": label,
         "description": description,
         "is_default": is_default,
-        "cloudinary_url": cloudinary_url,
-        "cloudinary_public_id": cloudinary_public_id,
+        "storage": stored.storage,
+        "storage_key": stored.key,
+        "storage_meta": stored.meta,
+        "cloudinary_url": stored.url if stored.storage == "cloudinary" else None,
+        "cloudinary_public_id": stored.key if stored.storage == "cloudinary" else None,
         "file_path": None,  # No longer using filesystem
         "file_size": file_size,
         "mime_type": file.content_type,
         "original_filename": file.filename,
-        "url": cloudinary_url,
+        # Pas d'URL persistée : résolue à la lecture (stored_url), une URL signée expire
+        "url": None,
+        "content_hash": file_hash,
+        "text_extracted": await extraction if extraction else False,
         "created_at": datetime.now(timezone.utc).isoformat(),
         "updated_at": datetime.now(timezone.utc).isoformat()
     }
     
     await db.documents.insert_one(document)
+    await record_typeahead_change(user_id, "documents", after=document)
     
     return DocumentResponse(
         id=doc_id,
@@ -268,6 +156,7 @@ async def upload_document(
         label=label,
         description=description,
         is_default=is_default,
+        url=await stored_url(document),
         file_size=file_size,
         mime_type=file.content_type,
         original_filename=file.filename,
@@ -318,6 +207,7 @@ async def create_portfolio_link(
     }
     
     await db.documents.insert_one(document)
+    await record_typeahead_change(user_id, "documents", after=document)
     
     return DocumentResponse(
         id=doc_id,
@@ -350,7 +240,7 @@ async def list_documents(
     result = []
     for doc in documents:
         download_url = None
-        if doc.get("cloudinary_url") or doc.get("file_path"):
+        if doc.get("storage_key") or doc.get("cloudinary_url") or doc.get("file_path"):
             download_url = f"/api/documents/{doc['id']}/download"
         
         result.append(DocumentResponse(
@@ -360,7 +250,7 @@ async def list_documents(
             label=doc.get("label"),
             description=doc.get("description"),
             is_default=doc.get("is_default", False),
-            url=doc.get("url"),
+            url=await stored_url(doc),
             file_size=doc.get("file_size"),
             mime_type=doc.get("mime_type"),
             original_filename=doc.get("original_filename"),
@@ -541,6 +431,7 @@ async def update_template(
         {"id": template_id},
         {"$set": update_data}
     )
+    await invalidate_template(template_id)
     
     return await get_template(template_id, current_user, db)
 
@@ -563,10 +454,31 @@ async def delete_template(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Template non trouvé"
         )
+    await invalidate_template(template_id)
     
     return {"message": "Template supprimé"}
 
 
+def _letter_pdf_fields(pdf_data: Optional[dict]) -> dict:
+    """Champs PDF d'une lettre : clé de stockage seulement, l'URL est résolue à la lecture"""
+    if not pdf_data:
+        return {"cloudinary_url": None, "cloudinary_public_id": None}
+    return {
+        "storage": pdf_data["storage"],
+        "storage_key": pdf_data["storage_key"],
+        "storage_meta": pdf_data["storage_meta"],
+        "cloudinary_url": None,
+        "cloudinary_public_id": pdf_data["public_id"],
+    }
+
+
+async def _with_pdf_url(letter: dict) -> dict:
+    """cloudinary_url (lu par le frontend) recalculé ; lettres antérieures : URL enregistrée"""
+    if letter.get("storage_key"):
+        letter["cloudinary_url"] = await stored_url(letter)
+    return letter
+
+
 @router.post("/templates/{template_id}/generate")
 async def generate_cover_letter_from_template(
     template_id: str,
@@ -582,16 +494,10 @@ async def generate_cover_letter_from_template(
     """Generate a cover letter from a template (User or System) and save as PDF to Cloudinary"""
     user_id = current_user["user_id"]
     
-    if is_system_template:
-        template = await db.system_templates.find_one({"id": template_id})
-        content_field = "html_content"
-        is_html = True
-    else:
-        template = await db.cover_letter_templates.find_one(
-            {"id": template_id, "user_id": user_id}
-        )
-        content_field = "content"
-        is_html = False
+    # Document et template compilé servis depuis le cache (utils/template_cache)
+    template = await get_template_doc(db, template_id, user_id, system=is_system_template)
+    content_field = "html_content" if is_system_template else "content"
+    is_html = is_system_template
         
     if not template:
         raise HTTPException(status_code=404, detail="Template non trouvé")
@@ -599,13 +505,8 @@ async def generate_cover_letter_from_template(
     raw_content = template[content_field]
     
     # Replace variables using Jinja2 for better robustness
+    # ({var} is converted to {{ var }} by the template cache)
     try:
-        # If template already uses {{ }}, use as-is; otherwise convert {var} → {{ var }}
-        if "{{" in raw_content:
-            processed_template = raw_content
-        else:
-            processed_template = re.sub(r'\{(\w+)\}', r'{{ \1 }}', raw_content)
-
         render_context = {
             "entreprise": entreprise,
             "poste": poste,
@@ -615,7 +516,7 @@ async def generate_cover_letter_from_template(
             "telephone": current_user.get("telephone", ""),
             "content": custom_content or ""
         }
-        content = _render_jinja(processed_template, render_context)
+        content = render_template_doc(template, render_context, system=is_system_template)
     except Exception as e:
         print(f"Jinja2 rendering error: {e}")
         # Fallback to simple replace
@@ -631,25 +532,27 @@ async def generate_cover_letter_from_template(
             content = content.replace(var, val or "")
     
     letter_id = str(uuid.uuid4())
-    cloudinary_url = None
-    cloudinary_public_id = None
+    pdf_data = None
     
     if save_as_pdf:
         try:
-            pdf_buffer = generate_cover_letter_pdf(
+            # Lettre identique déjà rendue : l'artefact stocké est réutilisé
+            pdf_data = await get_or_create_pdf(
+                db,
+                user_id,
                 content=content,
                 entreprise=entreprise,
                 poste=poste,
                 user_name=current_user.get("full_name", "Candidat"),
                 is_html=is_html
             )
-            filename = f"LM_{entreprise}_{poste}_{datetime.now().strftime('%Y%m%d')}.pdf"
-            cloudinary_data = await upload_cover_letter_to_cloudinary(
-                pdf_buffer, user_id, letter_id, filename
+        except PdfRenderBusy:
+            # Rien n'est encore enregistré : le client peut réessayer
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Génération PDF momentanément saturée, réessayez dans quelques secondes",
+                headers={"Retry-After": "5"}
             )
-            if cloudinary_data:
-                cloudinary_url = cloudinary_data.get("url")
-                cloudinary_public_id = cloudinary_data.get("public_id")
         except Exception as pdf_err:
             print(f"Error generating PDF from template: {pdf_err}")
     
@@ -665,8 +568,7 @@ async def generate_cover_letter_from_template(
         "poste": poste,
         "content": content,
         "generated_by": "template",
-        "cloudinary_url": cloudinary_url,
-        "cloudinary_public_id": cloudinary_public_id,
+        **_letter_pdf_fields(pdf_data),
         "created_at": datetime.now(timezone.utc).isoformat()
     }
     
@@ -678,7 +580,7 @@ async def generate_cover_letter_from_template(
         "entreprise": entreprise,
         "poste": poste,
         "template_name": template.get("name"),
-        "download_url": cloudinary_url,
+        "download_url": pdf_data["url"] if pdf_data else None,
         "created_at": letter["created_at"]
     }
 
@@ -696,7 +598,7 @@ async def list_generated_cover_letters(
         {"_id": 0}
     ).sort("created_at", -1).to_list(100)
     
-    return letters
+    return [await _with_pdf_url(letter) for letter in letters]
 
 
 @router.get("/cover-letters/{letter_id}")
@@ -719,7 +621,7 @@ async def get_generated_cover_letter(
             detail="Lettre non trouvée"
         )
     
-    return letter
+    return await _with_pdf_url(letter)
 
 
 @router.delete("/cover-letters/{letter_id}")
@@ -741,15 +643,12 @@ async def delete_generated_cover_letter(
             detail="Lettre non trouvée"
         )
     
-    # Delete from Cloudinary if exists
+    # PDF partagé entre lettres identiques : supprimé avec la dernière
     if letter.get("cloudinary_public_id"):
         try:
-            cloudinary.uploader.destroy(
-                letter["cloudinary_public_id"],
-                resource_type="raw"
-            )
+            await release_pdf(db, letter["cloudinary_public_id"])
         except Exception as e:
-            print(f"Warning: Failed to delete from Cloudinary: {e}")
+            print(f"Warning: Failed to release cover letter PDF: {e}")
     
     await db.generated_cover_letters.delete_one({"id": letter_id})
     
@@ -913,12 +812,14 @@ async def generate_cover_letter_with_ai(
     # Get user info
     user = await db.users.find_one({"id": user_id}, {"_id": 0, "full_name": 1, "email": 1, "google_ai_key": 1, "openai_key": 1, "groq_key": 1})
     
-    # Get CV content if provided
+    # Get CV content if provided (texte extrait à l'upload, sinon description du document)
     cv_content = ""
     if cv_id:
-        cv_doc = await db.documents.find_one({"id": cv_id, "user_id": user_id})
-        if cv_doc and cv_doc.get("description"):
-            cv_content = cv_doc["description"]
+        cv_content = (await document_cv_text(db, user_id, cv_id) or "")[:3000]
+        if not cv_content:
+            cv_doc = await db.documents.find_one({"id": cv_id, "user_id": user_id})
+            if cv_doc and cv_doc.get("description"):
+                cv_content = cv_doc["description"]
     
     # Get user's recent applications for context
     recent_apps = await db.applications.find(
@@ -996,7 +897,7 @@ Génère UNIQUEMENT la lettre, sans introduction ni commentaire."""
     # Quota check (exempts users with own key and admins)
     # This raises HTTPException directly if quota exceeded — must be outside the AI try/except
     if not has_own_key:
-        await check_and_increment_quota(user_id, db)
+        await check_and_increment_quota(user_id, db, role=current_user.get("role"))
 
     # Call AI
     try:
@@ -1009,13 +910,7 @@ Génère UNIQUEMENT la lettre, sans introduction ni commentaire."""
                 chat = chat.with_model("openai", "gpt-4o-mini")
                 content = await chat.send_message(UserMessage(text=prompt))
             except ImportError:
-                from openai import OpenAI
-                client = OpenAI(api_key=api_key)
-                response = client.chat.completions.create(
-                    model="gpt-4o-mini",
-                    messages=[{"role": "user", "content": prompt}]
-                )
-                content = response.choices[0].message.content
+                content = await complete("openai", api_key, "gpt-4o-mini", None, prompt)
         
         elif provider == "google":
             try:
@@ -1024,19 +919,10 @@ Génère UNIQUEMENT la lettre, sans introduction ni commentaire."""
                 chat = chat.with_model("gemini", "gemini-1.5-flash")
                 content = await chat.send_message(UserMessage(text=prompt))
             except ImportError:
-                from google import genai
-                client = genai.Client(api_key=api_key)
-                response = client.models.generate_content(model="gemini-1.5-flash", contents=prompt)
-                content = response.text
+                content = await complete("google", api_key, "gemini-1.5-flash", None, prompt)
         
         elif provider == "groq":
-            from groq import Groq
-            client = Groq(api_key=api_key)
-            response = client.chat.completions.create(
-                model="llama-3.1-8b-instant",
-                messages=[{"role": "user", "content": prompt}]
-            )
-            content = response.choices[0].message.content
+            content = await complete("groq", api_key, "llama-3.1-8b-instant", None, prompt)
         
         # Generate PDF and upload to Cloudinary
         letter_id = str(uuid.uuid4())
@@ -1045,22 +931,13 @@ Génère UNIQUEMENT la lettre, sans introduction ni commentaire."""
         try:
             # Handle Premium Template Rendering if requested
             if template_id:
-                if is_system_template:
-                    template = await db.system_templates.find_one({"id": template_id})
-                    raw_template = template.get("html_content")
-                    is_html = True
-                else:
-                    template = await db.cover_letter_templates.find_one({"id": template_id, "user_id": user_id})
-                    raw_template = template.get("content")
-                    is_html = False
+                template = await get_template_doc(db, template_id, user_id, system=is_system_template)
+                raw_template = template.get("html_content" if is_system_template else "content") if template else None
+                is_html = is_system_template
                 
                 if template and raw_template:
                     # Process template with Jinja2
                     try:
-                        if "{{" in raw_template:
-                            processed_tmpl = raw_template
-                        else:
-                            processed_tmpl = re.sub(r'\{(\w+)\}', r'{{ \1 }}', raw_template)
                         # Convertit les sauts de ligne en <br/> pour xhtml2pdf (white-space:pre-line non supporté)
                         content_for_pdf = content.replace('\n', '<br/>')
                         render_context = {
@@ -1072,37 +949,27 @@ Génère UNIQUEMENT la lettre, sans introduction ni commentaire."""
                             "telephone": user.get("telephone", ""),
                             "content": content_for_pdf
                         }
-                        content_to_render = _render_jinja(processed_tmpl, render_context)
+                        content_to_render = render_template_doc(template, render_context, system=is_system_template)
                     except:
                         content_to_render = content # Fallback to AI content only if template fails
-                    
-                    pdf_buffer = generate_cover_letter_pdf(
-                        content=content_to_render,
-                        entreprise=entreprise,
-                        poste=poste,
-                        user_name=user.get("full_name", "Candidat"),
-                        is_html=is_html
-                    )
                 else:
                     # Fallback to basic if template not found
-                    pdf_buffer = generate_cover_letter_pdf(
-                        content=content,
-                        entreprise=entreprise,
-                        poste=poste,
-                        user_name=user.get("full_name", "Candidat")
-                    )
+                    content_to_render = content
+                    is_html = False
             else:
                 # Basic Rendering
-                pdf_buffer = generate_cover_letter_pdf(
-                    content=content,
-                    entreprise=entreprise,
-                    poste=poste,
-                    user_name=user.get("full_name", "Candidat")
-                )
-                
-            filename = f"LM_AI_{entreprise}_{poste}_{datetime.now().strftime('%Y%m%d')}.pdf"
-            cloudinary_data = await upload_cover_letter_to_cloudinary(
-                pdf_buffer, user_id, letter_id, filename
+                content_to_render = content
+                is_html = False
+            
+            # Lettre identique déjà rendue : l'artefact stocké est réutilisé
+            cloudinary_data = await get_or_create_pdf(
+                db,
+                user_id,
+                content=content_to_render,
+                entreprise=entreprise,
+                poste=poste,
+                user_name=user.get("full_name", "Candidat"),
+                is_html=is_html
             )
         except Exception as pdf_err:
             import traceback
@@ -1122,8 +989,7 @@ Génère UNIQUEMENT la lettre, sans introduction ni commentaire."""
             "content": content,
             "generated_by": "ai_premium" if template_id else "ai",
             "tone": tone,
-            "cloudinary_url": cloudinary_data.get("url") if cloudinary_data else None,
-            "cloudinary_public_id": cloudinary_data.get("public_id") if cloudinary_data else None,
+            **_letter_pdf_fields(cloudinary_data),
             "created_at": datetime.now(timezone.utc).isoformat()
         }
         
@@ -1135,7 +1001,7 @@ Génère UNIQUEMENT la lettre, sans introduction ni commentaire."""
             "entreprise": entreprise,
             "poste": poste,
             "template_name": letter["template_name"],
-            "download_url": letter["cloudinary_url"],
+            "download_url": cloudinary_data["url"] if cloudinary_data else None,
             "created_at": letter["created_at"]
         }
     
@@ -1148,6 +1014,20 @@ Génère UNIQUEMENT la lettre, sans introduction ni commentaire."""
         )
 
 
+@router.get("/files/{key:path}")
+async def download_local_file(key: str, expires: int = 0, signature: str = ""):
+    """Fichier du stockage local, par URL signée (équivalent des URL signées S3)"""
+    store = get_object_store("local")
+    if not store.verify(key, expires, signature):
+        raise HTTPException(status_code=403, detail="Lien de téléchargement invalide ou expiré")
+    path = store.path(key)
+    if settings.STORAGE_BACKEND != "local" and settings.PDF_ARTIFACT_STORAGE != "local":
+        path = None
+    if not path or not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="Fichier non trouvé")
+    return FileResponse(path=path, filename=os.path.basename(path))
+
+
 # ============================================
 # GENERIC DOCUMENT ROUTES (moved to end to avoid shadowing)
 # ============================================
@@ -1173,7 +1053,7 @@ async def get_document(
         )
     
     download_url = None
-    if document.get("cloudinary_url") or document.get("file_path"):
+    if document.get("storage_key") or document.get("cloudinary_url") or document.get("file_path"):
         download_url = f"/api/documents/{document_id}/download"
     
     return DocumentResponse(
@@ -1183,7 +1063,7 @@ async def get_document(
         label=document.get("label"),
         description=document.get("description"),
         is_default=document.get("is_default", False),
-        url=document.get("url"),
+        url=await stored_url(document),
         file_size=document.get("file_size"),
         mime_type=document.get("mime_type"),
         original_filename=document.get("original_filename"),
@@ -1213,7 +1093,24 @@ async def download_document(
             detail="Document non trouvé"
         )
     
-    # If document has Cloudinary URL, redirect to it
+    if document.get("storage_key"):
+        store = get_object_store(document["storage"])
+        if isinstance(store, LocalStore):
+            path = store.path(document["storage_key"])
+            if path and os.path.exists(path):
+                return FileResponse(
+                    path=path,
+                    filename=document.get("original_filename") or document["name"],
+                    media_type=document.get("mime_type", "application/octet-stream")
+                )
+        else:
+            # URL publique ou signée (S3 privé) générée à la demande
+            return RedirectResponse(
+                url=await store.url(document["storage_key"], document.get("storage_meta")),
+                status_code=302
+            )
+    
+    # Documents antérieurs à utils/storage : URL Cloudinary enregistrée
     if document.get("cloudinary_url"):
         return RedirectResponse(url=document["cloudinary_url"], status_code=302)
     
@@ -1267,6 +1164,7 @@ async def update_document(
         {"id": document_id},
         {"$set": update_data}
     )
+    await record_typeahead_change(user_id, "documents", before=document, after={**document, **update_data})
     
     return await get_document(document_id, current_user, db)
 
@@ -1277,7 +1175,7 @@ async def delete_document(
     current_user: dict = Depends(get_current_user),
     db = Depends(get_db)
 ):
-    """Delete a document (from Cloudinary and database)"""
+    """Delete a document (from object storage and database)"""
     user_id = current_user["user_id"]
     
     document = await db.documents.find_one(
@@ -1290,18 +1188,16 @@ async def delete_document(
             detail="Document non trouvé"
         )
     
-    # Delete from Cloudinary if exists
-    if document.get("cloudinary_public_id"):
+    # Objet stocké (documents antérieurs à utils/storage : Cloudinary, resource_type inconnu)
+    storage_key = document.get("storage_key") or document.get("cloudinary_public_id")
+    if storage_key:
         try:
-            # Determine resource type based on mime_type
-            resource_type = "image" if document.get("mime_type", "").startswith("image/") else "raw"
-            cloudinary.uploader.destroy(
-                document["cloudinary_public_id"],
-                resource_type=resource_type
+            await get_object_store(document.get("storage", "cloudinary")).delete(
+                storage_key, document.get("storage_meta")
             )
         except Exception as e:
-            # Log but don't fail if Cloudinary delete fails
-            print(f"Warning: Failed to delete from Cloudinary: {e}")
+            # Log but don't fail if storage delete fails
+            print(f"Warning: Failed to delete stored file: {e}")
     
     # Legacy: Delete local file if exists
     if document.get("file_path"):
@@ -1313,5 +1209,6 @@ async def delete_document(
                 pass
     
     await db.documents.delete_one({"id": document_id})
+    await record_typeahead_change(user_id, "documents", before=document)
     
     return {"message": "Document supprimé"}
@@ -2,15 +2,25 @@
 JobTracker SaaS - Routes d'export
 """
 
-from fastapi import APIRouter, Depends, Response
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Request, Response, status
 from fastapi.responses import StreamingResponse
-from typing import List
+from pydantic import BaseModel
+from typing import List, Literal, Optional, Tuple
 from datetime import datetime, timezone
 import json
-import csv
-import io
 
 from utils.auth import get_current_user
+from utils.excel_export import OPENPYXL_AVAILABLE, SheetSpec, xlsx_response
+from utils.export_jobs import (
+    EXPORT_FORMATS, artifact_available, artifact_filename, create_export_job,
+    process_export_jobs, public_job, read_artifact
+)
+from utils.stats_engine import count_facet, facet_count, facet_groups, group_facet, run_facets
+from utils.export_stream import (
+    APPLICATION_CSV_HEADERS, APPLICATION_EXCEL_HEADERS, APPLICATION_EXCEL_WIDTHS,
+    INTERVIEW_CSV_HEADERS, INTERVIEW_EXCEL_WIDTHS, application_csv_row, application_excel_row,
+    interview_csv_row, iter_applications, iter_interviews, map_rows, stream_csv, stream_json
+)
 
 router = APIRouter(prefix="/export", tags=["Export"])
 
@@ -20,43 +30,23 @@ def get_db():
     pass
 
 
+def _attachment(filename: str) -> dict:
+    return {"Content-Disposition": f"attachment; filename={filename}"}
+
+
 @router.get("/json")
 async def export_json(
     current_user: dict = Depends(get_current_user),
     db = Depends(get_db)
 ):
-    """Export toutes les candidatures en JSON"""
+    """Export toutes les candidatures en JSON (flux, entretiens joints via $lookup)"""
     user_id = current_user["user_id"]
+    total = await db.applications.count_documents({"user_id": user_id})
     
-    # Récupérer les candidatures
-    applications = await db.applications.find(
-        {"user_id": user_id},
-        {"_id": 0, "user_id": 0}
-    ).sort("date_candidature", -1).to_list(10000)
-    
-    # Récupérer les entretiens et les associer
-    for app in applications:
-        interviews = await db.interviews.find(
-            {"candidature_id": app["id"]},
-            {"_id": 0, "user_id": 0, "candidature_id": 0}
-        ).to_list(100)
-        app["entretiens"] = interviews
-    
-    # Créer le JSON
-    export_data = {
-        "export_date": datetime.now(timezone.utc).isoformat(),
-        "total_applications": len(applications),
-        "applications": applications
-    }
-    
-    json_str = json.dumps(export_data, indent=2, ensure_ascii=False, default=str)
-    
-    return Response(
-        content=json_str,
+    return StreamingResponse(
+        stream_json(iter_applications(db, user_id), "applications", "total_applications", total),
         media_type="application/json",
-        headers={
-            "Content-Disposition": f"attachment; filename=candidatures_{datetime.now().strftime('%Y%m%d')}.json"
-        }
+        headers=_attachment(f"candidatures_{datetime.now().strftime('%Y%m%d')}.json")
     )
 
 
@@ -65,52 +55,26 @@ async def export_csv(
     current_user: dict = Depends(get_current_user),
     db = Depends(get_db)
 ):
-    """Export toutes les candidatures en CSV"""
+    """Export toutes les candidatures en CSV (flux)"""
     user_id = current_user["user_id"]
     
-    # Récupérer les candidatures
-    applications = await db.applications.find(
-        {"user_id": user_id},
-        {"_id": 0, "user_id": 0}
-    ).sort("date_candidature", -1).to_list(10000)
-    
-    # Créer le CSV
-    output = io.StringIO()
-    writer = csv.writer(output, delimiter=';', quoting=csv.QUOTE_ALL)
-    
-    # En-têtes
-    headers = [
-        "Entreprise", "Poste", "Type", "Lieu", "Moyen",
-        "Date Candidature", "Lien", "Statut", "Date Réponse",
-        "Commentaire", "Favori"
-    ]
-    writer.writerow(headers)
-    
-    # Données
-    for app in applications:
-        row = [
-            app.get("entreprise", ""),
-            app.get("poste", ""),
-            app.get("type_poste", ""),
-            app.get("lieu", ""),
-            app.get("moyen", ""),
-            app.get("date_candidature", "")[:10] if app.get("date_candidature") else "",
-            app.get("lien", ""),
-            app.get("reponse", ""),
-            app.get("date_reponse", "")[:10] if app.get("date_reponse") else "",
-            app.get("commentaire", ""),
-            "Oui" if app.get("is_favorite") else "Non"
-        ]
-        writer.writerow(row)
-    
-    output.seek(0)
-    
     return StreamingResponse(
-        iter([output.getvalue()]),
+        stream_csv(iter_applications(db, user_id, with_interviews=False), APPLICATION_CSV_HEADERS, application_csv_row),
         media_type="text/csv",
-        headers={
-            "Content-Disposition": f"attachment; filename=candidatures_{datetime.now().strftime('%Y%m%d')}.csv"
-        }
+        headers=_attachment(f"candidatures_{datetime.now().strftime('%Y%m%d')}.csv")
+    )
+
+
+async def _static_rows(rows):
+    for row in rows:
+        yield row
+
+
+def _openpyxl_missing() -> Response:
+    return Response(
+        content=json.dumps({"error": "openpyxl non installé"}),
+        media_type="application/json",
+        status_code=500
     )
 
 
@@ -119,104 +83,22 @@ async def export_excel(
     current_user: dict = Depends(get_current_user),
     db = Depends(get_db)
 ):
-    """Export toutes les candidatures en Excel"""
-    try:
-        import openpyxl
-        from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
-        from openpyxl.utils import get_column_letter
-    except ImportError:
-        return Response(
-            content=json.dumps({"error": "openpyxl non installé"}),
-            media_type="application/json",
-            status_code=500
-        )
+    """Export toutes les candidatures en Excel (write-only, construit hors de la boucle)"""
+    if not OPENPYXL_AVAILABLE:
+        return _openpyxl_missing()
     
     user_id = current_user["user_id"]
     
-    # Récupérer les candidatures
-    applications = await db.applications.find(
-        {"user_id": user_id},
-        {"_id": 0}
-    ).sort("date_candidature", -1).to_list(10000)
-    
-    # Créer le workbook
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "Candidatures"
-    
-    # Styles
-    header_font = Font(bold=True, color="FFFFFF")
-    header_fill = PatternFill(start_color="1a365d", end_color="1a365d", fill_type="solid")
-    gold_fill = PatternFill(start_color="c4a052", end_color="c4a052", fill_type="solid")
-    thin_border = Border(
-        left=Side(style='thin'),
-        right=Side(style='thin'),
-        top=Side(style='thin'),
-        bottom=Side(style='thin')
+    sheet = SheetSpec(
+        title="Candidatures",
+        headers=APPLICATION_EXCEL_HEADERS,
+        rows=map_rows(iter_applications(db, user_id, count_interviews=True), application_excel_row),
+        widths=APPLICATION_EXCEL_WIDTHS,
+        # Colorer les favoris
+        highlight=lambda row: [10] if row[10] else [],
     )
     
-    # En-têtes
-    headers = [
-        "Entreprise", "Poste", "Type", "Lieu", "Moyen",
-        "Date Candidature", "Lien", "Statut", "Date Réponse",
-        "Commentaire", "Favori", "Nb Entretiens"
-    ]
-    
-    for col, header in enumerate(headers, 1):
-        cell = ws.cell(row=1, column=col, value=header)
-        cell.font = header_font
-        cell.fill = header_fill
-        cell.alignment = Alignment(horizontal='center')
-        cell.border = thin_border
-    
-    # Données
-    for row_idx, app in enumerate(applications, 2):
-        # Compter les entretiens
-        interviews_count = await db.interviews.count_documents({"candidature_id": app["id"]})
-        
-        data = [
-            app.get("entreprise", ""),
-            app.get("poste", ""),
-            app.get("type_poste", ""),
-            app.get("lieu", ""),
-            app.get("moyen", ""),
-            app.get("date_candidature", "")[:10] if app.get("date_candidature") else "",
-            app.get("lien", ""),
-            app.get("reponse", ""),
-            app.get("date_reponse", "")[:10] if app.get("date_reponse") else "",
-            app.get("commentaire", ""),
-            "⭐" if app.get("is_favorite") else "",
-            interviews_count
-        ]
-        
-        for col, value in enumerate(data, 1):
-            cell = ws.cell(row=row_idx, column=col, value=value)
-            cell.border = thin_border
-            
-            # Colorer les favoris
-            if app.get("is_favorite"):
-                ws.cell(row=row_idx, column=11).fill = gold_fill
-    
-    # Ajuster largeurs
-    column_widths = [25, 30, 12, 15, 20, 15, 50, 15, 15, 40, 10, 12]
-    for col, width in enumerate(column_widths, 1):
-        ws.column_dimensions[get_column_letter(col)].width = width
-    
-    # Figer la première ligne
-    ws.freeze_panes = "A2"
-    
-    # Sauvegarder en mémoire
-    output = io.BytesIO()
-    wb.save(output)
-    output.seek(0)
-    
-    return StreamingResponse(
-        iter([output.getvalue()]),
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={
-            "Content-Disposition": f"attachment; filename=candidatures_{datetime.now().strftime('%Y%m%d')}.xlsx"
-        }
-    )
+    return await xlsx_response([sheet], f"candidatures_{datetime.now().strftime('%Y%m%d')}.xlsx")
 
 
 @router.get("/statistics/excel")
@@ -225,81 +107,40 @@ async def export_statistics_excel(
     db = Depends(get_db)
 ):
     """Export des statistiques en Excel multi-sheets"""
-    try:
-        import openpyxl
-        from openpyxl.styles import Font, PatternFill, Alignment
-    except ImportError:
-        return Response(
-            content=json.dumps({"error": "openpyxl non installé"}),
-            media_type="application/json",
-            status_code=500
-        )
+    if not OPENPYXL_AVAILABLE:
+        return _openpyxl_missing()
     
     user_id = current_user["user_id"]
     
-    wb = openpyxl.Workbook()
-    
-    # Sheet 1: Stats générales
-    ws1 = wb.active
-    ws1.title = "Stats Générales"
-    
-    total = await db.applications.count_documents({"user_id": user_id})
-    pending = await db.applications.count_documents({"user_id": user_id, "reponse": "pending"})
-    positive = await db.applications.count_documents({"user_id": user_id, "reponse": "positive"})
-    negative = await db.applications.count_documents({"user_id": user_id, "reponse": "negative"})
+    result = await run_facets(db.applications, {"user_id": user_id}, {
+        "total": count_facet(),
+        "by_status": group_facet("reponse"),
+        "by_type": group_facet("type_poste"),
+    })
+    total = facet_count(result, "total")
+    by_status = facet_groups(result, "by_status")
+    positive = by_status.get("positive", 0)
+    negative = by_status.get("negative", 0)
     
     stats = [
         ("Total Candidatures", total),
-        ("En attente", pending),
+        ("En attente", by_status.get("pending", 0)),
         ("Réponses positives", positive),
         ("Réponses négatives", negative),
         ("Taux de réponse", f"{((positive + negative) / total * 100):.1f}%" if total > 0 else "0%")
     ]
     
-    for row, (label, value) in enumerate(stats, 1):
-        ws1.cell(row=row, column=1, value=label)
-        ws1.cell(row=row, column=2, value=value)
-    
-    # Sheet 2: Par statut
-    ws2 = wb.create_sheet("Par Statut")
-    pipeline = [
-        {"$match": {"user_id": user_id}},
-        {"$group": {"_id": "$reponse", "count": {"$sum": 1}}}
-    ]
-    status_data = await db.applications.aggregate(pipeline).to_list(10)
-    
-    ws2.cell(row=1, column=1, value="Statut")
-    ws2.cell(row=1, column=2, value="Nombre")
-    for row, item in enumerate(status_data, 2):
-        ws2.cell(row=row, column=1, value=item["_id"] or "pending")
-        ws2.cell(row=row, column=2, value=item["count"])
-    
-    # Sheet 3: Par type
-    ws3 = wb.create_sheet("Par Type")
-    pipeline = [
-        {"$match": {"user_id": user_id}},
-        {"$group": {"_id": "$type_poste", "count": {"$sum": 1}}}
+    sheets = [
+        SheetSpec("Stats Générales", [], _static_rows(stats), styled=False, freeze_header=False),
+        SheetSpec("Par Statut", ["Statut", "Nombre"],
+                  _static_rows([(k or "pending", v) for k, v in by_status.items()]),
+                  styled=False, freeze_header=False),
+        SheetSpec("Par Type", ["Type", "Nombre"],
+                  _static_rows([(k or "cdi", v) for k, v in facet_groups(result, "by_type").items()]),
+                  styled=False, freeze_header=False),
     ]
-    type_data = await db.applications.aggregate(pipeline).to_list(10)
-    
-    ws3.cell(row=1, column=1, value="Type")
-    ws3.cell(row=1, column=2, value="Nombre")
-    for row, item in enumerate(type_data, 2):
-        ws3.cell(row=row, column=1, value=item["_id"] or "cdi")
-        ws3.cell(row=row, column=2, value=item["count"])
-    
-    # Sauvegarder
-    output = io.BytesIO()
-    wb.save(output)
-    output.seek(0)
     
-    return StreamingResponse(
-        iter([output.getvalue()]),
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={
-            "Content-Disposition": f"attachment; filename=statistiques_{datetime.now().strftime('%Y%m%d')}.xlsx"
-        }
-    )
+    return await xlsx_response(sheets, f"statistiques_{datetime.now().strftime('%Y%m%d')}.xlsx")
 
 
 # ============== EXPORT ENTRETIENS ==============
@@ -309,40 +150,14 @@ async def export_interviews_json(
     current_user: dict = Depends(get_current_user),
     db = Depends(get_db)
 ):
-    """Export tous les entretiens en JSON"""
+    """Export tous les entretiens en JSON (flux)"""
     user_id = current_user["user_id"]
+    total = await db.interviews.count_documents({"user_id": user_id})
     
-    # Récupérer les entretiens avec les infos de candidature
-    interviews = await db.interviews.find(
-        {"user_id": user_id},
-        {"_id": 0, "user_id": 0}
-    ).sort("date_entretien", -1).to_list(10000)
-    
-    # Enrichir avec les infos de candidature
-    for interview in interviews:
-        if interview.get("candidature_id"):
-            app = await db.applications.find_one(
-                {"id": interview["candidature_id"]},
-                {"_id": 0, "entreprise": 1, "poste": 1}
-            )
-            if app:
-                interview["entreprise"] = app.get("entreprise", "")
-                interview["poste"] = app.get("poste", "")
-    
-    export_data = {
-        "export_date": datetime.now(timezone.utc).isoformat(),
-        "total_interviews": len(interviews),
-        "interviews": interviews
-    }
-    
-    json_str = json.dumps(export_data, indent=2, ensure_ascii=False, default=str)
-    
-    return Response(
-        content=json_str,
+    return StreamingResponse(
+        stream_json(iter_interviews(db, user_id, exclude_user_id=True), "interviews", "total_interviews", total),
         media_type="application/json",
-        headers={
-            "Content-Disposition": f"attachment; filename=entretiens_{datetime.now().strftime('%Y%m%d')}.json"
-        }
+        headers=_attachment(f"entretiens_{datetime.now().strftime('%Y%m%d')}.json")
     )
 
 
@@ -351,57 +166,13 @@ async def export_interviews_csv(
     current_user: dict = Depends(get_current_user),
     db = Depends(get_db)
 ):
-    """Export tous les entretiens en CSV"""
+    """Export tous les entretiens en CSV (flux)"""
     user_id = current_user["user_id"]
     
-    interviews = await db.interviews.find(
-        {"user_id": user_id},
-        {"_id": 0}
-    ).sort("date_entretien", -1).to_list(10000)
-    
-    output = io.StringIO()
-    writer = csv.writer(output, delimiter=';', quoting=csv.QUOTE_ALL)
-    
-    headers = [
-        "Entreprise", "Poste", "Date Entretien", "Type", "Format",
-        "Lieu/Lien", "Recruteur", "Statut", "Commentaire"
-    ]
-    writer.writerow(headers)
-    
-    for interview in interviews:
-        # Get application info
-        entreprise = ""
-        poste = ""
-        if interview.get("candidature_id"):
-            app = await db.applications.find_one(
-                {"id": interview["candidature_id"]},
-                {"_id": 0, "entreprise": 1, "poste": 1}
-            )
-            if app:
-                entreprise = app.get("entreprise", "")
-                poste = app.get("poste", "")
-        
-        row = [
-            entreprise,
-            poste,
-            interview.get("date_entretien", "")[:16] if interview.get("date_entretien") else "",
-            interview.get("type_entretien", ""),
-            interview.get("format_entretien", ""),
-            interview.get("lieu_lien", ""),
-            interview.get("interviewer", ""),
-            interview.get("statut", ""),
-            interview.get("commentaire", "")
-        ]
-        writer.writerow(row)
-    
-    output.seek(0)
-    
     return StreamingResponse(
-        iter([output.getvalue()]),
+        stream_csv(iter_interviews(db, user_id), INTERVIEW_CSV_HEADERS, interview_csv_row),
         media_type="text/csv",
-        headers={
-            "Content-Disposition": f"attachment; filename=entretiens_{datetime.now().strftime('%Y%m%d')}.csv"
-        }
+        headers=_attachment(f"entretiens_{datetime.now().strftime('%Y%m%d')}.csv")
     )
 
 
@@ -410,95 +181,150 @@ async def export_interviews_excel(
     current_user: dict = Depends(get_current_user),
     db = Depends(get_db)
 ):
-    """Export tous les entretiens en Excel"""
-    try:
-        import openpyxl
-        from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
-        from openpyxl.utils import get_column_letter
-    except ImportError:
-        return Response(
-            content=json.dumps({"error": "openpyxl non installé"}),
-            media_type="application/json",
-            status_code=500
-        )
+    """Export tous les entretiens en Excel (write-only, construit hors de la boucle)"""
+    if not OPENPYXL_AVAILABLE:
+        return _openpyxl_missing()
     
     user_id = current_user["user_id"]
     
-    interviews = await db.interviews.find(
-        {"user_id": user_id},
-        {"_id": 0}
-    ).sort("date_entretien", -1).to_list(10000)
-    
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "Entretiens"
-    
-    # Styles
-    header_font = Font(bold=True, color="FFFFFF")
-    header_fill = PatternFill(start_color="1a365d", end_color="1a365d", fill_type="solid")
-    thin_border = Border(
-        left=Side(style='thin'),
-        right=Side(style='thin'),
-        top=Side(style='thin'),
-        bottom=Side(style='thin')
+    sheet = SheetSpec(
+        title="Entretiens",
+        headers=INTERVIEW_CSV_HEADERS,
+        rows=map_rows(iter_interviews(db, user_id), interview_csv_row),
+        widths=INTERVIEW_EXCEL_WIDTHS,
     )
     
-    headers = [
-        "Entreprise", "Poste", "Date Entretien", "Type", "Format",
-        "Lieu/Lien", "Recruteur", "Statut", "Commentaire"
-    ]
-    
-    for col, header in enumerate(headers, 1):
-        cell = ws.cell(row=1, column=col, value=header)
-        cell.font = header_font
-        cell.fill = header_fill
-        cell.alignment = Alignment(horizontal='center')
-        cell.border = thin_border
-    
-    for row_idx, interview in enumerate(interviews, 2):
-        # Get application info
-        entreprise = ""
-        poste = ""
-        if interview.get("candidature_id"):
-            app = await db.applications.find_one(
-                {"id": interview["candidature_id"]},
-                {"_id": 0, "entreprise": 1, "poste": 1}
-            )
-            if app:
-                entreprise = app.get("entreprise", "")
-                poste = app.get("poste", "")
-        
-        data = [
-            entreprise,
-            poste,
-            interview.get("date_entretien", "")[:16] if interview.get("date_entretien") else "",
-            interview.get("type_entretien", ""),
-            interview.get("format_entretien", ""),
-            interview.get("lieu_lien", ""),
-            interview.get("interviewer", ""),
-            interview.get("statut", ""),
-            interview.get("commentaire", "")
-        ]
-        
-        for col, value in enumerate(data, 1):
-            cell = ws.cell(row=row_idx, column=col, value=value)
-            cell.border = thin_border
+    return await xlsx_response([sheet], f"entretiens_{datetime.now().strftime('%Y%m%d')}.xlsx")
+
+
+# ============== EXPORTS ASYNCHRONES ==============
+
+class ExportJobRequest(BaseModel):
+    kind: Literal["applications", "interviews"] = "applications"
+    format: Literal["json", "csv", "xlsx"] = "json"
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    Plage 'bytes=start-end' (une seule plage, suffixe '-N' accepté).
+    None si absente ou illisible (réponse complète), ValueError si insatisfiable.
+    """
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None
+    start_str, _, end_str = header[6:].strip().partition("-")
+    if not (start_str.isdigit() or (not start_str and end_str.isdigit())) or (end_str and not end_str.isdigit()):
+        return None
+    if not start_str:
+        # Suffixe : les N derniers octets (aucun pour un artefact vide)
+        if int(end_str) == 0 or size == 0:
+            raise ValueError("plage vide")
+        return max(0, size - int(end_str)), size - 1
+    start = int(start_str)
+    end = int(end_str) if end_str else size - 1
+    if start >= size or end < start:
+        raise ValueError("plage insatisfiable")
+    return start, min(end, size - 1)
+
+
+async def _get_job(db, job_id: str, user_id: str) -> dict:
+    job = await db.export_jobs.find_one({"id": job_id, "user_id": user_id}, {"_id": 0})
+    if not job:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Export non trouvé")
+    return job
+
+
+@router.post("/jobs", status_code=status.HTTP_202_ACCEPTED)
+async def create_export(
+    request: ExportJobRequest,
+    background_tasks: BackgroundTasks,
+    current_user: dict = Depends(get_current_user),
+    db = Depends(get_db)
+):
+    """
+    Crée un export asynchrone (ou réutilise le précédent si les données n'ont pas changé).
+    Suivre l'avancement via GET /export/jobs/{id}.
+    """
+    if request.format == "xlsx" and not OPENPYXL_AVAILABLE:
+        raise HTTPException(status_code=500, detail="openpyxl non installé")
+    
+    job, reused = await create_export_job(db, current_user["user_id"], request.kind, request.format)
+    if job["status"] == "pending":
+        # Démarrage immédiat ; le scheduler reprend les jobs non traités
+        background_tasks.add_task(process_export_jobs, db, job_id=job["id"])
+    
+    return {**public_job(job), "reused": reused}
+
+
+@router.get("/jobs")
+async def list_exports(
+    current_user: dict = Depends(get_current_user),
+    db = Depends(get_db)
+):
+    """Derniers exports de l'utilisateur"""
+    jobs = await db.export_jobs.find(
+        {"user_id": current_user["user_id"]}, {"_id": 0}
+    ).sort("created_at", -1).to_list(20)
+    return [public_job(job) for job in jobs]
+
+
+@router.get("/jobs/{job_id}")
+async def get_export(
+    job_id: str,
+    current_user: dict = Depends(get_current_user),
+    db = Depends(get_db)
+):
+    """Statut et avancement d'un export"""
+    return public_job(await _get_job(db, job_id, current_user["user_id"]))
+
+
+@router.get("/jobs/{job_id}/download")
+async def download_export(
+    job_id: str,
+    request: Request,
+    current_user: dict = Depends(get_current_user),
+    db = Depends(get_db)
+):
+    """Télécharge l'artefact d'un export terminé (reprise via l'en-tête Range)"""
+    job = await _get_job(db, job_id, current_user["user_id"])
+    if job["status"] != "done":
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Export pas encore terminé")
+    if not await artifact_available(db, job):
+        raise HTTPException(status_code=status.HTTP_410_GONE, detail="Fichier d'export expiré, relancez l'export")
+    
+    size = job["size"]
+    etag = f'"{job["fingerprint"][:32]}"'
+    headers = {
+        **_attachment(artifact_filename(job)),
+        "Accept-Ranges": "bytes",
+        "ETag": etag,
+    }
     
-    # Adjust column widths
-    column_widths = [25, 30, 18, 15, 12, 40, 20, 15, 40]
-    for col, width in enumerate(column_widths, 1):
-        ws.column_dimensions[get_column_letter(col)].width = width
+    # If-Range : la plage n'est honorée que si l'artefact est toujours le même
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if if_range and if_range != etag:
+        range_header = None
     
-    ws.freeze_panes = "A2"
+    try:
+        byte_range = parse_range(range_header, size)
+    except ValueError:
+        raise HTTPException(
+            status_code=416,
+            detail="Plage demandée invalide",
+            headers={"Content-Range": f"bytes */{size}"}
+        )
     
-    output = io.BytesIO()
-    wb.save(output)
-    output.seek(0)
+    if byte_range is None:
+        start, end, status_code = 0, size - 1, status.HTTP_200_OK
+    else:
+        start, end = byte_range
+        status_code = status.HTTP_206_PARTIAL_CONTENT
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    headers["Content-Length"] = str(end - start + 1 if size else 0)
     
     return StreamingResponse(
-        iter([output.getvalue()]),
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={
-            "Content-Disposition": f"attachment; filename=entretiens_{datetime.now().strftime('%Y%m%d')}.xlsx"
-        }
+        read_artifact(db, job, start, end),
+        status_code=status_code,
+        media_type=EXPORT_FORMATS[job["format"]],
+        headers=headers
     )
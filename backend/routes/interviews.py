@@ -11,6 +11,9 @@ from models import (
     InterviewStatus, InterviewType, InterviewFormat
 )
 from utils.auth import get_current_user
+from utils.user_stats import record_interview_link, record_data_change, invalidate_user_stats
+from utils.typeahead import invalidate_typeahead, record_typeahead_change
+from utils.reminder_dispatcher import parse_interview_date, schedule_interview_reminders
 
 router = APIRouter(prefix="/interviews", tags=["Interviews"])
 
@@ -172,6 +175,7 @@ async def create_interview(
     
     interview_dict = interview.model_dump()
     # Convertir les datetimes et enums
+    interview_dict['date_entretien_at'] = parse_interview_date(interview_dict['date_entretien'])
     interview_dict['date_entretien'] = interview_dict['date_entretien'].isoformat()
     interview_dict['created_at'] = interview_dict['created_at'].isoformat()
     interview_dict['statut'] = interview_dict['statut'].value if hasattr(interview_dict['statut'], 'value') else interview_dict['statut']
@@ -179,6 +183,9 @@ async def create_interview(
     interview_dict['format_entretien'] = interview_dict['format_entretien'].value if hasattr(interview_dict['format_entretien'], 'value') else interview_dict['format_entretien']
     
     await db.interviews.insert_one(interview_dict)
+    await record_interview_link(db, current_user["user_id"], interview_dict["candidature_id"], created=True)
+    await record_typeahead_change(current_user["user_id"], "interviews", after=interview_dict)
+    await schedule_interview_reminders(interview_dict)
     
     # Retourner enrichi
     response = interview.model_dump()
@@ -259,11 +266,19 @@ async def update_interview(
             update_data[key] = value.value
         elif isinstance(value, datetime):
             update_data[key] = value.isoformat()
+    update_data["updated_at"] = datetime.now(timezone.utc).isoformat()
+    if "date_entretien" in update_data:
+        update_data["date_entretien_at"] = parse_interview_date(update_data["date_entretien"])
     
     await db.interviews.update_one(
         {"id": interview_id},
         {"$set": update_data}
     )
+    await record_data_change(db, current_user["user_id"])
+    await record_typeahead_change(
+        current_user["user_id"], "interviews", before=existing, after={**existing, **update_data}
+    )
+    await schedule_interview_reminders({**existing, **update_data})
     
     return await get_interview(interview_id, current_user, db)
 
@@ -275,15 +290,18 @@ async def delete_interview(
     db = Depends(get_db)
 ):
     """Supprime un entretien"""
-    result = await db.interviews.delete_one(
+    deleted = await db.interviews.find_one_and_delete(
         {"id": interview_id, "user_id": current_user["user_id"]}
     )
     
-    if result.deleted_count == 0:
+    if not deleted:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Entretien non trouvé"
         )
+    
+    await record_interview_link(db, current_user["user_id"], deleted["candidature_id"], created=False)
+    await record_typeahead_change(current_user["user_id"], "interviews", before=deleted)
 
 
 @router.delete("/reset/all", status_code=status.HTTP_200_OK)
@@ -295,6 +313,8 @@ async def reset_all_interviews(
     user_id = current_user["user_id"]
     
     result = await db.interviews.delete_many({"user_id": user_id})
+    await invalidate_user_stats(db, user_id)
+    await invalidate_typeahead(user_id)
     
     return {
         "success": True,
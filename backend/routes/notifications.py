@@ -290,12 +290,8 @@ async def generate_reminders(
 # PUSH NOTIFICATIONS (Web Push API)
 # ===========================================
 
-import json
-
-# VAPID Configuration
-VAPID_PUBLIC_KEY = os.environ.get("VAPID_PUBLIC_KEY", "")
-VAPID_PRIVATE_KEY = os.environ.get("VAPID_PRIVATE_KEY", "")
-VAPID_CLAIMS_EMAIL = os.environ.get("VAPID_CLAIMS_EMAIL", "contact@maadec.com")
+# Envoi : utils/push_service (client async partagé, VAPID en cache, purge groupée)
+from utils.push_service import VAPID_PUBLIC_KEY, deliver_pushes, push_to_user
 
 
 class PushSubscriptionKeys(BaseModel):
@@ -313,29 +309,6 @@ class SubscribeRequest(BaseModel):
     device_name: Optional[str] = None
 
 
-async def send_push_notification(db, subscription_info: dict, payload: dict) -> bool:
-    """Send a push notification to a single subscription"""
-    try:
-        from pywebpush import webpush, WebPushException
-        
-        webpush(
-            subscription_info=subscription_info,
-            data=json.dumps(payload),
-            vapid_private_key=VAPID_PRIVATE_KEY,
-            vapid_claims={"sub": f"mailto:{VAPID_CLAIMS_EMAIL}"}
-        )
-        return True
-    except Exception as e:
-        error_str = str(e)
-        print(f"[Push] Erreur: {error_str}")
-        # Si subscription expirée (410 Gone), on la supprime
-        if "410" in error_str or "expired" in error_str.lower():
-            await db.push_subscriptions.delete_one({
-                "subscription.endpoint": subscription_info.get("endpoint")
-            })
-        return False
-
-
 @router.get("/push/vapid-key")
 async def get_vapid_public_key():
     """Get the VAPID public key for client-side subscription"""
@@ -390,7 +363,7 @@ async def subscribe_to_push(
         "url": "/dashboard"
     }
     
-    await send_push_notification(db, data.subscription.model_dump(), welcome_payload)
+    await deliver_pushes(db, [(data.subscription.model_dump(), welcome_payload)])
     
     return {"message": "Subscribed successfully"}
 
@@ -423,13 +396,6 @@ async def send_test_push(
     """Send a test push notification to all user's devices"""
     user_id = current_user["user_id"]
     
-    subscriptions = await db.push_subscriptions.find(
-        {"user_id": user_id}
-    ).to_list(100)
-    
-    if not subscriptions:
-        raise HTTPException(status_code=404, detail="Aucun appareil enregistré")
-    
     payload = {
         "title": "Test de notification 🧪",
         "body": "Si vous voyez ceci, les notifications push fonctionnent !",
@@ -437,15 +403,14 @@ async def send_test_push(
         "url": "/dashboard"
     }
     
-    success_count = 0
-    for sub in subscriptions:
-        if await send_push_notification(db, sub["subscription"], payload):
-            success_count += 1
+    success_count, total = await push_to_user(db, user_id, payload)
+    if not total:
+        raise HTTPException(status_code=404, detail="Aucun appareil enregistré")
     
     return {
-        "message": f"Envoyé à {success_count}/{len(subscriptions)} appareil(s)",
+        "message": f"Envoyé à {success_count}/{total} appareil(s)",
         "success_count": success_count,
-        "total": len(subscriptions)
+        "total": total
     }
 
 
@@ -454,13 +419,6 @@ async def notify_user_push(db, user_id: str, title: str, body: str, url: str = "
     Internal function to send push notification to all devices of a user.
     Can be called from other modules for interview reminders, etc.
     """
-    subscriptions = await db.push_subscriptions.find(
-        {"user_id": user_id}
-    ).to_list(100)
-    
-    if not subscriptions:
-        return False
-    
     payload = {
         "title": title,
         "body": body,
@@ -471,10 +429,5 @@ async def notify_user_push(db, user_id: str, title: str, body: str, url: str = "
     if tag:
         payload["tag"] = tag
     
-    success = False
-    for sub in subscriptions:
-        if await send_push_notification(db, sub["subscription"], payload):
-            success = True
-    
-    return success
-
+    sent, _ = await push_to_user(db, user_id, payload)
+    return sent > 0
@@ -1,9 +1,11 @@
-from fastapi import APIRouter, Depends, Query, HTTPException
+from fastapi import APIRouter, Depends, Query, HTTPException, Response
 from typing import List, Optional
 import re
 from datetime import datetime
 
 from utils.auth import get_current_user
+from utils.search_engine import search, suggestions
+from utils.typeahead import suggest
 from routes.admin import get_admin_user
 
 
@@ -14,178 +16,41 @@ def get_db():
 
 @router.get("/global")
 async def global_search(
+    response: Response,
     q: Optional[str] = Query(None),
     current_user: dict = Depends(get_current_user),
     db = Depends(get_db)
 ):
     """
     Recherche exhaustive ou suggestions par défaut.
+    Les résultats sont triés par pertinence (champ score).
     """
     user_id = current_user["user_id"]
-    results = []
 
     # Cas où la recherche est vide : on renvoie des suggestions (Récents / Prochains)
     if not q or q.strip() == "":
-        # 1. Candidatures récentes
-        recent_apps = await db.applications.find(
-            {"user_id": user_id}
-        ).sort("updated_at", -1).limit(4).to_list(4)
-        
-        for app in recent_apps:
-            results.append({
-                "id": app["id"],
-                "type": "application",
-                "title": app["entreprise"],
-                "subtitle": f"Récemment mis à jour - {app['poste']}",
-                "url": f"/dashboard/applications?id={app['id']}",
-                "suggestion": True
-            })
-
-        # 2. Entretiens à venir
-        upcoming_interviews = await db.interviews.find(
-            {"user_id": user_id, "statut": "planned"}
-        ).sort("date_entretien", 1).limit(3).to_list(3)
-        
-        for interview in upcoming_interviews:
-            app_info = await db.applications.find_one({"id": interview["candidature_id"]}, {"entreprise": 1, "poste": 1})
-            results.append({
-                "id": interview["id"],
-                "type": "interview",
-                "title": f"Entretien : {app_info['entreprise'] if app_info else '?'}",
-                "subtitle": f"Prochainement le {interview['date_entretien'][:10]}",
-                "url": f"/dashboard/interviews?id={interview['id']}",
-                "suggestion": True
-            })
-            
-        return results
-
-    search_regex = {"$regex": re.escape(q), "$options": "i"}
-
-
-    # 1. Candidatures
-    apps_cursor = db.applications.find({
-        "user_id": user_id,
-        "$or": [
-            {"entreprise": search_regex},
-            {"poste": search_regex},
-            {"lieu": search_regex}
-        ]
-    }).limit(10)
-    
-    async for app in apps_cursor:
-        type_poste = app.get("type_poste", "")
-        subtitle = f"{app['poste']} · {type_poste.upper()}" if type_poste else app["poste"]
-        results.append({
-            "id": app["id"],
-            "type": "application",
-            "title": app["entreprise"],
-            "subtitle": subtitle,
-            "url": f"/dashboard/applications?id={app['id']}",
-            "status": app.get("reponse", "pending")
-        })
-
-    # 2. Entretiens (Recherche croisée avec candidatures car entreprise/poste ne sont pas stockés dans l'entretien)
-    matching_apps = await db.applications.find({
-        "user_id": user_id,
-        "$or": [
-            {"entreprise": search_regex},
-            {"poste": search_regex}
-        ]
-    }, {"id": 1}).to_list(100)
-    
-    app_ids = [app["id"] for app in matching_apps]
-    
-    interviews_cursor = db.interviews.find({
-        "user_id": user_id,
-        "$or": [
-            {"candidature_id": {"$in": app_ids}},
-            {"notes": search_regex},
-            {"type_entretien": search_regex},
-            {"interviewer": search_regex}
-        ]
-    }).limit(10)
-    
-    async for interview in interviews_cursor:
-
-        # Récupérer les infos de l'entreprise pour l'affichage
-        app_info = await db.applications.find_one({"id": interview["candidature_id"]}, {"entreprise": 1, "poste": 1})
-        title = app_info["entreprise"] if app_info else "Entretien"
-        subtitle = app_info["poste"] if app_info else interview.get("type_entretien", "RH")
-        
-        results.append({
-            "id": interview["id"],
-            "type": "interview",
-            "title": f"Entretien : {title}",
-            "subtitle": f"{subtitle} - {interview.get('date_entretien', '')[:10]}",
-            "url": f"/dashboard/interviews?id={interview['id']}",
-            "date": interview.get("date_entretien")
-        })
-
-
-    # 3. Documents (CV, Lettres)
-    docs_cursor = db.documents.find({
-        "user_id": user_id,
-        "$or": [
-            {"name": search_regex},
-            {"original_filename": search_regex},
-            {"description": search_regex}
-        ]
-    }).limit(10)
-    
-    async for doc in docs_cursor:
-
-        results.append({
-            "id": doc["id"],
-            "type": "document",
-            "title": doc["name"],
-            "subtitle": doc.get("document_type", "Document").upper(),
-            "url": f"/dashboard/documents?id={doc['id']}",
-            "format": doc.get("mime_type")
-        })
-
-    # 4. Lettres de motivation générées
-    letters_cursor = db.generated_cover_letters.find({
-        "user_id": user_id,
-        "$or": [
-            {"entreprise": search_regex},
-            {"poste": search_regex},
-            {"content": search_regex}
-        ]
-    }).limit(8)
-
-    
-    async for letter in letters_cursor:
-        results.append({
-            "id": letter["id"],
-            "type": "letter",
-            "title": f"Lettre : {letter['entreprise']}",
-            "subtitle": letter['poste'],
-            "url": f"/dashboard/documents?id={letter['id']}",
-            "is_ai": True
-        })
-
-
-    # 5. Notifications / Alertes
-    notifs_cursor = db.notifications.find({
-        "user_id": user_id,
-        "$or": [
-            {"title": search_regex},
-            {"message": search_regex}
-        ]
-    }).limit(3)
-    
-    async for notif in notifs_cursor:
-        results.append({
-            "id": notif["id"],
-            "type": "notification",
-            "title": notif["title"],
-            "subtitle": notif["message"],
-            "url": "#",
-            "date": notif.get("created_at")
-        })
+        return await suggestions(db, user_id)
 
+    # Recherche plein texte classée (index texte Mongo, cf. utils/search_engine).
+    # Sources trop lentes abandonnées : résultats partiels signalés en en-tête.
+    results, skipped = await search(db, user_id, q)
+    if skipped:
+        response.headers["X-Search-Partial"] = ",".join(skipped)
     return results
 
+@router.get("/typeahead")
+async def typeahead(
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(8, ge=1, le=20),
+    current_user: dict = Depends(get_current_user),
+    db = Depends(get_db)
+):
+    """
+    Suggestions par préfixe de mot (entreprise, poste, lieu, documents, recruteurs)
+    depuis l'index en mémoire de l'utilisateur : aucune requête Mongo une fois chargé.
+    """
+    return await suggest(db, current_user["user_id"], q, limit)
+
 @router.get("/admin")
 async def admin_search(
     q: str = Query(..., min_length=1),
@@ -5,7 +5,7 @@ JobTracker SaaS - Routes des statistiques
 from fastapi import APIRouter, Depends, Query, HTTPException
 from typing import List, Optional
 from datetime import datetime, timezone, timedelta
-from collections import defaultdict
+import asyncio
 
 from models import (
     DashboardStats, TimelineDataPoint, StatusDistribution,
@@ -17,6 +17,11 @@ from models import (
     UserPreferences, UserPreferencesUpdate
 )
 from utils.auth import get_current_user
+from utils.stats_engine import (
+    period_range, count_facet, group_facet, daily_facet, avg_response_time_facet,
+    application_facets, run_facets, facet_count, facet_groups, facet_value
+)
+from utils.user_stats import get_user_stats
 
 router = APIRouter(prefix="/statistics", tags=["Statistics"])
 
@@ -26,56 +31,105 @@ def get_db():
     pass
 
 
+def _status_distribution(groups: dict) -> List[StatusDistribution]:
+    """Construit la répartition par statut depuis {statut: nombre}"""
+    total = sum(groups.values())
+    distribution = []
+    for status_value, count in groups.items():
+        status_value = status_value or "pending"
+        try:
+            label = ApplicationStatus(status_value).label_fr
+        except ValueError:
+            label = status_value
+        distribution.append(StatusDistribution(
+            status=status_value,
+            label=label,
+            count=count,
+            percentage=round(count / total * 100, 1) if total > 0 else 0
+        ))
+    return distribution
+
+
+def _type_distribution(groups: dict) -> List[TypeDistribution]:
+    """Construit la répartition par type de poste depuis {type: nombre}"""
+    total = sum(groups.values())
+    distribution = []
+    for type_value, count in groups.items():
+        type_value = type_value or "cdi"
+        try:
+            label = JobType(type_value).label_fr
+        except ValueError:
+            label = type_value
+        distribution.append(TypeDistribution(
+            type=type_value,
+            label=label,
+            count=count,
+            percentage=round(count / total * 100, 1) if total > 0 else 0
+        ))
+    return distribution
+
+
+def _method_distribution(groups: dict) -> List[MethodDistribution]:
+    """Construit la répartition par moyen de candidature depuis {moyen: nombre}"""
+    total = sum(groups.values())
+    distribution = []
+    for method_value, count in groups.items():
+        if not method_value:
+            continue
+        try:
+            label = ApplicationMethod(method_value).label_fr
+        except ValueError:
+            label = method_value
+        distribution.append(MethodDistribution(
+            method=method_value,
+            label=label,
+            count=count,
+            percentage=round(count / total * 100, 1) if total > 0 else 0
+        ))
+    return distribution
+
+
+def _dashboard_stats(result: dict, responded_statuses: tuple = ("positive", "negative")) -> DashboardStats:
+    """Construit DashboardStats depuis le résultat de application_facets"""
+    by_status = facet_groups(result, "by_status")
+    total = sum(by_status.values())
+    responded = sum(by_status.get(s, 0) for s in responded_statuses)
+    return DashboardStats(
+        total_applications=total,
+        pending=by_status.get("pending", 0),
+        with_interview=facet_count(result, "with_interview"),
+        positive=by_status.get("positive", 0),
+        negative=by_status.get("negative", 0),
+        no_response=by_status.get("no_response", 0),
+        cancelled=by_status.get("cancelled", 0),
+        response_rate=round(responded / total * 100, 1) if total > 0 else 0.0,
+        favorites_count=facet_count(result, "favorites")
+    )
+
+
 @router.get("/dashboard", response_model=DashboardStats)
 async def get_dashboard_stats(
     current_user: dict = Depends(get_current_user),
     db = Depends(get_db)
 ):
     """Statistiques pour le dashboard"""
-    user_id = current_user["user_id"]
-    
-    # Total candidatures
-    total = await db.applications.count_documents({"user_id": user_id})
-    
-    # Par statut
-    pending = await db.applications.count_documents({"user_id": user_id, "reponse": "pending"})
-    positive = await db.applications.count_documents({"user_id": user_id, "reponse": "positive"})
-    negative = await db.applications.count_documents({"user_id": user_id, "reponse": "negative"})
-    no_response = await db.applications.count_documents({"user_id": user_id, "reponse": "no_response"})
-    cancelled = await db.applications.count_documents({"user_id": user_id, "reponse": "cancelled"})
-    
-    # Avec entretien (au moins un entretien associé)
-    pipeline = [
-        {"$match": {"user_id": user_id}},
-        {"$lookup": {
-            "from": "interviews",
-            "localField": "id",
-            "foreignField": "candidature_id",
-            "as": "interviews"
-        }},
-        {"$match": {"interviews": {"$ne": []}}},
-        {"$count": "count"}
-    ]
-    result = await db.applications.aggregate(pipeline).to_list(1)
-    with_interview = result[0]["count"] if result else 0
-    
-    # Favoris
-    favorites_count = await db.applications.count_documents({"user_id": user_id, "is_favorite": True})
+    stats = await get_user_stats(db, current_user["user_id"])
+    by_status = stats["by_status"]
+    total = stats["total"]
     
-    # Taux de réponse
-    responded = positive + negative + no_response
-    response_rate = (responded / total * 100) if total > 0 else 0
+    # no_response compte comme une réponse sur ce dashboard
+    responded = sum(by_status.get(s, 0) for s in ("positive", "negative", "no_response"))
     
     return DashboardStats(
         total_applications=total,
-        pending=pending,
-        with_interview=with_interview,
-        positive=positive,
-        negative=negative,
-        no_response=no_response,
-        cancelled=cancelled,
-        response_rate=round(response_rate, 1),
-        favorites_count=favorites_count
+        pending=by_status.get("pending", 0),
+        with_interview=stats["with_interview"],
+        positive=by_status.get("positive", 0),
+        negative=by_status.get("negative", 0),
+        no_response=by_status.get("no_response", 0),
+        cancelled=by_status.get("cancelled", 0),
+        response_rate=round(responded / total * 100, 1) if total > 0 else 0.0,
+        favorites_count=stats["favorites"]
     )
 
 
@@ -85,30 +139,16 @@ async def get_timeline_stats(
     db = Depends(get_db)
 ):
     """Évolution temporelle des candidatures (cumul)"""
-    cursor = db.applications.find(
-        {"user_id": current_user["user_id"]},
-        {"_id": 0, "date_candidature": 1}
-    ).sort("date_candidature", 1)
-    
-    applications = await cursor.to_list(length=10000)
+    stats = await get_user_stats(db, current_user["user_id"])
     
-    if not applications:
-        return []
-    
-    # Grouper par date
-    date_counts = defaultdict(int)
-    for app in applications:
-        date_str = app["date_candidature"][:10] if isinstance(app["date_candidature"], str) else app["date_candidature"].strftime("%Y-%m-%d")
-        date_counts[date_str] += 1
-    
-    # Calculer le cumul
+    # Calculer le cumul (by_day est déjà trié par date)
     timeline = []
     cumulative = 0
-    for date in sorted(date_counts.keys()):
-        cumulative += date_counts[date]
+    for date, count in stats["by_day"].items():
+        cumulative += count
         timeline.append(TimelineDataPoint(
             date=date,
-            count=date_counts[date],
+            count=count,
             cumulative=cumulative
         ))
     
@@ -121,32 +161,8 @@ async def get_status_distribution(
     db = Depends(get_db)
 ):
     """Répartition par statut"""
-    pipeline = [
-        {"$match": {"user_id": current_user["user_id"]}},
-        {"$group": {"_id": "$reponse", "count": {"$sum": 1}}},
-        {"$sort": {"count": -1}}
-    ]
-    
-    result = await db.applications.aggregate(pipeline).to_list(10)
-    total = sum(r["count"] for r in result)
-    
-    distribution = []
-    for r in result:
-        status_value = r["_id"] or "pending"
-        try:
-            status_enum = ApplicationStatus(status_value)
-            label = status_enum.label_fr
-        except ValueError:
-            label = status_value
-        
-        distribution.append(StatusDistribution(
-            status=status_value,
-            label=label,
-            count=r["count"],
-            percentage=round(r["count"] / total * 100, 1) if total > 0 else 0
-        ))
-    
-    return distribution
+    stats = await get_user_stats(db, current_user["user_id"])
+    return _status_distribution(stats["by_status"])
 
 
 @router.get("/by-type", response_model=List[TypeDistribution])
@@ -155,32 +171,8 @@ async def get_type_distribution(
     db = Depends(get_db)
 ):
     """Répartition par type de poste"""
-    pipeline = [
-        {"$match": {"user_id": current_user["user_id"]}},
-        {"$group": {"_id": "$type_poste", "count": {"$sum": 1}}},
-        {"$sort": {"count": -1}}
-    ]
-    
-    result = await db.applications.aggregate(pipeline).to_list(10)
-    total = sum(r["count"] for r in result)
-    
-    distribution = []
-    for r in result:
-        type_value = r["_id"] or "cdi"
-        try:
-            type_enum = JobType(type_value)
-            label = type_enum.label_fr
-        except ValueError:
-            label = type_value
-        
-        distribution.append(TypeDistribution(
-            type=type_value,
-            label=label,
-            count=r["count"],
-            percentage=round(r["count"] / total * 100, 1) if total > 0 else 0
-        ))
-    
-    return distribution
+    stats = await get_user_stats(db, current_user["user_id"])
+    return _type_distribution(stats["by_type"])
 
 
 @router.get("/by-method", response_model=List[MethodDistribution])
@@ -189,33 +181,8 @@ async def get_method_distribution(
     db = Depends(get_db)
 ):
     """Répartition par moyen de candidature"""
-    pipeline = [
-        {"$match": {"user_id": current_user["user_id"], "moyen": {"$ne": None}}},
-        {"$group": {"_id": "$moyen", "count": {"$sum": 1}}},
-        {"$sort": {"count": -1}}
-    ]
-    
-    result = await db.applications.aggregate(pipeline).to_list(20)
-    total = sum(r["count"] for r in result)
-    
-    distribution = []
-    for r in result:
-        method_value = r["_id"]
-        if method_value:
-            try:
-                method_enum = ApplicationMethod(method_value)
-                label = method_enum.label_fr
-            except ValueError:
-                label = method_value
-            
-            distribution.append(MethodDistribution(
-                method=method_value,
-                label=label,
-                count=r["count"],
-                percentage=round(r["count"] / total * 100, 1) if total > 0 else 0
-            ))
-    
-    return distribution
+    stats = await get_user_stats(db, current_user["user_id"])
+    return _method_distribution(stats["by_method"])
 
 
 @router.get("/response-rate")
@@ -224,42 +191,17 @@ async def get_response_rate_stats(
     db = Depends(get_db)
 ):
     """Taux de réponse et temps moyen de réponse"""
-    user_id = current_user["user_id"]
-    
-    # Total et réponses
-    total = await db.applications.count_documents({"user_id": user_id})
-    responded = await db.applications.count_documents({
-        "user_id": user_id,
-        "reponse": {"$in": ["positive", "negative"]}
-    })
+    stats = await get_user_stats(db, current_user["user_id"])
     
+    total = stats["total"]
+    responded = stats["by_status"].get("positive", 0) + stats["by_status"].get("negative", 0)
     response_rate = (responded / total * 100) if total > 0 else 0
     
     # Temps moyen de réponse (pour celles qui ont date_reponse)
-    pipeline = [
-        {"$match": {
-            "user_id": user_id,
-            "date_reponse": {"$ne": None}
-        }},
-        {"$project": {
-            "response_time": {
-                "$divide": [
-                    {"$subtract": [
-                        {"$dateFromString": {"dateString": "$date_reponse"}},
-                        {"$dateFromString": {"dateString": "$date_candidature"}}
-                    ]},
-                    1000 * 60 * 60 * 24
-                ]
-            }
-        }},
-        {"$group": {
-            "_id": None,
-            "avg_response_time": {"$avg": "$response_time"}
-        }}
-    ]
-    
-    result = await db.applications.aggregate(pipeline).to_list(1)
-    avg_response_time = result[0]["avg_response_time"] if result else None
+    avg_response_time = (
+        stats["response_time_sum"] / stats["response_time_count"]
+        if stats["response_time_count"] else None
+    )
     
     return {
         "response_rate": round(response_rate, 1),
@@ -388,172 +330,56 @@ async def get_statistics_overview(
     """Vue d'ensemble complète des statistiques"""
     user_id = current_user["user_id"]
 
-    # Filtre de période appliqué sur date_candidature
-    date_filter: dict = {"user_id": user_id}
-    if date_from or date_to:
-        date_range: dict = {}
-        if date_from:
-            date_range["$gte"] = date_from
-        if date_to:
-            # Inclure tout le jour de fin
-            date_range["$lte"] = date_to + "T23:59:59"
-        date_filter["date_candidature"] = date_range
-
-    # --- Dashboard stats ---
-    total = await db.applications.count_documents(date_filter)
-    pending = await db.applications.count_documents({**date_filter, "reponse": "pending"})
-    positive = await db.applications.count_documents({**date_filter, "reponse": "positive"})
-    negative = await db.applications.count_documents({**date_filter, "reponse": "negative"})
-    no_response = await db.applications.count_documents({**date_filter, "reponse": "no_response"})
-    cancelled = await db.applications.count_documents({**date_filter, "reponse": "cancelled"})
-    wi_result = await db.applications.aggregate([
-        {"$match": date_filter},
-        {"$lookup": {"from": "interviews", "localField": "id", "foreignField": "candidature_id", "as": "_ivs"}},
-        {"$match": {"_ivs": {"$ne": []}}},
-        {"$count": "count"}
-    ]).to_list(1)
-    with_interview = wi_result[0]["count"] if wi_result else 0
-    favorites_count = await db.applications.count_documents({**date_filter, "is_favorite": True})
-    responded = positive + negative
-    response_rate = round(responded / total * 100, 1) if total > 0 else 0.0
+    # Filtre de période appliqué sur date_candidature / date_entretien
+    date_range = period_range(date_from, date_to)
+    app_period = {"date_candidature": date_range} if date_range else {}
+    interview_period = {"date_entretien": date_range} if date_range else {}
 
-    dashboard = DashboardStats(
-        total_applications=total,
-        pending=pending,
-        with_interview=with_interview,
-        positive=positive,
-        negative=negative,
-        no_response=no_response,
-        cancelled=cancelled,
-        response_rate=response_rate,
-        favorites_count=favorites_count,
+    # Deux agrégations : une par collection
+    app_result = await run_facets(db.applications, {"user_id": user_id}, {
+        **application_facets(app_period),
+        "timeline": daily_facet("date_candidature", app_period),
+        "response_time": avg_response_time_facet(app_period),
+    })
+    interview_result = await run_facets(
+        db.interviews,
+        {"user_id": user_id, **interview_period},
+        {"by_status": group_facet("statut")}
     )
 
+    # --- Dashboard stats ---
+    dashboard = _dashboard_stats(app_result)
+
     # --- Timeline ---
-    cursor = db.applications.find(date_filter, {"_id": 0, "date_candidature": 1}).sort("date_candidature", 1)
-    apps = await cursor.to_list(length=10000)
-    date_counts: dict = defaultdict(int)
-    for app in apps:
-        d = app.get("date_candidature", "")[:10]
-        if d:
-            date_counts[d] += 1
     timeline = []
     cumulative = 0
-    for date in sorted(date_counts.keys()):
-        cumulative += date_counts[date]
-        timeline.append(TimelineDataPoint(date=date, count=date_counts[date], cumulative=cumulative))
-
-    # --- Distributions ---
-    def add_date_filter(pipeline):
-        pipeline[0]["$match"].update({k: v for k, v in date_filter.items() if k != "user_id"})
-        return pipeline
-
-    status_pipeline = add_date_filter([
-        {"$match": {"user_id": user_id}},
-        {"$group": {"_id": "$reponse", "count": {"$sum": 1}}},
-        {"$sort": {"count": -1}}
-    ])
-    status_result = await db.applications.aggregate(status_pipeline).to_list(10)
-    status_total = sum(r["count"] for r in status_result)
-    by_status = []
-    for r in status_result:
-        sv = r["_id"]
-        try:
-            label = ApplicationStatus(sv).label_fr
-        except (ValueError, AttributeError):
-            label = sv or "Inconnu"
-        by_status.append(StatusDistribution(
-            status=sv, label=label, count=r["count"],
-            percentage=round(r["count"] / status_total * 100, 1) if status_total > 0 else 0
-        ))
-
-    type_pipeline = add_date_filter([
-        {"$match": {"user_id": user_id}},
-        {"$group": {"_id": "$type_poste", "count": {"$sum": 1}}},
-        {"$sort": {"count": -1}}
-    ])
-    type_result = await db.applications.aggregate(type_pipeline).to_list(10)
-    type_total = sum(r["count"] for r in type_result)
-    by_type = []
-    for r in type_result:
-        tv = r["_id"]
-        try:
-            label = JobType(tv).label_fr
-        except (ValueError, AttributeError):
-            label = tv or "Inconnu"
-        by_type.append(TypeDistribution(
-            type=tv, label=label, count=r["count"],
-            percentage=round(r["count"] / type_total * 100, 1) if type_total > 0 else 0
-        ))
-
-    method_match = {**date_filter, "moyen": {"$ne": None}}
-    method_pipeline = [
-        {"$match": method_match},
-        {"$group": {"_id": "$moyen", "count": {"$sum": 1}}},
-        {"$sort": {"count": -1}}
-    ]
-    method_result = await db.applications.aggregate(method_pipeline).to_list(20)
-    method_total = sum(r["count"] for r in method_result)
-    by_method = []
-    for r in method_result:
-        mv = r["_id"]
-        if mv:
-            try:
-                label = ApplicationMethod(mv).label_fr
-            except (ValueError, AttributeError):
-                label = mv
-            by_method.append(MethodDistribution(
-                method=mv, label=label, count=r["count"],
-                percentage=round(r["count"] / method_total * 100, 1) if method_total > 0 else 0
-            ))
+    for date, count in facet_groups(app_result, "timeline").items():
+        cumulative += count
+        timeline.append(TimelineDataPoint(date=date, count=count, cumulative=cumulative))
 
     # --- Avg response time ---
-    rt_pipeline = [
-        {"$match": {**date_filter, "date_reponse": {"$ne": None}}},
-        {"$project": {"response_time": {"$divide": [
-            {"$subtract": [
-                {"$dateFromString": {"dateString": "$date_reponse"}},
-                {"$dateFromString": {"dateString": "$date_candidature"}}
-            ]},
-            1000 * 60 * 60 * 24
-        ]}}},
-        {"$group": {"_id": None, "avg": {"$avg": "$response_time"}}}
-    ]
-    rt_result = await db.applications.aggregate(rt_pipeline).to_list(1)
-    avg_response_time = round(rt_result[0]["avg"], 1) if rt_result else None
+    avg = facet_value(app_result, "response_time", "avg")
+    avg_response_time = round(avg, 1) if avg is not None else None
 
-    # --- Interviews (filtre sur date_entretien si période définie) ---
-    interview_filter: dict = {"user_id": user_id}
-    if date_from or date_to:
-        dr: dict = {}
-        if date_from:
-            dr["$gte"] = date_from
-        if date_to:
-            dr["$lte"] = date_to + "T23:59:59"
-        interview_filter["date_entretien"] = dr
-
-    interviews_total = await db.interviews.count_documents(interview_filter)
-    interviews_planned = await db.interviews.count_documents({**interview_filter, "statut": "planned"})
-    interviews_completed = await db.interviews.count_documents({**interview_filter, "statut": "completed"})
-    interviews_cancelled = await db.interviews.count_documents({**interview_filter, "statut": "cancelled"})
+    # --- Interviews ---
+    interviews_by_status = facet_groups(interview_result, "by_status")
 
     return StatisticsOverview(
         dashboard=dashboard,
         timeline=timeline,
-        by_status=by_status,
-        by_type=by_type,
-        by_method=by_method,
+        by_status=_status_distribution(facet_groups(app_result, "by_status")),
+        by_type=_type_distribution(facet_groups(app_result, "by_type")),
+        by_method=_method_distribution(facet_groups(app_result, "by_method")),
         avg_response_time_days=avg_response_time,
         interviews_stats={
-            "total": interviews_total,
-            "planned": interviews_planned,
-            "completed": interviews_completed,
-            "cancelled": interviews_cancelled,
+            "total": sum(interviews_by_status.values()),
+            "planned": interviews_by_status.get("planned", 0),
+            "completed": interviews_by_status.get("completed", 0),
+            "cancelled": interviews_by_status.get("cancelled", 0),
         }
     )
 
 
-
 # ============================================
 # DASHBOARD V2 - INTELLIGENT STATISTICS
 # ============================================
@@ -607,55 +433,11 @@ async def get_dashboard_v2(
     user_id = current_user["user_id"]
     now = datetime.now()
 
-    # Filtre de période sur date_candidature
-    period_filter: dict = {"user_id": user_id}
-    if date_from or date_to:
-        dr: dict = {}
-        if date_from:
-            dr["$gte"] = date_from
-        if date_to:
-            dr["$lte"] = date_to + "T23:59:59"
-        period_filter["date_candidature"] = dr
+    # Filtre de période sur date_candidature / date_entretien
+    date_range = period_range(date_from, date_to)
+    app_period = {"date_candidature": date_range} if date_range else {}
+    interview_period = {"date_entretien": date_range} if date_range else {}
 
-    # ============================================
-    # 1. STATS DE BASE (filtrées par période)
-    # ============================================
-    total_apps = await db.applications.count_documents(period_filter)
-    pending = await db.applications.count_documents({**period_filter, "reponse": "pending"})
-    positive = await db.applications.count_documents({**period_filter, "reponse": "positive"})
-    negative = await db.applications.count_documents({**period_filter, "reponse": "negative"})
-    no_response = await db.applications.count_documents({**period_filter, "reponse": "no_response"})
-    cancelled = await db.applications.count_documents({**period_filter, "reponse": "cancelled"})
-    wi_result = await db.applications.aggregate([
-        {"$match": period_filter},
-        {"$lookup": {"from": "interviews", "localField": "id", "foreignField": "candidature_id", "as": "_ivs"}},
-        {"$match": {"_ivs": {"$ne": []}}},
-        {"$count": "count"}
-    ]).to_list(1)
-    with_interview = wi_result[0]["count"] if wi_result else 0
-    favorites_count = await db.applications.count_documents({**period_filter, "is_favorite": True})
-    responded = positive + negative
-    response_rate = round(responded / total_apps * 100, 1) if total_apps > 0 else 0.0
-
-    basic_stats = DashboardStats(
-        total_applications=total_apps,
-        pending=pending,
-        with_interview=with_interview,
-        positive=positive,
-        negative=negative,
-        no_response=no_response,
-        cancelled=cancelled,
-        response_rate=response_rate,
-        favorites_count=favorites_count,
-    )
-    
-    # ============================================
-    # 2. PRÉFÉRENCES & OBJECTIFS
-    # ============================================
-    prefs = await db.user_preferences.find_one({"user_id": user_id}, {"_id": 0})
-    monthly_goal = prefs.get("monthly_goal", 40) if prefs else 40
-    weekly_goal = prefs.get("weekly_goal", 10) if prefs else 10
-    
     # Dates clés (converties en ISO strings pour MongoDB)
     start_of_month = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
     start_of_week = now - timedelta(days=now.weekday())
@@ -666,24 +448,76 @@ async def get_dashboard_v2(
     start_of_month_str = start_of_month.isoformat()
     start_of_week_str = start_of_week.isoformat()
     start_of_last_month_str = start_of_last_month.isoformat()
+    now_str = now.isoformat()
+    in_48h_str = (now + timedelta(hours=48)).isoformat()
+    week_end_str = (start_of_week + timedelta(weeks=1)).isoformat()
+    followup_min_date = (now - timedelta(days=45)).isoformat()
+    followup_max_date = (now - timedelta(days=14)).isoformat()
+    inactive_date = (now - timedelta(days=30)).isoformat()
+    old_pending_date = (now - timedelta(days=21)).isoformat()
+
+    # 4 dernières semaines, de la plus récente (0) à la plus ancienne (3)
+    weeks = []
+    for i in range(4):
+        week_start = start_of_week - timedelta(weeks=i)
+        weeks.append((week_start, week_start.isoformat(), (week_start + timedelta(weeks=1)).isoformat()))
+
+    # Candidatures sans réponse : contrainte d'ancienneté seulement si pas de filtre de période
+    old_pending_match = {**app_period, "reponse": "pending"}
+    if not date_range:
+        old_pending_match["date_candidature"] = {"$lt": old_pending_date}
+
+    app_facets = {
+        **application_facets(app_period),
+        "this_month": count_facet({"date_candidature": {"$gte": start_of_month_str}}),
+        "last_month": count_facet({"date_candidature": {"$gte": start_of_last_month_str, "$lt": start_of_month_str}}),
+        "this_week": count_facet({"date_candidature": {"$gte": start_of_week_str}}),
+        "with_followup": count_facet({**app_period, "followup_count": {"$gte": 1}}),
+        "old_pending": count_facet(old_pending_match),
+        "needs_followup": count_facet({
+            "reponse": "pending",
+            "followup_count": {"$lt": 2},
+            "date_candidature": {"$lt": followup_max_date, "$gt": followup_min_date}
+        }),
+        "inactive_favorites": count_facet({
+            "is_favorite": True,
+            "reponse": "pending",
+            "date_candidature": {"$lt": inactive_date}
+        }),
+    }
+    interview_facets = {
+        "period_total": count_facet(interview_period),
+        "upcoming_48h": count_facet({"statut": "planned", "date_entretien": {"$gte": now_str, "$lte": in_48h_str}}),
+        "this_week_planned": count_facet({"statut": "planned", "date_entretien": {"$gte": start_of_week_str, "$lt": week_end_str}}),
+    }
+    for i, (_, week_start_str, week_end_iso) in enumerate(weeks):
+        app_facets[f"week_{i}_applications"] = count_facet({"date_candidature": {"$gte": week_start_str, "$lt": week_end_iso}})
+        app_facets[f"week_{i}_responses"] = count_facet({"date_reponse": {"$gte": week_start_str, "$lt": week_end_iso}})
+        interview_facets[f"week_{i}_interviews"] = count_facet({"date_entretien": {"$gte": week_start_str, "$lt": week_end_iso}})
+
+    # Une agrégation par collection + préférences, en parallèle
+    app_result, interview_result, prefs = await asyncio.gather(
+        run_facets(db.applications, {"user_id": user_id}, app_facets),
+        run_facets(db.interviews, {"user_id": user_id}, interview_facets),
+        db.user_preferences.find_one({"user_id": user_id}, {"_id": 0}),
+    )
+
+    # ============================================
+    # 1. STATS DE BASE (filtrées par période)
+    # ============================================
+    basic_stats = _dashboard_stats(app_result)
+    total_apps = basic_stats.total_applications
+    responded = basic_stats.positive + basic_stats.negative
     
-    # Candidatures ce mois
-    this_month_count = await db.applications.count_documents({
-        "user_id": user_id,
-        "date_candidature": {"$gte": start_of_month_str}
-    })
-    
-    # Candidatures mois dernier
-    last_month_count = await db.applications.count_documents({
-        "user_id": user_id,
-        "date_candidature": {"$gte": start_of_last_month_str, "$lt": start_of_month_str}
-    })
+    # ============================================
+    # 2. PRÉFÉRENCES & OBJECTIFS
+    # ============================================
+    monthly_goal = prefs.get("monthly_goal", 40) if prefs else 40
+    weekly_goal = prefs.get("weekly_goal", 10) if prefs else 10
     
-    # Candidatures cette semaine
-    this_week_count = await db.applications.count_documents({
-        "user_id": user_id,
-        "date_candidature": {"$gte": start_of_week_str}
-    })
+    this_month_count = facet_count(app_result, "this_month")
+    last_month_count = facet_count(app_result, "last_month")
+    this_week_count = facet_count(app_result, "this_week")
     
     # Goal Progress
     goal_progress = GoalProgress(
@@ -707,15 +541,7 @@ async def get_dashboard_v2(
     # ============================================
     
     # 3.1 Régularité (30 pts) - basé sur les 4 dernières semaines
-    weeks_data = []
-    for i in range(4):
-        week_start = start_of_week - timedelta(weeks=i)
-        week_end = week_start + timedelta(weeks=1)
-        week_count = await db.applications.count_documents({
-            "user_id": user_id,
-            "date_candidature": {"$gte": week_start.isoformat(), "$lt": week_end.isoformat()}
-        })
-        weeks_data.append(week_count)
+    weeks_data = [facet_count(app_result, f"week_{i}_applications") for i in range(4)]
     
     avg_weekly = sum(weeks_data) / 4 if weeks_data else 0
     if avg_weekly >= 5:
@@ -740,15 +566,7 @@ async def get_dashboard_v2(
         response_rate_score = 5 if total_apps > 0 else 0
     
     # 3.3 Ratio entretiens/candidatures (25 pts)
-    interview_filter: dict = {"user_id": user_id}
-    if date_from or date_to:
-        idr: dict = {}
-        if date_from:
-            idr["$gte"] = date_from
-        if date_to:
-            idr["$lte"] = date_to + "T23:59:59"
-        interview_filter["date_entretien"] = idr
-    interview_count = await db.interviews.count_documents(interview_filter)
+    interview_count = facet_count(interview_result, "period_total")
     interview_ratio = (interview_count / total_apps * 100) if total_apps > 0 else 0
     
     if interview_ratio >= 30:
@@ -763,10 +581,7 @@ async def get_dashboard_v2(
         interview_ratio_score = 0
     
     # 3.4 Relances effectuées (20 pts)
-    apps_with_followup = await db.applications.count_documents({
-        **period_filter,
-        "followup_count": {"$gte": 1}
-    })
+    apps_with_followup = facet_count(app_result, "with_followup")
     followup_rate = (apps_with_followup / total_apps * 100) if total_apps > 0 else 0
     
     if followup_rate >= 50:
@@ -838,12 +653,7 @@ async def get_dashboard_v2(
         ))
     
     # Insight sur les candidatures sans réponse
-    old_pending_date = (now - timedelta(days=21)).isoformat()
-    old_pending_filter = {**period_filter, "reponse": "pending"}
-    # Garde la contrainte d'ancienneté seulement si pas de filtre de période
-    if not (date_from or date_to):
-        old_pending_filter["date_candidature"] = {"$lt": old_pending_date}
-    old_pending = await db.applications.count_documents(old_pending_filter)
+    old_pending = facet_count(app_result, "old_pending")
     if old_pending > 0:
         insights.append(DashboardInsight(
             type="warning",
@@ -880,13 +690,7 @@ async def get_dashboard_v2(
     priority_actions = []
     
     # Entretiens dans les 48h
-    now_str = now.isoformat()
-    in_48h_str = (now + timedelta(hours=48)).isoformat()
-    upcoming_48h = await db.interviews.count_documents({
-        "user_id": user_id,
-        "statut": "planned",
-        "date_entretien": {"$gte": now_str, "$lte": in_48h_str}
-    })
+    upcoming_48h = facet_count(interview_result, "upcoming_48h")
     if upcoming_48h > 0:
         priority_actions.append(PriorityAction(
             type="interview_soon",
@@ -898,14 +702,7 @@ async def get_dashboard_v2(
         ))
     
     # Candidatures à relancer
-    followup_min_date = (now - timedelta(days=45)).isoformat()
-    followup_max_date = (now - timedelta(days=14)).isoformat()
-    needs_followup = await db.applications.count_documents({
-        "user_id": user_id,
-        "reponse": "pending",
-        "followup_count": {"$lt": 2},
-        "date_candidature": {"$lt": followup_max_date, "$gt": followup_min_date}
-    })
+    needs_followup = facet_count(app_result, "needs_followup")
     if needs_followup > 0:
         priority_actions.append(PriorityAction(
             type="needs_followup",
@@ -917,13 +714,7 @@ async def get_dashboard_v2(
         ))
     
     # Favoris inactifs
-    inactive_date = (now - timedelta(days=30)).isoformat()
-    inactive_favorites = await db.applications.count_documents({
-        "user_id": user_id,
-        "is_favorite": True,
-        "reponse": "pending",
-        "date_candidature": {"$lt": inactive_date}
-    })
+    inactive_favorites = facet_count(app_result, "inactive_favorites")
     if inactive_favorites > 0:
         priority_actions.append(PriorityAction(
             type="inactive_favorite",
@@ -935,12 +726,7 @@ async def get_dashboard_v2(
         ))
     
     # Entretiens cette semaine
-    week_end_str = (start_of_week + timedelta(weeks=1)).isoformat()
-    interviews_this_week = await db.interviews.count_documents({
-        "user_id": user_id,
-        "statut": "planned",
-        "date_entretien": {"$gte": start_of_week_str, "$lt": week_end_str}
-    })
+    interviews_this_week = facet_count(interview_result, "this_week_planned")
     if interviews_this_week > 0 and upcoming_48h == 0:
         priority_actions.append(PriorityAction(
             type="interviews_week",
@@ -956,25 +742,10 @@ async def get_dashboard_v2(
     # ============================================
     weekly_evolution = []
     for i in range(3, -1, -1):  # De la plus ancienne à la plus récente
-        week_start = start_of_week - timedelta(weeks=i)
-        week_end = week_start + timedelta(weeks=1)
-        week_start_str = week_start.isoformat()
-        week_end_str = week_end.isoformat()
-        
-        apps_count = await db.applications.count_documents({
-            "user_id": user_id,
-            "date_candidature": {"$gte": week_start_str, "$lt": week_end_str}
-        })
-        
-        responses_count = await db.applications.count_documents({
-            "user_id": user_id,
-            "date_reponse": {"$gte": week_start_str, "$lt": week_end_str}
-        })
-        
-        interviews_count = await db.interviews.count_documents({
-            "user_id": user_id,
-            "date_entretien": {"$gte": week_start_str, "$lt": week_end_str}
-        })
+        week_start = weeks[i][0]
+        apps_count = facet_count(app_result, f"week_{i}_applications")
+        responses_count = facet_count(app_result, f"week_{i}_responses")
+        interviews_count = facet_count(interview_result, f"week_{i}_interviews")
         
         week_label = f"Sem {4-i}"
         if i == 0:
@@ -1021,6 +792,7 @@ async def analyze_statistics_with_ai(
 ):
     """Analyse IA complète des statistiques de l'utilisateur"""
     from routes.ai import get_user_api_keys, select_api_key, call_ai
+    from utils.ai_cache import cached_completion
 
     user_id = current_user["user_id"]
 
@@ -1146,7 +918,10 @@ Analyse avec ces sections exactes :
 ## Benchmark marché"""
 
     try:
-        analysis = await call_ai(api_key, provider, model, system_message, user_message)
+        analysis = await cached_completion(
+            db, "statistics_analysis", provider, model, system_message, user_message,
+            call=lambda: call_ai(api_key, provider, model, system_message, user_message)
+        )
         return {"analysis": analysis, "provider": provider, "model": model, "period": period_label}
     except HTTPException:
         raise
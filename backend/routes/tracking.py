@@ -13,6 +13,10 @@ from models import (
 )
 from utils.auth import get_current_user
 from utils.crypto import decrypt
+from utils.ai_providers import complete, complete_hedged
+from utils import ai_cache
+from utils.cv_text import document_cv_text
+from utils.user_stats import record_data_change
 import os
 
 router = APIRouter(prefix="/applications", tags=["Application Tracking"])
@@ -23,6 +27,14 @@ def get_db():
     pass
 
 
+MATCHING_SYSTEM_MESSAGE = "Tu es un expert en recrutement et en analyse de CV. Tu dois répondre uniquement en JSON."
+MATCHING_DEFAULT_MODELS = {
+    "groq": "llama-3.3-70b-versatile",
+    "openai": "gpt-4o-mini",
+    "google": "gemini-1.5-flash",
+}
+
+
 # ============================================
 # TIMELINE / HISTORIQUE
 # ============================================
@@ -110,8 +122,12 @@ async def add_timeline_event(
     
     await db.applications.update_one(
         {"id": application_id},
-        {"$push": {"history": event_dict}}
+        {
+            "$push": {"history": event_dict},
+            "$set": {"updated_at": datetime.now(timezone.utc).isoformat()}
+        }
     )
+    await record_data_change(db, current_user["user_id"])
     
     return {"message": "Événement ajouté à la timeline"}
 
@@ -186,7 +202,10 @@ async def mark_reminder_sent(
     result = await db.applications.update_one(
         {"id": application_id, "user_id": current_user["user_id"]},
         {
-            "$set": {"last_reminder_sent": datetime.now(timezone.utc).isoformat()},
+            "$set": {
+                "last_reminder_sent": datetime.now(timezone.utc).isoformat(),
+                "updated_at": datetime.now(timezone.utc).isoformat()
+            },
             "$inc": {"followup_count": 1},
             "$push": {
                 "history": {
@@ -200,6 +219,7 @@ async def mark_reminder_sent(
     
     if result.modified_count == 0:
         raise HTTPException(status_code=404, detail="Candidature non trouvée")
+    await record_data_change(db, current_user["user_id"])
     
     return {"message": "Rappel marqué comme envoyé"}
 
@@ -277,20 +297,12 @@ Réponds UNIQUEMENT avec un JSON au format:
             response_text = response.message if hasattr(response, 'message') else str(response)
         except ImportError:
             # Fallback to standard Google AI SDK
-            import google.genai as genai
-            import os
-            
             api_key = os.environ.get("GOOGLE_AI_API_KEY") or os.environ.get("GOOGLE_API_KEY")
             if not api_key:
                 # Fallback to template
                 raise Exception("No API key available")
             
-            client = genai.Client(api_key=api_key)
-            response = client.models.generate_content(
-                model="gemini-1.5-flash",
-                contents=prompt
-            )
-            response_text = response.text
+            response_text = await complete("google", api_key, "gemini-1.5-flash", None, prompt)
         
         # Parser la réponse JSON
         import json
@@ -377,10 +389,13 @@ async def calculate_matching_score(
             detail="Veuillez d'abord ajouter une description de poste à cette candidature"
         )
     
-    # Utiliser le CV fourni ou récupérer le dernier CV analysé
+    # Utiliser le CV fourni, sinon le texte extrait à l'upload du CV demandé
+    # (ou du CV par défaut), sinon le dernier CV analysé
     if not cv_text or not cv_text.strip():
+        cv_text = await document_cv_text(db, current_user["user_id"], cv_id)
+        
         # Si un ID de document est fourni, chercher son analyse
-        if cv_id:
+        if cv_id and (not cv_text or not cv_text.strip()):
             cv_analysis = await db.cv_analyses.find_one(
                 {"user_id": current_user["user_id"], "document_id": cv_id},
                 sort=[("created_at", -1)]
@@ -465,79 +480,36 @@ Score guide:
             "groq": os.environ.get("GROQ_API_KEY")
         }
         
-        response_text = None
-        last_error = None
-        
-        # 3. Essayer les providers par ordre de priorité
-        # Si un provider est spécifié, on l'essaie en premier
-        providers_to_try = ["groq", "openai", "google"]
-        if model_provider and model_provider.lower() in providers_to_try:
-            providers_to_try.remove(model_provider.lower())
-            providers_to_try.insert(0, model_provider.lower())
-        
-        for provider in providers_to_try:
+        # 3. Interroger les providers disponibles : le provider spécifié est
+        # essayé en premier, les autres sont classés selon leur santé observée
+        # et lancés en couverture si le premier tarde ou échoue
+        preferred = model_provider.lower() if model_provider else None
+        candidates = []
+        for provider in ["groq", "openai", "google"]:
             api_key = user_keys.get(provider) or env_keys.get(provider)
             if not api_key:
                 continue
-                
+            # Utiliser le modèle spécifié ou le défaut du provider
+            target_model = model_name if preferred == provider else None
+            candidates.append((provider, api_key, target_model or MATCHING_DEFAULT_MODELS[provider]))
+        
+        if not candidates:
+            raise Exception("Tous les services IA ont échoué ou aucune clé n'est disponible.")
+        
+        cached = await ai_cache.lookup(
+            db, "matching", [(p, m) for p, _, m in candidates], MATCHING_SYSTEM_MESSAGE, prompt
+        )
+        winner = None
+        if cached:
+            response_text = cached[0]
+        else:
             try:
-                # Utiliser le modèle spécifié ou le défaut du provider
-                target_model = model_name if (model_provider and model_provider.lower() == provider) else None
-                
-                if provider == "groq":
-                    try:
-                        from groq import Groq
-                        client = Groq(api_key=api_key)
-                        response = client.chat.completions.create(
-                            model=target_model or "llama-3.3-70b-versatile",
-                            messages=[
-                                {"role": "system", "content": "Tu es un expert en recrutement et en analyse de CV. Tu dois répondre uniquement en JSON."},
-                                {"role": "user", "content": prompt}
-                            ],
-                            response_format={"type": "json_object"}
-                        )
-                        response_text = response.choices[0].message.content
-                    except ImportError:
-                        continue # Groq non installé
-                        
-                elif provider == "openai":
-                    try:
-                        from openai import OpenAI
-                        client = OpenAI(api_key=api_key)
-                        response = client.chat.completions.create(
-                            model=target_model or "gpt-4o-mini",
-                            messages=[
-                                {"role": "system", "content": "Tu es un expert en recrutement et en analyse de CV. Tu dois répondre uniquement en JSON."},
-                                {"role": "user", "content": prompt}
-                            ],
-                            response_format={"type": "json_object"}
-                        )
-                        response_text = response.choices[0].message.content
-                    except ImportError:
-                        continue # OpenAI non installé
-                        
-                elif provider == "google":
-                    try:
-                        import google.genai as genai
-                        client = genai.Client(api_key=api_key)
-                        response = client.models.generate_content(
-                            model=target_model or "gemini-1.5-flash",
-                            contents=prompt
-                        )
-                        response_text = response.text
-                    except ImportError:
-                        continue
-                
-                if response_text:
-                    break # On a une réponse !
-                    
+                response_text, provider, model = await complete_hedged(
+                    candidates, MATCHING_SYSTEM_MESSAGE, prompt, json_mode=True, preferred=preferred
+                )
             except Exception as e:
-                print(f"Matching AI Error with {provider}: {str(e)}")
-                last_error = e
-                continue
-        
-        if not response_text:
-            raise Exception(f"Tous les services IA ont échoué ou aucune clé n'est disponible. Dernière erreur: {last_error}")
+                raise Exception(f"Tous les services IA ont échoué ou aucune clé n'est disponible. Dernière erreur: {e}")
+            winner = (provider, model, response_text)
         
         # Parser la réponse JSON
         import json
@@ -551,6 +523,10 @@ Score guide:
         
         match_data = json.loads(response_text.strip())
         
+        # Mise en cache uniquement des réponses exploitables
+        if winner:
+            await ai_cache.store(db, "matching", winner[0], winner[1], MATCHING_SYSTEM_MESSAGE, prompt, winner[2])
+        
         # Sauvegarder le score dans la candidature
         await db.applications.update_one(
             {"id": application_id},
@@ -570,6 +546,7 @@ Score guide:
                 }
             }
         )
+        await record_data_change(db, current_user["user_id"])
         
         return MatchingScoreResponse(
             score=match_data.get("score", 0),
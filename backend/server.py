@@ -54,6 +54,14 @@ from routes.search import get_db as search_get_db
 from utils.auth import get_current_user, security
 
 from utils.scheduler import setup_scheduler, shutdown_scheduler
+from utils.cache import get_invalidation_bus
+from utils.ai_providers import close_ai_clients
+from utils.push_service import close_push_client
+from utils.pdf_renderer import shutdown_pdf_renderer
+from utils.storage import shutdown_storage
+from utils.cv_text import shutdown_cv_text
+from utils.template_cache import preload_system_templates
+from utils.search_engine import ensure_search_indexes
 
 # Configure logging
 logging.basicConfig(
@@ -85,21 +93,41 @@ async def lifespan(app: FastAPI):
     await db.interviews.create_index("user_id")
     await db.interviews.create_index("candidature_id")
     await db.interviews.create_index("id", unique=True)
+    # Planificateur de rappels : plage de dates sur les entretiens planifiés
+    await db.interviews.create_index([("statut", 1), ("date_entretien_at", 1)])
+    # Rollup des statistiques par utilisateur
+    await db.user_stats.create_index("user_id", unique=True)
     # Documents indexes
     await db.documents.create_index("user_id")
     await db.documents.create_index("id", unique=True)
     await db.documents.create_index([("user_id", 1), ("document_type", 1)])
     await db.cover_letter_templates.create_index("user_id")
     await db.application_documents.create_index("application_id")
+    # PDF de lettres dédupliqués
+    await db.pdf_artifacts.create_index("key", unique=True)
+    await db.pdf_artifacts.create_index("public_id")
+    # Texte des CV extrait, par empreinte du fichier
+    await db.cv_texts.create_index("hash", unique=True)
     # Reminders indexes
     await db.sent_reminders.create_index([("user_id", 1), ("reminder_key", 1)], unique=True)
     await db.push_subscriptions.create_index([("user_id", 1), ("subscription.endpoint", 1)])
+    await db.push_subscriptions.create_index("subscription.endpoint")
     # Chrome extension auth code indexes
     await db.extension_auth_codes.create_index("code")
     await db.extension_auth_codes.create_index("user_id")
     await db.extension_auth_codes.create_index("expires_at", expireAfterSeconds=0)
     # AI usage quota index
     await db.ai_usage.create_index([("user_id", 1), ("date", 1)], unique=True)
+    # Cache des réponses IA
+    await db.ai_response_cache.create_index("key", unique=True)
+    await db.ai_response_cache.create_index("created_at", expireAfterSeconds=settings.AI_CACHE_TTL_SECONDS)
+    # Exports asynchrones
+    await db.export_jobs.create_index("id", unique=True)
+    await db.export_jobs.create_index([("user_id", 1), ("fingerprint", 1), ("created_at", -1)])
+    await db.export_jobs.create_index([("status", 1), ("created_at", 1)])
+    await db.export_jobs.create_index("expires_at")
+    # Recherche globale (index texte)
+    await ensure_search_indexes(db)
     # Support tickets indexes
     await db.support_tickets.create_index("id", unique=True)
     await db.support_tickets.create_index("status")
@@ -107,6 +135,15 @@ async def lifespan(app: FastAPI):
     
     logger.info(f"Connecté à MongoDB: {settings.DB_NAME}")
     
+    # Templates système compilés d'avance (génération de lettres)
+    try:
+        logger.info(f"{await preload_system_templates(db)} template(s) système préchargé(s)")
+    except Exception as e:
+        logger.warning(f"Préchargement des templates système impossible: {e}")
+    
+    # Bus d'invalidation des caches (partagé entre workers si REDIS_URL)
+    await get_invalidation_bus().start()
+    
     # Démarrer le scheduler pour les rappels automatiques
     setup_scheduler(db)
     logger.info("✅ Scheduler de rappels automatiques démarré")
@@ -114,7 +151,13 @@ async def lifespan(app: FastAPI):
     yield
     
     # Arrêter le scheduler proprement
-    shutdown_scheduler()
+    await shutdown_scheduler()
+    await get_invalidation_bus().stop()
+    await close_ai_clients()
+    await close_push_client()
+    shutdown_pdf_renderer()
+    shutdown_storage()
+    shutdown_cv_text()
     logger.info("Fermeture connexion MongoDB...")
     client.close()
 
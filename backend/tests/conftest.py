@@ -0,0 +1,31 @@
+"""
+Shared fixtures for the offline tests (no server, no MongoDB, no cloud storage)
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import settings  # noqa: E402
+from utils import storage  # noqa: E402
+
+
+@pytest.fixture
+def local_store(tmp_path, monkeypatch):
+    """LocalStore in a temporary directory, used as the default storage backend"""
+    monkeypatch.setattr(settings, "STORAGE_BACKEND", "local")
+    monkeypatch.setattr(settings, "PDF_ARTIFACT_STORAGE", "")
+    monkeypatch.setattr(settings, "BACKEND_URL", "http://api.test")
+    store = storage.LocalStore(str(tmp_path / "storage"))
+    monkeypatch.setitem(storage._stores, "local", store)
+    return store
+
+
+@pytest.fixture
+def mongo_db():
+    """In-memory MongoDB database (tests skipped when mongomock_motor is missing)"""
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    return mongomock_motor.AsyncMongoMockClient()["jobtracker_test"]
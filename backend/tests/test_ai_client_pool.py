@@ -0,0 +1,113 @@
+"""
+AI Client Pool Tests (offline)
+Tests for the LRU pool of SDK clients in utils/ai_providers (fake clients):
+- Clients are reused per (provider, api_key)
+- A client evicted while idle is closed, one still in use only after its last call
+- Close tasks are kept until done and awaited at shutdown
+"""
+
+import asyncio
+
+import pytest
+
+from config import settings
+from utils import ai_providers
+from utils.ai_providers import borrow_client, close_ai_clients
+
+
+class FakeClient:
+    """SDK client recording its closing"""
+
+    def __init__(self, api_key):
+        self.api_key = api_key
+        self.closed = False
+
+    async def close(self):
+        await asyncio.sleep(0)
+        self.closed = True
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    """Empty pool of one client, creating fake clients"""
+    monkeypatch.setattr(settings, "AI_CLIENT_POOL_SIZE", 1)
+    monkeypatch.setattr(ai_providers, "_create_client", lambda provider, api_key: FakeClient(api_key))
+    monkeypatch.setattr(ai_providers, "_clients", ai_providers.OrderedDict())
+    monkeypatch.setattr(ai_providers, "_leases", {})
+    monkeypatch.setattr(ai_providers, "_retired", {})
+    monkeypatch.setattr(ai_providers, "_close_tasks", set())
+    return ai_providers
+
+
+async def _settle():
+    for _ in range(3):
+        await asyncio.sleep(0)
+
+
+class TestClientPool:
+    """borrow_client and eviction"""
+
+    def test_client_reused(self, pool):
+        async def scenario():
+            with borrow_client("openai", "k1") as first:
+                pass
+            with borrow_client("openai", "k1") as second:
+                pass
+            return first, second
+
+        first, second = asyncio.run(scenario())
+        assert first is second
+        assert not first.closed
+
+    def test_idle_client_closed_on_eviction(self, pool):
+        async def scenario():
+            with borrow_client("openai", "k1") as first:
+                pass
+            with borrow_client("openai", "k2"):
+                await _settle()
+            return first
+
+        first = asyncio.run(scenario())
+        assert first.closed
+        assert not pool._close_tasks
+
+    def test_client_in_use_closed_after_last_call(self, pool):
+        async def scenario():
+            states = []
+            with borrow_client("openai", "k1") as first:
+                with borrow_client("openai", "k1"):
+                    with borrow_client("openai", "k2"):
+                        await _settle()
+                        states.append(first.closed)
+                    await _settle()
+                    states.append(first.closed)
+                await _settle()
+                states.append(first.closed)
+            await _settle()
+            states.append(first.closed)
+            return states, dict(pool._leases), dict(pool._retired)
+
+        states, leases, retired = asyncio.run(scenario())
+        assert states == [False, False, False, True]
+        assert leases == {}
+        assert retired == {}
+
+    def test_lease_released_on_error(self, pool):
+        async def scenario():
+            with pytest.raises(ValueError):
+                with borrow_client("openai", "k1"):
+                    raise ValueError("boom")
+            return dict(pool._leases)
+
+        assert asyncio.run(scenario()) == {}
+
+    def test_shutdown_closes_pooled_retired_and_pending(self, pool):
+        async def scenario():
+            with borrow_client("openai", "k1") as first:
+                with borrow_client("openai", "k2") as second:
+                    await close_ai_clients()
+            return first, second
+
+        first, second = asyncio.run(scenario())
+        assert first.closed and second.closed
+        assert not pool._clients and not pool._retired
@@ -0,0 +1,128 @@
+"""
+AI Hedging Tests (offline)
+Tests for hedged multi-provider AI calls using fake providers:
+- Fast primary answers alone (no hedge fired)
+- Slow primary is hedged, the winner returns and the loser is cancelled
+- Failing primary falls over immediately
+- EWMA health re-ranks providers
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.ai_providers import (  # noqa: E402
+    AIProviderError,
+    FakeProvider,
+    complete_hedged,
+    provider_health,
+    register_provider,
+    unregister_provider,
+)
+
+
+@pytest.fixture
+def fakes():
+    """Register fake providers, cleaned up after each test"""
+    registered = {}
+
+    def _register(name, **kwargs):
+        fake = FakeProvider(response=name, **kwargs)
+        register_provider(name, fake)
+        registered[name] = fake
+        return fake
+
+    yield _register
+    for name in registered:
+        unregister_provider(name)
+
+
+def _run(coro):
+    return asyncio.run(coro)
+
+
+class TestHedging:
+    """complete_hedged behaviour"""
+
+    def test_fast_primary_no_hedge(self, fakes):
+        primary = fakes("fake_a", latency=0.01)
+        backup = fakes("fake_b", latency=0.01)
+        result, provider, _ = _run(complete_hedged(
+            [("fake_a", "k", "m"), ("fake_b", "k", "m")], None, "hello", hedge_delay=0.5
+        ))
+        assert result == "fake_a" and provider == "fake_a"
+        assert primary.calls == 1
+        assert backup.calls == 0
+
+    def test_slow_primary_is_hedged_and_cancelled(self, fakes):
+        slow = fakes("fake_slow", latency=2.0)
+        fast = fakes("fake_fast", latency=0.05)
+        start = time.monotonic()
+        result, provider, _ = _run(complete_hedged(
+            [("fake_slow", "k", "m"), ("fake_fast", "k", "m")], None, "hello", hedge_delay=0.1
+        ))
+        elapsed = time.monotonic() - start
+        assert provider == "fake_fast"
+        assert elapsed < 1.0
+        assert slow.calls == 1 and slow.cancelled == 1
+        # The slow provider is now ranked behind the fast one
+        assert provider_health.rank([("fake_slow",), ("fake_fast",)])[0] == ("fake_fast",)
+
+    def test_failure_falls_over_immediately(self, fakes):
+        fakes("fake_broken", latency=0.0, fail_rate=1.0)
+        fakes("fake_ok", latency=0.01)
+        start = time.monotonic()
+        result, provider, _ = _run(complete_hedged(
+            [("fake_broken", "k", "m"), ("fake_ok", "k", "m")], None, "hello", hedge_delay=5.0
+        ))
+        assert provider == "fake_ok"
+        assert time.monotonic() - start < 1.0
+        assert provider_health.snapshot()["fake_broken"]["error_rate_ewma"] > 0
+
+    def test_parse_failure_counts_as_provider_failure(self, fakes):
+        fakes("fake_text", latency=0.0)
+        fakes("fake_json", latency=0.01)
+
+        def parse(text):
+            if text != "fake_json":
+                raise ValueError("not json")
+            return {"ok": True}
+
+        result, provider, _ = _run(complete_hedged(
+            [("fake_text", "k", "m"), ("fake_json", "k", "m")], None, "hello", parse=parse, hedge_delay=5.0
+        ))
+        assert result == {"ok": True} and provider == "fake_json"
+
+    def test_all_fail_raises_last_error(self, fakes):
+        fakes("fake_x", fail_rate=1.0)
+        fakes("fake_y", fail_rate=1.0)
+        with pytest.raises(Exception):
+            _run(complete_hedged([("fake_x", "k", "m"), ("fake_y", "k", "m")], None, "hello"))
+
+    def test_no_candidates(self):
+        with pytest.raises(AIProviderError):
+            _run(complete_hedged([], None, "hello"))
+
+    def test_preferred_provider_stays_first(self, fakes):
+        fakes("fake_fav", latency=0.01)
+        fakes("fake_other", latency=0.01)
+        provider_health.record_failure("fake_fav", 10.0)
+        _, provider, _ = _run(complete_hedged(
+            [("fake_other", "k", "m"), ("fake_fav", "k", "m")], None, "hello",
+            hedge_delay=5.0, preferred="fake_fav"
+        ))
+        assert provider == "fake_fav"
+
+    def test_hedging_disabled_waits_for_primary(self, fakes):
+        fakes("fake_p", latency=0.2)
+        backup = fakes("fake_q", latency=0.0)
+        _, provider, _ = _run(complete_hedged(
+            [("fake_p", "k", "m"), ("fake_q", "k", "m")], None, "hello", hedge_delay=0.01, hedge=False
+        ))
+        assert provider == "fake_p"
+        assert backup.calls == 0
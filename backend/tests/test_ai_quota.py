@@ -0,0 +1,127 @@
+"""
+AI Quota Tests (offline)
+Tests for the daily AI call quota of utils/ai_quota:
+- Calls are counted up to the quota, the next one is rejected with 429
+- A rejected call does not increment the counter
+- A concurrent first call of the day (unique index conflict) is retried without upsert
+- Admins are exempted
+"""
+
+import asyncio
+from datetime import date
+
+import pytest
+from fastapi import HTTPException
+from pymongo.errors import DuplicateKeyError
+
+from utils import ai_quota
+from utils.ai_quota import check_and_increment_quota, get_usage_today
+
+QUOTA = 3
+
+
+@pytest.fixture
+def db(mongo_db):
+    """Database with the ai_usage unique index and a configured quota"""
+    async def setup():
+        await mongo_db.ai_usage.create_index([("user_id", 1), ("date", 1)], unique=True)
+        await mongo_db.platform_settings.insert_one({"key": "ai_daily_quota", "value": QUOTA})
+
+    ai_quota._limit_cache.clear()
+    asyncio.run(setup())
+    yield mongo_db
+    ai_quota._limit_cache.clear()
+
+
+async def _call(db, user_id="u1", role="user"):
+    await check_and_increment_quota(user_id, db, role=role)
+
+
+class TestQuota:
+    """check_and_increment_quota"""
+
+    def test_counts_up_to_quota(self, db):
+        async def scenario():
+            for _ in range(QUOTA):
+                await _call(db)
+            return await get_usage_today("u1", db)
+
+        assert asyncio.run(scenario()) == QUOTA
+
+    def test_over_quota_rejected_without_increment(self, db):
+        async def scenario():
+            for _ in range(QUOTA):
+                await _call(db)
+            with pytest.raises(HTTPException) as exc:
+                await _call(db)
+            with pytest.raises(HTTPException):
+                await _call(db)
+            return exc.value, await get_usage_today("u1", db)
+
+        error, count = asyncio.run(scenario())
+        assert error.status_code == 429
+        assert error.detail == {"code": "quota_exceeded", "calls_today": QUOTA, "quota": QUOTA}
+        assert count == QUOTA
+
+    def test_quota_per_user(self, db):
+        async def scenario():
+            for _ in range(QUOTA):
+                await _call(db, "u1")
+            await _call(db, "u2")
+            return await get_usage_today("u2", db)
+
+        assert asyncio.run(scenario()) == 1
+
+    def test_admin_exempted(self, db):
+        async def scenario():
+            for _ in range(QUOTA + 2):
+                await _call(db, role="admin")
+            return await get_usage_today("u1", db)
+
+        assert asyncio.run(scenario()) == 0
+
+
+class TestConcurrentFirstCall:
+    """Unique index conflict on the first call of the day"""
+
+    @pytest.fixture
+    def racing_insert(self, db, monkeypatch):
+        """Another worker inserts the day's document just before our upsert"""
+        consume = ai_quota._consume
+        upserts = []
+
+        def race(count):
+            async def racing_consume(db, user_id, today, quota, upsert):
+                if upsert:
+                    upserts.append(user_id)
+                    await db.ai_usage.insert_one({"user_id": user_id, "date": today, "call_count": count})
+                    raise DuplicateKeyError("E11000 duplicate key error")
+                return await consume(db, user_id, today, quota, upsert)
+
+            monkeypatch.setattr(ai_quota, "_consume", racing_consume)
+            return upserts
+
+        return race
+
+    def test_retried_without_upsert(self, db, racing_insert):
+        upserts = racing_insert(1)
+
+        async def scenario():
+            await _call(db)
+            return await db.ai_usage.find({"user_id": "u1"}, {"_id": 0}).to_list(10)
+
+        docs = asyncio.run(scenario())
+        assert upserts == ["u1"]
+        assert docs == [{"user_id": "u1", "date": date.today().isoformat(), "call_count": 2}]
+
+    def test_racing_call_reaches_quota(self, db, racing_insert):
+        racing_insert(QUOTA)
+
+        async def scenario():
+            with pytest.raises(HTTPException) as exc:
+                await _call(db)
+            return exc.value, await get_usage_today("u1", db)
+
+        error, count = asyncio.run(scenario())
+        assert error.status_code == 429
+        assert count == QUOTA
@@ -0,0 +1,138 @@
+"""
+Export Download Range Tests (offline)
+Tests for the resumable download of finished export jobs (routes/export):
+- parse_range: single ranges, suffix ranges, multi-range and unreadable headers
+- 206 with Content-Range, 416 for unsatisfiable ranges
+- If-Range: the range is honored only while the ETag matches
+- A 0-byte artifact is served whole, any range on it is unsatisfiable
+"""
+
+import asyncio
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from routes import export
+from routes.export import parse_range
+from utils.auth import get_current_user
+
+CONTENT = b"0123456789"
+FINGERPRINT = "f" * 64
+ETAG = f'"{FINGERPRINT[:32]}"'
+
+
+class TestParseRange:
+    """parse_range"""
+
+    @pytest.mark.parametrize("header, expected", [
+        ("bytes=0-3", (0, 3)),
+        ("bytes=4-", (4, 9)),
+        ("bytes=5-100", (5, 9)),
+        ("bytes=-3", (7, 9)),
+        ("bytes=-100", (0, 9)),
+    ])
+    def test_satisfiable(self, header, expected):
+        assert parse_range(header, 10) == expected
+
+    @pytest.mark.parametrize("header", [
+        None, "", "items=0-3", "bytes=0-1,4-5", "bytes=-", "bytes=a-3", "bytes=0-b", "bytes=--3",
+    ])
+    def test_ignored(self, header):
+        assert parse_range(header, 10) is None
+
+    @pytest.mark.parametrize("header, size", [
+        ("bytes=10-", 10),
+        ("bytes=5-2", 10),
+        ("bytes=-0", 10),
+        ("bytes=0-", 0),
+        ("bytes=-5", 0),
+    ])
+    def test_unsatisfiable(self, header, size):
+        with pytest.raises(ValueError):
+            parse_range(header, size)
+
+
+@pytest.fixture
+def client(tmp_path, mongo_db):
+    """Export router on the in-memory database, with a finished job per artifact size"""
+    for job_id, content in [("full", CONTENT), ("empty", b"")]:
+        path = tmp_path / f"{job_id}.csv"
+        path.write_bytes(content)
+        asyncio.run(mongo_db.export_jobs.insert_one({
+            "id": job_id, "user_id": "u1", "kind": "applications", "format": "csv",
+            "status": "done", "size": len(content), "fingerprint": FINGERPRINT,
+            "created_at": "2026-10-18T10:00:00+00:00",
+            "artifact": {"storage": "local", "path": str(path)},
+        }))
+
+    app = FastAPI()
+    app.include_router(export.router, prefix="/api")
+    app.dependency_overrides[export.get_db] = lambda: mongo_db
+    app.dependency_overrides[get_current_user] = lambda: {"user_id": "u1"}
+    return TestClient(app)
+
+
+def _download(client, job_id="full", **headers):
+    return client.get(f"/api/export/jobs/{job_id}/download", headers=headers)
+
+
+class TestDownload:
+    """GET /export/jobs/{id}/download"""
+
+    def test_full_download(self, client):
+        response = _download(client)
+        assert response.status_code == 200
+        assert response.content == CONTENT
+        assert response.headers["accept-ranges"] == "bytes"
+        assert response.headers["etag"] == ETAG
+        assert "content-range" not in response.headers
+
+    def test_partial_download(self, client):
+        response = _download(client, Range="bytes=2-5")
+        assert response.status_code == 206
+        assert response.content == b"2345"
+        assert response.headers["content-range"] == "bytes 2-5/10"
+        assert response.headers["content-length"] == "4"
+
+    def test_suffix_range(self, client):
+        response = _download(client, Range="bytes=-4")
+        assert response.status_code == 206
+        assert response.content == b"6789"
+        assert response.headers["content-range"] == "bytes 6-9/10"
+
+    def test_multi_range_served_whole(self, client):
+        response = _download(client, Range="bytes=0-1,4-5")
+        assert response.status_code == 200
+        assert response.content == CONTENT
+
+    def test_unsatisfiable_range(self, client):
+        response = _download(client, Range="bytes=10-")
+        assert response.status_code == 416
+        assert response.headers["content-range"] == "bytes */10"
+
+    def test_if_range_match(self, client):
+        response = _download(client, Range="bytes=8-", **{"If-Range": ETAG})
+        assert response.status_code == 206
+        assert response.content == b"89"
+
+    def test_if_range_mismatch_served_whole(self, client):
+        response = _download(client, Range="bytes=8-", **{"If-Range": '"stale"'})
+        assert response.status_code == 200
+        assert response.content == CONTENT
+
+    def test_empty_artifact(self, client):
+        response = _download(client, "empty")
+        assert response.status_code == 200
+        assert response.content == b""
+        assert response.headers["content-length"] == "0"
+
+    @pytest.mark.parametrize("header", ["bytes=0-", "bytes=-5"])
+    def test_empty_artifact_range(self, client, header):
+        response = _download(client, "empty", Range=header)
+        assert response.status_code == 416
+        assert response.headers["content-range"] == "bytes */0"
+
+    def test_other_user_job_not_found(self, client):
+        client.app.dependency_overrides[get_current_user] = lambda: {"user_id": "u2"}
+        assert _download(client).status_code == 404
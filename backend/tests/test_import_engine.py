@@ -0,0 +1,135 @@
+"""
+Import Engine Tests (offline)
+Tests for the batched import of utils/import_engine:
+- Deduplication against preloaded keys is case-insensitive (casefold)
+- Partial insert_many(ordered=False) failures are mapped back to their lines
+- Interviews whose application failed to insert are skipped and reported
+"""
+
+import asyncio
+
+import pytest
+
+from utils.import_engine import ImportBatch, application_key
+
+
+def _app(app_id, entreprise="Acme", poste="Développeur"):
+    return {"id": app_id, "user_id": "u1", "entreprise": entreprise, "poste": poste}
+
+
+def _interview(interview_id, candidature_id, day="2026-10-20"):
+    return {"id": interview_id, "user_id": "u1", "candidature_id": candidature_id, "date_entretien": f"{day}T10:00:00"}
+
+
+@pytest.fixture
+def db(mongo_db):
+    """Database with unique ids, as in production"""
+    async def setup():
+        await mongo_db.applications.create_index("id", unique=True)
+        await mongo_db.interviews.create_index("id", unique=True)
+
+    asyncio.run(setup())
+    return mongo_db
+
+
+class TestDedupe:
+    """Preloaded keys and in-memory index"""
+
+    def test_existing_application_matched_casefold(self, db):
+        async def scenario():
+            await db.applications.insert_one(_app("a0", "Straße GmbH", "Data Engineer"))
+            batch = ImportBatch(db, "u1")
+            await batch.load_existing_applications()
+            return batch
+
+        batch = asyncio.run(scenario())
+        found = batch.find_application("  STRASSE gmbh ", "data engineer")
+        assert found["id"] == "a0"
+        assert found["_existing"] is True
+        assert batch.find_application("Straße GmbH", "Data Scientist") is None
+
+    def test_other_user_not_loaded(self, db):
+        async def scenario():
+            await db.applications.insert_one({**_app("a0"), "user_id": "u2"})
+            batch = ImportBatch(db, "u1")
+            await batch.load_existing_applications()
+            return batch
+
+        assert asyncio.run(scenario()).find_application("Acme", "Développeur") is None
+
+    def test_pending_application_matched(self, db):
+        batch = ImportBatch(db, "u1")
+        batch.add_application(_app("a1", "Acme", "Développeur"), 1)
+        batch.add_application(_app("a2", "ACME", "développeur"), 2)
+        assert batch.find_application("acme", "DÉVELOPPEUR")["id"] == "a1"
+        assert application_key("ACME", "Dév") == application_key(" acme", "dév ")
+
+    def test_existing_interview_day(self, db):
+        async def scenario():
+            await db.interviews.insert_one(_interview("i0", "a0"))
+            batch = ImportBatch(db, "u1")
+            await batch.load_existing_interview_days()
+            return batch
+
+        batch = asyncio.run(scenario())
+        assert batch.has_interview_on("a0", "2026-10-20T18:30:00")
+        assert not batch.has_interview_on("a0", "2026-10-21T10:00:00")
+
+
+class TestFlush:
+    """ImportBatch.flush"""
+
+    def _flush(self, db, apps, interviews=()):
+        async def scenario():
+            await db.applications.insert_one(_app("taken", "Old", "Job"))
+            batch = ImportBatch(db, "u1", chunk_size=2)
+            for line, app in apps:
+                batch.add_application(app, line)
+            for line, interview in interviews:
+                batch.add_interview(interview, line)
+            await batch.flush()
+            stored = await db.interviews.distinct("id", {"user_id": "u1"})
+            return batch, sorted(stored)
+
+        return asyncio.run(scenario())
+
+    def test_all_inserted(self, db):
+        batch, _ = self._flush(db, [(1, _app("a1", poste="A")), (2, _app("a2", poste="B"))])
+        assert [app["id"] for app in batch.inserted_applications] == ["a1", "a2"]
+        assert batch.errors == []
+        assert all("_id" not in app for app in batch.inserted_applications)
+
+    def test_partial_failure_mapped_to_lines(self, db):
+        batch, _ = self._flush(db, [
+            (2, _app("a1", poste="A")),
+            (3, _app("a2", poste="B")),
+            (5, _app("taken", poste="C")),
+            (6, _app("a3", poste="D")),
+        ])
+        assert [app["id"] for app in batch.inserted_applications] == ["a1", "a2", "a3"]
+        assert [line for line, _ in batch.errors] == [5]
+        assert "duplicate" in batch.errors[0][1].lower()
+
+    def test_interviews_of_failed_application_skipped(self, db):
+        batch, stored = self._flush(
+            db,
+            [(2, _app("a1", poste="A")), (3, _app("taken", poste="B"))],
+            [(2, _interview("i1", "a1")), (3, _interview("i2", "taken")), (3, _interview("i3", "taken", "2026-10-21"))],
+        )
+        assert stored == ["i1"]
+        assert [iv["id"] for iv in batch.inserted_interviews] == ["i1"]
+        assert [line for line, _ in batch.interview_errors] == [3, 3]
+        assert [line for line, _ in batch.errors] == [3]
+
+    def test_interview_of_existing_application_kept(self, db):
+        batch, stored = self._flush(db, [(2, _app("taken", poste="B"))], [(4, _interview("i1", "a0"))])
+        assert stored == ["i1"]
+        assert batch.interview_errors == []
+
+    def test_flush_bumps_data_version(self, db):
+        async def version():
+            doc = await db.user_stats.find_one({"user_id": "u1"})
+            return doc["version"] if doc else 0
+
+        self._flush(db, [(1, _app("a1"))])
+        assert asyncio.run(version()) == 1
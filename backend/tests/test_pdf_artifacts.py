@@ -0,0 +1,123 @@
+"""
+PDF Artifact Cache Tests (offline)
+Tests for the deduplicated cover-letter PDFs of utils/pdf_artifacts
+(shared LocalStore and in-memory MongoDB fixtures from conftest):
+- A repeated render reuses the stored object (no render, no upload)
+- References are counted up on reuse and down on release
+- The object is deleted with the last release only
+- Only the storage key is persisted, the URL is resolved on each call
+"""
+
+import asyncio
+import io
+import os
+
+import pytest
+
+from utils import pdf_artifacts
+from utils.pdf_artifacts import ARTIFACT_COLLECTION, get_or_create_pdf, release_pdf
+
+LETTER = {
+    "content": "Madame, Monsieur,\n\nJe vous propose ma candidature.",
+    "entreprise": "Acme",
+    "poste": "Développeur",
+    "user_name": "Jo Doe",
+}
+
+
+@pytest.fixture
+def renders(monkeypatch):
+    """Fake renderer recording each render"""
+    calls = []
+
+    async def fake_render_pdf(content, entreprise, poste, user_name, is_html=False):
+        calls.append(content)
+        return io.BytesIO(b"%PDF-1.4 " + content.encode("utf-8"))
+
+    monkeypatch.setattr(pdf_artifacts, "render_pdf", fake_render_pdf)
+    return calls
+
+
+async def _artifact(db, public_id):
+    return await db[ARTIFACT_COLLECTION].find_one({"public_id": public_id}, {"_id": 0})
+
+
+class TestGetOrCreate:
+    """get_or_create_pdf"""
+
+    def test_first_render_stores_object(self, local_store, mongo_db, renders):
+        async def scenario():
+            pdf = await get_or_create_pdf(mongo_db, "u1", **LETTER)
+            return pdf, await _artifact(mongo_db, pdf["public_id"])
+
+        pdf, artifact = asyncio.run(scenario())
+        assert pdf["reused"] is False
+        assert len(renders) == 1
+        assert pdf["storage"] == "local"
+        assert pdf["storage_key"] == pdf["public_id"]
+        assert pdf["public_id"].startswith("jobtracker/u1/cover_letters/")
+        assert pdf["url"]
+        assert os.path.exists(local_store.path(pdf["public_id"]))
+        assert artifact["refs"] == 1
+        assert "url" not in artifact
+
+    def test_repeat_render_reuses_object(self, local_store, mongo_db, renders):
+        async def scenario():
+            first = await get_or_create_pdf(mongo_db, "u1", **LETTER)
+            second = await get_or_create_pdf(mongo_db, "u1", **LETTER)
+            return first, second, await _artifact(mongo_db, first["public_id"])
+
+        first, second, artifact = asyncio.run(scenario())
+        assert second["reused"] is True
+        assert second["public_id"] == first["public_id"]
+        assert second["url"] == first["url"]
+        assert len(renders) == 1
+        assert artifact["refs"] == 2
+        assert os.listdir(os.path.dirname(local_store.path(first["public_id"]))) == [os.path.basename(first["public_id"])]
+
+    def test_different_content_or_user_not_shared(self, local_store, mongo_db, renders):
+        async def scenario():
+            base = await get_or_create_pdf(mongo_db, "u1", **LETTER)
+            other_content = await get_or_create_pdf(mongo_db, "u1", **{**LETTER, "content": "Autre lettre"})
+            other_user = await get_or_create_pdf(mongo_db, "u2", **LETTER)
+            return base, other_content, other_user
+
+        base, other_content, other_user = asyncio.run(scenario())
+        assert len({base["public_id"], other_content["public_id"], other_user["public_id"]}) == 3
+        assert not other_content["reused"] and not other_user["reused"]
+        assert len(renders) == 3
+
+
+class TestRelease:
+    """release_pdf"""
+
+    def test_refs_count_down_and_last_release_deletes(self, local_store, mongo_db, renders):
+        async def scenario():
+            pdf = await get_or_create_pdf(mongo_db, "u1", **LETTER)
+            await get_or_create_pdf(mongo_db, "u1", **LETTER)
+            path = local_store.path(pdf["public_id"])
+
+            await release_pdf(mongo_db, pdf["public_id"])
+            after_first = await _artifact(mongo_db, pdf["public_id"])
+            exists_after_first = os.path.exists(path)
+
+            await release_pdf(mongo_db, pdf["public_id"])
+            after_last = await _artifact(mongo_db, pdf["public_id"])
+            return after_first, exists_after_first, after_last, os.path.exists(path)
+
+        after_first, exists_after_first, after_last, exists_after_last = asyncio.run(scenario())
+        assert after_first["refs"] == 1
+        assert exists_after_first
+        assert after_last is None
+        assert not exists_after_last
+
+    def test_render_again_after_last_release(self, local_store, mongo_db, renders):
+        async def scenario():
+            pdf = await get_or_create_pdf(mongo_db, "u1", **LETTER)
+            await release_pdf(mongo_db, pdf["public_id"])
+            return await get_or_create_pdf(mongo_db, "u1", **LETTER)
+
+        pdf = asyncio.run(scenario())
+        assert pdf["reused"] is False
+        assert len(renders) == 2
+        assert os.path.exists(local_store.path(pdf["public_id"]))
@@ -0,0 +1,140 @@
+"""
+Object Storage Tests (offline)
+Tests for the local disk adapter of utils/storage:
+- Bytes and file sources saved by chunks, temporary file renamed at the end
+- Keys with absolute paths or ".." are rejected
+- Delete removes the file and tolerates missing objects
+- URLs are resolved at read time, never taken from the stored record
+"""
+
+import asyncio
+import io
+import os
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+from config import settings
+from utils import storage
+from utils.storage import StorageError, stored_url
+
+
+class CountingFile(io.BytesIO):
+    """Synchronous file recording the size of each read"""
+
+    def __init__(self, data: bytes):
+        super().__init__(data)
+        self.reads = []
+
+    def read(self, size=-1):
+        chunk = super().read(size)
+        self.reads.append(len(chunk))
+        return chunk
+
+
+@pytest.fixture
+def store(local_store, monkeypatch):
+    """Shared LocalStore with 4-byte chunks"""
+    monkeypatch.setattr(settings, "STORAGE_CHUNK_SIZE", 4)
+    return local_store
+
+
+class TestLocalSave:
+    """LocalStore.save"""
+
+    def test_save_bytes(self, store):
+        stored = asyncio.run(store.save("jobtracker/u1/doc.pdf", b"%PDF-data"))
+        assert stored.storage == "local"
+        assert stored.key == "jobtracker/u1/doc.pdf"
+        assert stored.size == 9
+        with open(store.path(stored.key), "rb") as f:
+            assert f.read() == b"%PDF-data"
+
+    def test_save_file_by_chunks(self, store):
+        source = CountingFile(b"0123456789")
+        stored = asyncio.run(store.save("jobtracker/u1/notes.txt", source))
+        assert stored.size == 10
+        assert source.reads == [4, 4, 2, 0]
+        with open(store.path(stored.key), "rb") as f:
+            assert f.read() == b"0123456789"
+        assert not os.path.exists(store.path(stored.key) + ".part")
+
+    def test_overwrite(self, store):
+        asyncio.run(store.save("jobtracker/u1/doc", b"first"))
+        stored = asyncio.run(store.save("jobtracker/u1/doc", b"second"))
+        with open(store.path(stored.key), "rb") as f:
+            assert f.read() == b"second"
+
+    @pytest.mark.parametrize("key", ["../escape", "/etc/passwd", "a/../../b", "a//b", "a/", ""])
+    def test_invalid_key_rejected(self, store, key):
+        with pytest.raises(StorageError):
+            asyncio.run(store.save(key, b"data"))
+        assert store.path(key) is None
+        assert not os.path.exists(store.directory) or os.listdir(store.directory) == []
+
+
+class TestLocalDelete:
+    """LocalStore.delete"""
+
+    def test_delete(self, store):
+        stored = asyncio.run(store.save("jobtracker/u1/doc", b"data"))
+        asyncio.run(store.delete(stored.key))
+        assert not os.path.exists(store.path(stored.key))
+
+    def test_delete_missing_and_invalid(self, store):
+        asyncio.run(store.delete("jobtracker/u1/missing"))
+        asyncio.run(store.delete("../escape"))
+
+
+class TestStoredUrl:
+    """stored_url resolution"""
+
+    def test_resolved_from_key(self, store):
+        record = {"storage": "local", "storage_key": "jobtracker/u1/doc", "url": "https://expired.example/old"}
+        url = asyncio.run(stored_url(record))
+        assert url.startswith("http://api.test/api/documents/files/jobtracker/u1/doc?expires=")
+
+    def test_legacy_record_keeps_url(self, store):
+        assert asyncio.run(stored_url({"url": "https://github.com/me"})) == "https://github.com/me"
+        assert asyncio.run(stored_url({})) is None
+
+    def test_unknown_storage(self, store):
+        assert asyncio.run(stored_url({"storage": "ftp", "storage_key": "a/b"})) is None
+
+
+class TestSignedUrl:
+    """LocalStore signed URLs"""
+
+    def _query(self, url):
+        query = parse_qs(urlsplit(url).query)
+        return int(query["expires"][0]), query["signature"][0]
+
+    def test_valid_signature(self, store):
+        expires, signature = self._query(asyncio.run(store.url("jobtracker/u1/doc")))
+        assert store.verify("jobtracker/u1/doc", expires, signature)
+
+    def test_signature_bound_to_key(self, store):
+        expires, signature = self._query(asyncio.run(store.url("jobtracker/u1/doc")))
+        assert not store.verify("jobtracker/u2/doc", expires, signature)
+        assert not store.verify("jobtracker/u1/doc", expires + 1, signature)
+        assert not store.verify("jobtracker/u1/doc", 0, "")
+
+    def test_expired(self, store, monkeypatch):
+        expires, signature = self._query(asyncio.run(store.url("jobtracker/u1/doc")))
+        monkeypatch.setattr(storage.time, "time", lambda: expires + 1)
+        assert not store.verify("jobtracker/u1/doc", expires, signature)
+
+
+class TestObjectStore:
+    """ObjectStore interface"""
+
+    def test_incomplete_adapter_cannot_be_created(self):
+        class NoUrlStore(storage.ObjectStore):
+            async def save(self, key, source, content_type=None, tags=None, **options):
+                pass
+
+            async def delete(self, key, meta=None):
+                pass
+
+        with pytest.raises(TypeError):
+            NoUrlStore()
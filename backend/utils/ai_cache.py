@@ -0,0 +1,164 @@
+"""
+JobTracker SaaS - Cache des réponses IA
+Les réponses sont adressées par le contenu : sha256 de (fournisseur, modèle,
+message système, message utilisateur). Deux niveaux :
+- mémoire (TTLCache, local au process)
+- Mongo (collection ai_response_cache, index TTL + éviction par taille)
+Un succès de cache ne consomme pas de quota IA.
+"""
+
+import hashlib
+import json
+import logging
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Iterable, Optional, Tuple
+
+from config import settings
+from utils.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+_memory = TTLCache(
+    max_entries=settings.AI_CACHE_MEMORY_ENTRIES,
+    ttl=settings.AI_CACHE_MEMORY_TTL_SECONDS,
+)
+_metrics: Counter = Counter()
+_writes_since_trim = 0
+
+
+def cache_key(provider: str, model: str, system_message: Optional[str], user_message: str) -> str:
+    payload = json.dumps([provider, model, system_message or "", user_message], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def cache_enabled(endpoint: str) -> bool:
+    """Cache actif globalement et non désactivé pour cet endpoint (AI_CACHE_DISABLED_ENDPOINTS)"""
+    if not settings.AI_CACHE_ENABLED:
+        return False
+    disabled = {e.strip() for e in settings.AI_CACHE_DISABLED_ENDPOINTS.split(",") if e.strip()}
+    return endpoint not in disabled
+
+
+def _count(endpoint: str, event: str):
+    _metrics[event] += 1
+    _metrics[f"{endpoint}:{event}"] += 1
+
+
+async def lookup(db, endpoint: str, candidates: Iterable[Tuple[str, str]], system_message: Optional[str],
+                 user_message: str) -> Optional[Tuple[str, str]]:
+    """
+    Cherche une réponse pour l'un des couples (provider, model).
+    Retourne (réponse, provider) ou None.
+    """
+    if not cache_enabled(endpoint):
+        return None
+
+    keys = [(cache_key(p, m, system_message, user_message), p) for p, m in candidates]
+    for key, provider in keys:
+        cached = _memory.get(key)
+        if cached is not None:
+            _count(endpoint, "hits_memory")
+            return cached, provider
+
+    try:
+        doc = await db.ai_response_cache.find_one(
+            {"key": {"$in": [k for k, _ in keys]}}, {"_id": 0, "key": 1, "provider": 1, "response": 1}
+        )
+    except Exception as e:
+        logger.error(f"AI cache lookup failed ({endpoint}): {e}")
+        doc = None
+
+    if doc:
+        _memory.set(doc["key"], doc["response"])
+        _count(endpoint, "hits_db")
+        return doc["response"], doc["provider"]
+
+    _count(endpoint, "misses")
+    return None
+
+
+async def store(db, endpoint: str, provider: str, model: str, system_message: Optional[str],
+                user_message: str, response: str):
+    """Enregistre une réponse (les réponses vides ne sont pas mises en cache)"""
+    global _writes_since_trim
+    if not response or not cache_enabled(endpoint):
+        return
+
+    key = cache_key(provider, model, system_message, user_message)
+    _memory.set(key, response)
+    try:
+        await db.ai_response_cache.update_one(
+            {"key": key},
+            {"$set": {
+                "key": key,
+                "provider": provider,
+                "model": model,
+                "endpoint": endpoint,
+                "response": response,
+                "created_at": datetime.now(timezone.utc),
+            }},
+            upsert=True
+        )
+        _count(endpoint, "stores")
+        _writes_since_trim += 1
+        if _writes_since_trim >= settings.AI_CACHE_TRIM_EVERY:
+            _writes_since_trim = 0
+            await trim(db)
+    except Exception as e:
+        logger.error(f"AI cache store failed ({endpoint}): {e}")
+
+
+async def trim(db) -> int:
+    """Éviction par taille : supprime les entrées les plus anciennes au-delà de AI_CACHE_MAX_ENTRIES"""
+    excess = await db.ai_response_cache.estimated_document_count() - settings.AI_CACHE_MAX_ENTRIES
+    if excess <= 0:
+        return 0
+    oldest = await db.ai_response_cache.find({}, {"_id": 1}).sort("created_at", 1).limit(excess).to_list(excess)
+    result = await db.ai_response_cache.delete_many({"_id": {"$in": [d["_id"] for d in oldest]}})
+    _metrics["evictions"] += result.deleted_count
+    return result.deleted_count
+
+
+async def cached_completion(db, endpoint: str, provider: str, model: str, system_message: Optional[str],
+                            user_message: str, call: Callable[[], Awaitable[str]],
+                            before_call: Optional[Callable[[], Awaitable[None]]] = None) -> str:
+    """
+    Réponse en cache si disponible, sinon before_call (ex. contrôle de quota)
+    puis call, dont le résultat est mis en cache.
+    """
+    cached = await lookup(db, endpoint, [(provider, model)], system_message, user_message)
+    if cached:
+        return cached[0]
+    if before_call:
+        await before_call()
+    response = await call()
+    await store(db, endpoint, provider, model, system_message, user_message, response)
+    return response
+
+
+def cache_stats() -> dict:
+    """Compteurs de succès / échecs (globaux et par endpoint)"""
+    hits = _metrics["hits_memory"] + _metrics["hits_db"]
+    lookups = hits + _metrics["misses"]
+    endpoints = {}
+    for name, value in _metrics.items():
+        if ":" in name:
+            endpoint, event = name.split(":", 1)
+            endpoints.setdefault(endpoint, {})[event] = value
+    return {
+        "enabled": settings.AI_CACHE_ENABLED,
+        "hits_memory": _metrics["hits_memory"],
+        "hits_db": _metrics["hits_db"],
+        "misses": _metrics["misses"],
+        "stores": _metrics["stores"],
+        "evictions": _metrics["evictions"],
+        "hit_rate": round(hits / lookups, 3) if lookups else 0.0,
+        "memory": _memory.stats(),
+        "endpoints": endpoints,
+    }
+
+
+async def clear_cache(db):
+    _memory.clear()
+    await db.ai_response_cache.delete_many({})
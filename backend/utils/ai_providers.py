@@ -0,0 +1,513 @@
+"""
+JobTracker SaaS - Couche d'appel aux fournisseurs IA (OpenAI, Google Gemini, Groq)
+- Clients SDK asynchrones, réutilisés par (fournisseur, clé API)
+- Limite de concurrence et timeout par fournisseur
+- Streaming des tokens (annulable : fermer le générateur ferme le flux amont)
+- Requêtes couvertes (hedging) entre fournisseurs, classés par latence / taux
+  d'erreur observés (EWMA)
+Aucun appel ne bloque la boucle d'événements.
+"""
+
+import asyncio
+import contextlib
+import logging
+import random
+import time
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+try:
+    from openai import AsyncOpenAI
+    OPENAI_AVAILABLE = True
+except ImportError:
+    OPENAI_AVAILABLE = False
+
+try:
+    from groq import AsyncGroq
+    GROQ_AVAILABLE = True
+except ImportError:
+    GROQ_AVAILABLE = False
+
+try:
+    from google import genai
+    from google.genai import types as genai_types
+    GOOGLE_AVAILABLE = True
+except ImportError:
+    GOOGLE_AVAILABLE = False
+
+PROVIDERS = ("groq", "openai", "google")
+
+
+class AIProviderError(Exception):
+    """Erreur d'un fournisseur IA (SDK absent, réponse vide, erreur API)"""
+
+    def __init__(self, provider: str, message: str):
+        super().__init__(f"{provider}: {message}")
+        self.provider = provider
+
+
+class AIProviderTimeout(AIProviderError):
+    """Le fournisseur n'a pas répondu dans le délai imparti"""
+
+
+# ============================================
+# FOURNISSEURS ENREGISTRÉS (tests, stand-ins)
+# ============================================
+
+ProviderFn = Callable[[str, str, Optional[str], str, bool], Awaitable[str]]
+_custom_providers: Dict[str, ProviderFn] = {}
+
+
+def register_provider(name: str, fn: ProviderFn):
+    """Enregistre un fournisseur personnalisé : fn(api_key, model, system, user, json_mode)"""
+    _custom_providers[name] = fn
+
+
+def unregister_provider(name: str):
+    _custom_providers.pop(name, None)
+    _semaphores.pop(name, None)
+    provider_health.reset(name)
+
+
+class FakeProvider:
+    """
+    Fournisseur factice pour les tests hors ligne : latence, taux d'échec et
+    réponse configurables. S'enregistre via register_provider(name, fake).
+    """
+
+    def __init__(self, response: str = "ok", latency: float = 0.0, fail_rate: float = 0.0,
+                 error: str = "fake provider error"):
+        self.response = response
+        self.latency = latency
+        self.fail_rate = fail_rate
+        self.error = error
+        self.calls = 0
+        self.cancelled = 0
+
+    async def __call__(self, api_key: str, model: str, system_message: Optional[str],
+                       user_message: str, json_mode: bool) -> str:
+        self.calls += 1
+        try:
+            await asyncio.sleep(self.latency)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        if self.fail_rate and random.random() < self.fail_rate:
+            raise RuntimeError(self.error)
+        return self.response
+
+    async def stream(self, api_key: str, model: str, system_message: Optional[str],
+                     user_message: str) -> AsyncIterator[str]:
+        """Renvoie la réponse mot par mot, latency étant le délai avant le premier token"""
+        self.calls += 1
+        try:
+            await asyncio.sleep(self.latency)
+            if self.fail_rate and random.random() < self.fail_rate:
+                raise RuntimeError(self.error)
+            for i, word in enumerate(self.response.split(" ")):
+                yield word if i == 0 else " " + word
+                await asyncio.sleep(0)
+        except (asyncio.CancelledError, GeneratorExit):
+            self.cancelled += 1
+            raise
+
+
+# ============================================
+# POOL DE CLIENTS
+# ============================================
+
+_clients: "OrderedDict[tuple, object]" = OrderedDict()
+_semaphores: Dict[str, asyncio.Semaphore] = {}
+# Appels en cours par client (id) ; un client évincé du LRU n'est fermé qu'une fois libéré
+_leases: Dict[int, int] = {}
+_retired: Dict[int, object] = {}
+# Fermetures en cours (référence gardée jusqu'à la fin de la tâche)
+_close_tasks: "set[asyncio.Task]" = set()
+
+
+def _create_client(provider: str, api_key: str):
+    if provider == "openai":
+        if not OPENAI_AVAILABLE:
+            raise AIProviderError(provider, "SDK openai non installé")
+        return AsyncOpenAI(api_key=api_key, max_retries=1)
+    if provider == "groq":
+        if not GROQ_AVAILABLE:
+            raise AIProviderError(provider, "SDK groq non installé")
+        return AsyncGroq(api_key=api_key, max_retries=1)
+    if provider == "google":
+        if not GOOGLE_AVAILABLE:
+            raise AIProviderError(provider, "SDK google-genai non installé")
+        return genai.Client(api_key=api_key)
+    raise AIProviderError(provider, "fournisseur inconnu")
+
+
+def _get_client(provider: str, api_key: str):
+    """Client réutilisé pour (provider, api_key), LRU borné par AI_CLIENT_POOL_SIZE"""
+    key = (provider, api_key)
+    client = _clients.get(key)
+    if client is None:
+        client = _create_client(provider, api_key)
+        _clients[key] = client
+        while len(_clients) > settings.AI_CLIENT_POOL_SIZE:
+            _, evicted = _clients.popitem(last=False)
+            if _leases.get(id(evicted)):
+                _retired[id(evicted)] = evicted
+            else:
+                _schedule_close(evicted)
+    else:
+        _clients.move_to_end(key)
+    return client
+
+
+@contextlib.contextmanager
+def borrow_client(provider: str, api_key: str):
+    """Client du pool réservé le temps d'un appel (pas de fermeture par éviction entre-temps)"""
+    client = _get_client(provider, api_key)
+    _leases[id(client)] = _leases.get(id(client), 0) + 1
+    try:
+        yield client
+    finally:
+        remaining = _leases.pop(id(client)) - 1
+        if remaining:
+            _leases[id(client)] = remaining
+        elif _retired.pop(id(client), None) is not None:
+            _schedule_close(client)
+
+
+def _get_semaphore(provider: str) -> asyncio.Semaphore:
+    sem = _semaphores.get(provider)
+    if sem is None:
+        sem = asyncio.Semaphore(settings.AI_MAX_CONCURRENCY_PER_PROVIDER)
+        _semaphores[provider] = sem
+    return sem
+
+
+async def _close_client(client):
+    try:
+        if hasattr(client, "aio"):  # google-genai
+            await client.aio.aclose()
+        elif hasattr(client, "close"):
+            await client.close()
+    except Exception as e:
+        logger.debug(f"AI client close error: {e}")
+
+
+def _schedule_close(client):
+    try:
+        task = asyncio.get_running_loop().create_task(_close_client(client))
+    except RuntimeError:
+        return
+    _close_tasks.add(task)
+    task.add_done_callback(_close_tasks.discard)
+
+
+async def close_ai_clients():
+    """Ferme tous les clients du pool (arrêt de l'application)"""
+    clients = list(_clients.values()) + list(_retired.values())
+    _clients.clear()
+    _retired.clear()
+    for client in clients:
+        await _close_client(client)
+    if _close_tasks:
+        await asyncio.gather(*_close_tasks, return_exceptions=True)
+
+
+# ============================================
+# APPELS
+# ============================================
+
+async def _call_chat_completions(client, model: str, system_message: Optional[str],
+                                 user_message: str, json_mode: bool) -> str:
+    messages = []
+    if system_message:
+        messages.append({"role": "system", "content": system_message})
+    messages.append({"role": "user", "content": user_message})
+    kwargs = {"model": model, "messages": messages}
+    if json_mode:
+        kwargs["response_format"] = {"type": "json_object"}
+    response = await client.chat.completions.create(**kwargs)
+    return response.choices[0].message.content
+
+
+async def _call_google(client, model: str, system_message: Optional[str], user_message: str) -> str:
+    config = genai_types.GenerateContentConfig(system_instruction=system_message) if system_message else None
+    response = await client.aio.models.generate_content(model=model, contents=user_message, config=config)
+    return response.text
+
+
+async def complete(provider: str, api_key: str, model: str, system_message: Optional[str],
+                   user_message: str, json_mode: bool = False, timeout: Optional[float] = None) -> str:
+    """
+    Appel de complétion non bloquant.
+    La concurrence est limitée par fournisseur ; le timeout couvre l'attente
+    d'un créneau et l'appel lui-même.
+    """
+    custom = _custom_providers.get(provider)
+    timeout = timeout or settings.AI_TIMEOUT_SECONDS
+
+    async def _run(client):
+        async with _get_semaphore(provider):
+            if custom:
+                return await custom(api_key, model, system_message, user_message, json_mode)
+            if provider == "google":
+                return await _call_google(client, model, system_message, user_message)
+            return await _call_chat_completions(client, model, system_message, user_message, json_mode)
+
+    with contextlib.nullcontext() if custom else borrow_client(provider, api_key) as client:
+        try:
+            content = await asyncio.wait_for(_run(client), timeout=timeout)
+        except asyncio.TimeoutError:
+            raise AIProviderTimeout(provider, f"timeout après {timeout:g}s")
+
+    if not content:
+        raise AIProviderError(provider, "réponse vide")
+    return content
+
+
+async def _stream_chat_completions(client, model: str, system_message: Optional[str],
+                                   user_message: str) -> AsyncIterator[str]:
+    messages = []
+    if system_message:
+        messages.append({"role": "system", "content": system_message})
+    messages.append({"role": "user", "content": user_message})
+    response = await client.chat.completions.create(model=model, messages=messages, stream=True)
+    try:
+        async for chunk in response:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+    finally:
+        # Ferme la connexion HTTP amont si le consommateur abandonne
+        await response.close()
+
+
+async def _stream_google(client, model: str, system_message: Optional[str],
+                         user_message: str) -> AsyncIterator[str]:
+    config = genai_types.GenerateContentConfig(system_instruction=system_message) if system_message else None
+    response = await client.aio.models.generate_content_stream(model=model, contents=user_message, config=config)
+    try:
+        async for chunk in response:
+            if chunk.text:
+                yield chunk.text
+    finally:
+        if hasattr(response, "aclose"):
+            await response.aclose()
+
+
+async def stream(provider: str, api_key: str, model: str, system_message: Optional[str],
+                 user_message: str, timeout: Optional[float] = None) -> AsyncIterator[str]:
+    """
+    Complétion en streaming : produit les fragments de texte au fil de l'eau.
+    timeout s'applique à l'attente de chaque fragment. Fermer le générateur
+    (aclose, annulation) interrompt l'appel amont et libère le créneau.
+    """
+    custom = _custom_providers.get(provider)
+    timeout = timeout or settings.AI_TIMEOUT_SECONDS
+
+    with contextlib.nullcontext() if custom else borrow_client(provider, api_key) as client:
+        async with _get_semaphore(provider):
+            if custom:
+                if hasattr(custom, "stream"):
+                    upstream = custom.stream(api_key, model, system_message, user_message)
+                else:
+                    upstream = _single_chunk(custom(api_key, model, system_message, user_message, False))
+            elif provider == "google":
+                upstream = _stream_google(client, model, system_message, user_message)
+            else:
+                upstream = _stream_chat_completions(client, model, system_message, user_message)
+
+            emitted = False
+            try:
+                while True:
+                    try:
+                        chunk = await asyncio.wait_for(upstream.__anext__(), timeout=timeout)
+                    except StopAsyncIteration:
+                        break
+                    except asyncio.TimeoutError:
+                        raise AIProviderTimeout(provider, f"timeout après {timeout:g}s")
+                    emitted = True
+                    yield chunk
+            finally:
+                await upstream.aclose()
+
+    if not emitted:
+        raise AIProviderError(provider, "réponse vide")
+
+
+async def _single_chunk(awaitable: Awaitable[str]) -> AsyncIterator[str]:
+    yield await awaitable
+
+
+def provider_stats() -> dict:
+    """État du pool (diagnostic)"""
+    return {
+        "pooled_clients": len(_clients),
+        "retired_clients": len(_retired),
+        "max_concurrency_per_provider": settings.AI_MAX_CONCURRENCY_PER_PROVIDER,
+        "in_flight": {
+            p: settings.AI_MAX_CONCURRENCY_PER_PROVIDER - s._value for p, s in _semaphores.items()
+        },
+        "health": provider_health.snapshot(),
+    }
+
+
+# ============================================
+# SANTÉ DES FOURNISSEURS (EWMA) ET CLASSEMENT
+# ============================================
+
+class ProviderHealth:
+    """Moyennes mobiles exponentielles de la latence et du taux d'erreur par fournisseur"""
+
+    def __init__(self, alpha: float = 0.2, prior_latency: float = 5.0):
+        self.alpha = alpha
+        self.prior_latency = prior_latency
+        self._latency: Dict[str, float] = {}
+        self._error_rate: Dict[str, float] = {}
+
+    def _ewma(self, table: Dict[str, float], provider: str, value: float, prior: float):
+        previous = table.get(provider, prior)
+        table[provider] = self.alpha * value + (1 - self.alpha) * previous
+
+    def record_success(self, provider: str, latency: float):
+        self._ewma(self._latency, provider, latency, latency)
+        self._ewma(self._error_rate, provider, 0.0, 0.0)
+
+    def record_failure(self, provider: str, latency: Optional[float] = None):
+        self._ewma(self._error_rate, provider, 1.0, 0.0)
+        if latency is not None:
+            self._ewma(self._latency, provider, latency, latency)
+
+    def record_abandoned(self, provider: str, elapsed: float):
+        """Appel annulé car un autre a gagné : elapsed est une borne basse de la latence"""
+        if elapsed > self._latency.get(provider, 0.0):
+            self._ewma(self._latency, provider, elapsed, elapsed)
+
+    def score(self, provider: str) -> float:
+        """Latence attendue pénalisée par le taux d'erreur (plus petit = meilleur)"""
+        latency = self._latency.get(provider, self.prior_latency)
+        return latency * (1 + 4 * self._error_rate.get(provider, 0.0))
+
+    def rank(self, candidates: List[Any], provider_of: Callable[[Any], str] = lambda c: c[0]) -> List[Any]:
+        """Trie des candidats par score ; l'ordre d'origine départage (priorité par défaut)"""
+        indexed = list(enumerate(candidates))
+        indexed.sort(key=lambda item: (self.score(provider_of(item[1])), item[0]))
+        return [candidate for _, candidate in indexed]
+
+    def reset(self, provider: Optional[str] = None):
+        if provider is None:
+            self._latency.clear()
+            self._error_rate.clear()
+        else:
+            self._latency.pop(provider, None)
+            self._error_rate.pop(provider, None)
+
+    def snapshot(self) -> dict:
+        providers = set(self._latency) | set(self._error_rate)
+        return {
+            p: {
+                "latency_ewma": round(self._latency.get(p, self.prior_latency), 3),
+                "error_rate_ewma": round(self._error_rate.get(p, 0.0), 3),
+            }
+            for p in sorted(providers)
+        }
+
+
+provider_health = ProviderHealth(
+    alpha=settings.AI_EWMA_ALPHA,
+    prior_latency=settings.AI_HEDGE_DELAY_SECONDS,
+)
+
+
+# ============================================
+# REQUÊTES COUVERTES (HEDGING)
+# ============================================
+
+Candidate = Tuple[str, str, str]  # (provider, api_key, model)
+
+
+async def complete_hedged(candidates: List[Candidate], system_message: Optional[str], user_message: str,
+                          json_mode: bool = False, parse: Optional[Callable[[str], Any]] = None,
+                          hedge_delay: Optional[float] = None, timeout: Optional[float] = None,
+                          hedge: Optional[bool] = None, preferred: Optional[str] = None) -> Tuple[Any, str, str]:
+    """
+    Envoie le prompt au meilleur fournisseur ; si aucune réponse après
+    hedge_delay (ou en cas d'échec), lance le suivant. Le premier succès gagne,
+    les appels restants sont annulés.
+
+    parse : transformation appliquée à la réponse (ex. json.loads) ; si elle
+    lève une exception, la réponse compte comme un échec du fournisseur.
+    preferred : fournisseur choisi par l'utilisateur, toujours essayé en premier.
+
+    Retourne (résultat, provider, model).
+    """
+    if not candidates:
+        raise AIProviderError("hedge", "aucun fournisseur disponible")
+
+    hedge = settings.AI_HEDGE_ENABLED if hedge is None else hedge
+    hedge_delay = settings.AI_HEDGE_DELAY_SECONDS if hedge_delay is None else hedge_delay
+    timeout = timeout or settings.AI_TIMEOUT_SECONDS
+    queue = provider_health.rank(candidates)
+    if preferred:
+        queue.sort(key=lambda c: c[0] != preferred)
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+
+    running: Dict[asyncio.Task, Tuple[Candidate, float]] = {}
+    last_error: Optional[Exception] = None
+
+    async def _attempt(candidate: Candidate):
+        provider, api_key, model = candidate
+        text = await complete(provider, api_key, model, system_message, user_message,
+                              json_mode=json_mode, timeout=max(deadline - loop.time(), 0.001))
+        return parse(text) if parse else text
+
+    def _launch_next():
+        candidate = queue.pop(0)
+        task = asyncio.create_task(_attempt(candidate))
+        running[task] = (candidate, time.monotonic())
+
+    _launch_next()
+    try:
+        while running:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            wait_for = min(hedge_delay, remaining) if (hedge and queue) else remaining
+            done, _ = await asyncio.wait(running.keys(), timeout=wait_for, return_when=asyncio.FIRST_COMPLETED)
+
+            if not done:
+                # Budget de latence dépassé : on couvre avec le fournisseur suivant
+                if hedge and queue:
+                    logger.info(f"AI hedge: {len(running)} appel(s) lent(s), lancement de {queue[0][0]}")
+                    _launch_next()
+                continue
+
+            for task in done:
+                (provider, _, model), started = running.pop(task)
+                elapsed = time.monotonic() - started
+                try:
+                    result = task.result()
+                except Exception as e:
+                    provider_health.record_failure(provider, elapsed)
+                    logger.warning(f"AI provider {provider} failed after {elapsed:.2f}s: {e}")
+                    last_error = e
+                    continue
+                provider_health.record_success(provider, elapsed)
+                return result, provider, model
+
+            # Que des échecs : on passe au suivant sans attendre le budget
+            if not running and queue:
+                _launch_next()
+    finally:
+        for task, ((provider, _, _), started) in running.items():
+            task.cancel()
+            provider_health.record_abandoned(provider, time.monotonic() - started)
+        if running:
+            await asyncio.gather(*running.keys(), return_exceptions=True)
+
+    if last_error is None:
+        last_error = AIProviderTimeout("hedge", f"timeout après {timeout:g}s")
+    raise last_error
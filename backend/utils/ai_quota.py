@@ -1,41 +1,85 @@
 from datetime import date
+from typing import Optional
+
 from fastapi import HTTPException
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from utils.cache import TTLCache, get_invalidation_bus
 
 DAILY_QUOTA = 10  # valeur par défaut si rien en DB
 
+# Quota configuré par l'admin, mis en cache et invalidé via le bus à chaque modification
+_QUOTA_LIMIT_KEY = "ai_daily_quota"
+_limit_cache = TTLCache(max_entries=1, ttl=300)
+
+
+def _on_quota_invalidated(key: Optional[str]):
+    _limit_cache.clear()
+
+
+get_invalidation_bus().subscribe("ai_quota", _on_quota_invalidated)
+
+
+async def invalidate_quota_limit():
+    """À appeler après modification du quota dans platform_settings (tous les workers)"""
+    await get_invalidation_bus().publish("ai_quota")
+
 
 async def get_quota_limit(db) -> int:
-    """Lit le quota journalier configuré par l'admin depuis la DB."""
-    doc = await db.platform_settings.find_one({"key": "ai_daily_quota"})
-    if doc and isinstance(doc.get("value"), int) and doc["value"] > 0:
-        return doc["value"]
-    return DAILY_QUOTA
-
-
-async def check_and_increment_quota(user_id: str, db) -> None:
-    """Vérifie le quota IA journalier et l'incrémente. Lève 429 si dépassé.
-    Les admins et les utilisateurs avec leur propre clé sont exemptés (géré en amont)."""
-    user = await db.users.find_one({"id": user_id}, {"role": 1})
-    if user and user.get("role") == "admin":
+    """Lit le quota journalier configuré par l'admin depuis la DB (mis en cache)."""
+    quota = _limit_cache.get(_QUOTA_LIMIT_KEY)
+    if quota is None:
+        doc = await db.platform_settings.find_one({"key": "ai_daily_quota"})
+        if doc and isinstance(doc.get("value"), int) and doc["value"] > 0:
+            quota = doc["value"]
+        else:
+            quota = DAILY_QUOTA
+        _limit_cache.set(_QUOTA_LIMIT_KEY, quota)
+    return quota
+
+
+async def _consume(db, user_id: str, today: str, quota: int, upsert: bool) -> Optional[dict]:
+    """Incrémente call_count seulement s'il reste du quota (un seul aller-retour)"""
+    return await db.ai_usage.find_one_and_update(
+        {"user_id": user_id, "date": today, "call_count": {"$lt": quota}},
+        {"$inc": {"call_count": 1}},
+        projection={"call_count": 1},
+        upsert=upsert,
+        return_document=ReturnDocument.AFTER,
+    )
+
+
+async def check_and_increment_quota(user_id: str, db, role: Optional[str] = None) -> None:
+    """Vérifie le quota IA journalier et l'incrémente atomiquement. Lève 429 si dépassé.
+    Les admins et les utilisateurs avec leur propre clé sont exemptés (géré en amont).
+    role : rôle déjà connu (get_current_user) ; sinon lu depuis le cache des comptes."""
+    if role is None:
+        from utils.auth import get_user_state
+        state = await get_user_state(user_id, db)
+        role = state["role"] if state else None
+    if role == "admin":
         return
 
     quota = await get_quota_limit(db)
     today = date.today().isoformat()
-    doc = await db.ai_usage.find_one({"user_id": user_id, "date": today})
-    count = doc["call_count"] if doc else 0
 
-    if count >= quota:
+    # Si le document du jour existe déjà avec call_count >= quota, l'upsert tente
+    # une insertion qui échoue sur l'index unique (user_id, date) : quota atteint.
+    # Une DuplicateKeyError peut aussi venir d'une première insertion concurrente,
+    # d'où le second essai sans upsert.
+    try:
+        doc = await _consume(db, user_id, today, quota, upsert=True)
+    except DuplicateKeyError:
+        doc = await _consume(db, user_id, today, quota, upsert=False)
+
+    if doc is None:
+        count = await get_usage_today(user_id, db)
         raise HTTPException(
             status_code=429,
             detail={"code": "quota_exceeded", "calls_today": count, "quota": quota}
         )
 
-    await db.ai_usage.update_one(
-        {"user_id": user_id, "date": today},
-        {"$inc": {"call_count": 1}},
-        upsert=True
-    )
-
 
 async def get_usage_today(user_id: str, db) -> int:
     today = date.today().isoformat()
@@ -11,6 +11,7 @@ from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 
 from config import settings
 from models import TokenData
+from utils.cache import TTLCache, get_invalidation_bus
 
 # Password hashing
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
@@ -60,6 +61,42 @@ def get_db():
     pass
 
 
+# Cache de l'état des comptes (is_active, role) pour éviter un find_one par requête
+_user_cache = TTLCache(
+    max_entries=settings.USER_CACHE_MAX_ENTRIES,
+    ttl=settings.USER_CACHE_TTL_SECONDS,
+)
+
+
+def _on_user_invalidated(user_id: Optional[str]):
+    if user_id is None:
+        _user_cache.clear()
+    else:
+        _user_cache.invalidate(user_id)
+
+
+get_invalidation_bus().subscribe("user", _on_user_invalidated)
+
+
+async def invalidate_user_cache(user_id: Optional[str] = None):
+    """À appeler après toute modification de is_active / role (tous les workers)"""
+    await get_invalidation_bus().publish("user", user_id)
+
+
+async def get_user_state(user_id: str, db) -> Optional[dict]:
+    """État du compte (is_active, role), servi depuis le cache si possible"""
+    state = _user_cache.get(user_id)
+    if state is None:
+        user = await db.users.find_one({"id": user_id}, {"_id": 0, "is_active": 1, "role": 1})
+        state = {
+            "exists": user is not None,
+            "is_active": user.get("is_active", True) if user else False,
+            "role": user.get("role", "standard") if user else None,
+        }
+        _user_cache.set(user_id, state)
+    return state if state["exists"] else None
+
+
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db=Depends(get_db),
@@ -77,8 +114,8 @@ async def get_current_user(
     if token_data is None or token_data.user_id is None:
         raise credentials_exception
 
-    user = await db.users.find_one({"id": token_data.user_id}, {"is_active": 1})
-    if not user or not user.get("is_active", True):
+    user = await get_user_state(token_data.user_id, db)
+    if not user or not user["is_active"]:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Compte désactivé",
@@ -87,6 +124,7 @@ async def get_current_user(
 
     return {
         "user_id": token_data.user_id,
-        "source": token_data.source or "webapp"
+        "source": token_data.source or "webapp",
+        "role": user["role"]
     }
 
@@ -0,0 +1,190 @@
+"""
+JobTracker SaaS - Caches en mémoire et bus d'invalidation
+- TTLCache : LRU borné avec expiration, local au process
+- Bus d'invalidation : local par défaut, Redis (ou compatible) si REDIS_URL est
+  défini pour propager les invalidations entre workers
+"""
+
+import asyncio
+import json
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Union
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+try:
+    import redis.asyncio as aioredis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+_MISSING = object()
+
+
+class TTLCache:
+    """Cache LRU borné en taille, chaque entrée expire après ttl secondes"""
+
+    def __init__(self, max_entries: int = 1000, ttl: float = 60.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data: "OrderedDict[Any, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        entry = self._data.get(key, _MISSING)
+        if entry is _MISSING:
+            self.misses += 1
+            return default
+        value, expires_at = entry
+        if expires_at < time.monotonic():
+            del self._data[key]
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key, value, ttl: Optional[float] = None):
+        self._data[key] = (value, time.monotonic() + (self.ttl if ttl is None else ttl))
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+    def invalidate(self, key):
+        self._data.pop(key, None)
+
+    def clear(self):
+        self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self) -> dict:
+        return {"size": len(self._data), "max_entries": self.max_entries, "hits": self.hits, "misses": self.misses}
+
+
+Handler = Callable[[Optional[str]], Union[None, Awaitable[None]]]
+
+
+class LocalInvalidationBus:
+    """Bus d'invalidation mono-process : les handlers sont appelés directement"""
+
+    def __init__(self):
+        self._handlers: Dict[str, List[Handler]] = {}
+
+    def subscribe(self, topic: str, handler: Handler):
+        self._handlers.setdefault(topic, []).append(handler)
+
+    async def _dispatch(self, topic: str, key: Optional[str]):
+        for handler in self._handlers.get(topic, []):
+            try:
+                result = handler(key)
+                if asyncio.iscoroutine(result):
+                    await result
+            except Exception as e:
+                logger.error(f"Invalidation handler error ({topic}): {e}")
+
+    async def publish(self, topic: str, key: Optional[str] = None, local: bool = True):
+        """
+        Invalide `key` (ou tout le topic si None). local=False : seulement les
+        autres workers (l'appelant a déjà mis à jour son propre état).
+        """
+        if local:
+            await self._dispatch(topic, key)
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+
+class RedisInvalidationBus(LocalInvalidationBus):
+    """
+    Bus partagé entre workers via pub/sub Redis. Fonctionne avec tout client
+    exposant l'API redis.asyncio (publish / pubsub), y compris un stand-in local.
+    """
+
+    CHANNEL = "jobtracker:invalidate"
+
+    def __init__(self, client):
+        super().__init__()
+        self._client = client
+        self._origin = uuid.uuid4().hex
+        self._task: Optional[asyncio.Task] = None
+        self._pubsub = None
+
+    async def publish(self, topic: str, key: Optional[str] = None, local: bool = True):
+        # Application locale immédiate, puis diffusion aux autres workers
+        if local:
+            await self._dispatch(topic, key)
+        try:
+            await self._client.publish(
+                self.CHANNEL, json.dumps({"origin": self._origin, "topic": topic, "key": key})
+            )
+        except Exception as e:
+            logger.error(f"Invalidation publish failed ({topic}): {e}")
+
+    async def start(self):
+        self._pubsub = self._client.pubsub()
+        await self._pubsub.subscribe(self.CHANNEL)
+        self._task = asyncio.create_task(self._listen())
+
+    async def _listen(self):
+        while True:
+            try:
+                message = await self._pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                if not message:
+                    continue
+                payload = json.loads(message["data"])
+                if payload.get("origin") == self._origin:
+                    continue
+                await self._dispatch(payload["topic"], payload.get("key"))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Invalidation listener error: {e}")
+                await asyncio.sleep(1)
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._pubsub:
+            await self._pubsub.unsubscribe(self.CHANNEL)
+            await self._pubsub.close()
+            self._pubsub = None
+
+
+def _create_bus() -> LocalInvalidationBus:
+    if settings.REDIS_URL:
+        if REDIS_AVAILABLE:
+            return RedisInvalidationBus(aioredis.from_url(settings.REDIS_URL))
+        logger.warning("REDIS_URL défini mais le paquet redis n'est pas installé : invalidation locale uniquement")
+    return LocalInvalidationBus()
+
+
+_bus = _create_bus()
+
+
+def set_invalidation_bus(bus: LocalInvalidationBus):
+    """Remplace le bus (tests, stand-in Redis) en conservant les abonnements"""
+    global _bus
+    for topic, handlers in _bus._handlers.items():
+        for handler in handlers:
+            bus.subscribe(topic, handler)
+    _bus = bus
+
+
+def get_invalidation_bus() -> LocalInvalidationBus:
+    return _bus
@@ -0,0 +1,262 @@
+"""
+JobTracker SaaS - Extraction du texte des CV
+Le texte d'un CV (PDF, DOCX, TXT) est extrait une seule fois, dans un pool de
+processus (PyPDF2 / python-docx sont purement CPU), normalisé puis rangé dans
+db.cv_texts sous l'empreinte SHA-256 du fichier : l'upload déclenche
+l'extraction, et l'analyse, le matching et les lettres relisent ce texte sans
+jamais re-parser le fichier. Deux demandes simultanées pour le même fichier
+partagent la même extraction. La file du pool est bornée (CV_EXTRACT_QUEUE_SIZE)
+et un fichier qui dépasse le délai n'y bloque pas les suivants : le pool est recyclé.
+"""
+
+import asyncio
+import hashlib
+import io
+import logging
+import multiprocessing
+import re
+import threading
+import unicodedata
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+from config import settings
+
+try:
+    from PyPDF2 import PdfReader
+    PDF_SUPPORT = True
+except ImportError:
+    PDF_SUPPORT = False
+
+try:
+    from docx import Document as DocxDocument
+    DOCX_SUPPORT = True
+except ImportError:
+    DOCX_SUPPORT = False
+
+logger = logging.getLogger(__name__)
+
+CV_TEXT_COLLECTION = "cv_texts"
+CV_EXTENSIONS = (".pdf", ".docx", ".doc", ".txt")
+# À incrémenter quand l'extraction ou la normalisation change
+EXTRACTOR_VERSION = 1
+# En dessous, le fichier est considéré vide ou protégé
+MIN_TEXT_LENGTH = 50
+
+
+class CvTextError(Exception):
+    """Extraction impossible ; status_code à reprendre dans la HTTPException"""
+
+    def __init__(self, detail: str, status_code: int = 400):
+        # Les deux arguments dans args : l'exception traverse le pool de processus (pickle)
+        super().__init__(detail, status_code)
+        self.detail = detail
+        self.status_code = status_code
+
+
+def file_extension(filename: Optional[str], default: str = "") -> str:
+    if not filename or "." not in filename:
+        return default
+    return "." + filename.rsplit(".", 1)[-1].lower()
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+# ============================================
+# EXTRACTION (exécutée dans un processus du pool)
+# ============================================
+
+def normalize_text(text: str) -> str:
+    """NFC, espaces multiples réduits, lignes vides en trop supprimées"""
+    text = unicodedata.normalize("NFC", text).replace("\x00", "")
+    lines = [re.sub(r"[ \t\u00a0]+", " ", line).strip() for line in text.splitlines()]
+    return re.sub(r"\n{3,}", "\n\n", "\n".join(lines)).strip()
+
+
+def extract_cv_text(data: bytes, ext: str) -> str:
+    """Texte normalisé d'un CV ; lève CvTextError (message affichable)"""
+    if ext == ".txt":
+        text = data.decode("utf-8", errors="replace")
+
+    elif ext == ".pdf":
+        if not PDF_SUPPORT:
+            raise CvTextError("Support PDF non disponible. Installez PyPDF2.", 500)
+        try:
+            pdf_reader = PdfReader(io.BytesIO(data))
+            text = "\n".join(page_text for page_text in (page.extract_text() for page in pdf_reader.pages) if page_text)
+        except Exception as e:
+            raise CvTextError(f"Erreur lecture PDF: {str(e)}")
+
+    elif ext in (".docx", ".doc"):
+        if not DOCX_SUPPORT:
+            raise CvTextError("Support DOCX non disponible. Installez python-docx.", 500)
+        try:
+            doc = DocxDocument(io.BytesIO(data))
+            text_parts = [para.text for para in doc.paragraphs if para.text.strip()]
+            # Also extract from tables
+            for table in doc.tables:
+                for row in table.rows:
+                    for cell in row.cells:
+                        if cell.text.strip():
+                            text_parts.append(cell.text)
+            text = "\n".join(text_parts)
+        except Exception as e:
+            raise CvTextError(f"Erreur lecture DOCX: {str(e)}")
+
+    else:
+        raise CvTextError(f"Format non supporté. Utilisez: {', '.join(CV_EXTENSIONS)}")
+
+    return normalize_text(text)
+
+
+# ============================================
+# POOL
+# ============================================
+
+_pool: Optional[Executor] = None
+# Extractions soumises et pas encore terminées (y compris celles abandonnées au délai)
+_pending = 0
+_pending_lock = threading.Lock()
+# Empreinte -> extraction en cours (partagée entre demandes simultanées)
+_inflight: Dict[str, "asyncio.Future"] = {}
+
+
+def _get_pool() -> Executor:
+    global _pool
+    if _pool is None:
+        if settings.CV_EXTRACT_PROCESSES > 0:
+            # spawn : pas de fork d'un process qui porte déjà la boucle, Motor et leurs threads
+            _pool = ProcessPoolExecutor(
+                max_workers=settings.CV_EXTRACT_PROCESSES,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        else:
+            _pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="cv_text")
+    return _pool
+
+
+def _reset_pool(cancel_futures: bool = True):
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=cancel_futures)
+        _pool = None
+
+
+def _release(_job=None):
+    global _pending
+    with _pending_lock:
+        _pending -= 1
+
+
+async def _extract(data: bytes, ext: str) -> str:
+    global _pending
+    capacity = max(settings.CV_EXTRACT_PROCESSES, 1) + settings.CV_EXTRACT_QUEUE_SIZE
+    with _pending_lock:
+        if _pending >= capacity:
+            raise CvTextError("Extraction des CV momentanément saturée, réessayez dans quelques secondes", 503)
+        _pending += 1
+
+    try:
+        try:
+            job = _get_pool().submit(extract_cv_text, data, ext)
+        except BaseException:
+            _release()
+            raise
+        # Libéré quand l'extraction se termine réellement, pas au délai
+        job.add_done_callback(_release)
+        return await asyncio.wait_for(asyncio.wrap_future(job), timeout=settings.CV_EXTRACT_TIMEOUT_SECONDS)
+    except asyncio.TimeoutError:
+        if job.running():
+            # Le fichier occupe toujours un processus : les extractions suivantes passent
+            # par un nouveau pool (l'ancien s'arrête après ses tâches déjà commencées)
+            logger.warning("[CV] Extraction au-delà du délai, pool d'extraction recyclé")
+            _reset_pool(cancel_futures=False)
+        raise CvTextError("Extraction du texte du CV trop longue", 500)
+    except BrokenProcessPool as e:
+        _reset_pool()
+        raise CvTextError(f"Pool d'extraction interrompu: {e}", 500)
+
+
+# ============================================
+# CACHE
+# ============================================
+
+async def cached_cv_text(db, file_hash: Optional[str]) -> Optional[str]:
+    """Texte déjà extrait pour cette empreinte (None si inconnu)"""
+    if not file_hash:
+        return None
+    entry = await db[CV_TEXT_COLLECTION].find_one(
+        {"hash": file_hash, "version": EXTRACTOR_VERSION}, {"_id": 0, "text": 1}
+    )
+    return entry["text"] if entry else None
+
+
+async def _extract_and_store(db, data: bytes, ext: str, file_hash: str) -> str:
+    text = await _extract(data, ext)
+    await db[CV_TEXT_COLLECTION].update_one(
+        {"hash": file_hash},
+        {"$set": {
+            "text": text,
+            "format": ext.lstrip("."),
+            "chars": len(text),
+            "version": EXTRACTOR_VERSION,
+            "extracted_at": datetime.now(timezone.utc),
+        }},
+        upsert=True
+    )
+    return text
+
+
+async def get_cv_text(db, data: bytes, ext: str, file_hash: Optional[str] = None) -> str:
+    """
+    Texte du fichier : lu dans db.cv_texts, sinon extrait dans le pool puis enregistré.
+    Lève CvTextError si l'extraction échoue ou si le texte est trop court.
+    """
+    file_hash = file_hash or await asyncio.to_thread(content_hash, data)
+    text = await cached_cv_text(db, file_hash)
+    if text is None:
+        future = _inflight.get(file_hash)
+        if future is None:
+            future = asyncio.ensure_future(_extract_and_store(db, data, ext, file_hash))
+            _inflight[file_hash] = future
+            future.add_done_callback(lambda _: _inflight.pop(file_hash, None))
+        text = await asyncio.shield(future)
+    if len(text) < MIN_TEXT_LENGTH:
+        raise CvTextError("Impossible d'extraire le texte du CV. Le fichier est peut-être vide ou protégé.")
+    return text
+
+
+async def prepare_cv_text(db, data: bytes, filename: Optional[str], file_hash: str) -> bool:
+    """Extraction à l'upload d'un CV ; les échecs sont journalisés sans bloquer l'upload"""
+    ext = file_extension(filename)
+    if ext not in CV_EXTENSIONS:
+        return False
+    try:
+        await get_cv_text(db, data, ext, file_hash)
+        return True
+    except CvTextError as e:
+        logger.info(f"[CV] Texte non extrait ({filename}): {e.detail}")
+    except Exception as e:
+        logger.warning(f"[CV] Extraction impossible ({filename}): {e}")
+    return False
+
+
+async def document_cv_text(db, user_id: str, document_id: Optional[str] = None) -> Optional[str]:
+    """Texte extrait d'un CV de l'utilisateur (sinon son CV par défaut, puis le plus récent)"""
+    query = {"user_id": user_id, "document_type": "cv", "content_hash": {"$exists": True}}
+    if document_id:
+        document = await db.documents.find_one({**query, "id": document_id}, {"_id": 0, "content_hash": 1})
+    else:
+        document = await db.documents.find_one(
+            query, {"_id": 0, "content_hash": 1}, sort=[("is_default", -1), ("created_at", -1)]
+        )
+    return await cached_cv_text(db, document["content_hash"]) if document else None
+
+
+def shutdown_cv_text():
+    """Arrête le pool d'extraction (arrêt de l'application)"""
+    _reset_pool()
@@ -0,0 +1,192 @@
+"""
+JobTracker SaaS - Export Excel en flux
+Classeur openpyxl en mode write-only construit dans un thread de travail :
+la boucle d'événements lit le curseur Mongo et transmet les lignes par lots via
+une file bornée, le classeur est écrit dans un fichier temporaire puis renvoyé
+par morceaux. Ni la mémoire ni la boucle ne dépendent de la taille de l'export.
+"""
+
+import asyncio
+import logging
+import os
+import queue
+import tempfile
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Callable, List, Optional
+
+from fastapi.responses import StreamingResponse
+
+logger = logging.getLogger(__name__)
+
+try:
+    import openpyxl
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Alignment, Border, Font, NamedStyle, PatternFill, Side
+    from openpyxl.utils import get_column_letter
+    OPENPYXL_AVAILABLE = True
+except ImportError:
+    OPENPYXL_AVAILABLE = False
+
+XLSX_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+ROW_BATCH_SIZE = 500
+QUEUE_MAX_BATCHES = 4
+# Attente maximale d'une place dans la file avant de revérifier le thread d'écriture
+PUT_TIMEOUT_SECONDS = 0.5
+FILE_CHUNK_SIZE = 64 * 1024
+
+_DONE = object()
+
+
+@dataclass
+class SheetSpec:
+    """Une feuille : en-têtes, largeurs et lignes (listes de valeurs) produites en asynchrone"""
+    title: str
+    headers: List[str]
+    rows: AsyncIterator[list]
+    widths: List[int] = field(default_factory=list)
+    styled: bool = True
+    freeze_header: bool = True
+    # Colonnes (index 0) à surligner pour une ligne donnée (ex. favoris)
+    highlight: Optional[Callable[[list], List[int]]] = None
+
+
+def _register_styles(wb):
+    thin = Side(style="thin")
+    border = Border(left=thin, right=thin, top=thin, bottom=thin)
+
+    header = NamedStyle(name="jt_header")
+    header.font = Font(bold=True, color="FFFFFF")
+    header.fill = PatternFill(start_color="1a365d", end_color="1a365d", fill_type="solid")
+    header.alignment = Alignment(horizontal="center")
+    header.border = border
+
+    cell = NamedStyle(name="jt_cell")
+    cell.border = border
+
+    gold = NamedStyle(name="jt_gold")
+    gold.border = border
+    gold.fill = PatternFill(start_color="c4a052", end_color="c4a052", fill_type="solid")
+
+    for style in (header, cell, gold):
+        wb.add_named_style(style)
+
+
+def _write_workbook(path: str, specs: List[SheetSpec], channels: List[queue.Queue]):
+    """Exécuté dans un thread : consomme les lots de lignes et écrit le classeur"""
+    wb = openpyxl.Workbook(write_only=True)
+    _register_styles(wb)
+
+    for spec, channel in zip(specs, channels):
+        ws = wb.create_sheet(spec.title)
+        for col, width in enumerate(spec.widths, 1):
+            ws.column_dimensions[get_column_letter(col)].width = width
+        if spec.freeze_header:
+            ws.freeze_panes = "A2"
+
+        def styled(value, style):
+            cell = WriteOnlyCell(ws, value=value)
+            cell.style = style
+            return cell
+
+        if spec.headers:
+            ws.append([styled(h, "jt_header") for h in spec.headers] if spec.styled else spec.headers)
+        while True:
+            batch = channel.get()
+            if batch is _DONE:
+                break
+            for row in batch:
+                if not spec.styled:
+                    ws.append(row)
+                    continue
+                gold = set(spec.highlight(row)) if spec.highlight else ()
+                ws.append([styled(v, "jt_gold" if i in gold else "jt_cell") for i, v in enumerate(row)])
+
+    wb.save(path)
+
+
+async def _feed(spec: SheetSpec, channel: queue.Queue, writer: asyncio.Future):
+    """Lit les lignes d'une feuille et les pousse par lots (attente dans un thread si la file est pleine)"""
+    batch = []
+    async for row in spec.rows:
+        batch.append(row)
+        if len(batch) >= ROW_BATCH_SIZE:
+            await _put(channel, batch, writer)
+            batch = []
+    if batch:
+        await _put(channel, batch, writer)
+    await _put(channel, _DONE, writer)
+
+
+async def _offer(channel: queue.Queue, item, writer: asyncio.Future) -> bool:
+    """
+    Dépose l'élément, en attendant une place dans un thread (la boucle reste libre).
+    False si le thread d'écriture s'est arrêté : il ne viderait plus la file.
+    """
+    while not writer.done():
+        try:
+            await asyncio.to_thread(channel.put, item, True, PUT_TIMEOUT_SECONDS)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+async def _put(channel: queue.Queue, item, writer: asyncio.Future):
+    if not await _offer(channel, item, writer):
+        # Le thread d'écriture a échoué : on remonte son exception
+        writer.result()
+        raise RuntimeError("Écriture du classeur interrompue")
+
+
+async def build_xlsx(specs: List[SheetSpec]) -> str:
+    """Construit le classeur dans un fichier temporaire et retourne son chemin"""
+    fd, path = tempfile.mkstemp(prefix="jobtracker_export_", suffix=".xlsx")
+    os.close(fd)
+    channels = [queue.Queue(maxsize=QUEUE_MAX_BATCHES) for _ in specs]
+    writer = asyncio.ensure_future(asyncio.to_thread(_write_workbook, path, specs, channels))
+    try:
+        # Les feuilles sont écrites dans l'ordre : on les alimente séquentiellement
+        for spec, channel in zip(specs, channels):
+            await _feed(spec, channel, writer)
+        await writer
+    except BaseException:
+        # Débloque le thread, attend sa fin puis supprime le fichier partiel
+        for channel in channels:
+            await _offer(channel, _DONE, writer)
+        await asyncio.gather(writer, return_exceptions=True)
+        _remove(path)
+        raise
+    return path
+
+
+def _remove(path: str):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+async def iter_file(path: str, delete: bool = True) -> AsyncIterator[bytes]:
+    """Lit un fichier par morceaux hors de la boucle, puis le supprime"""
+    try:
+        with open(path, "rb") as f:
+            while True:
+                chunk = await asyncio.to_thread(f.read, FILE_CHUNK_SIZE)
+                if not chunk:
+                    break
+                yield chunk
+    finally:
+        if delete:
+            _remove(path)
+
+
+async def xlsx_response(specs: List[SheetSpec], filename: str) -> StreamingResponse:
+    path = await build_xlsx(specs)
+    return StreamingResponse(
+        iter_file(path),
+        media_type=XLSX_MEDIA_TYPE,
+        headers={
+            "Content-Disposition": f"attachment; filename={filename}",
+            "Content-Length": str(os.path.getsize(path)),
+        }
+    )
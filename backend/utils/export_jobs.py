@@ -0,0 +1,403 @@
+"""
+JobTracker SaaS - Exports asynchrones
+Un POST crée un document db.export_jobs (pending) ; le worker, lancé par le
+scheduler et juste après la création, réclame les jobs de façon atomique
+(bail renouvelé pendant la production), écrit l'artefact JSON / CSV / XLSX puis
+le range sur disque local ou dans GridFS. Le téléchargement supporte Range.
+Une empreinte des données (version par utilisateur tenue dans user_stats)
+permet de réutiliser l'artefact d'un export précédent si rien n'a changé.
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import shutil
+import tempfile
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator, Optional, Tuple
+
+from pymongo import ReturnDocument
+
+from config import settings
+from utils.user_stats import data_version
+from utils.excel_export import OPENPYXL_AVAILABLE, XLSX_MEDIA_TYPE, SheetSpec, build_xlsx
+from utils.export_stream import (
+    APPLICATION_CSV_HEADERS, APPLICATION_EXCEL_HEADERS, APPLICATION_EXCEL_WIDTHS,
+    INTERVIEW_CSV_HEADERS, INTERVIEW_EXCEL_WIDTHS, application_csv_row, application_excel_row,
+    interview_csv_row, iter_applications, iter_interviews, map_rows, stream_csv, stream_json
+)
+
+logger = logging.getLogger(__name__)
+
+EXPORT_KINDS = ("applications", "interviews")
+EXPORT_FORMATS = {
+    "json": "application/json",
+    "csv": "text/csv",
+    "xlsx": XLSX_MEDIA_TYPE,
+}
+# À incrémenter quand le contenu produit change (invalide les empreintes)
+ARTIFACT_VERSION = 1
+PROGRESS_EVERY = 500
+FILE_CHUNK_SIZE = 64 * 1024
+GRIDFS_BUCKET = "export_artifacts"
+
+_FILENAME_PREFIX = {"applications": "candidatures", "interviews": "entretiens"}
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def artifact_filename(job: dict) -> str:
+    day = (job.get("created_at") or "")[:10].replace("-", "")
+    return f"{_FILENAME_PREFIX[job['kind']]}_{day}.{job['format']}"
+
+
+def public_job(job: dict) -> dict:
+    """Vue API d'un job (sans les champs internes)"""
+    return {
+        "id": job["id"],
+        "kind": job["kind"],
+        "format": job["format"],
+        "status": job["status"],
+        "progress": job.get("progress", 0),
+        "processed": job.get("processed", 0),
+        "total": job.get("total"),
+        "size": job.get("size"),
+        "error": job.get("error"),
+        "created_at": job.get("created_at"),
+        "finished_at": job.get("finished_at"),
+        "download_url": f"/api/export/jobs/{job['id']}/download" if job["status"] == "done" else None,
+    }
+
+
+# ============================================
+# EMPREINTE DES DONNÉES
+# ============================================
+
+async def data_fingerprint(db, user_id: str, kind: str, fmt: str) -> str:
+    """
+    Empreinte des données exportées : version des candidatures et entretiens de
+    l'utilisateur (utils/user_stats.data_version), incrémentée à chaque écriture
+    à côté des deltas du rollup. Les deux collections comptent : les exports de
+    candidatures joignent les entretiens et inversement.
+    """
+    payload = f"{ARTIFACT_VERSION}|{kind}|{fmt}|{await data_version(db, user_id)}"
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+# ============================================
+# STOCKAGE DES ARTEFACTS
+# ============================================
+
+def _local_dir() -> str:
+    path = settings.EXPORT_JOBS_DIR or os.path.join(tempfile.gettempdir(), "jobtracker_exports")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def _remove(path: str):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def _gridfs(db):
+    from motor.motor_asyncio import AsyncIOMotorGridFSBucket
+    return AsyncIOMotorGridFSBucket(db, bucket_name=GRIDFS_BUCKET)
+
+
+async def _store_artifact(db, job: dict, src: str) -> dict:
+    """Range le fichier produit et retourne sa référence de stockage"""
+    if settings.EXPORT_JOBS_STORAGE == "gridfs":
+        bucket = _gridfs(db)
+        try:
+            with open(src, "rb") as f:
+                stream = bucket.open_upload_stream(
+                    artifact_filename(job), metadata={"job_id": job["id"], "user_id": job["user_id"]}
+                )
+                try:
+                    while True:
+                        chunk = await asyncio.to_thread(f.read, FILE_CHUNK_SIZE)
+                        if not chunk:
+                            break
+                        await stream.write(chunk)
+                    await stream.close()
+                except BaseException:
+                    await stream.abort()
+                    raise
+            return {"storage": "gridfs", "file_id": stream._id}
+        finally:
+            _remove(src)
+
+    dest = os.path.join(_local_dir(), f"{job['id']}.{job['format']}")
+    await asyncio.to_thread(shutil.move, src, dest)
+    return {"storage": "local", "path": dest}
+
+
+async def artifact_available(db, job: dict) -> bool:
+    artifact = job.get("artifact") or {}
+    if artifact.get("storage") == "local":
+        return os.path.exists(artifact.get("path", ""))
+    if artifact.get("storage") == "gridfs":
+        return await db[f"{GRIDFS_BUCKET}.files"].count_documents({"_id": artifact["file_id"]}, limit=1) > 0
+    return False
+
+
+async def read_artifact(db, job: dict, start: int, end: int) -> AsyncIterator[bytes]:
+    """Octets [start, end] (inclus) de l'artefact, par morceaux"""
+    remaining = end - start + 1
+    artifact = job["artifact"]
+    if artifact["storage"] == "gridfs":
+        stream = await _gridfs(db).open_download_stream(artifact["file_id"])
+        try:
+            stream.seek(start)
+            while remaining > 0:
+                chunk = await stream.read(min(FILE_CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
+        finally:
+            stream.close()
+        return
+
+    with open(artifact["path"], "rb") as f:
+        f.seek(start)
+        while remaining > 0:
+            chunk = await asyncio.to_thread(f.read, min(FILE_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+async def _delete_artifact(db, job: dict):
+    artifact = job.get("artifact") or {}
+    try:
+        if artifact.get("storage") == "local":
+            _remove(artifact["path"])
+        elif artifact.get("storage") == "gridfs":
+            await _gridfs(db).delete(artifact["file_id"])
+    except Exception as e:
+        logger.warning(f"[ExportJobs] Suppression artefact {job.get('id')} impossible: {e}")
+
+
+# ============================================
+# CRÉATION
+# ============================================
+
+async def create_export_job(db, user_id: str, kind: str, fmt: str) -> Tuple[dict, bool]:
+    """
+    Retourne (job, réutilisé). Un export terminé ou en cours avec la même
+    empreinte est renvoyé tel quel au lieu d'en créer un nouveau.
+    """
+    fingerprint = await data_fingerprint(db, user_id, kind, fmt)
+
+    existing = await db.export_jobs.find_one(
+        {"user_id": user_id, "fingerprint": fingerprint, "status": {"$in": ["pending", "running", "done"]}},
+        {"_id": 0},
+        sort=[("created_at", -1)]
+    )
+    now = _now()
+    if existing and (existing["status"] != "done" or await artifact_available(db, existing)):
+        # Rétention repartie de zéro : l'artefact remis n'est pas purgé juste après
+        expires_at = now + timedelta(hours=settings.EXPORT_JOBS_RETENTION_HOURS)
+        await db.export_jobs.update_one({"id": existing["id"]}, {"$set": {"expires_at": expires_at}})
+        return {**existing, "expires_at": expires_at}, True
+
+    job = {
+        "id": str(uuid.uuid4()),
+        "user_id": user_id,
+        "kind": kind,
+        "format": fmt,
+        "fingerprint": fingerprint,
+        "status": "pending",
+        "progress": 0,
+        "processed": 0,
+        "total": None,
+        "created_at": now.isoformat(),
+        "expires_at": now + timedelta(hours=settings.EXPORT_JOBS_RETENTION_HOURS),
+    }
+    await db.export_jobs.insert_one(job)
+    job.pop("_id", None)
+    return job, False
+
+
+# ============================================
+# WORKER
+# ============================================
+
+class _Progress:
+    """Compte les documents produits et publie l'avancement (renouvelle le bail)"""
+
+    def __init__(self, db, job: dict, total: int):
+        self.db = db
+        self.job = job
+        self.total = total
+        self.processed = 0
+
+    async def track(self, items: AsyncIterator[dict]) -> AsyncIterator[dict]:
+        async for item in items:
+            yield item
+            self.processed += 1
+            if self.processed % PROGRESS_EVERY == 0:
+                await self.publish()
+
+    async def publish(self):
+        progress = min(99, int(self.processed * 100 / self.total)) if self.total else 0
+        await self.db.export_jobs.update_one(
+            {"id": self.job["id"], "worker_id": self.job["worker_id"]},
+            {"$set": {
+                "processed": self.processed,
+                "progress": progress,
+                "lease_until": _now() + timedelta(seconds=settings.EXPORT_JOBS_LEASE_SECONDS),
+            }}
+        )
+
+
+async def _write_text(chunks: AsyncIterator[str], path: str):
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        async for chunk in chunks:
+            await asyncio.to_thread(f.write, chunk)
+
+
+async def _produce(db, job: dict, progress: _Progress) -> str:
+    """Produit l'artefact dans un fichier temporaire et retourne son chemin"""
+    user_id, kind, fmt = job["user_id"], job["kind"], job["format"]
+
+    if kind == "applications":
+        items = progress.track(iter_applications(
+            db, user_id, with_interviews=(fmt == "json"), count_interviews=(fmt == "xlsx")
+        ))
+    else:
+        items = progress.track(iter_interviews(db, user_id, exclude_user_id=(fmt == "json")))
+
+    if fmt == "xlsx":
+        if kind == "applications":
+            sheet = SheetSpec("Candidatures", APPLICATION_EXCEL_HEADERS, map_rows(items, application_excel_row),
+                              widths=APPLICATION_EXCEL_WIDTHS, highlight=lambda row: [10] if row[10] else [])
+        else:
+            sheet = SheetSpec("Entretiens", INTERVIEW_CSV_HEADERS, map_rows(items, interview_csv_row),
+                              widths=INTERVIEW_EXCEL_WIDTHS)
+        return await build_xlsx([sheet])
+
+    fd, path = tempfile.mkstemp(prefix="jobtracker_export_", suffix=f".{fmt}")
+    os.close(fd)
+    if fmt == "json":
+        list_key, total_key = ("applications", "total_applications") if kind == "applications" \
+            else ("interviews", "total_interviews")
+        chunks = stream_json(items, list_key, total_key, progress.total)
+    elif kind == "applications":
+        chunks = stream_csv(items, APPLICATION_CSV_HEADERS, application_csv_row)
+    else:
+        chunks = stream_csv(items, INTERVIEW_CSV_HEADERS, interview_csv_row)
+    try:
+        await _write_text(chunks, path)
+    except BaseException:
+        _remove(path)
+        raise
+    return path
+
+
+async def _claim(db, worker_id: str, job_id: Optional[str] = None) -> Optional[dict]:
+    """Réclame le job donné, sinon le plus ancien en attente (ou dont le bail a expiré)"""
+    now = _now()
+    query = {"$or": [
+        {"status": "pending"},
+        {"status": "running", "lease_until": {"$lt": now}},
+    ]}
+    if job_id:
+        query["id"] = job_id
+    return await db.export_jobs.find_one_and_update(
+        query,
+        {
+            "$set": {
+                "status": "running",
+                "worker_id": worker_id,
+                "started_at": now.isoformat(),
+                "lease_until": now + timedelta(seconds=settings.EXPORT_JOBS_LEASE_SECONDS),
+            },
+            "$inc": {"attempts": 1},
+        },
+        sort=[("created_at", 1)],
+        projection={"_id": 0},
+        return_document=ReturnDocument.AFTER
+    )
+
+
+async def run_export_job(db, job: dict):
+    """Produit, range et publie l'artefact d'un job réclamé"""
+    collection = db.applications if job["kind"] == "applications" else db.interviews
+    total = await collection.count_documents({"user_id": job["user_id"]})
+    await db.export_jobs.update_one({"id": job["id"]}, {"$set": {"total": total}})
+    progress = _Progress(db, job, total)
+
+    path = await _produce(db, job, progress)
+    size = os.path.getsize(path)
+    artifact = await _store_artifact(db, job, path)
+
+    result = await db.export_jobs.update_one(
+        {"id": job["id"], "worker_id": job["worker_id"]},
+        {"$set": {
+            "status": "done",
+            "progress": 100,
+            "processed": progress.processed,
+            "size": size,
+            "artifact": artifact,
+            "finished_at": _now().isoformat(),
+        }, "$unset": {"lease_until": ""}}
+    )
+    if not result.matched_count:
+        # Bail perdu : un autre worker a repris le job, on jette notre artefact
+        await _delete_artifact(db, {**job, "artifact": artifact})
+
+
+async def process_export_jobs(db, max_jobs: Optional[int] = None, job_id: Optional[str] = None) -> int:
+    """
+    Traite les jobs en attente jusqu'à épuisement (ou max_jobs), ou seulement
+    le job job_id s'il est encore à prendre. Retourne le nombre traité.
+    """
+    worker_id = str(uuid.uuid4())
+    processed = 0
+    if job_id:
+        max_jobs = 1
+    while max_jobs is None or processed < max_jobs:
+        job = await _claim(db, worker_id, job_id)
+        if not job:
+            break
+        processed += 1
+        if job["format"] == "xlsx" and not OPENPYXL_AVAILABLE:
+            error = "openpyxl non installé"
+        elif job.get("attempts", 1) > settings.EXPORT_JOBS_MAX_ATTEMPTS:
+            error = "Nombre maximal de tentatives atteint"
+        else:
+            error = None
+            try:
+                await run_export_job(db, job)
+                logger.info(f"[ExportJobs] Job {job['id']} terminé ({job['kind']}/{job['format']})")
+            except Exception as e:
+                logger.error(f"[ExportJobs] Job {job['id']} en échec: {e}")
+                error = str(e) or type(e).__name__
+        if error:
+            await db.export_jobs.update_one(
+                {"id": job["id"], "worker_id": worker_id},
+                {"$set": {"status": "failed", "error": error, "finished_at": _now().isoformat()},
+                 "$unset": {"lease_until": ""}}
+            )
+    return processed
+
+
+async def purge_expired_exports(db) -> int:
+    """Supprime les jobs expirés et leurs artefacts"""
+    expired = await db.export_jobs.find(
+        {"expires_at": {"$lt": _now()}, "status": {"$ne": "running"}}, {"_id": 0, "id": 1, "artifact": 1}
+    ).to_list(1000)
+    for job in expired:
+        await _delete_artifact(db, job)
+    if expired:
+        await db.export_jobs.delete_many({"id": {"$in": [j["id"] for j in expired]}})
+    return len(expired)
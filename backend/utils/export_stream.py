@@ -0,0 +1,176 @@
+"""
+JobTracker SaaS - Export en flux
+Générateurs asynchrones sur curseur Mongo : les documents sont lus par lots
+et sérialisés au fil de l'eau (mémoire constante, pas de limite de lignes).
+Les entretiens sont joints côté serveur via $lookup (index candidature_id).
+"""
+
+import csv
+import io
+import json
+from datetime import datetime, timezone
+from typing import AsyncIterator, Callable, List, Optional
+
+CURSOR_BATCH_SIZE = 500
+CSV_FLUSH_ROWS = 200
+
+APPLICATION_CSV_HEADERS = [
+    "Entreprise", "Poste", "Type", "Lieu", "Moyen",
+    "Date Candidature", "Lien", "Statut", "Date Réponse",
+    "Commentaire", "Favori"
+]
+
+INTERVIEW_CSV_HEADERS = [
+    "Entreprise", "Poste", "Date Entretien", "Type", "Format",
+    "Lieu/Lien", "Recruteur", "Statut", "Commentaire"
+]
+
+
+APPLICATION_EXCEL_HEADERS = APPLICATION_CSV_HEADERS + ["Nb Entretiens"]
+APPLICATION_EXCEL_WIDTHS = [25, 30, 12, 15, 20, 15, 50, 15, 15, 40, 10, 12]
+INTERVIEW_EXCEL_WIDTHS = [25, 30, 18, 15, 12, 40, 20, 15, 40]
+
+
+def _day(value, length: int = 10) -> str:
+    return value[:length] if value else ""
+
+
+def application_csv_row(app: dict) -> list:
+    return [
+        app.get("entreprise", ""),
+        app.get("poste", ""),
+        app.get("type_poste", ""),
+        app.get("lieu", ""),
+        app.get("moyen", ""),
+        _day(app.get("date_candidature")),
+        app.get("lien", ""),
+        app.get("reponse", ""),
+        _day(app.get("date_reponse")),
+        app.get("commentaire", ""),
+        "Oui" if app.get("is_favorite") else "Non"
+    ]
+
+
+def application_excel_row(app: dict) -> list:
+    """Ligne Excel : favori en étoile et nombre d'entretiens (iter_applications(count_interviews=True))"""
+    row = application_csv_row(app)
+    row[10] = "⭐" if app.get("is_favorite") else ""
+    return row + [app.get("interviews_count", 0)]
+
+
+def interview_csv_row(interview: dict) -> list:
+    return [
+        interview.get("entreprise", ""),
+        interview.get("poste", ""),
+        _day(interview.get("date_entretien"), 16),
+        interview.get("type_entretien", ""),
+        interview.get("format_entretien", ""),
+        interview.get("lieu_lien", ""),
+        interview.get("interviewer", ""),
+        interview.get("statut", ""),
+        interview.get("commentaire", "")
+    ]
+
+
+# ============================================
+# CURSEURS
+# ============================================
+
+def iter_applications(db, user_id: str, with_interviews: bool = True,
+                      count_interviews: bool = False) -> AsyncIterator[dict]:
+    """
+    Candidatures (plus récentes d'abord), avec leurs entretiens sous 'entretiens'
+    ou seulement leur nombre sous 'interviews_count' (count_interviews).
+    """
+    pipeline: List[dict] = [
+        {"$match": {"user_id": user_id}},
+        {"$sort": {"date_candidature": -1}},
+    ]
+    if count_interviews:
+        pipeline += [
+            {"$lookup": {"from": "interviews", "localField": "id", "foreignField": "candidature_id", "as": "_ivs"}},
+            {"$addFields": {"interviews_count": {"$size": "$_ivs"}}},
+            {"$project": {"_id": 0, "_ivs": 0}},
+        ]
+    elif with_interviews:
+        pipeline += [
+            {"$lookup": {"from": "interviews", "localField": "id", "foreignField": "candidature_id", "as": "entretiens"}},
+            {"$project": {
+                "_id": 0, "user_id": 0,
+                "entretiens._id": 0, "entretiens.user_id": 0, "entretiens.candidature_id": 0
+            }},
+        ]
+    else:
+        pipeline.append({"$project": {"_id": 0, "user_id": 0}})
+    return db.applications.aggregate(pipeline, allowDiskUse=True, batchSize=CURSOR_BATCH_SIZE)
+
+
+async def iter_interviews(db, user_id: str, exclude_user_id: bool = False) -> AsyncIterator[dict]:
+    """Entretiens (plus récents d'abord) enrichis de l'entreprise et du poste"""
+    pipeline = [
+        {"$match": {"user_id": user_id}},
+        {"$sort": {"date_entretien": -1}},
+        {"$lookup": {"from": "applications", "localField": "candidature_id", "foreignField": "id", "as": "_app"}},
+        {"$project": {"_id": 0, "_app._id": 0}},
+    ]
+    cursor = db.interviews.aggregate(pipeline, allowDiskUse=True, batchSize=CURSOR_BATCH_SIZE)
+    async for interview in cursor:
+        apps = interview.pop("_app", None) or []
+        if exclude_user_id:
+            interview.pop("user_id", None)
+        if apps and interview.get("candidature_id"):
+            interview["entreprise"] = apps[0].get("entreprise", "")
+            interview["poste"] = apps[0].get("poste", "")
+        yield interview
+
+
+# ============================================
+# SÉRIALISATION
+# ============================================
+
+async def map_rows(items: AsyncIterator[dict], to_row: Callable[[dict], list]) -> AsyncIterator[list]:
+    async for item in items:
+        yield to_row(item)
+
+
+async def stream_csv(rows: AsyncIterator[dict], headers: list, to_row: Callable[[dict], list],
+                     flush_rows: int = CSV_FLUSH_ROWS) -> AsyncIterator[str]:
+    """CSV ';' entièrement quoté, émis par blocs de flush_rows lignes"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, delimiter=';', quoting=csv.QUOTE_ALL)
+    writer.writerow(headers)
+    pending = 1
+    async for doc in rows:
+        writer.writerow(to_row(doc))
+        pending += 1
+        if pending >= flush_rows:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+            pending = 0
+    if pending:
+        yield buffer.getvalue()
+
+
+async def stream_json(items: AsyncIterator[dict], list_key: str, total_key: str,
+                      total: Optional[int] = None) -> AsyncIterator[str]:
+    """
+    Objet JSON {"export_date", total_key, list_key: [...]} émis élément par élément.
+    total est écrit en tête (compté au préalable) ; à défaut il est ajouté en fin.
+    """
+    header = {"export_date": datetime.now(timezone.utc).isoformat()}
+    if total is not None:
+        header[total_key] = total
+    head = json.dumps(header, indent=2, ensure_ascii=False)[:-2]
+    yield f'{head},\n  "{list_key}": ['
+
+    count = 0
+    async for item in items:
+        body = json.dumps(item, indent=2, ensure_ascii=False, default=str).replace("\n", "\n    ")
+        yield ("," if count else "") + "\n    " + body
+        count += 1
+
+    tail = "\n  ]" if count else "]"
+    if total is None:
+        tail += f',\n  "{total_key}": {count}'
+    yield tail + "\n}"
@@ -0,0 +1,143 @@
+"""
+JobTracker SaaS - Moteur d'import en masse
+Les clés existantes (entreprise, poste) et les entretiens de l'utilisateur sont
+chargés une seule fois, la déduplication se fait en mémoire et les écritures
+partent par lots (insert_many / bulk_write non ordonnés).
+"""
+
+import logging
+from typing import Dict, List, Optional, Set, Tuple
+
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from config import settings
+from utils.reminder_dispatcher import parse_interview_date
+from utils.user_stats import record_data_change
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_key(value) -> str:
+    """Clé de comparaison insensible à la casse (équivalent de l'ancien regex ^...$ /i)"""
+    return str(value or "").strip().casefold()
+
+
+def application_key(entreprise, poste) -> Tuple[str, str]:
+    return normalize_key(entreprise), normalize_key(poste)
+
+
+def _chunks(items: list, size: int):
+    for start in range(0, len(items), size):
+        yield start, items[start:start + size]
+
+
+class ImportBatch:
+    """
+    Accumule les documents d'un import puis les écrit par lots.
+    Chaque document est associé à son numéro de ligne pour remonter les erreurs.
+    """
+
+    def __init__(self, db, user_id: str, chunk_size: Optional[int] = None):
+        self.db = db
+        self.user_id = user_id
+        self.chunk_size = chunk_size or settings.IMPORT_BATCH_SIZE
+        self.applications: List[dict] = []
+        self.interviews: List[dict] = []
+        self.updates: List[UpdateOne] = []
+        self._app_lines: List[int] = []
+        self._interview_lines: List[int] = []
+        # Index mémoire des candidatures (existantes + en attente d'insertion)
+        self.known_apps: Dict[Tuple[str, str], dict] = {}
+        self.interview_days: Set[Tuple[str, str]] = set()
+        # Résultats
+        self.inserted_applications: List[dict] = []
+        self.inserted_interviews: List[dict] = []
+        # Erreurs d'écriture des candidatures (ligne, message) ; celles des
+        # entretiens sont seulement journalisées, comme à l'import ligne à ligne
+        self.errors: List[Tuple[int, str]] = []
+        # Entretiens ignorés car leur candidature n'a pas pu être insérée
+        self.interview_errors: List[Tuple[int, str]] = []
+
+    async def load_existing_applications(self):
+        """Un seul parcours des candidatures de l'utilisateur (projection minimale)"""
+        cursor = self.db.applications.find(
+            {"user_id": self.user_id}, {"_id": 0, "id": 1, "entreprise": 1, "poste": 1, "date_reponse": 1}
+        )
+        async for app in cursor:
+            key = application_key(app.get("entreprise"), app.get("poste"))
+            self.known_apps.setdefault(key, {**app, "_existing": True})
+
+    async def load_existing_interview_days(self):
+        """(candidature_id, jour) des entretiens existants, pour la déduplication"""
+        cursor = self.db.interviews.find(
+            {"user_id": self.user_id}, {"_id": 0, "candidature_id": 1, "date_entretien": 1}
+        )
+        async for interview in cursor:
+            self.interview_days.add((interview.get("candidature_id"), str(interview.get("date_entretien") or "")[:10]))
+
+    def find_application(self, entreprise, poste) -> Optional[dict]:
+        return self.known_apps.get(application_key(entreprise, poste))
+
+    def add_application(self, doc: dict, line: int):
+        self.applications.append(doc)
+        self._app_lines.append(line)
+        self.known_apps.setdefault(application_key(doc.get("entreprise"), doc.get("poste")), doc)
+
+    def has_interview_on(self, candidature_id: str, date_str: str) -> bool:
+        return (candidature_id, date_str[:10]) in self.interview_days
+
+    def add_interview(self, doc: dict, line: int):
+        doc.setdefault("date_entretien_at", parse_interview_date(doc.get("date_entretien")))
+        self.interviews.append(doc)
+        self._interview_lines.append(line)
+        self.interview_days.add((doc["candidature_id"], doc["date_entretien"][:10]))
+
+    def add_update(self, app_id: str, fields: dict):
+        self.updates.append(UpdateOne({"id": app_id, "user_id": self.user_id}, {"$set": fields}))
+
+    async def _insert(self, collection, docs: List[dict], lines: List[int], inserted: List[dict],
+                      errors: Optional[List[Tuple[int, str]]]) -> List[dict]:
+        """Insère par lots non ordonnés, renvoie les documents refusés"""
+        rejected = []
+        for start, chunk in _chunks(docs, self.chunk_size):
+            failed = set()
+            try:
+                await collection.insert_many(chunk, ordered=False)
+            except BulkWriteError as e:
+                for err in e.details.get("writeErrors", []):
+                    failed.add(err["index"])
+                    message = err.get("errmsg", "erreur d'écriture")
+                    if errors is None:
+                        logger.error(f"Import write error ({collection.name}, ligne {lines[start + err['index']]}): {message}")
+                    else:
+                        errors.append((lines[start + err["index"]], message))
+            for i, doc in enumerate(chunk):
+                doc.pop("_id", None)
+                (rejected if i in failed else inserted).append(doc)
+        return rejected
+
+    async def flush(self):
+        """Écrit candidatures, entretiens puis mises à jour, par lots de chunk_size"""
+        written = bool(self.applications or self.interviews or self.updates)
+        rejected = await self._insert(self.db.applications, self.applications, self._app_lines,
+                                      self.inserted_applications, self.errors)
+        # Entretiens d'une candidature refusée : ignorés (pas d'entretien orphelin)
+        rejected_ids = {doc.get("id") for doc in rejected}
+        interviews, lines = [], []
+        for doc, line in zip(self.interviews, self._interview_lines):
+            if doc.get("candidature_id") in rejected_ids:
+                self.interview_errors.append((line, "entretien ignoré, candidature non enregistrée"))
+            else:
+                interviews.append(doc)
+                lines.append(line)
+        await self._insert(self.db.interviews, interviews, lines, self.inserted_interviews, None)
+        for _, chunk in _chunks(self.updates, self.chunk_size):
+            try:
+                await self.db.applications.bulk_write(chunk, ordered=False)
+            except BulkWriteError as e:
+                logger.error(f"Import bulk update errors for {self.user_id}: {e.details.get('writeErrors', [])[:3]}")
+        self.applications, self.interviews, self.updates = [], [], []
+        self._app_lines, self._interview_lines = [], []
+        if written:
+            await record_data_change(self.db, self.user_id)
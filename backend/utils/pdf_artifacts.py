@@ -0,0 +1,140 @@
+"""
+JobTracker SaaS - Cache dédupliqué des PDF de lettres générées
+La clé d'un artefact est l'empreinte du contenu rendu (HTML ou texte) et des
+paramètres de rendu : régénérer une lettre identique réutilise l'objet déjà
+stocké au lieu de relancer le rendu et l'upload. Les artefacts sont partagés
+entre lettres (compteur de références), supprimés avec la dernière lettre.
+Objets rangés par utils/storage (PDF_ARTIFACT_STORAGE, sinon STORAGE_BACKEND) ;
+seule la clé est enregistrée, l'URL (éventuellement signée) est calculée à la lecture.
+"""
+
+import hashlib
+import logging
+import uuid
+from datetime import datetime, timezone
+from typing import Optional
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from config import settings
+from utils.pdf_renderer import render_pdf
+from utils.storage import get_object_store
+
+logger = logging.getLogger(__name__)
+
+ARTIFACT_COLLECTION = "pdf_artifacts"
+# À incrémenter quand le rendu change (mise en page, moteur) : invalide les empreintes
+RENDER_VERSION = 1
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+# ============================================
+# ARTEFACTS
+# ============================================
+
+def artifact_key(user_id: str, content: str, entreprise: str, poste: str, user_name: str, is_html: bool) -> str:
+    """Empreinte du rendu ; par utilisateur (les objets sont rangés sous son dossier)"""
+    h = hashlib.sha256()
+    for part in (str(RENDER_VERSION), user_id, "html" if is_html else "text", entreprise, poste, user_name, content):
+        h.update((part or "").encode("utf-8"))
+        h.update(b"\x00")
+    return h.hexdigest()
+
+
+async def _reuse(db, key: str) -> Optional[dict]:
+    return await db[ARTIFACT_COLLECTION].find_one_and_update(
+        {"key": key},
+        {"$inc": {"refs": 1}, "$set": {"last_used_at": _now()}},
+        return_document=ReturnDocument.AFTER
+    )
+
+
+async def _stored_pdf(artifact: dict, reused: bool) -> dict:
+    """Champs à enregistrer sur la lettre, et URL du moment pour la réponse"""
+    store = get_object_store(artifact["storage"])
+    return {
+        "storage": artifact["storage"],
+        "storage_key": artifact["public_id"],
+        "storage_meta": artifact.get("storage_meta") or {},
+        "public_id": artifact["public_id"],
+        "url": await store.url(artifact["public_id"], artifact.get("storage_meta")),
+        "reused": reused,
+    }
+
+
+async def get_or_create_pdf(db, user_id: str, content: str, entreprise: str, poste: str,
+                            user_name: str, is_html: bool = False) -> dict:
+    """
+    PDF stocké de la lettre : {storage, storage_key, storage_meta, public_id, url, reused}.
+    url n'est valable qu'un temps (URL signée S3) : seuls storage* sont à enregistrer.
+    Chaque appel ajoute une référence, à rendre avec release_pdf.
+    Les erreurs de rendu (PdfRenderBusy, ...) et de stockage sont propagées.
+    """
+    key = artifact_key(user_id, content, entreprise, poste, user_name, is_html)
+    artifact = await _reuse(db, key)
+    if artifact:
+        return await _stored_pdf(artifact, reused=True)
+
+    pdf_buffer = await render_pdf(
+        content=content, entreprise=entreprise, poste=poste, user_name=user_name, is_html=is_html
+    )
+    data = pdf_buffer.getvalue()
+    store = get_object_store(settings.PDF_ARTIFACT_STORAGE or None)
+    # Suffixe aléatoire : deux rendus concurrents n'écrivent jamais le même objet
+    # .pdf dans la clé : l'URL d'un fichier raw Cloudinary garde la bonne extension
+    stored = await store.save(
+        f"jobtracker/{user_id}/cover_letters/{key}-{uuid.uuid4().hex[:8]}.pdf",
+        data,
+        content_type="application/pdf",
+        tags=[user_id, "cover_letter"],
+        resource_type="raw"
+    )
+    now = _now()
+    artifact = {
+        "key": key,
+        "user_id": user_id,
+        "storage": stored.storage,
+        "storage_meta": stored.meta,
+        "public_id": stored.key,
+        "size": stored.size,
+        "refs": 1,
+        "created_at": now,
+        "last_used_at": now,
+    }
+    try:
+        await db[ARTIFACT_COLLECTION].insert_one(artifact)
+    except DuplicateKeyError:
+        # Rendu concurrent du même contenu : on garde l'artefact déjà enregistré
+        existing = await _reuse(db, key)
+        if existing:
+            await _delete_object(store, stored.key, stored.meta)
+            return await _stored_pdf(existing, reused=True)
+        raise
+    return await _stored_pdf(artifact, reused=False)
+
+
+async def _delete_object(store, public_id: str, meta: Optional[dict] = None):
+    try:
+        await store.delete(public_id, meta)
+    except Exception as e:
+        logger.warning(f"[PDF] Suppression de l'objet {public_id} impossible: {e}")
+
+
+async def release_pdf(db, public_id: str):
+    """Rend une référence ; l'objet est supprimé avec la dernière lettre qui l'utilise"""
+    artifact = await db[ARTIFACT_COLLECTION].find_one_and_update(
+        {"public_id": public_id},
+        {"$inc": {"refs": -1}},
+        return_document=ReturnDocument.AFTER
+    )
+    if artifact is None:
+        # Lettre antérieure au cache : objet Cloudinary propre à la lettre
+        await _delete_object(get_object_store("cloudinary"), public_id, {"resource_type": "raw"})
+        return
+    result = await db[ARTIFACT_COLLECTION].delete_one({"public_id": public_id, "refs": {"$lte": 0}})
+    if result.deleted_count:
+        await _delete_object(get_object_store(artifact["storage"]), public_id, artifact.get("storage_meta"))
@@ -0,0 +1,204 @@
+"""
+JobTracker SaaS - Rendu PDF des lettres de motivation hors de la boucle
+xhtml2pdf (HTML) et ReportLab (texte) sont purement CPU : le rendu s'exécute
+dans un pool de processus (PDF_RENDER_PROCESSES, 0 = thread pour les
+environnements sans multiprocessing). La file est bornée : au-delà de
+PDF_RENDER_QUEUE_SIZE rendus en attente, la demande est refusée immédiatement
+(PdfRenderBusy) plutôt que d'empiler de la latence ; chaque rendu a un délai
+maximal (PDF_RENDER_TIMEOUT_SECONDS).
+"""
+
+import asyncio
+import io
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+from xml.sax.saxutils import escape
+
+from reportlab.lib.enums import TA_LEFT
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+from reportlab.lib.units import cm
+from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer
+from xhtml2pdf import pisa
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class PdfRenderError(Exception):
+    pass
+
+
+class PdfRenderBusy(PdfRenderError):
+    """File de rendu pleine : réessayer plus tard"""
+
+
+class PdfRenderTimeout(PdfRenderError):
+    pass
+
+
+# ============================================
+# RENDU (exécuté dans un processus du pool)
+# ============================================
+
+def _render_text(content: str, entreprise: str, poste: str, user_name: str) -> bytes:
+    buffer = io.BytesIO()
+    doc = SimpleDocTemplate(
+        buffer,
+        pagesize=A4,
+        rightMargin=2*cm,
+        leftMargin=2*cm,
+        topMargin=2*cm,
+        bottomMargin=2*cm
+    )
+
+    styles = getSampleStyleSheet()
+
+    # Custom styles
+    title_style = ParagraphStyle(
+        'CustomTitle',
+        parent=styles['Heading1'],
+        fontSize=14,
+        spaceAfter=20,
+        textColor='#1a1a2e'
+    )
+
+    body_style = ParagraphStyle(
+        'CustomBody',
+        parent=styles['Normal'],
+        fontSize=11,
+        leading=16,
+        alignment=TA_LEFT,
+        spaceAfter=12
+    )
+
+    meta_style = ParagraphStyle(
+        'Meta',
+        parent=styles['Normal'],
+        fontSize=9,
+        textColor='#666666',
+        spaceAfter=20
+    )
+
+    story = []
+
+    # Title
+    story.append(Paragraph(f"Lettre de Motivation - {poste}", title_style))
+    story.append(Paragraph(f"Candidature chez {entreprise} • {user_name}", meta_style))
+    story.append(Spacer(1, 0.5*cm))
+
+    # Content - split by paragraphs
+    paragraphs = content.split('\n\n')
+    for para in paragraphs:
+        if para.strip():
+            # Escape XML special characters for ReportLab Paragraph
+            clean_para = escape(para.strip())
+            # Replace single newlines with <br/> for line breaks within paragraphs
+            clean_para = clean_para.replace('\n', '<br/>')
+            story.append(Paragraph(clean_para, body_style))
+
+    doc.build(story)
+    return buffer.getvalue()
+
+
+def render_cover_letter_pdf(content: str, entreprise: str, poste: str, user_name: str, is_html: bool = False) -> bytes:
+    """Rendu synchrone d'une lettre (HTML via xhtml2pdf, sinon texte via ReportLab)"""
+    if is_html:
+        buffer = io.BytesIO()
+        pisa_status = pisa.CreatePDF(content, dest=buffer)
+        if not pisa_status.err:
+            return buffer.getvalue()
+        logger.warning(f"[PDF] HTML to PDF FAILED ({pisa_status.err} erreur(s)), falling back to text")
+    return _render_text(content, entreprise, poste, user_name)
+
+
+def _warm_up():
+    """Initialisation d'un processus du pool : polices et feuilles de style chargées d'avance"""
+    getSampleStyleSheet()
+
+
+# ============================================
+# POOL
+# ============================================
+
+_pool: Optional[Executor] = None
+# Rendus soumis et pas encore terminés dans le pool (y compris ceux abandonnés au délai)
+_pending = 0
+_pending_lock = threading.Lock()
+
+
+def _get_pool() -> Executor:
+    global _pool
+    if _pool is None:
+        if settings.PDF_RENDER_PROCESSES > 0:
+            # spawn : pas de fork d'un process qui porte déjà la boucle, Motor et leurs threads
+            _pool = ProcessPoolExecutor(
+                max_workers=settings.PDF_RENDER_PROCESSES,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_warm_up
+            )
+        else:
+            _pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="pdf_render")
+    return _pool
+
+
+def _reset_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+async def render_pdf(content: str, entreprise: str, poste: str, user_name: str, is_html: bool = False) -> io.BytesIO:
+    """
+    Rend une lettre hors de la boucle d'événements.
+    Lève PdfRenderBusy si la file est pleine, PdfRenderTimeout au-delà du délai.
+    """
+    global _pending
+    capacity = max(settings.PDF_RENDER_PROCESSES, 1) + settings.PDF_RENDER_QUEUE_SIZE
+    with _pending_lock:
+        if _pending >= capacity:
+            raise PdfRenderBusy(f"{_pending} rendus PDF en cours ou en attente")
+        _pending += 1
+
+    try:
+        try:
+            job = _get_pool().submit(render_cover_letter_pdf, content, entreprise, poste, user_name, is_html)
+        except BaseException:
+            _release()
+            raise
+        # Libéré quand le rendu se termine réellement : après un délai dépassé, le
+        # processus continue de rendre et occupe toujours sa place dans la file
+        job.add_done_callback(_release)
+        data = await asyncio.wait_for(asyncio.wrap_future(job), timeout=settings.PDF_RENDER_TIMEOUT_SECONDS)
+    except asyncio.TimeoutError:
+        raise PdfRenderTimeout(f"Rendu PDF > {settings.PDF_RENDER_TIMEOUT_SECONDS}s")
+    except BrokenProcessPool as e:
+        # Un processus est mort (mémoire, signal) : le pool est recréé au prochain rendu
+        _reset_pool()
+        raise PdfRenderError(f"Pool de rendu PDF interrompu: {e}")
+    return io.BytesIO(data)
+
+
+def _release(_job=None):
+    global _pending
+    with _pending_lock:
+        _pending -= 1
+
+
+def pdf_renderer_stats() -> dict:
+    return {
+        "processes": settings.PDF_RENDER_PROCESSES,
+        "pending": _pending,
+        "capacity": max(settings.PDF_RENDER_PROCESSES, 1) + settings.PDF_RENDER_QUEUE_SIZE,
+    }
+
+
+def shutdown_pdf_renderer():
+    """Arrête le pool de rendu (arrêt de l'application)"""
+    _reset_pool()
@@ -0,0 +1,200 @@
+"""
+JobTracker SaaS - Service d'envoi Web Push
+Point d'envoi unique des notifications push : client HTTP asynchrone partagé
+(connexions réutilisées par service push), en-têtes VAPID signés une fois par
+origine jusqu'à expiration, concurrence bornée, nouvelles tentatives avec
+backoff sur 429/5xx et purge groupée des abonnements expirés (404/410).
+Le chiffrement du message (aes128gcm) reste délégué à pywebpush.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import random
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+from config import settings
+
+try:
+    # aiohttp est une dépendance de pywebpush (>= 2.0)
+    import aiohttp
+    from py_vapid import Vapid
+    from pywebpush import WebPusher
+    PUSH_AVAILABLE = True
+except ImportError:
+    PUSH_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# VAPID Config
+VAPID_PUBLIC_KEY = os.environ.get("VAPID_PUBLIC_KEY", "")
+VAPID_PRIVATE_KEY = os.environ.get("VAPID_PRIVATE_KEY", "")
+VAPID_CLAIMS_EMAIL = os.environ.get("VAPID_CLAIMS_EMAIL", "contact@maadec.com")
+
+CONTENT_ENCODING = "aes128gcm"
+# Un JWT VAPID est re-signé quand il lui reste moins de cette marge (s)
+VAPID_RENEW_MARGIN = 300
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+EXPIRED_STATUSES = {404, 410}
+RETRY_BASE_DELAY = 0.5
+RETRY_MAX_DELAY = 30.0
+
+Push = Tuple[dict, dict]  # (abonnement, payload)
+
+
+@dataclass
+class PushReport:
+    sent: int = 0
+    failed: int = 0
+    expired: List[str] = field(default_factory=list)
+
+
+_session: Optional["aiohttp.ClientSession"] = None
+_semaphore: Optional[asyncio.Semaphore] = None
+_vapid = None
+# Origine du service push -> (en-têtes VAPID, expiration du JWT)
+_vapid_headers: Dict[str, Tuple[dict, int]] = {}
+
+
+def push_enabled() -> bool:
+    return PUSH_AVAILABLE and bool(VAPID_PRIVATE_KEY)
+
+
+def _get_session() -> "aiohttp.ClientSession":
+    global _session
+    if _session is None or _session.closed:
+        _session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=settings.PUSH_MAX_CONCURRENCY),
+            timeout=aiohttp.ClientTimeout(total=settings.PUSH_TIMEOUT_SECONDS)
+        )
+    return _session
+
+
+def _get_semaphore() -> asyncio.Semaphore:
+    global _semaphore
+    if _semaphore is None:
+        _semaphore = asyncio.Semaphore(settings.PUSH_MAX_CONCURRENCY)
+    return _semaphore
+
+
+def _origin(endpoint: str) -> str:
+    url = urlparse(endpoint)
+    return f"{url.scheme}://{url.netloc}"
+
+
+def vapid_headers(endpoint: str) -> dict:
+    """En-têtes Authorization VAPID pour l'origine de l'endpoint, mis en cache jusqu'à expiration"""
+    global _vapid
+    origin = _origin(endpoint)
+    now = int(time.time())
+    cached = _vapid_headers.get(origin)
+    if cached and cached[1] - VAPID_RENEW_MARGIN > now:
+        return cached[0]
+    if _vapid is None:
+        _vapid = Vapid.from_string(private_key=VAPID_PRIVATE_KEY)
+    expires = now + settings.PUSH_VAPID_EXPIRY_SECONDS
+    headers = _vapid.sign({"sub": f"mailto:{VAPID_CLAIMS_EMAIL}", "aud": origin, "exp": expires})
+    _vapid_headers[origin] = (headers, expires)
+    return headers
+
+
+def _retry_delay(attempt: int, retry_after: Optional[str]) -> float:
+    if retry_after and retry_after.isdigit():
+        return min(float(retry_after), RETRY_MAX_DELAY)
+    return min(RETRY_BASE_DELAY * (2 ** attempt), RETRY_MAX_DELAY) * (0.5 + random.random() / 2)
+
+
+# ============================================
+# ENVOI
+# ============================================
+
+async def send_push(subscription_info: dict, payload: dict) -> str:
+    """Envoie une notification : 'sent', 'expired' (abonnement à supprimer) ou 'failed'"""
+    endpoint = subscription_info.get("endpoint", "")
+    try:
+        body = WebPusher(subscription_info).encode(json.dumps(payload), CONTENT_ENCODING)["body"]
+        headers = {
+            **vapid_headers(endpoint),
+            "Content-Encoding": CONTENT_ENCODING,
+            "TTL": str(settings.PUSH_TTL_SECONDS),
+        }
+    except Exception as e:
+        logger.warning(f"[Push] Abonnement invalide ({endpoint[:60]}): {e}")
+        return "failed"
+
+    for attempt in range(settings.PUSH_MAX_RETRIES + 1):
+        retry_after = None
+        try:
+            async with _get_semaphore():
+                async with _get_session().post(endpoint, data=body, headers=headers) as response:
+                    status = response.status
+                    retry_after = response.headers.get("Retry-After")
+                    detail = await response.text() if status >= 300 else ""
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logger.warning(f"[Push] Erreur réseau ({endpoint[:60]}): {e}")
+        else:
+            if status < 300:
+                return "sent"
+            if status in EXPIRED_STATUSES:
+                return "expired"
+            if status not in RETRY_STATUSES:
+                if status in (401, 403):
+                    # JWT refusé : re-signé au prochain envoi
+                    _vapid_headers.pop(_origin(endpoint), None)
+                logger.warning(f"[Push] Refusé ({status}): {detail[:200]}")
+                return "failed"
+        if attempt < settings.PUSH_MAX_RETRIES:
+            await asyncio.sleep(_retry_delay(attempt, retry_after))
+    logger.warning(f"[Push] Abandon après {settings.PUSH_MAX_RETRIES + 1} tentatives ({endpoint[:60]})")
+    return "failed"
+
+
+async def send_pushes(pushes: List[Push]) -> PushReport:
+    """Envoie les couples (abonnement, payload) en parallèle (PUSH_MAX_CONCURRENCY)"""
+    report = PushReport()
+    if not pushes or not push_enabled():
+        return report
+    outcomes = await asyncio.gather(*(send_push(sub, payload) for sub, payload in pushes))
+    for (sub, _), outcome in zip(pushes, outcomes):
+        if outcome == "sent":
+            report.sent += 1
+        elif outcome == "expired":
+            report.expired.append(sub.get("endpoint"))
+        else:
+            report.failed += 1
+    return report
+
+
+async def prune_subscriptions(db, endpoints: List[str]):
+    """Supprime en une requête les abonnements expirés"""
+    if endpoints:
+        result = await db.push_subscriptions.delete_many({"subscription.endpoint": {"$in": list(set(endpoints))}})
+        logger.info(f"[Push] {result.deleted_count} abonnement(s) expiré(s) supprimé(s)")
+
+
+async def deliver_pushes(db, pushes: List[Push]) -> int:
+    """Envoi + purge des abonnements expirés ; retourne le nombre de push envoyés"""
+    report = await send_pushes(pushes)
+    await prune_subscriptions(db, report.expired)
+    return report.sent
+
+
+async def push_to_user(db, user_id: str, payload: dict) -> Tuple[int, int]:
+    """Envoie le payload à tous les appareils de l'utilisateur : (envoyés, appareils)"""
+    subscriptions = await db.push_subscriptions.find(
+        {"user_id": user_id}, {"_id": 0, "subscription": 1}
+    ).to_list(100)
+    sent = await deliver_pushes(db, [(sub["subscription"], payload) for sub in subscriptions])
+    return sent, len(subscriptions)
+
+
+async def close_push_client():
+    """Ferme la session HTTP partagée (arrêt de l'application)"""
+    global _session
+    if _session is not None:
+        await _session.close()
+        _session = None
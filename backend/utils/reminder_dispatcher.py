@@ -0,0 +1,422 @@
+"""
+JobTracker SaaS - Planification des rappels d'entretiens
+Les entretiens portent une date normalisée (date_entretien_at, datetime UTC
+indexée avec statut). Le planificateur ne lit que les entretiens dont un rappel
+tombe dans l'horizon à venir (requête par plage, curseur sans plafond) et pose
+un job ponctuel APScheduler par échéance (regroupée à la minute). À l'échéance,
+l'entretien est relu : un entretien déplacé ou annulé entre-temps est ignoré,
+le planificateur reprogramme la nouvelle date.
+"""
+
+import logging
+import math
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+from apscheduler.triggers.date import DateTrigger
+from apscheduler.triggers.interval import IntervalTrigger
+from pymongo import InsertOne, UpdateOne
+from pymongo.errors import BulkWriteError
+
+from config import settings
+from utils.push_service import deliver_pushes
+from utils.user_stats import record_data_change
+
+logger = logging.getLogger(__name__)
+
+# Type de rappel -> (délai avant l'entretien, retard de livraison toléré)
+# Les tolérances reprennent les fenêtres de l'ancien balayage (23h-25h, 45-75 min)
+REMINDER_KINDS = {
+    "24h": (timedelta(hours=24), timedelta(hours=1)),
+    "1h": (timedelta(hours=1), timedelta(minutes=15)),
+}
+BACKFILL_BATCH = 1000
+CURSOR_BATCH_SIZE = 1000
+
+ReminderKey = Tuple[str, str]  # (identifiant de l'entretien, type de rappel)
+
+_db = None
+_scheduler = None
+# Échéance (début de minute) -> rappels à livrer
+_pending: Dict[datetime, Dict[ReminderKey, datetime]] = {}
+
+
+def parse_interview_date(value) -> Optional[datetime]:
+    """date_entretien (ISO, éventuellement sans fuseau = UTC) -> datetime UTC"""
+    if isinstance(value, datetime):
+        parsed = value
+    elif isinstance(value, str) and value:
+        try:
+            parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            return None
+    else:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc)
+
+
+def _as_utc(value: datetime) -> datetime:
+    # Mongo renvoie des datetimes naïfs (UTC)
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+def interview_key(interview: dict) -> str:
+    """Identifiant utilisé dans les clés de rappel (compatible avec les rappels déjà envoyés)"""
+    return str(interview.get("_id", interview.get("id", "")))
+
+
+# ============================================
+# ENVOI
+# ============================================
+
+def _reminder_message(kind: str, entreprise: str, poste: str, type_entretien: str) -> Tuple[str, str]:
+    if kind == "24h":
+        return (
+            f"🗓️ Entretien demain - {entreprise}",
+            f"Votre entretien {type_entretien} pour {poste} est prévu demain. Préparez-vous !",
+        )
+    return (
+        f"⚠️ Entretien dans 1h - {entreprise}",
+        f"Votre entretien chez {entreprise} commence bientôt ! Bonne chance ! 🍀",
+    )
+
+
+async def _claim(db, reminders: List[dict], now: datetime) -> List[dict]:
+    """
+    Réserve les rappels par insertion groupée dans sent_reminders : l'index
+    unique (user_id, reminder_key) écarte ceux qu'un autre worker a déjà pris.
+    """
+    if not reminders:
+        return []
+    markers = [
+        InsertOne({
+            "user_id": r["user_id"],
+            "reminder_key": r["reminder_key"],
+            "interview_id": r["interview_id"],
+            "sent_at": now.isoformat()
+        })
+        for r in reminders
+    ]
+    try:
+        await db.sent_reminders.bulk_write(markers, ordered=False)
+        return reminders
+    except BulkWriteError as e:
+        errors = e.details.get("writeErrors", [])
+        if any(err.get("code") != 11000 for err in errors):
+            raise
+        taken = {err["index"] for err in errors}
+        return [r for i, r in enumerate(reminders) if i not in taken]
+
+
+async def deliver_reminders(db, keys: List[ReminderKey], now: Optional[datetime] = None) -> dict:
+    """
+    Livre les rappels dont l'échéance est atteinte, par lot : rappels déjà
+    envoyés et abonnements push chargés en une requête chacun, réservation et
+    notifications in-app par bulk_write, push envoyés en parallèle
+    (utils/push_service).
+    Un rappel déjà envoyé, par ce worker ou un autre, n'est jamais renvoyé.
+    """
+    now = now or datetime.now(timezone.utc)
+    stats = {"users": 0, "reminders_24h": 0, "reminders_1h": 0, "push_sent": 0}
+    if not keys:
+        return stats
+
+    object_ids = [oid for oid in (_object_id(key) for key, _ in keys) if oid is not None]
+    interviews = {}
+    async for interview in db.interviews.find({"_id": {"$in": object_ids}, "statut": "planned"}):
+        interviews[interview_key(interview)] = interview
+
+    user_ids = list({i["user_id"] for i in interviews.values() if i.get("user_id")})
+    user_settings = {
+        s["user_id"]: s async for s in db.notification_settings.find({"user_id": {"$in": user_ids}})
+    }
+
+    # Rappels à l'échéance, autorisés par l'utilisateur
+    candidates = []
+    for interview_id, kind in dict.fromkeys(keys):
+        interview = interviews.get(interview_id)
+        if not interview or not isinstance(interview.get("date_entretien_at"), datetime):
+            continue
+        offset, grace = REMINDER_KINDS[kind]
+        fire_at = _as_utc(interview["date_entretien_at"]) - offset
+        # Déplacé depuis la planification (trop tôt) ou livraison trop tardive
+        if not (fire_at - timedelta(seconds=settings.REMINDER_BUCKET_SECONDS) <= now <= fire_at + grace):
+            continue
+        user_id = interview.get("user_id")
+        if not user_id or not user_settings.get(user_id, {}).get(f"reminder_{kind}", True):
+            continue
+        candidates.append({
+            "user_id": user_id,
+            "interview_id": interview_id,
+            "kind": kind,
+            "reminder_key": f"reminder_{kind}_{interview_id}",
+            "interview": interview,
+        })
+    if not candidates:
+        return stats
+
+    # Déjà envoyés : une requête pour tout le lot (évite des conflits d'insertion)
+    sent = {
+        (doc["user_id"], doc["reminder_key"]) async for doc in db.sent_reminders.find(
+            {"user_id": {"$in": list({c["user_id"] for c in candidates})},
+             "reminder_key": {"$in": [c["reminder_key"] for c in candidates]}},
+            {"_id": 0, "user_id": 1, "reminder_key": 1}
+        )
+    }
+    reminders = await _claim(db, [c for c in candidates if (c["user_id"], c["reminder_key"]) not in sent], now)
+    if not reminders:
+        return stats
+
+    app_ids = {r["interview"].get("candidature_id") for r in reminders} - {None}
+    applications = {
+        a["id"]: a async for a in db.applications.find(
+            {"id": {"$in": list(app_ids)}}, {"_id": 0, "id": 1, "entreprise": 1, "poste": 1}
+        )
+    }
+    subscriptions: Dict[str, List[dict]] = {}
+    async for sub in db.push_subscriptions.find(
+        {"user_id": {"$in": list({r["user_id"] for r in reminders})}}, {"_id": 0, "user_id": 1, "subscription": 1}
+    ):
+        subscriptions.setdefault(sub["user_id"], []).append(sub["subscription"])
+
+    pushes, notifications = [], []
+    for r in reminders:
+        interview, kind, interview_id = r["interview"], r["kind"], r["interview_id"]
+        application = applications.get(interview.get("candidature_id"), {})
+        entreprise = interview.get("entreprise") or application.get("entreprise") or "Entreprise"
+        poste = interview.get("poste") or application.get("poste") or "Poste"
+        title, body = _reminder_message(kind, entreprise, poste, interview.get("type_entretien", ""))
+
+        payload = {
+            "title": title,
+            "body": body,
+            "icon": "/icons/icon-192x192.png",
+            "url": "/dashboard/interviews",
+            "tag": f"interview-{kind}-{interview_id}"
+        }
+        pushes += [(sub, payload) for sub in subscriptions.get(r["user_id"], [])]
+        notifications.append(InsertOne({
+            "id": f"notif-{interview_id}-{kind}",
+            "user_id": r["user_id"],
+            "type": f"interview_reminder_{kind}",
+            "title": title,
+            "message": body,
+            "interview_id": interview_id,
+            "read": False,
+            "created_at": now.isoformat()
+        }))
+        stats[f"reminders_{kind}"] += 1
+
+    stats["push_sent"] = await deliver_pushes(db, pushes)
+    await db.notifications.bulk_write(notifications, ordered=False)
+    stats["users"] = len({r["user_id"] for r in reminders})
+    logger.info(f"[Reminders] {len(reminders)} rappel(s) envoyé(s) à {stats['users']} utilisateur(s)")
+    return stats
+
+
+async def deliver_due_reminders(db, user_id: Optional[str] = None) -> dict:
+    """
+    Livre immédiatement les rappels échus (tous les utilisateurs ou un seul),
+    sans passer par les jobs planifiés : endpoints /reminders/process*.
+    """
+    now = datetime.now(timezone.utc)
+    await backfill_interview_dates(db, user_id=user_id)
+    keys: List[ReminderKey] = []
+    for kind in REMINDER_KINDS:
+        query = {"statut": "planned", "date_entretien_at": _due_window(kind, now, timedelta(0))}
+        if user_id:
+            query["user_id"] = user_id
+        cursor = db.interviews.find(query, {"_id": 1}).batch_size(CURSOR_BATCH_SIZE)
+        keys += [(interview_key(interview), kind) async for interview in cursor]
+    return await deliver_reminders(db, keys, now)
+
+
+def _object_id(value: str):
+    try:
+        from bson import ObjectId
+        return ObjectId(value)
+    except Exception:
+        return None
+
+
+# ============================================
+# PLANIFICATION
+# ============================================
+
+async def backfill_interview_dates(db, limit: int = BACKFILL_BATCH, user_id: Optional[str] = None) -> int:
+    """
+    Renseigne date_entretien_at pour les entretiens planifiés qui ne l'ont pas
+    (données antérieures, chemins d'écriture externes). Une date illisible est
+    marquée False pour ne pas être relue à chaque passage.
+    """
+    query = {"statut": "planned", "date_entretien_at": None}
+    if user_id:
+        query["user_id"] = user_id
+    missing = await db.interviews.find(
+        query, {"_id": 1, "user_id": 1, "date_entretien": 1}
+    ).limit(limit).to_list(limit)
+    if not missing:
+        return 0
+    now = datetime.now(timezone.utc)
+    await db.interviews.bulk_write([
+        UpdateOne({"_id": doc["_id"]}, {"$set": {
+            "date_entretien_at": parse_interview_date(doc.get("date_entretien")) or False,
+            "updated_at": now.isoformat(),
+        }})
+        for doc in missing
+    ], ordered=False)
+    # Champ exporté : version des données (empreinte des exports) de chaque utilisateur touché
+    for uid in {doc.get("user_id") for doc in missing if doc.get("user_id")}:
+        await record_data_change(db, uid)
+    return len(missing)
+
+
+def _bucket(fire_at: datetime) -> datetime:
+    step = settings.REMINDER_BUCKET_SECONDS
+    return datetime.fromtimestamp(math.floor(fire_at.timestamp() / step) * step, tz=timezone.utc)
+
+
+async def _run_bucket(bucket: datetime):
+    keys = list(_pending.pop(bucket, {}))
+    if not keys:
+        return
+    try:
+        stats = await deliver_reminders(_db, keys)
+        logger.info(f"[Reminders] Échéance {bucket.isoformat()}: {stats}")
+    except Exception as e:
+        logger.error(f"[Reminders] Erreur livraison {bucket.isoformat()}: {e}")
+
+
+def _enqueue(key: ReminderKey, fire_at: datetime, now: datetime):
+    bucket = _bucket(fire_at)
+    _pending.setdefault(bucket, {})[key] = fire_at
+    job_id = f"reminders_{int(bucket.timestamp())}"
+    if _scheduler.get_job(job_id) is None:
+        _scheduler.add_job(
+            _run_bucket,
+            trigger=DateTrigger(run_date=max(bucket, now)),
+            args=[bucket],
+            id=job_id,
+            name=f"Rappels {bucket.isoformat()}",
+            misfire_grace_time=int(REMINDER_KINDS["24h"][1].total_seconds()),
+            replace_existing=True
+        )
+
+
+def _due_window(kind: str, now: datetime, horizon: timedelta) -> dict:
+    """Plage de date_entretien_at dont le rappel `kind` tombe dans [now - tolérance, now + horizon]"""
+    offset, grace = REMINDER_KINDS[kind]
+    return {"$gte": now - grace + offset, "$lt": now + horizon + offset}
+
+
+async def plan_reminders(db, deliver_due: bool = False) -> dict:
+    """
+    Lit les entretiens dont un rappel tombe dans l'horizon (REMINDER_PLAN_HORIZON_SECONDS).
+    Les rappels échus sont livrés immédiatement si deliver_due (ou si aucun
+    scheduler n'est actif), les autres sont confiés à un job ponctuel.
+    """
+    now = datetime.now(timezone.utc)
+    horizon = timedelta(seconds=settings.REMINDER_PLAN_HORIZON_SECONDS)
+    stats = {"backfilled": await backfill_interview_dates(db), "scheduled": 0}
+    # Rappels échus (fenêtre de tolérance) : (clé, (user_id, reminder_key), échéance)
+    overdue: List[Tuple[ReminderKey, Tuple[Optional[str], str], datetime]] = []
+
+    for kind, (offset, _) in REMINDER_KINDS.items():
+        cursor = db.interviews.find(
+            {"statut": "planned", "date_entretien_at": _due_window(kind, now, horizon)},
+            {"_id": 1, "id": 1, "user_id": 1, "date_entretien_at": 1}
+        ).batch_size(CURSOR_BATCH_SIZE)
+        async for interview in cursor:
+            key = (interview_key(interview), kind)
+            fire_at = _as_utc(interview["date_entretien_at"]) - offset
+            if fire_at <= now:
+                overdue.append((key, (interview.get("user_id"), f"reminder_{kind}_{key[0]}"), fire_at))
+            elif _scheduler is not None:
+                _enqueue(key, fire_at, now)
+                stats["scheduled"] += 1
+
+    # La fenêtre relit à chaque passage les rappels déjà livrés : écartés ici en
+    # une requête plutôt que replanifiés pour être ignorés à la livraison
+    if overdue:
+        sent = {
+            (doc["user_id"], doc["reminder_key"]) async for doc in db.sent_reminders.find(
+                {"user_id": {"$in": list({marker[0] for _, marker, _ in overdue})},
+                 "reminder_key": {"$in": [marker[1] for _, marker, _ in overdue]}},
+                {"_id": 0, "user_id": 1, "reminder_key": 1}
+            )
+        }
+        overdue = [item for item in overdue if item[1] not in sent]
+
+    due: List[ReminderKey] = []
+    for key, _, fire_at in overdue:
+        if deliver_due or _scheduler is None:
+            due.append(key)
+        else:
+            _enqueue(key, fire_at, now)
+            stats["scheduled"] += 1
+
+    stats.update(await deliver_reminders(db, due, now))
+    return stats
+
+
+async def schedule_interview_reminders(interview: dict):
+    """
+    Appelé à la création / modification d'un entretien : planifie tout de suite
+    les rappels qui tombent avant le prochain passage du planificateur.
+    """
+    if _scheduler is None or interview.get("statut", "planned") != "planned":
+        return
+    date_at = interview.get("date_entretien_at")
+    if not isinstance(date_at, datetime):
+        return
+    now = datetime.now(timezone.utc)
+    horizon = timedelta(seconds=settings.REMINDER_PLAN_HORIZON_SECONDS)
+    for kind, (offset, grace) in REMINDER_KINDS.items():
+        fire_at = _as_utc(date_at) - offset
+        if now - grace <= fire_at < now + horizon:
+            _enqueue((interview_key(interview), kind), fire_at, now)
+
+
+def start_reminder_dispatcher(db, scheduler):
+    """Enregistre le job de planification périodique sur le scheduler"""
+    global _db, _scheduler
+    _db, _scheduler = db, scheduler
+
+    async def plan_job():
+        try:
+            stats = await plan_reminders(db)
+            logger.info(f"[Reminders] Planification: {stats}")
+        except Exception as e:
+            logger.error(f"[Reminders] Erreur planification: {e}")
+
+    scheduler.add_job(
+        plan_job,
+        trigger=IntervalTrigger(seconds=settings.REMINDER_PLAN_INTERVAL_SECONDS),
+        next_run_time=datetime.now(timezone.utc),
+        id="interview_reminders",
+        name="Planification des rappels d'entretiens",
+        replace_existing=True,
+        max_instances=1
+    )
+
+
+def stop_reminder_dispatcher():
+    """Retire le job de planification et les échéances en attente (perte du leadership)"""
+    global _db, _scheduler
+    if _scheduler is not None:
+        for job in _scheduler.get_jobs():
+            if job.id == "interview_reminders" or job.id.startswith("reminders_"):
+                job.remove()
+    _pending.clear()
+    _db, _scheduler = None, None
+
+
+def pending_reminders() -> dict:
+    """Échéances en mémoire (statut du scheduler)"""
+    return {
+        "buckets": len(_pending),
+        "reminders": sum(len(keys) for keys in _pending.values()),
+        "next": min(_pending).isoformat() if _pending else None,
+    }
@@ -0,0 +1,104 @@
+"""
+JobTracker SaaS - Élection du worker leader pour les tâches planifiées
+Un document de bail dans Mongo (scheduler_leases) désigne le seul worker qui
+exécute les jobs périodiques. Le leader renouvelle son bail régulièrement ;
+s'il disparaît, un autre worker le reprend dès l'expiration du bail.
+"""
+
+import logging
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Optional
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+LEASE_COLLECTION = "scheduler_leases"
+
+Callback = Callable[[], Awaitable[None]]
+
+
+class SchedulerLease:
+    """Bail de leadership renouvelable, identifié par nom (un document par bail)"""
+
+    def __init__(self, db, name: str = "scheduler", ttl: Optional[int] = None,
+                 on_elected: Optional[Callback] = None, on_demoted: Optional[Callback] = None):
+        self.db = db
+        self.name = name
+        self.ttl = timedelta(seconds=ttl or settings.SCHEDULER_LEASE_SECONDS)
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self.on_elected = on_elected
+        self.on_demoted = on_demoted
+        self.is_leader = False
+        self.expires_at: Optional[datetime] = None
+
+    async def _acquire(self, now: datetime) -> bool:
+        """Prend le bail s'il est libre ou expiré, le prolonge si on le détient déjà"""
+        update = {"holder": self.worker_id, "expires_at": now + self.ttl, "renewed_at": now}
+        if not self.is_leader:
+            update["acquired_at"] = now
+        try:
+            lease = await self.db[LEASE_COLLECTION].find_one_and_update(
+                {"_id": self.name, "$or": [{"holder": self.worker_id}, {"expires_at": {"$lt": now}}]},
+                {"$set": update},
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+        except DuplicateKeyError:
+            # Bail détenu (et valide) par un autre worker
+            return False
+        return bool(lease) and lease.get("holder") == self.worker_id
+
+    async def heartbeat(self):
+        """Tentative d'acquisition / renouvellement ; déclenche les transitions de leadership"""
+        now = datetime.now(timezone.utc)
+        try:
+            leader = await self._acquire(now)
+            if leader:
+                self.expires_at = now + self.ttl
+        except Exception as e:
+            # Mongo injoignable : on reste leader tant que le bail court encore
+            logger.warning(f"[Leader] Renouvellement impossible: {e}")
+            leader = self.is_leader and self.expires_at is not None and now < self.expires_at
+
+        if leader and not self.is_leader:
+            self.is_leader = True
+            logger.info(f"[Leader] {self.worker_id} élu pour '{self.name}'")
+            if self.on_elected:
+                await self.on_elected()
+        elif not leader and self.is_leader:
+            self.is_leader = False
+            logger.warning(f"[Leader] {self.worker_id} perd le bail '{self.name}'")
+            if self.on_demoted:
+                await self.on_demoted()
+
+    async def release(self):
+        """Libère le bail (arrêt propre) : un autre worker le reprend sans attendre l'expiration"""
+        if not self.is_leader:
+            return
+        self.is_leader = False
+        try:
+            await self.db[LEASE_COLLECTION].update_one(
+                {"_id": self.name, "holder": self.worker_id},
+                {"$set": {"expires_at": datetime.now(timezone.utc)}}
+            )
+        except Exception as e:
+            logger.warning(f"[Leader] Libération du bail impossible: {e}")
+
+    async def status(self) -> dict:
+        lease = await self.db[LEASE_COLLECTION].find_one({"_id": self.name}) or {}
+        expires_at = lease.get("expires_at")
+        return {
+            "worker_id": self.worker_id,
+            "is_leader": self.is_leader,
+            "leader": lease.get("holder"),
+            "leader_since": lease.get("acquired_at").isoformat() if lease.get("acquired_at") else None,
+            "lease_expires_at": expires_at.isoformat() if expires_at else None,
+            "lease_seconds": int(self.ttl.total_seconds()),
+        }
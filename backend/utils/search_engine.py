@@ -0,0 +1,337 @@
+"""
+JobTracker SaaS - Moteur de recherche globale
+Index texte Mongo (langue française : racinisation, insensible aux accents et à
+la casse) sur candidatures, entretiens, documents, lettres générées et
+notifications. Chaque source retourne ses résultats avec le score de
+pertinence ($meta textScore) pondéré, puis la liste unifiée est triée.
+Les sources sont interrogées en parallèle, chacune dans un budget de temps.
+"""
+
+import asyncio
+import logging
+import re
+import unicodedata
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+TEXT_INDEX_LANGUAGE = "french"
+# Champ de langue inexistant : évite qu'un champ "language" d'un document ne
+# change l'analyseur (comportement par défaut de Mongo)
+LANGUAGE_OVERRIDE = "_search_language"
+
+
+# ============================================
+# TOKENISATION
+# ============================================
+
+def strip_accents(text: str) -> str:
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Mots normalisés (minuscules, sans accents), ponctuation ignorée"""
+    if not text:
+        return []
+    return re.findall(r"[a-z0-9]+", strip_accents(text).casefold())
+
+
+def text_query(q: str) -> str:
+    """
+    Chaîne $search : tokens séparés par des espaces, sans guillemets ni '-'
+    (qui activeraient phrase exacte / négation dans la syntaxe $text).
+    """
+    return " ".join(tokenize(q))
+
+
+# ============================================
+# SOURCES
+# ============================================
+
+@dataclass
+class SearchSource:
+    """Collection interrogée : index texte (champ -> poids), formatage et poids de la source"""
+    collection: str
+    fields: Dict[str, int]
+    limit: int
+    to_result: Callable[[dict], dict]
+    # Multiplicateur appliqué au textScore pour classer les sources entre elles
+    boost: float = 1.0
+    # Champs utilisés par le repli regex (par défaut : ceux de l'index)
+    fallback_fields: Optional[List[str]] = None
+
+    @property
+    def index_name(self) -> str:
+        return f"{self.collection}_search"
+
+
+def _application_result(app: dict) -> dict:
+    type_poste = app.get("type_poste", "")
+    return {
+        "id": app["id"],
+        "type": "application",
+        "title": app["entreprise"],
+        "subtitle": f"{app['poste']} · {type_poste.upper()}" if type_poste else app["poste"],
+        "url": f"/dashboard/applications?id={app['id']}",
+        "status": app.get("reponse", "pending"),
+    }
+
+
+def _interview_result(interview: dict) -> dict:
+    app_info = interview.get("_application")
+    title = app_info["entreprise"] if app_info else "Entretien"
+    subtitle = app_info["poste"] if app_info else interview.get("type_entretien", "RH")
+    return {
+        "id": interview["id"],
+        "type": "interview",
+        "title": f"Entretien : {title}",
+        "subtitle": f"{subtitle} - {interview.get('date_entretien', '')[:10]}",
+        "url": f"/dashboard/interviews?id={interview['id']}",
+        "date": interview.get("date_entretien"),
+    }
+
+
+def _document_result(doc: dict) -> dict:
+    return {
+        "id": doc["id"],
+        "type": "document",
+        "title": doc["name"],
+        "subtitle": doc.get("document_type", "Document").upper(),
+        "url": f"/dashboard/documents?id={doc['id']}",
+        "format": doc.get("mime_type"),
+    }
+
+
+def _letter_result(letter: dict) -> dict:
+    return {
+        "id": letter["id"],
+        "type": "letter",
+        "title": f"Lettre : {letter['entreprise']}",
+        "subtitle": letter["poste"],
+        "url": f"/dashboard/documents?id={letter['id']}",
+        "is_ai": True,
+    }
+
+
+def _notification_result(notif: dict) -> dict:
+    return {
+        "id": notif["id"],
+        "type": "notification",
+        "title": notif["title"],
+        "subtitle": notif["message"],
+        "url": "#",
+        "date": notif.get("created_at"),
+    }
+
+
+APPLICATIONS = SearchSource(
+    "applications", {"entreprise": 10, "poste": 8, "lieu": 3}, 10, _application_result, boost=1.2
+)
+INTERVIEWS = SearchSource(
+    "interviews", {"interviewer": 6, "type_entretien": 4, "notes": 2}, 10, _interview_result
+)
+DOCUMENTS = SearchSource(
+    "documents", {"name": 8, "original_filename": 4, "description": 2}, 10, _document_result
+)
+LETTERS = SearchSource(
+    "generated_cover_letters", {"entreprise": 8, "poste": 6, "content": 1}, 8, _letter_result, boost=0.8
+)
+NOTIFICATIONS = SearchSource(
+    "notifications", {"title": 4, "message": 2}, 3, _notification_result, boost=0.5
+)
+
+SEARCH_SOURCES = [APPLICATIONS, INTERVIEWS, DOCUMENTS, LETTERS, NOTIFICATIONS]
+
+# Entretiens d'une candidature trouvée : score de la candidature × ce facteur
+INTERVIEW_VIA_APPLICATION = 0.9
+
+
+async def ensure_search_indexes(db):
+    """
+    Index texte composés (user_id, texte) : le préfixe d'égalité sur user_id
+    restreint chaque recherche aux documents de l'utilisateur.
+    """
+    for source in SEARCH_SOURCES:
+        keys = [("user_id", 1)] + [(field, "text") for field in source.fields]
+        await db[source.collection].create_index(
+            keys,
+            name=source.index_name,
+            weights=source.fields,
+            default_language=TEXT_INDEX_LANGUAGE,
+            language_override=LANGUAGE_OVERRIDE,
+        )
+
+
+# ============================================
+# EXÉCUTION
+# ============================================
+
+async def _text_search(db, source: SearchSource, user_id: str, query: str, extra: Optional[dict] = None) -> List[dict]:
+    filter_query = {"user_id": user_id, "$text": {"$search": query}}
+    if extra:
+        filter_query.update(extra)
+    cursor = db[source.collection].find(
+        filter_query, {"_id": 0, "score": {"$meta": "textScore"}}
+    ).sort([("score", {"$meta": "textScore"})]).limit(source.limit)
+    return await cursor.to_list(source.limit)
+
+
+async def _regex_search(db, source: SearchSource, user_id: str, q: str) -> List[dict]:
+    """Repli sous-chaîne (mots partiels) : balayage, utilisé seulement sans résultat texte"""
+    pattern = {"$regex": re.escape(q), "$options": "i"}
+    fields = source.fallback_fields or list(source.fields)
+    docs = await db[source.collection].find(
+        {"user_id": user_id, "$or": [{f: pattern} for f in fields]}, {"_id": 0}
+    ).limit(source.limit).to_list(source.limit)
+    for doc in docs:
+        doc["score"] = 0.0
+    return docs
+
+
+async def _attach_applications(db, interviews: List[dict], known: Dict[str, dict]):
+    """Entreprise / poste des entretiens, en une requête pour les candidatures non chargées"""
+    missing = {i.get("candidature_id") for i in interviews} - set(known) - {None}
+    if missing:
+        async for app in db.applications.find(
+            {"id": {"$in": list(missing)}}, {"_id": 0, "id": 1, "entreprise": 1, "poste": 1}
+        ):
+            known[app["id"]] = app
+    for interview in interviews:
+        interview["_application"] = known.get(interview.get("candidature_id"))
+
+
+def _rank(scored: List[tuple]) -> List[dict]:
+    """(score, résultat) -> résultats triés par score décroissant, sans doublons"""
+    seen = set()
+    results = []
+    for score, result in sorted(scored, key=lambda item: item[0], reverse=True):
+        key = (result["type"], result["id"])
+        if key in seen:
+            continue
+        seen.add(key)
+        results.append({**result, "score": round(score, 3)})
+    return results
+
+
+async def _run_sources(jobs: Dict[str, "asyncio.Future"], budget: float) -> Tuple[List[tuple], List[str]]:
+    """
+    Attend les sources lancées en parallèle au plus `budget` secondes.
+    Retourne (résultats des sources terminées, sources abandonnées ou en erreur).
+    """
+    done, pending = await asyncio.wait(jobs.values(), timeout=budget)
+    for task in pending:
+        task.cancel()
+    if pending:
+        await asyncio.gather(*pending, return_exceptions=True)
+
+    scored, skipped = [], []
+    for name, task in jobs.items():
+        if task in pending:
+            logger.warning(f"Search source {name} exceeded its {budget}s budget")
+            skipped.append(name)
+        elif task.exception() is not None:
+            logger.error(f"Search source {name} failed: {task.exception()}")
+            skipped.append(name)
+        else:
+            scored += task.result()
+    return scored, skipped
+
+
+async def search(db, user_id: str, q: str, budget: Optional[float] = None) -> Tuple[List[dict], List[str]]:
+    """
+    Recherche classée sur toutes les sources de l'utilisateur, interrogées en
+    parallèle. Une source qui dépasse le budget (SEARCH_SOURCE_BUDGET_SECONDS)
+    est abandonnée : retourne (résultats, sources manquantes).
+    """
+    query = text_query(q)
+    if not query:
+        return [], []
+    budget = settings.SEARCH_SOURCE_BUDGET_SECONDS if budget is None else budget
+
+    async def applications():
+        return await _text_search(db, APPLICATIONS, user_id, query)
+
+    apps_task = asyncio.ensure_future(applications())
+
+    async def applications_scored():
+        return [(app["score"] * APPLICATIONS.boost, APPLICATIONS.to_result(app)) for app in await apps_task]
+
+    async def interviews():
+        # Texte propre + entretiens des candidatures trouvées (si elles arrivent à temps)
+        found = await _text_search(db, INTERVIEWS, user_id, query)
+        for interview in found:
+            interview["_score"] = interview["score"] * INTERVIEWS.boost
+        await asyncio.wait([apps_task])
+        matched_apps = {} if apps_task.cancelled() or apps_task.exception() else {a["id"]: a for a in apps_task.result()}
+        if matched_apps:
+            linked = await db.interviews.find(
+                {"user_id": user_id, "candidature_id": {"$in": list(matched_apps)}}, {"_id": 0}
+            ).limit(INTERVIEWS.limit).to_list(INTERVIEWS.limit)
+            for interview in linked:
+                app_score = matched_apps[interview["candidature_id"]]["score"] * APPLICATIONS.boost
+                interview["_score"] = app_score * INTERVIEW_VIA_APPLICATION
+            found += linked
+        await _attach_applications(db, found, matched_apps)
+        return [(i["_score"], INTERVIEWS.to_result(i)) for i in found]
+
+    async def text_source(source: SearchSource):
+        docs = await _text_search(db, source, user_id, query)
+        return [(d["score"] * source.boost, source.to_result(d)) for d in docs]
+
+    jobs = {
+        APPLICATIONS.collection: asyncio.ensure_future(applications_scored()),
+        INTERVIEWS.collection: asyncio.ensure_future(interviews()),
+        **{s.collection: asyncio.ensure_future(text_source(s)) for s in (DOCUMENTS, LETTERS, NOTIFICATIONS)},
+    }
+    try:
+        scored, skipped = await _run_sources(jobs, budget)
+    finally:
+        if not apps_task.done():
+            apps_task.cancel()
+
+    if not scored and not skipped and settings.SEARCH_REGEX_FALLBACK:
+        async def regex_source(source: SearchSource):
+            docs = await _regex_search(db, source, user_id, q.strip())
+            if source is INTERVIEWS:
+                await _attach_applications(db, docs, {})
+            return [(0.0, source.to_result(d)) for d in docs]
+
+        scored, skipped = await _run_sources(
+            {s.collection: asyncio.ensure_future(regex_source(s)) for s in SEARCH_SOURCES}, budget
+        )
+
+    return _rank(scored), skipped
+
+
+async def suggestions(db, user_id: str) -> List[dict]:
+    """Requête vide : candidatures récentes et prochains entretiens (2 requêtes en parallèle + 1 $in)"""
+    recent_apps, upcoming = await asyncio.gather(
+        db.applications.find({"user_id": user_id}, {"_id": 0}).sort("updated_at", -1).limit(4).to_list(4),
+        db.interviews.find({"user_id": user_id, "statut": "planned"}, {"_id": 0}).sort("date_entretien", 1).limit(3).to_list(3),
+    )
+    known = {app["id"]: app for app in recent_apps}
+    await _attach_applications(db, upcoming, known)
+
+    results = [{
+        "id": app["id"],
+        "type": "application",
+        "title": app["entreprise"],
+        "subtitle": f"Récemment mis à jour - {app['poste']}",
+        "url": f"/dashboard/applications?id={app['id']}",
+        "suggestion": True
+    } for app in recent_apps]
+    for interview in upcoming:
+        app_info = interview.get("_application")
+        results.append({
+            "id": interview["id"],
+            "type": "interview",
+            "title": f"Entretien : {app_info['entreprise'] if app_info else '?'}",
+            "subtitle": f"Prochainement le {interview['date_entretien'][:10]}",
+            "url": f"/dashboard/interviews?id={interview['id']}",
+            "suggestion": True
+        })
+    return results
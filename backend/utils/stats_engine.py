@@ -0,0 +1,106 @@
+"""
+JobTracker SaaS - Moteur de statistiques
+Calcule compteurs et répartitions en une seule agrégation $facet par collection
+au lieu d'enchaîner les count_documents.
+"""
+
+from typing import Dict, List, Optional
+
+
+def period_range(date_from: Optional[str], date_to: Optional[str]) -> Optional[dict]:
+    """Plage de dates ISO (YYYY-MM-DD) ; le jour de fin est inclus en entier"""
+    if not (date_from or date_to):
+        return None
+    date_range: dict = {}
+    if date_from:
+        date_range["$gte"] = date_from
+    if date_to:
+        date_range["$lte"] = date_to + "T23:59:59"
+    return date_range
+
+
+def count_facet(match: Optional[dict] = None) -> List[dict]:
+    """Sous-pipeline : nombre de documents correspondant à match"""
+    stages = [{"$match": match}] if match else []
+    return stages + [{"$count": "count"}]
+
+
+def group_facet(field: str, match: Optional[dict] = None) -> List[dict]:
+    """Sous-pipeline : répartition des documents par valeur de field"""
+    stages = [{"$match": match}] if match else []
+    return stages + [
+        {"$group": {"_id": f"${field}", "count": {"$sum": 1}}},
+        {"$sort": {"count": -1}}
+    ]
+
+
+def with_interview_facet(match: Optional[dict] = None) -> List[dict]:
+    """Sous-pipeline : candidatures ayant au moins un entretien associé"""
+    stages = [{"$match": match}] if match else []
+    return stages + [
+        {"$lookup": {"from": "interviews", "localField": "id", "foreignField": "candidature_id", "as": "_ivs"}},
+        {"$match": {"_ivs": {"$ne": []}}},
+        {"$count": "count"}
+    ]
+
+
+def avg_response_time_facet(match: Optional[dict] = None) -> List[dict]:
+    """Sous-pipeline : délai moyen de réponse en jours"""
+    return [
+        {"$match": {**(match or {}), "date_reponse": {"$ne": None}}},
+        {"$project": {"response_time": {"$divide": [
+            {"$subtract": [
+                {"$dateFromString": {"dateString": "$date_reponse"}},
+                {"$dateFromString": {"dateString": "$date_candidature"}}
+            ]},
+            1000 * 60 * 60 * 24
+        ]}}},
+        {"$group": {"_id": None, "avg": {"$avg": "$response_time"}}}
+    ]
+
+
+def daily_facet(field: str, match: Optional[dict] = None) -> List[dict]:
+    """Sous-pipeline : nombre de documents par jour (YYYY-MM-DD) de field"""
+    match = dict(match or {})
+    match[field] = {**match.get(field, {}), "$type": "string"}
+    return [
+        {"$match": match},
+        {"$group": {"_id": {"$substr": [f"${field}", 0, 10]}, "count": {"$sum": 1}}},
+        {"$sort": {"_id": 1}}
+    ]
+
+
+def application_facets(period_match: Optional[dict] = None) -> Dict[str, List[dict]]:
+    """Facettes communes aux dashboards : statuts, types, moyens, favoris, entretiens"""
+    period_match = period_match or {}
+    return {
+        "by_status": group_facet("reponse", period_match),
+        "by_type": group_facet("type_poste", period_match),
+        "by_method": group_facet("moyen", {**period_match, "moyen": {"$ne": None}}),
+        "favorites": count_facet({**period_match, "is_favorite": True}),
+        "with_interview": with_interview_facet(period_match),
+    }
+
+
+async def run_facets(collection, base_match: dict, facets: Dict[str, List[dict]]) -> dict:
+    """Exécute toutes les facettes en un seul aller-retour"""
+    pipeline = [{"$match": base_match}, {"$facet": facets}]
+    result = await collection.aggregate(pipeline).to_list(1)
+    return result[0] if result else {name: [] for name in facets}
+
+
+def facet_count(result: dict, name: str) -> int:
+    """Lit le résultat d'un count_facet / with_interview_facet"""
+    rows = result.get(name) or []
+    return rows[0]["count"] if rows else 0
+
+
+def facet_groups(result: dict, name: str) -> Dict:
+    """Lit le résultat d'un group_facet / daily_facet sous forme {valeur: nombre}"""
+    return {row["_id"]: row["count"] for row in result.get(name) or []}
+
+
+def facet_value(result: dict, name: str, key: str):
+    """Lit un champ du premier document d'une facette (ex. moyenne)"""
+    rows = result.get(name) or []
+    return rows[0].get(key) if rows else None
@@ -0,0 +1,317 @@
+"""
+JobTracker SaaS - Stockage objet des documents
+Interface asynchrone commune (save / delete / url) et trois adaptateurs :
+- Cloudinary : SDK synchrone exécuté dans un pool de threads dédié
+  (STORAGE_MAX_WORKERS appels simultanés), upload par morceaux (upload_large)
+- S3 (AWS, MinIO, R2...) : boto3 dans le même pool, multipart par morceaux
+- disque local : développement et tests, fichiers servis par /api/documents/files
+  via des URL signées (HMAC) à durée limitée
+Les uploads lisent la source (UploadFile, fichier ou bytes) par morceaux de
+STORAGE_CHUNK_SIZE : un document n'est jamais chargé entier en mémoire.
+"""
+
+import abc
+import asyncio
+import functools
+import hashlib
+import hmac
+import inspect
+import io
+import logging
+import os
+import re
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from config import settings
+
+try:
+    import boto3
+    from boto3.s3.transfer import TransferConfig
+    from botocore.config import Config as BotoConfig
+    S3_AVAILABLE = True
+except ImportError:
+    S3_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Clés relatives uniquement : pas de chemin absolu ni de remontée ("..")
+VALID_KEY = re.compile(r"^[\w\-]+(?:\.[\w\-]+)*(?:/[\w\-]+(?:\.[\w\-]+)*)*$")
+
+
+@dataclass
+class StoredObject:
+    storage: str
+    key: str
+    url: str
+    size: int
+    # Informations propres à l'adaptateur, à repasser à delete (ex. resource_type Cloudinary)
+    meta: Dict[str, str] = field(default_factory=dict)
+
+
+class StorageError(Exception):
+    pass
+
+
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+async def _run(fn, *args, **kwargs):
+    """Appel bloquant d'un SDK dans le pool de threads du stockage"""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=settings.STORAGE_MAX_WORKERS, thread_name_prefix="storage")
+    return await asyncio.get_running_loop().run_in_executor(_executor, functools.partial(fn, *args, **kwargs))
+
+
+def _check_key(key: str) -> str:
+    if not VALID_KEY.match(key):
+        raise StorageError(f"Clé de stockage invalide: {key!r}")
+    return key
+
+
+def _sync_file(source):
+    """Fichier synchrone lisible par morceaux (UploadFile, fichier ou bytes)"""
+    if isinstance(source, (bytes, bytearray)):
+        return io.BytesIO(source)
+    return getattr(source, "file", source)
+
+
+def _size(fileobj) -> int:
+    position = fileobj.tell()
+    fileobj.seek(0, 2)
+    size = fileobj.tell() - position
+    fileobj.seek(position)
+    return size
+
+
+# ============================================
+# ADAPTATEURS
+# ============================================
+
+class ObjectStore(abc.ABC):
+    name = ""
+
+    @abc.abstractmethod
+    async def save(self, key: str, source, content_type: Optional[str] = None,
+                   tags: Optional[List[str]] = None, **options) -> StoredObject:
+        """Enregistre la source sous la clé (options propres à l'adaptateur, ignorées par les autres)"""
+
+    @abc.abstractmethod
+    async def delete(self, key: str, meta: Optional[dict] = None):
+        """Supprime l'objet (absent : pas d'erreur)"""
+
+    @abc.abstractmethod
+    async def url(self, key: str, meta: Optional[dict] = None) -> str:
+        """URL de téléchargement (éventuellement temporaire)"""
+
+
+class CloudinaryStore(ObjectStore):
+    name = "cloudinary"
+
+    def __init__(self):
+        import cloudinary
+        import cloudinary.uploader
+
+        cloudinary.config(
+            cloud_name=os.environ.get("CLOUDINARY_CLOUD_NAME"),
+            api_key=os.environ.get("CLOUDINARY_API_KEY"),
+            api_secret=os.environ.get("CLOUDINARY_API_SECRET"),
+            secure=True
+        )
+        self._uploader = cloudinary.uploader
+
+    async def save(self, key, source, content_type=None, tags=None, **options) -> StoredObject:
+        fileobj = _sync_file(source)
+        size = _size(fileobj)
+        result = await _run(
+            self._uploader.upload_large,
+            fileobj,
+            public_id=_check_key(key),
+            # auto : images et PDF visualisables, autres formats en raw
+            resource_type=options.get("resource_type", "auto"),
+            chunk_size=settings.STORAGE_CHUNK_SIZE,
+            overwrite=True,
+            tags=tags or []
+        )
+        return StoredObject(
+            storage=self.name,
+            key=result.get("public_id", key),
+            url=result.get("secure_url"),
+            size=size,
+            meta={"resource_type": result.get("resource_type", "raw")}
+        )
+
+    async def delete(self, key, meta=None):
+        resource_type = (meta or {}).get("resource_type")
+        # Objets plus anciens sans resource_type connu : image puis raw
+        for candidate in [resource_type] if resource_type else ["image", "raw"]:
+            result = await _run(self._uploader.destroy, key, resource_type=candidate)
+            if result.get("result") == "ok":
+                return
+
+    async def url(self, key, meta=None):
+        from cloudinary.utils import cloudinary_url
+        return cloudinary_url(key, resource_type=(meta or {}).get("resource_type", "image"), secure=True)[0]
+
+
+class S3Store(ObjectStore):
+    """Bucket S3 ou compatible (S3_ENDPOINT_URL pour MinIO, R2, Scaleway...)"""
+
+    name = "s3"
+
+    def __init__(self):
+        if not S3_AVAILABLE:
+            raise StorageError("boto3 n'est pas installé (stockage S3)")
+        if not settings.S3_BUCKET:
+            raise StorageError("S3_BUCKET non configuré")
+        self.bucket = settings.S3_BUCKET
+        self._client = boto3.client(
+            "s3",
+            endpoint_url=settings.S3_ENDPOINT_URL or None,
+            region_name=settings.S3_REGION or None,
+            aws_access_key_id=settings.S3_ACCESS_KEY_ID or None,
+            aws_secret_access_key=settings.S3_SECRET_ACCESS_KEY or None,
+            config=BotoConfig(max_pool_connections=settings.STORAGE_MAX_WORKERS)
+        )
+        # Déjà dans un thread du pool : pas de threads supplémentaires par transfert
+        self._transfer = TransferConfig(
+            multipart_threshold=settings.STORAGE_CHUNK_SIZE,
+            multipart_chunksize=settings.STORAGE_CHUNK_SIZE,
+            use_threads=False
+        )
+
+    async def save(self, key, source, content_type=None, tags=None, **options) -> StoredObject:
+        fileobj = _sync_file(source)
+        size = _size(fileobj)
+        extra = {"ContentType": content_type} if content_type else {}
+        if tags:
+            extra["Tagging"] = "&".join(f"tag{i}={tag}" for i, tag in enumerate(tags))
+        await _run(
+            self._client.upload_fileobj, fileobj, self.bucket, _check_key(key),
+            ExtraArgs=extra, Config=self._transfer
+        )
+        return StoredObject(storage=self.name, key=key, url=await self.url(key), size=size)
+
+    async def delete(self, key, meta=None):
+        await _run(self._client.delete_object, Bucket=self.bucket, Key=key)
+
+    async def url(self, key, meta=None):
+        if settings.S3_PUBLIC_URL:
+            return f"{settings.S3_PUBLIC_URL.rstrip('/')}/{key}"
+        # Bucket privé : URL signée (calcul local, sans appel réseau)
+        return self._client.generate_presigned_url(
+            "get_object", Params={"Bucket": self.bucket, "Key": key},
+            ExpiresIn=settings.S3_URL_EXPIRES_SECONDS
+        )
+
+
+class LocalStore(ObjectStore):
+    """Fichiers sur disque (STORAGE_LOCAL_DIR), servis par /api/documents/files/{clé}"""
+
+    name = "local"
+
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = directory or settings.STORAGE_LOCAL_DIR or os.path.join(
+            tempfile.gettempdir(), "jobtracker_storage"
+        )
+
+    def path(self, key: str) -> Optional[str]:
+        """Chemin du fichier, None si la clé est invalide"""
+        if not VALID_KEY.match(key):
+            return None
+        return os.path.join(self.directory, *key.split("/"))
+
+    async def save(self, key, source, content_type=None, tags=None, **options) -> StoredObject:
+        path = self.path(_check_key(key))
+        await asyncio.to_thread(os.makedirs, os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.part"
+        size = 0
+        f = await asyncio.to_thread(open, tmp, "wb")
+        try:
+            if isinstance(source, (bytes, bytearray)):
+                await asyncio.to_thread(f.write, source)
+                size = len(source)
+            else:
+                # UploadFile (read asynchrone) ou fichier synchrone
+                read = source.read if inspect.iscoroutinefunction(source.read) else functools.partial(asyncio.to_thread, source.read)
+                while True:
+                    chunk = await read(settings.STORAGE_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    await asyncio.to_thread(f.write, chunk)
+                    size += len(chunk)
+        except BaseException:
+            f.close()
+            await asyncio.to_thread(_remove, tmp)
+            raise
+        f.close()
+        await asyncio.to_thread(os.replace, tmp, path)
+        return StoredObject(storage=self.name, key=key, url=await self.url(key), size=size)
+
+    async def delete(self, key, meta=None):
+        path = self.path(key)
+        if path:
+            await asyncio.to_thread(_remove, path)
+
+    async def url(self, key, meta=None):
+        # Échéance arrondie : même URL pendant une période (cache navigateur), valable au moins la durée configurée
+        ttl = settings.STORAGE_LOCAL_URL_EXPIRES_SECONDS
+        expires = (int(time.time()) // ttl + 2) * ttl
+        return f"{settings.BACKEND_URL}/api/documents/files/{key}?expires={expires}&signature={self._sign(key, expires)}"
+
+    def verify(self, key: str, expires: int, signature: str) -> bool:
+        """Signature valide et non expirée d'une URL produite par url()"""
+        if expires < time.time():
+            return False
+        return hmac.compare_digest(self._sign(key, expires), signature or "")
+
+    @staticmethod
+    def _sign(key: str, expires: int) -> str:
+        return hmac.new(settings.SECRET_KEY.encode("utf-8"), f"{key}:{expires}".encode("utf-8"), hashlib.sha256).hexdigest()
+
+
+def _remove(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+_ADAPTERS = {"cloudinary": CloudinaryStore, "s3": S3Store, "local": LocalStore}
+_stores: Dict[str, ObjectStore] = {}
+
+
+def get_object_store(name: Optional[str] = None) -> ObjectStore:
+    """Adaptateur de stockage (STORAGE_BACKEND par défaut), créé une fois par processus"""
+    name = name or settings.STORAGE_BACKEND
+    if name not in _stores:
+        if name not in _ADAPTERS:
+            raise StorageError(f"Stockage inconnu: {name}")
+        _stores[name] = _ADAPTERS[name]()
+    return _stores[name]
+
+
+async def stored_url(record: dict) -> Optional[str]:
+    """
+    URL d'un objet enregistré (champs storage, storage_key, storage_meta), calculée
+    à la lecture : jamais persistée, une URL signée S3 expire. Sinon champ url.
+    """
+    if not record.get("storage_key"):
+        return record.get("url")
+    try:
+        return await get_object_store(record.get("storage")).url(record["storage_key"], record.get("storage_meta"))
+    except Exception as e:
+        logger.warning(f"[Storage] URL de {record['storage_key']} indisponible: {e}")
+        return None
+
+
+def shutdown_storage():
+    """Arrête le pool de threads du stockage (arrêt de l'application)"""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False)
+        _executor = None
@@ -0,0 +1,196 @@
+"""
+JobTracker SaaS - Cache des templates de lettres de motivation
+- Documents templates (utilisateur et système) gardés en mémoire : plus de
+  find_one à chaque génération
+- Templates Jinja compilés une fois dans un Environment partagé, LRU indexé par
+  template et version (hash de updated_at + source) ; le bytecode est aussi
+  persisté sur disque (FileSystemBytecodeCache, dossier privé 0700), partagé
+  entre workers et redémarrages, et la version remplacée en est supprimée
+- Invalidation par le bus (update/delete), templates système préchargés au démarrage
+"""
+
+import hashlib
+import logging
+import os
+import re
+import stat
+from typing import Dict, Optional, Tuple
+
+from jinja2 import BaseLoader, ChainableUndefined, Environment, FileSystemBytecodeCache, Template, TemplateNotFound
+
+from config import settings
+from utils.cache import TTLCache, get_invalidation_bus
+
+logger = logging.getLogger(__name__)
+
+# Champ contenant la source selon la collection
+CONTENT_FIELDS = {"cover_letter_templates": "content", "system_templates": "html_content"}
+
+
+class _SourceLoader(BaseLoader):
+    """Sources fournies juste avant la compilation (le nom porte la version)"""
+
+    def __init__(self):
+        self.sources: Dict[str, str] = {}
+
+    def get_source(self, environment, name):
+        if name not in self.sources:
+            raise TemplateNotFound(name)
+        return self.sources[name], None, lambda: True
+
+
+def _bytecode_cache() -> Optional[FileSystemBytecodeCache]:
+    """
+    Jinja recharge du code depuis ce dossier : il doit appartenir au processus et
+    n'être accessible qu'à lui (0700). Sans TEMPLATE_BYTECODE_DIR, dossier privé
+    par utilisateur créé et vérifié par Jinja.
+    """
+    directory = settings.TEMPLATE_BYTECODE_DIR
+    try:
+        if not directory:
+            return FileSystemBytecodeCache()
+        os.makedirs(directory, mode=stat.S_IRWXU, exist_ok=True)
+        os.chmod(directory, stat.S_IRWXU)
+        info = os.lstat(directory)
+        if (info.st_uid != os.getuid() or not stat.S_ISDIR(info.st_mode)
+                or stat.S_IMODE(info.st_mode) != stat.S_IRWXU):
+            raise OSError("dossier non privé (propriétaire ou droits)")
+        return FileSystemBytecodeCache(directory)
+    except (OSError, RuntimeError) as e:
+        logger.warning(f"[Templates] Cache de bytecode désactivé ({directory or 'dossier temporaire'}): {e}")
+        return None
+
+
+_loader = _SourceLoader()
+# Le cache interne de Jinja est désactivé : les templates compilés vivent dans _compiled
+_env = Environment(
+    loader=_loader,
+    undefined=ChainableUndefined,
+    bytecode_cache=_bytecode_cache(),
+    cache_size=0,
+    auto_reload=False
+)
+
+# (collection, template_id) -> document
+_documents = TTLCache(max_entries=settings.TEMPLATE_CACHE_SIZE, ttl=settings.TEMPLATE_CACHE_TTL_SECONDS)
+# (collection, template_id) -> (version, Template compilé)
+_compiled = TTLCache(max_entries=settings.TEMPLATE_CACHE_SIZE, ttl=settings.TEMPLATE_CACHE_TTL_SECONDS)
+
+
+def _template_name(collection: str, template_id: str, version: str) -> str:
+    return f"{collection}/{template_id}@{version}"
+
+
+def _prune_bytecode(name: str):
+    """Supprime le bytecode d'une version remplacée (sinon le dossier grossit à chaque modification)"""
+    cache = _env.bytecode_cache
+    if cache is None:
+        return
+    try:
+        os.remove(os.path.join(cache.directory, cache.pattern % cache.get_cache_key(name)))
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        logger.warning(f"[Templates] Bytecode de {name} non supprimé: {e}")
+
+
+def _on_template_invalidated(template_id: Optional[str]):
+    if template_id is None:
+        _documents.clear()
+        _compiled.clear()
+        if _env.bytecode_cache is not None:
+            _env.bytecode_cache.clear()
+        return
+    for collection in CONTENT_FIELDS:
+        key = (collection, template_id)
+        cached = _compiled.get(key)
+        if cached is not None:
+            _prune_bytecode(_template_name(collection, template_id, cached[0]))
+        _documents.invalidate(key)
+        _compiled.invalidate(key)
+
+
+get_invalidation_bus().subscribe("templates", _on_template_invalidated)
+
+
+async def invalidate_template(template_id: Optional[str] = None):
+    """À appeler après modification / suppression d'un template (tous les workers)"""
+    await get_invalidation_bus().publish("templates", template_id)
+
+
+def to_jinja(raw: str) -> str:
+    """Les templates utilisateurs historiques utilisent {var} : convertis en {{ var }}"""
+    if "{{" in raw:
+        return raw
+    return re.sub(r'\{(\w+)\}', r'{{ \1 }}', raw)
+
+
+# ============================================
+# DOCUMENTS
+# ============================================
+
+async def get_template_doc(db, template_id: str, user_id: Optional[str] = None, system: bool = False) -> Optional[dict]:
+    """Template système, ou template de l'utilisateur (None s'il ne lui appartient pas)"""
+    collection = "system_templates" if system else "cover_letter_templates"
+    key = (collection, template_id)
+    doc = _documents.get(key)
+    if doc is None:
+        doc = await db[collection].find_one({"id": template_id}, {"_id": 0})
+        if doc is None:
+            return None
+        _documents.set(key, doc)
+    if not system and doc.get("user_id") != user_id:
+        return None
+    return doc
+
+
+async def preload_system_templates(db) -> int:
+    """Charge et compile les templates système actifs (démarrage)"""
+    count = 0
+    async for doc in db.system_templates.find({"is_active": True}, {"_id": 0}):
+        _documents.set(("system_templates", doc["id"]), doc)
+        try:
+            compile_template(doc, system=True)
+            count += 1
+        except Exception as e:
+            logger.warning(f"[Templates] Template système {doc.get('id')} non compilable: {e}")
+    return count
+
+
+# ============================================
+# COMPILATION & RENDU
+# ============================================
+
+def _version(doc: dict, source: str) -> str:
+    return hashlib.sha1(f"{doc.get('updated_at', '')}|{source}".encode("utf-8")).hexdigest()[:16]
+
+
+def compile_template(doc: dict, system: bool = False) -> Template:
+    """Template Jinja compilé du document, recompilé seulement si sa version change"""
+    collection = "system_templates" if system else "cover_letter_templates"
+    key = (collection, doc["id"])
+    source = to_jinja(doc.get(CONTENT_FIELDS[collection]) or "")
+    version = _version(doc, source)
+    cached: Optional[Tuple[str, Template]] = _compiled.get(key)
+    if cached is not None:
+        if cached[0] == version:
+            return cached[1]
+        _prune_bytecode(_template_name(collection, doc["id"], cached[0]))
+
+    name = _template_name(collection, doc["id"], version)
+    _loader.sources[name] = source
+    try:
+        template = _env.get_template(name)
+    finally:
+        _loader.sources.pop(name, None)
+    _compiled.set(key, (version, template))
+    return template
+
+
+def render_template_doc(doc: dict, context: dict, system: bool = False) -> str:
+    """Rend un template en ignorant silencieusement les variables inconnues"""
+    return compile_template(doc, system).render(**context)
+
+
+def template_cache_stats() -> dict:
+    return {"documents": _documents.stats(), "compiled": _compiled.stats()}
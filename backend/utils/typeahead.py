@@ -0,0 +1,211 @@
+"""
+JobTracker SaaS - Index de préfixes pour l'autocomplétion (palette de commandes)
+Un index en mémoire par utilisateur sur entreprise, poste, lieu, noms de
+documents et recruteurs. Chaque terme est indexé à chaque début de mot
+(« dev », « python » trouvent « Développeur Python ») dans un tableau trié
+parcouru par dichotomie. Les index sont construits à la demande, mis à jour
+sur les écritures et évincés par LRU (utilisateurs inactifs).
+"""
+
+import asyncio
+import logging
+from bisect import bisect_left, insort
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set, Tuple
+
+from config import settings
+from utils.cache import TTLCache, get_invalidation_bus
+from utils.search_engine import tokenize
+
+logger = logging.getLogger(__name__)
+
+# Champs indexés par collection
+INDEXED_FIELDS = {
+    "applications": ("entreprise", "poste", "lieu"),
+    "interviews": ("interviewer",),
+    "documents": ("name",),
+}
+# Type renvoyé quand il diffère du nom du champ
+RESULT_TYPES = {"name": "document"}
+# Nombre maximal d'entrées parcourues par requête avant classement
+SCAN_LIMIT = 500
+
+TermKey = Tuple[str, str]  # (champ, valeur normalisée)
+
+
+@dataclass
+class _Term:
+    value: str
+    refs: Set[str] = field(default_factory=set)
+
+
+class PrefixIndex:
+    """Termes d'un utilisateur, interrogeables par préfixe de mot"""
+
+    def __init__(self):
+        self._terms: Dict[TermKey, _Term] = {}
+        # (suffixe normalisé commençant à un début de mot, position du mot, terme)
+        self._entries: List[Tuple[str, int, TermKey]] = []
+
+    def __len__(self):
+        return len(self._terms)
+
+    @staticmethod
+    def _suffixes(normalized: str) -> List[Tuple[str, int]]:
+        words = normalized.split(" ")
+        return [(" ".join(words[i:]), i) for i in range(len(words))]
+
+    def add(self, field_name: str, value, ref_id: str):
+        normalized = " ".join(tokenize(value if isinstance(value, str) else None))
+        if not normalized:
+            return
+        key = (field_name, normalized)
+        term = self._terms.get(key)
+        if term is None:
+            term = self._terms[key] = _Term(value.strip())
+            for suffix, position in self._suffixes(normalized):
+                insort(self._entries, (suffix, position, key))
+        term.refs.add(ref_id)
+
+    def remove(self, field_name: str, value, ref_id: str):
+        normalized = " ".join(tokenize(value if isinstance(value, str) else None))
+        key = (field_name, normalized)
+        term = self._terms.get(key)
+        if term is None:
+            return
+        term.refs.discard(ref_id)
+        if term.refs:
+            return
+        del self._terms[key]
+        for suffix, position in self._suffixes(normalized):
+            i = bisect_left(self._entries, (suffix, position, key))
+            if i < len(self._entries) and self._entries[i] == (suffix, position, key):
+                del self._entries[i]
+
+    def add_document(self, collection: str, doc: dict):
+        for field_name in INDEXED_FIELDS[collection]:
+            self.add(field_name, doc.get(field_name), doc["id"])
+
+    def remove_document(self, collection: str, doc: dict):
+        for field_name in INDEXED_FIELDS[collection]:
+            self.remove(field_name, doc.get(field_name), doc["id"])
+
+    def search(self, q: str, limit: int = 8) -> List[dict]:
+        """
+        Termes dont un mot commence par la requête. Classement : préfixe du
+        terme entier d'abord, puis nombre d'occurrences, puis longueur.
+        """
+        prefix = " ".join(tokenize(q))
+        if not prefix:
+            return []
+        best: Dict[TermKey, int] = {}
+        i = bisect_left(self._entries, (prefix,))
+        end = min(len(self._entries), i + SCAN_LIMIT)
+        while i < end and self._entries[i][0].startswith(prefix):
+            _, position, key = self._entries[i]
+            if key in self._terms and position < best.get(key, position + 1):
+                best[key] = position
+            i += 1
+
+        ranked = sorted(
+            best.items(),
+            key=lambda item: (item[1] > 0, -len(self._terms[item[0]].refs), len(item[0][1]), item[0][1])
+        )
+        return [
+            {"type": RESULT_TYPES.get(key[0], key[0]), "value": self._terms[key].value, "count": len(self._terms[key].refs)}
+            for key, _ in ranked[:limit]
+        ]
+
+
+# ============================================
+# INDEX PAR UTILISATEUR
+# ============================================
+
+_indexes = TTLCache(max_entries=settings.TYPEAHEAD_MAX_USERS, ttl=settings.TYPEAHEAD_TTL_SECONDS)
+_build_locks: Dict[str, asyncio.Lock] = {}
+# Utilisateurs dont l'index est en construction -> écriture concurrente constatée
+_building: Dict[str, bool] = {}
+
+
+def _on_typeahead_invalidated(user_id: Optional[str]):
+    if user_id is None:
+        _indexes.clear()
+    else:
+        _indexes.invalidate(user_id)
+        if user_id in _building:
+            _building[user_id] = True
+
+
+get_invalidation_bus().subscribe("typeahead", _on_typeahead_invalidated)
+
+
+async def _build(db, user_id: str) -> PrefixIndex:
+    index = PrefixIndex()
+    for collection, fields in INDEXED_FIELDS.items():
+        projection = {"_id": 0, "id": 1, **{f: 1 for f in fields}}
+        async for doc in db[collection].find({"user_id": user_id}, projection):
+            index.add_document(collection, doc)
+    return index
+
+
+async def get_index(db, user_id: str) -> PrefixIndex:
+    """Index de l'utilisateur, construit une seule fois même sous requêtes concurrentes"""
+    index = _indexes.get(user_id)
+    if index is not None:
+        return index
+
+    lock = _build_locks.setdefault(user_id, asyncio.Lock())
+    try:
+        async with lock:
+            index = _indexes.get(user_id)
+            if index is not None:
+                return index
+            _building[user_id] = False
+            try:
+                index = await _build(db, user_id)
+                # Une écriture pendant la construction : l'index sert cette
+                # requête mais n'est pas conservé
+                if not _building[user_id]:
+                    _indexes.set(user_id, index)
+            finally:
+                _building.pop(user_id, None)
+            return index
+    finally:
+        if not lock.locked():
+            _build_locks.pop(user_id, None)
+
+
+async def suggest(db, user_id: str, q: str, limit: int = 8) -> List[dict]:
+    index = await get_index(db, user_id)
+    return index.search(q, limit)
+
+
+# ============================================
+# MISES À JOUR SUR LES ÉCRITURES
+# ============================================
+
+async def record_typeahead_change(user_id: str, collection: str, before: Optional[dict] = None,
+                                  after: Optional[dict] = None):
+    """
+    Répercute une création (after), suppression (before) ou modification
+    (before + after) sur l'index local s'il est chargé ; les autres workers
+    abandonnent le leur et le reconstruiront à la demande.
+    """
+    index = _indexes.get(user_id)
+    if index is not None:
+        if before:
+            index.remove_document(collection, before)
+        if after:
+            index.add_document(collection, after)
+    if user_id in _building:
+        _building[user_id] = True
+    await get_invalidation_bus().publish("typeahead", user_id, local=False)
+
+
+async def invalidate_typeahead(user_id: str):
+    """Changements en masse (imports, réinitialisations) : reconstruction à la demande"""
+    await get_invalidation_bus().publish("typeahead", user_id)
+
+
+def typeahead_stats() -> dict:
+    return _indexes.stats()
@@ -0,0 +1,308 @@
+"""
+JobTracker SaaS - Rollup des statistiques par utilisateur
+Un document db.user_stats par utilisateur, maintenu par $inc sur les chemins
+d'écriture (candidatures, entretiens, imports) pour que les statistiques
+simples se lisent sans parcourir tout l'historique.
+Le champ version est incrémenté par chaque écriture sur les candidatures ou
+entretiens de l'utilisateur (delta, même vide, ou record_data_change) : une
+reconstruction n'est enregistrée que s'il n'a pas bougé pendant son parcours,
+et (epoch, version) sert de version des données (empreinte des exports).
+"""
+
+import logging
+import uuid
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Iterable, Optional
+
+from pymongo.errors import DuplicateKeyError
+
+logger = logging.getLogger(__name__)
+
+NONE_KEY = "_none"
+# Reconstructions successives tentées quand des écritures concurrentes l'invalident
+REBUILD_ATTEMPTS = 3
+
+
+def _on_insert() -> dict:
+    """Document créé par un $inc : compteurs partiels (stale), nouvelle epoch"""
+    return {"stale": True, "epoch": uuid.uuid4().hex}
+
+
+def _encode_key(value) -> str:
+    """Clé de sous-document Mongo sûre ('.' et '$' interdits)"""
+    if value is None or value == "":
+        return NONE_KEY
+    key = str(value).replace(".", "．")
+    if key.startswith("$"):
+        key = "＄" + key[1:]
+    return key
+
+
+def _decode_key(key: str) -> Optional[str]:
+    if key == NONE_KEY:
+        return None
+    key = key.replace("．", ".")
+    if key.startswith("＄"):
+        key = "$" + key[1:]
+    return key
+
+
+def _day(value) -> Optional[str]:
+    if isinstance(value, datetime):
+        return value.strftime("%Y-%m-%d")
+    if isinstance(value, str) and len(value) >= 10:
+        return value[:10]
+    return None
+
+
+def _parse_date(value) -> Optional[datetime]:
+    if isinstance(value, datetime):
+        parsed = value
+    elif isinstance(value, str) and value:
+        try:
+            parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            return None
+    else:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+def application_contribution(app: Optional[dict], has_interview: bool = False) -> Counter:
+    """Compteurs apportés au rollup par une candidature"""
+    contribution = Counter()
+    if not app:
+        return contribution
+
+    contribution["total"] += 1
+    contribution[f"by_status.{_encode_key(app.get('reponse') or 'pending')}"] += 1
+    contribution[f"by_type.{_encode_key(app.get('type_poste'))}"] += 1
+    if app.get("moyen"):
+        contribution[f"by_method.{_encode_key(app['moyen'])}"] += 1
+    if app.get("is_favorite"):
+        contribution["favorites"] += 1
+    if has_interview:
+        contribution["with_interview"] += 1
+
+    day = _day(app.get("date_candidature"))
+    if day:
+        contribution[f"by_day.{day}"] += 1
+
+    # Délai de réponse (en jours), mêmes règles que l'agrégation $dateFromString
+    date_reponse = _parse_date(app.get("date_reponse"))
+    date_candidature = _parse_date(app.get("date_candidature"))
+    if date_reponse and date_candidature:
+        contribution["response_time_sum"] += (date_reponse - date_candidature).total_seconds() / 86400
+        contribution["response_time_count"] += 1
+        response_day = _day(app.get("date_reponse"))
+        if response_day:
+            contribution[f"responses_by_day.{response_day}"] += 1
+
+    return contribution
+
+
+def application_delta(before: Optional[dict], after: Optional[dict],
+                      has_interview: bool = False) -> Counter:
+    """Différence de contribution entre deux versions d'une candidature"""
+    delta = Counter(application_contribution(after, has_interview))
+    delta.subtract(application_contribution(before, has_interview))
+    return delta
+
+
+async def apply_stats_delta(db, user_id: str, delta: Counter):
+    """
+    Applique un delta au rollup et incrémente sa version (même si le delta est
+    vide : les données ont changé). Upsert : un document créé ici est marqué
+    stale et sera reconstruit à la prochaine lecture, mais aucun delta n'est
+    perdu pendant la reconstruction.
+    """
+    inc = {path: value for path, value in delta.items() if value}
+    try:
+        await db.user_stats.update_one(
+            {"user_id": user_id},
+            {
+                "$inc": {**inc, "version": 1},
+                "$set": {"updated_at": datetime.now(timezone.utc).isoformat()},
+                "$setOnInsert": _on_insert(),
+            },
+            upsert=True
+        )
+    except Exception as e:
+        # Le rollup est secondaire : on invalide plutôt que de faire échouer l'écriture
+        logger.error(f"user_stats update failed for {user_id}: {e}")
+        await invalidate_user_stats(db, user_id)
+
+
+async def record_application_change(db, user_id: str, before: Optional[dict] = None,
+                                    after: Optional[dict] = None, has_interview: bool = False):
+    """Met à jour le rollup après création / modification / suppression d'une candidature"""
+    await apply_stats_delta(db, user_id, application_delta(before, after, has_interview))
+
+
+async def record_applications_inserted(db, user_id: str, apps: Iterable[dict]):
+    """Met à jour le rollup après un import (un seul $inc pour tout le lot)"""
+    delta = Counter()
+    for app in apps:
+        delta.update(application_contribution(app))
+    await apply_stats_delta(db, user_id, delta)
+
+
+async def record_interview_link(db, user_id: str, candidature_id: str, created: bool):
+    """
+    Met à jour with_interview après création / suppression d'un entretien :
+    seul le premier entretien créé ou le dernier supprimé change le compteur.
+    """
+    remaining = await db.interviews.count_documents({"candidature_id": candidature_id}, limit=2)
+    delta = Counter()
+    if (created and remaining == 1) or (not created and remaining == 0):
+        delta["with_interview"] = 1 if created else -1
+    # Delta vide : la version des données change quand même
+    await apply_stats_delta(db, user_id, delta)
+
+
+async def record_data_change(db, user_id: str):
+    """
+    Écriture sur les candidatures / entretiens sans effet sur les compteurs
+    (champs non agrégés, entretiens, imports) : incrémente seulement la version
+    """
+    try:
+        await db.user_stats.update_one(
+            {"user_id": user_id},
+            {"$inc": {"version": 1}, "$setOnInsert": _on_insert()},
+            upsert=True
+        )
+    except DuplicateKeyError:
+        # Document créé en même temps : l'incrément porte sur lui
+        await db.user_stats.update_one({"user_id": user_id}, {"$inc": {"version": 1}})
+
+
+async def data_version(db, user_id: str) -> str:
+    """Version des candidatures et entretiens de l'utilisateur : change à chaque écriture"""
+    doc = await db.user_stats.find_one({"user_id": user_id}, {"_id": 0, "epoch": 1, "version": 1})
+    if not doc or not doc.get("epoch"):
+        try:
+            # Rollup absent ou antérieur aux epochs
+            await db.user_stats.update_one(
+                {"user_id": user_id, "epoch": {"$exists": False}},
+                {"$set": {"epoch": uuid.uuid4().hex}, "$setOnInsert": {"stale": True, "version": 0}},
+                upsert=True
+            )
+        except DuplicateKeyError:
+            pass
+        doc = await db.user_stats.find_one({"user_id": user_id}, {"_id": 0, "epoch": 1, "version": 1})
+    return f"{doc['epoch']}:{doc.get('version', 0)}"
+
+
+async def invalidate_user_stats(db, user_id: str):
+    """Marque le rollup à reconstruire (prochaine lecture) ; une reconstruction en cours est abandonnée"""
+    try:
+        await db.user_stats.update_one(
+            {"user_id": user_id},
+            {"$set": {"stale": True}, "$inc": {"version": 1}, "$setOnInsert": {"epoch": uuid.uuid4().hex}},
+            upsert=True
+        )
+    except DuplicateKeyError:
+        # Document créé en même temps par un delta : lui aussi est stale
+        await db.user_stats.update_one({"user_id": user_id}, {"$set": {"stale": True}, "$inc": {"version": 1}})
+
+
+async def _current_version(db, user_id: str) -> int:
+    """Version du rollup, document stale créé s'il n'existe pas encore"""
+    try:
+        await db.user_stats.update_one(
+            {"user_id": user_id},
+            {"$setOnInsert": {**_on_insert(), "version": 0}},
+            upsert=True
+        )
+    except DuplicateKeyError:
+        pass
+    doc = await db.user_stats.find_one({"user_id": user_id}, {"_id": 0, "version": 1})
+    return doc.get("version", 0)
+
+
+async def _compute_user_stats(db, user_id: str) -> dict:
+    with_interview_ids = set(await db.interviews.distinct("candidature_id", {"user_id": user_id}))
+
+    totals = Counter()
+    cursor = db.applications.find(
+        {"user_id": user_id},
+        {"_id": 0, "id": 1, "reponse": 1, "type_poste": 1, "moyen": 1, "is_favorite": 1,
+         "date_candidature": 1, "date_reponse": 1}
+    )
+    async for app in cursor:
+        totals.update(application_contribution(app, app.get("id") in with_interview_ids))
+
+    doc = {
+        "total": 0,
+        "favorites": 0,
+        "with_interview": 0,
+        "response_time_sum": 0,
+        "response_time_count": 0,
+        "by_status": {},
+        "by_type": {},
+        "by_method": {},
+        "by_day": {},
+        "responses_by_day": {},
+    }
+    for path, value in totals.items():
+        if "." in path:
+            group, key = path.split(".", 1)
+            doc[group][key] = value
+        else:
+            doc[path] = value
+    return doc
+
+
+async def rebuild_user_stats(db, user_id: str) -> dict:
+    """
+    Recalcule entièrement le rollup d'un utilisateur depuis les collections.
+    Enregistré seulement si la version n'a pas bougé pendant le parcours (sinon
+    un $inc concurrent serait écrasé) ; recommencé jusqu'à REBUILD_ATTEMPTS fois,
+    puis laissé stale pour la lecture suivante.
+    """
+    for _ in range(REBUILD_ATTEMPTS):
+        version = await _current_version(db, user_id)
+        doc = await _compute_user_stats(db, user_id)
+        doc["updated_at"] = datetime.now(timezone.utc).isoformat()
+        result = await db.user_stats.update_one(
+            {"user_id": user_id, "version": version},
+            {"$set": {**doc, "stale": False}}
+        )
+        if result.matched_count:
+            return doc
+    logger.info(f"user_stats rebuild for {user_id} kept losing to concurrent writes")
+    return doc
+
+
+async def get_user_stats(db, user_id: str) -> dict:
+    """
+    Lit le rollup (reconstruit s'il manque) avec les clés décodées.
+    Les répartitions sont triées par nombre décroissant, l'histogramme par jour.
+    """
+    doc = await db.user_stats.find_one({"user_id": user_id}, {"_id": 0})
+    if not doc or doc.get("stale"):
+        doc = await rebuild_user_stats(db, user_id)
+
+    def decode(group: str, sort_by_count: bool = True) -> dict:
+        items = [(_decode_key(k), v) for k, v in (doc.get(group) or {}).items() if v]
+        if sort_by_count:
+            items.sort(key=lambda item: item[1], reverse=True)
+        else:
+            items.sort(key=lambda item: item[0] or "")
+        return dict(items)
+
+    return {
+        "total": doc.get("total", 0),
+        "favorites": doc.get("favorites", 0),
+        "with_interview": doc.get("with_interview", 0),
+        "response_time_sum": doc.get("response_time_sum", 0),
+        "response_time_count": doc.get("response_time_count", 0),
+        "by_status": decode("by_status"),
+        "by_type": decode("by_type"),
+        "by_method": decode("by_method"),
+        "by_day": decode("by_day", sort_by_count=False),
+        "responses_by_day": decode("responses_by_day", sort_by_count=False),
+    }